@@ -0,0 +1,223 @@
+# batch_render.py
+"""
+Пакетный рендер протоколов по манифесту — параллельно, в нескольких процессах.
+
+    python -m batch_render manifest.json [--workers N] [--no-word] [--summary result.json]
+
+Манифест:
+  * JSON — список заданий (формат как у render_engine.job_from_dict) либо
+    {"defaults": {...}, "jobs": [{...}, ...]} — defaults подмешиваются в каждое задание;
+  * CSV (; или ,) — строка = задание. Колонки: mode, out, tpl, tests, xls_tests, xls_eq,
+    risk, scans_dir, rooms_file, selected_tests (через "|"), report, use_word, name;
+    прочие колонки (object, prt, year, customer, ...) уходят в fields.
+
+Относительные пути считаются от папки манифеста.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+import render_engine
+import word_pool
+from logger import logger
+
+# колонки CSV, которые относятся к самому заданию (остальные — поля формы)
+JOB_KEYS = {
+    "name", "mode", "out", "tpl", "tests", "xls_tests", "xls_eq", "risk", "scans_dir",
+    "rooms_file", "selected_tests", "report", "use_word",
+}
+_FALSE = {"0", "false", "no", "нет", ""}
+
+
+@dataclass
+class JobOutcome:
+    index: int
+    name: str
+    ok: bool
+    seconds: float
+    out_path: str = ""
+    out_report_path: str = ""
+    missing: List[str] = field(default_factory=list)
+    error: str = ""
+
+
+# =============================================================================
+# 1) Манифест
+# =============================================================================
+def _csv_row_to_job(row: Dict[str, str]) -> Dict[str, Any]:
+    job: Dict[str, Any] = {}
+    fields: Dict[str, str] = {}
+    for k, v in row.items():
+        if k is None:
+            continue
+        k = k.strip()
+        v = (v or "").strip()
+        if k in JOB_KEYS:
+            if not v:
+                continue
+            if k == "selected_tests":
+                job[k] = [t.strip() for t in v.split("|") if t.strip()]
+            elif k in ("report", "use_word"):
+                job[k] = v.lower() not in _FALSE
+            else:
+                job[k] = v
+        elif k:
+            fields[k] = v
+    if fields:
+        job["fields"] = fields
+    return job
+
+
+def load_manifest(path: Path) -> List[Dict[str, Any]]:
+    """Манифест (JSON/CSV) -> список словарей-заданий для render_engine.job_from_dict."""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            defaults = data.get("defaults") or {}
+            jobs = data.get("jobs") or []
+        else:
+            defaults, jobs = {}, data
+        if not isinstance(jobs, list):
+            raise ValueError(f"{path.name}: ожидается список заданий")
+        out = []
+        for i, j in enumerate(jobs, 1):
+            if not isinstance(j, dict):
+                raise ValueError(f"{path.name}: задание #{i} — ожидается объект, получено {type(j).__name__}")
+            merged = {**defaults, **j}
+            if "fields" in defaults or "fields" in j:
+                merged["fields"] = {**(defaults.get("fields") or {}), **(j.get("fields") or {})}
+            out.append(merged)
+        return out
+
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        text = f.read()
+    delim = ";" if text.count(";") >= text.count(",") else ","
+    return [_csv_row_to_job(r) for r in csv.DictReader(text.splitlines(), delimiter=delim)]
+
+
+def _job_name(index: int, d: Dict[str, Any]) -> str:
+    return str(d.get("name") or f"#{index + 1} {str(d.get('mode') or 'OQ').upper()} {Path(str(d.get('out') or '')).name}")
+
+
+# =============================================================================
+# 2) Исполнение (функция верхнего уровня — её вызывает дочерний процесс)
+# =============================================================================
+def _run_one(index: int, d: Dict[str, Any], base: str, no_word: bool) -> JobOutcome:
+    name = _job_name(index, d)
+    t0 = time.perf_counter()
+    try:
+        if no_word:
+            d = {**d, "use_word": False}
+        job = render_engine.job_from_dict(d, base=Path(base))
+        result = render_engine.render_job(job)
+        return JobOutcome(
+            index=index, name=name, ok=True, seconds=time.perf_counter() - t0,
+            out_path=result.out_path, out_report_path=result.out_report_path or "",
+            missing=list(result.missing),
+        )
+    except Exception as e:
+        logger.exception(f"Ошибка рендера задания {name}:")
+        return JobOutcome(index=index, name=name, ok=False, seconds=time.perf_counter() - t0, error=str(e))
+
+
+def _worker_init() -> None:
+    # Word в процессе-воркере живёт между заданиями; закроется по простою или при выходе
+    word_pool.POOL.keep_warm = True
+
+
+def run_batch(
+    jobs: List[Dict[str, Any]],
+    *,
+    base: Path,
+    workers: int | None = None,
+    no_word: bool = False,
+) -> List[JobOutcome]:
+    """Рендерит задания в ProcessPoolExecutor; результаты — в порядке манифеста."""
+    workers = max(1, workers or os.cpu_count() or 1)
+    outcomes: List[JobOutcome] = []
+    if workers == 1 or len(jobs) <= 1:
+        with word_pool.session():   # один Word на весь пакет
+            for i, d in enumerate(jobs):
+                outcomes.append(_run_one(i, d, str(base), no_word))
+                _print_outcome(outcomes[-1], len(jobs))
+        return outcomes
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_worker_init) as ex:
+        futures = {ex.submit(_run_one, i, d, str(base), no_word): i for i, d in enumerate(jobs)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                o = fut.result()
+            except Exception as e:  # упал сам процесс (BrokenProcessPool и т.п.)
+                o = JobOutcome(index=i, name=_job_name(i, jobs[i]), ok=False, seconds=0.0, error=str(e))
+            outcomes.append(o)
+            _print_outcome(o, len(jobs))
+    outcomes.sort(key=lambda o: o.index)
+    return outcomes
+
+
+def _print_outcome(o: JobOutcome, total: int) -> None:
+    status = "OK " if o.ok else "ERR"
+    tail = o.out_path if o.ok else o.error
+    print(f"[{o.index + 1}/{total}] {status} {o.name} ({o.seconds:.1f} с) {tail}", flush=True)
+
+
+# =============================================================================
+# 3) CLI
+# =============================================================================
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m batch_render",
+        description="Пакетный параллельный рендер протоколов по манифесту (JSON/CSV)",
+    )
+    p.add_argument("manifest", help="JSON/CSV со списком заданий")
+    p.add_argument("-w", "--workers", type=int, default=None, help="Число процессов (по умолчанию — число ядер)")
+    p.add_argument("--no-word", action="store_true", help="Не запускать MS Word для финализации")
+    p.add_argument("--summary", help="Сохранить итог по заданиям в JSON")
+    args = p.parse_args(argv)
+
+    manifest = Path(args.manifest).resolve()
+    try:
+        jobs = load_manifest(manifest)
+    except Exception as e:
+        logger.exception("Ошибка чтения манифеста:")
+        print(f"Ошибка чтения манифеста: {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("Манифест пуст.")
+        return 0
+
+    t0 = time.perf_counter()
+    outcomes = run_batch(jobs, base=manifest.parent, workers=args.workers, no_word=args.no_word)
+    wall = time.perf_counter() - t0
+
+    ok = sum(o.ok for o in outcomes)
+    print(f"\nГотово: {ok}/{len(outcomes)} успешно, ошибок: {len(outcomes) - ok}. Общее время: {wall:.1f} с")
+    for o in outcomes:
+        if not o.ok:
+            print(f"  ✗ {o.name}: {o.error}")
+        elif o.missing:
+            print(f"  ! {o.name}: не вставлены тесты: {', '.join(o.missing)}")
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(
+                {"wall_seconds": round(wall, 3), "jobs": [asdict(o) for o in outcomes]},
+                f, ensure_ascii=False, indent=2,
+            )
+    return 0 if ok == len(outcomes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
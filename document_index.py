@@ -0,0 +1,203 @@
+# document_index.py
+"""
+Классификация таблиц документа за один проход.
+
+Каждый этап постобработки раньше сам перебирал doc.tables, склеивал текст
+шапки через rows[0].cells и искал «свою» таблицу по ключевым словам. Здесь
+таблицы один раз читаются из XML (текст ячеек — как у python-docx, с учётом
+gridSpan/vMerge) и размечаются по декларативным правилам RULES:
+
+    index = DocumentIndex(doc)
+    tbl = index.first(ROOMS)                  # Table или None
+    for tbl in index.tables(RESULTS): ...
+    row = index.row(tbl, RESULTS)             # строка, на которой сработало правило
+
+Таблицы, которых индекс ещё не видел (вставленные этапом), классифицируются
+при следующем запросе; таблицу, которую этап разрезал или перестроил, надо
+переразметить: index.refresh(tbl). Номер строки — на момент разметки.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from docx.document import Document as DocxDocument
+from docx.oxml.ns import qn
+from docx.table import Table
+
+from table_index import cell_text
+from table_view import norm
+
+_W_TBL = qn("w:tbl")
+_W_TR = qn("w:tr")
+_W_TC = qn("w:tc")
+
+
+# ===== 1) Виды таблиц =====
+ROOMS = "rooms"                      # таблица помещений (протокол и Таблица 1 ОТЧ)
+EQUIPMENT = "equipment"              # средства измерений: строка-шаблон с @1..@4
+EQUIPMENT_DATES = "equipment_dates"  # столбец «Дата поверки/ Действительно до»
+TABLE5 = "table5"                    # анализ рисков: строка-шаблон <<T5_RISK>>
+TEST = "test"                        # любая тест-таблица (описательная или результатная)
+TEST11_TITLE = "test11_title"        # заголовок «Тест 11.x …» в первой строке
+RESULTS = "results"                  # шапка результатов: номер помещения / площадь / № точки
+SUPPLY_AIR = "supply_air"            # Тест 11 «Проверка расхода приточного воздуха»
+TEST11_FLOWS = "test11_flows"        # таблица калькулятора: «фактический суммарный»
+TEST_11_2 = "test_11_2"              # Тест 11.2 «Проверка кратности воздухообмена в ЧП»
+TEST11_3 = "test11_3"                # результаты Теста 11.3: фильтр / скорость / расход / соответствует
+REPORT_TABLE1 = "report_table1"      # ОТЧ, Таблица 1: строка-шаблон #, ##, …, #%%%
+REPORT_TABLE2 = "report_table2"      # ОТЧ, Таблица 2: тест / критерий / факт / оценка
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Правило «таблица — вид `kind`», проверяется по строкам таблицы.
+
+    Строка подходит, если её текст (ячейки через пробел, norm) содержит все
+    подстроки all_of и хотя бы одну из каждой группы any_of, среди ячеек
+    есть все значения cells (точно, после strip), а regex находится в одной
+    из ячеек (re.M — с начала любого абзаца). col — смотреть только эту
+    ячейку, rows — только первые N строк (None — все), last — запоминать
+    последнюю подходящую строку, а не первую.
+    """
+    kind: str
+    all_of: Tuple[str, ...] = ()
+    any_of: Tuple[Tuple[str, ...], ...] = ()
+    cells: FrozenSet[str] = frozenset()
+    regex: Optional[str] = None
+    col: Optional[int] = None
+    rows: Optional[int] = 1
+    last: bool = False
+
+    def matches(self, cells: Sequence[str], text: str) -> bool:
+        if self.col is not None:
+            if self.col >= len(cells):
+                return False
+            cells = cells[self.col:self.col + 1]
+            text = norm(cells[0])
+        if any(s not in text for s in self.all_of):
+            return False
+        if any(not any(s in text for s in group) for group in self.any_of):
+            return False
+        if self.cells and not self.cells <= {c.strip() for c in cells}:
+            return False
+        if self.regex is not None and not any(re.search(self.regex, c, re.I | re.M) for c in cells):
+            return False
+        return True
+
+
+RULES: Tuple[Rule, ...] = (
+    Rule(ROOMS, all_of=("номер помещения",), col=0),
+    Rule(EQUIPMENT, any_of=(("@1", "@2", "@3", "@4"),), rows=None),
+    Rule(EQUIPMENT_DATES, all_of=("дата поверки/ действительно до",), rows=3),
+    Rule(TABLE5, all_of=("<<t5_risk>>",), rows=None),
+    # тест-таблица: результатная …
+    Rule(TEST, all_of=("номер помещения", "площад"), any_of=(("точк", "№"),)),
+    Rule(TEST, all_of=("результат", "испытан")),
+    # … или описательная
+    Rule(TEST, any_of=(("дата провед", "контролируемый параметр",
+                        "критерий приемлемости", "квалификационное испытание"),)),
+    Rule(TEST11_TITLE, regex=r"^\s*Тест\s*11[\.\s]"),
+    Rule(RESULTS, all_of=("номер", "помещени", "площад"), any_of=(("точк", "№"),), rows=None, last=True),
+    Rule(SUPPLY_AIR, all_of=("проверка расхода приточного воздуха",), rows=6),
+    Rule(TEST11_FLOWS, all_of=("расход приточного воздуха", "фактический суммарный")),
+    Rule(TEST_11_2, all_of=("тест",), any_of=(("11.2", "11,2"), ("кратност", "чп"))),
+    Rule(TEST11_3, all_of=("фильтр", "скорост", "расход", "приточ", "соответ")),
+    Rule(REPORT_TABLE1, cells=frozenset({"#", "##", "#%%%"}), rows=None),
+    Rule(REPORT_TABLE2, all_of=("тест", "критер", "фактичес", "оценк")),
+)
+
+
+# ===== 2) Разметка таблицы =====
+def _row_cells(tr, above: Dict[int, str]) -> List[str]:
+    """
+    Текст ячеек строки по колонкам сетки — как [c.text for c in row.cells]:
+    gridSpan повторяет ячейку, vMerge-продолжение берёт текст верхней.
+    above: колонка сетки -> текст ячейки выше (обновляется).
+    """
+    out: List[str] = []
+    for tc in tr.iterchildren(_W_TC):
+        col = len(out)
+        text = above.get(col, "") if tc.vMerge == "continue" else cell_text(tc)
+        span = tc.grid_span
+        for c in range(col, col + span):
+            above[c] = text
+        out.extend([text] * span)
+    return out
+
+
+def classify(tbl, rules: Sequence[Rule] = RULES) -> Dict[str, int]:
+    """Вид таблицы -> номер строки, на которой сработало правило этого вида."""
+    depth = 0
+    for r in rules:
+        if r.rows is None:
+            depth = None
+            break
+        depth = max(depth, r.rows)
+
+    hits: Dict[str, int] = {}
+    above: Dict[int, str] = {}
+    for ri, tr in enumerate(tbl.iterchildren(_W_TR)):
+        if depth is not None and ri >= depth:
+            break
+        cells = _row_cells(tr, above)
+        text = norm(" ".join(cells))
+        for r in rules:
+            if r.rows is not None and ri >= r.rows:
+                continue
+            if (r.last or r.kind not in hits) and r.matches(cells, text):
+                hits[r.kind] = ri
+    return hits
+
+
+# ===== 3) Индекс документа =====
+class DocumentIndex:
+    """Виды таблиц тела документа (doc.tables), в порядке документа."""
+
+    def __init__(self, doc: DocxDocument, rules: Sequence[Rule] = RULES):
+        self.doc = doc
+        self.rules = tuple(rules)
+        self._hits: Dict[object, Dict[str, int]] = {}
+        for tbl in self._body_tables():
+            self._hits[tbl] = classify(tbl, self.rules)
+
+    def _body_tables(self) -> List:
+        return list(self.doc.element.body.iterchildren(_W_TBL))
+
+    def _scan(self) -> List:
+        # новые таблицы (вставленные после построения индекса) размечаются здесь
+        tbls = self._body_tables()
+        for tbl in tbls:
+            self._hits_of(tbl)
+        return tbls
+
+    def _wrap(self, tbl) -> Table:
+        return Table(tbl, self.doc._body)
+
+    def tables(self, kind: str) -> List[Table]:
+        return [self._wrap(t) for t in self._scan() if kind in self._hits[t]]
+
+    def first(self, kind: str) -> Optional[Table]:
+        for t in self._scan():
+            if kind in self._hits[t]:
+                return self._wrap(t)
+        return None
+
+    def _hits_of(self, tbl) -> Dict[str, int]:
+        hits = self._hits.get(tbl)
+        if hits is None:
+            hits = self._hits[tbl] = classify(tbl, self.rules)
+        return hits
+
+    def row(self, table: Table, kind: str) -> Optional[int]:
+        return self._hits_of(table._tbl).get(kind)
+
+    def kinds(self, table: Table) -> FrozenSet[str]:
+        return frozenset(self._hits_of(table._tbl))
+
+    def refresh(self, *tables: Table) -> None:
+        """Переразметить таблицы после разрезания/перестройки."""
+        for t in tables:
+            self._hits[t._tbl] = classify(t._tbl, self.rules)
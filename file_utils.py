@@ -1,4 +1,6 @@
 # file_utils.py
+import os
+from pathlib import Path
 from tempfile import NamedTemporaryFile
 from contextlib import contextmanager
 
@@ -10,7 +12,15 @@ def temp_docx(suffix: str = ".docx"):
     finally:
         try:
             f.close()
-            import os
             os.remove(f.name)
         except OSError:
             pass
+
+
+# Кэши на диске (индексы тестов/сканов, обработанные картинки) — рядом с проектом,
+# можно переопределить переменной окружения OQGEN_CACHE_DIR
+def cache_dir(name: str) -> Path:
+    base = os.environ.get("OQGEN_CACHE_DIR") or Path(__file__).resolve().parent / ".cache"
+    path = Path(base) / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
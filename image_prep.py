@@ -0,0 +1,152 @@
+# image_prep.py
+"""
+Подготовка картинок перед вставкой в DOCX (сканы поверок, Приложения 1/4/5).
+
+Сканы приходят в полном разрешении (3–6 тыс. px), а в документе занимают
+150–160 мм — файл протокола раздувается до сотен МБ, сохранение и открытие
+в Word становятся медленными. Здесь каждая картинка:
+  1) разворачивается по EXIF-ориентации;
+  2) уменьшается до TARGET_DPI при ширине вставки;
+  3) пережимается: PNG/GIF остаются PNG, остальное — в JPEG.
+
+Если картинку не пришлось ни поворачивать, ни уменьшать, JPEG вставляется как
+есть, а остальные форматы — только если пережатие дало выигрыш по размеру.
+
+Результат кладётся в .cache/images по хэшу содержимого исходника и параметрам,
+поэтому повторный рендер берёт готовый файл. Обработка — в пуле потоков.
+Без Pillow (или при любой ошибке) используется исходный файл — как раньше.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from file_utils import cache_dir
+from logger import logger
+
+TARGET_DPI = 200
+JPEG_QUALITY = 85
+_VERSION = 2  # менять при изменении алгоритма — старый кэш не подхватится
+
+_PREP_EXT = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".gif"}
+# форматы без потерь — скриншоты Приложений не превращаем в JPEG
+_LOSSLESS_FORMATS = {"PNG", "GIF"}
+_EXIF_ORIENTATION = 0x0112
+
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+_memo_lock = threading.Lock()
+# протокол и ОТЧ готовят одни и те же сканы одновременно — один ключ обрабатывается один раз
+_key_locks: Dict[str, threading.Lock] = {}
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _memo_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _content_digest(path: str) -> str:
+    st = os.stat(path)
+    memo_key = (path, st.st_mtime_ns, st.st_size)
+    with _memo_lock:
+        d = _digest_memo.get(memo_key)
+    if d is None:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        d = h.hexdigest()
+        with _memo_lock:
+            _digest_memo[memo_key] = d
+    return d
+
+
+def _encode(img, lossless: bool) -> Tuple[bytes, str]:
+    buf = io.BytesIO()
+    if lossless:
+        img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), ".png"
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue(), ".jpg"
+
+
+def prepare_image(path: str, *, width_mm: float = 160, dpi: int = TARGET_DPI) -> str:
+    """Путь к подготовленной копии картинки (из кэша) или исходный путь."""
+    if not path or Path(path).suffix.lower() not in _PREP_EXT or not os.path.isfile(path):
+        return path
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return path
+
+    try:
+        key = hashlib.sha1(
+            f"{_content_digest(path)}|{width_mm}|{dpi}|{JPEG_QUALITY}|{_VERSION}".encode()
+        ).hexdigest()
+        with _lock_for(key):
+            return _prepare(path, key, Image, ImageOps, width_mm=width_mm, dpi=dpi)
+    except Exception as e:
+        logger.warning(f"Не удалось подготовить картинку {path}: {e} — вставляю исходник")
+        return path
+
+
+def _prepare(path: str, key: str, Image, ImageOps, *, width_mm: float, dpi: int) -> str:
+    out_dir = cache_dir("images")
+    for ext in (".jpg", ".png", ".orig"):
+        cached = out_dir / f"{key}{ext}"
+        if cached.exists():
+            # .orig — маркер «обработка не дала выигрыша, берём исходник»
+            return path if ext == ".orig" else str(cached)
+
+    with Image.open(path) as src:
+        src.load()
+        src_format = src.format
+        # exif_transpose возвращает копию и без тега ориентации — смотрим на сам тег
+        rotated = src.getexif().get(_EXIF_ORIENTATION, 1) not in (0, 1)
+        img = ImageOps.exif_transpose(src) if rotated else src
+        resized = False
+
+        max_px = int(round(width_mm / 25.4 * dpi))
+        if img.width > max_px:
+            h = max(1, int(round(img.height * max_px / img.width)))
+            img = img.resize((max_px, h), Image.LANCZOS)
+            resized = True
+
+        if src_format == "JPEG" and not (rotated or resized):
+            # повторное сжатие с потерями без поворота и уменьшения только портит скан
+            (out_dir / f"{key}.orig").touch()
+            return path
+
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        data, ext = _encode(img, has_alpha or src_format in _LOSSLESS_FORMATS)
+
+    # повёрнутую картинку оставляем и при росте размера: Word не учитывает EXIF-ориентацию
+    if not resized and not rotated and len(data) >= os.path.getsize(path):
+        (out_dir / f"{key}.orig").touch()
+        return path
+
+    target = out_dir / f"{key}{ext}"
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+    logger.debug(
+        f"Картинка подготовлена: {Path(path).name} {os.path.getsize(path) // 1024} КБ -> {len(data) // 1024} КБ"
+    )
+    return str(target)
+
+
+def prepare_images(paths: List[str], *, width_mm: float = 160, dpi: int = TARGET_DPI,
+                   max_workers: int | None = None) -> List[str]:
+    """prepare_image для списка — параллельно, порядок сохраняется."""
+    paths = list(paths or [])
+    if len(paths) <= 1:
+        return [prepare_image(p, width_mm=width_mm, dpi=dpi) for p in paths]
+    workers = max_workers or min(8, (os.cpu_count() or 2), len(paths))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="img") as ex:
+        return list(ex.map(lambda p: prepare_image(p, width_mm=width_mm, dpi=dpi), paths))
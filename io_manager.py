@@ -1,10 +1,13 @@
 # io_manager.py
 from __future__ import annotations
 
+import csv
+import json
 from pathlib import Path
 from typing import List, Dict
 
 import pandas as pd
+import workbook_cache
 from logger import logger
 
 
@@ -29,7 +32,7 @@ def load_tests_list(excel_path: Path) -> List[str]:
     Берётся первый столбец первого листа (как было ранее).
     """
     validate_file(excel_path)
-    df = pd.read_excel(excel_path, dtype=str)
+    df = workbook_cache.frame(excel_path)
 
     if df.empty or df.columns.size == 0:
         raise ValueError(f"В файле {excel_path} нет данных для тестов")
@@ -49,10 +52,24 @@ def load_tests_list(excel_path: Path) -> List[str]:
 # Оборудование (Excel -> списки словарей)
 # ---------------------------
 
+def _str_col(df: pd.DataFrame, col: str | None) -> pd.Series:
+    """Колонка как строки без пробелов по краям; пусто/NaN/колонки нет -> ""."""
+    if not col:
+        return pd.Series("", index=df.index, dtype=object)
+    s = df.iloc[:, list(df.columns).index(col)]   # первая колонка с таким именем
+    if isinstance(s.dtype, pd.StringDtype):            # read_excel(dtype=str) — уже строки
+        return s.fillna("").str.strip()
+    # иначе через object — чтобы str() был как у скаляра
+    # (Timestamp -> "2025-03-01 00:00:00", 2.0 -> "2.0")
+    s = s.astype(object)
+    return s.where(s.notna(), "").astype(str).str.strip()
+
+
 def _parse_equipment_df(df: pd.DataFrame) -> List[dict]:
     """
     Универсальный парсер листа Excel с оборудованием.
     Возвращает список словарей с ключами: name_sn, params, cert, date, until
+    Разбор по колонкам целиком (без iterrows) — большие перечни приборов.
     """
     df = df.copy()
     df.rename(columns=lambda c: str(c).strip(), inplace=True)
@@ -67,20 +84,20 @@ def _parse_equipment_df(df: pd.DataFrame) -> List[dict]:
     if not name_col or not sn_col:
         raise ValueError("Нет колонок «Наименование»/«Зав. (серийный) номер»")
 
-    items: List[dict] = []
-    for _, row in df.iterrows():
-        nm = str(row[name_col]).strip() if pd.notna(row[name_col]) else ""
-        if not nm:
-            continue
-        sn = str(row[sn_col]).strip() if pd.notna(row[sn_col]) else ""
-        items.append({
-            "name_sn": f"{nm}, {sn}".strip(", "),
-            "params": str(row[param_col]).strip() if param_col and pd.notna(row.get(param_col)) else "",
-            "cert":   str(row[cert_col]).strip()  if cert_col  and pd.notna(row.get(cert_col))  else "",
-            "date":   str(row[date_col]).strip()  if date_col  and pd.notna(row.get(date_col))  else "",
-            "until":  str(row[until_col]).strip() if until_col and pd.notna(row.get(until_col)) else "",
-        })
-    return items
+    nm = _str_col(df, name_col)
+    keep = nm != ""
+    if not keep.any():
+        return []
+
+    cols = {
+        "name_sn": (nm + ", " + _str_col(df, sn_col)).str.strip(", "),
+        "params": _str_col(df, param_col),
+        "cert":   _str_col(df, cert_col),
+        "date":   _str_col(df, date_col),
+        "until":  _str_col(df, until_col),
+    }
+    cols = {k: v[keep].tolist() for k, v in cols.items()}
+    return [dict(zip(cols, values)) for values in zip(*cols.values())]
 
 
 def load_equipment_by_sheets(excel_path: Path) -> Dict[str, List[dict]]:
@@ -89,14 +106,14 @@ def load_equipment_by_sheets(excel_path: Path) -> Dict[str, List[dict]]:
     Листы с ошибками парсинга не валят процесс — для них будет [] и warning в лог.
     """
     validate_file(excel_path)
-    xls = pd.ExcelFile(excel_path)
-    if not xls.sheet_names:
+    book = workbook_cache.get_book(excel_path)
+    if not book.sheet_names:
         raise ValueError(f"В файле {excel_path} нет листов Excel")
 
     result: Dict[str, List[dict]] = {}
-    for sheet in xls.sheet_names:
+    for sheet in book.sheet_names:
         try:
-            df = pd.read_excel(xls, sheet_name=sheet, dtype=str)
+            df = workbook_cache.frame(excel_path, sheet)
             result[sheet] = _parse_equipment_df(df)
             logger.debug(f"[{sheet}] загружено {len(result[sheet])} позиций")
         except Exception as e:
@@ -110,5 +127,48 @@ def load_equipment_list(excel_path: Path) -> List[dict]:
     Обратная совместимость: берёт первый лист (как в старой версии).
     """
     validate_file(excel_path)
-    df = pd.read_excel(excel_path, dtype=str)
+    df = workbook_cache.frame(excel_path)
     return _parse_equipment_df(df)
+
+
+# ---------------------------
+# Помещения (CSV/JSON -> список словарей)
+# ---------------------------
+
+ROOM_KEYS = ["num", "name", "klass", "area", "volume", "dp", "airflow", "exchange", "temp", "rh"]
+
+
+def load_rooms_file(path: Path) -> List[Dict[str, str]]:
+    """
+    Помещения для headless-рендера (те же поля, что в «Настройки помещений»):
+      - .json: список объектов {"num": ..., "name": ..., ...}
+      - .csv:  строка заголовков с ключами ROOM_KEYS (разделитель ; или ,),
+               либо без заголовков — колонки по порядку ROOM_KEYS.
+    """
+    path = Path(path)
+    validate_file(path)
+
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"В файле {path} ожидается список помещений")
+        rows = [{k: str(r.get(k, "") or "").strip() for k in ROOM_KEYS} for r in data]
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            text = f.read()
+        delim = ";" if text.count(";") >= text.count(",") else ","
+        lines = list(csv.reader(text.splitlines(), delimiter=delim))
+        lines = [ln for ln in lines if any(c.strip() for c in ln)]
+        if lines and set(c.strip() for c in lines[0]) & set(ROOM_KEYS):
+            header = [c.strip() for c in lines[0]]
+            lines = lines[1:]
+        else:
+            header = ROOM_KEYS
+        rows = []
+        for ln in lines:
+            rec = dict(zip(header, (c.strip() for c in ln)))
+            rows.append({k: rec.get(k, "") for k in ROOM_KEYS})
+
+    logger.debug(f"Загружено помещений: {len(rows)} из {path.name}")
+    return rows
@@ -948,21 +948,8 @@ def postprocess_equipment_dates(doc) -> None:
 
 def update_fields_only_with_word(docx_path: str) -> None:
     """Обновляет поля Word (NUMPAGES и т.п.) через COM. Требует pywin32 и MS Word."""
-    import win32com.client as win32
-
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = False
-    try:
-        doc = word.Documents.Open(str(docx_path))
-        doc.Repaginate()
-        doc.Fields.Update()
-        for sec in doc.Sections:
-            sec.Headers(1).Range.Fields.Update()
-            sec.Footers(1).Range.Fields.Update()
-        doc.Save()
-        doc.Close()
-    finally:
-        word.Quit()
+    import word_pool
+    word_pool.finalize(docx_path, ("fields",))
 
 
 # ===================== Render Worker =====================
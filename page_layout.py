@@ -0,0 +1,797 @@
+# page_layout.py
+"""
+Оценка раскладки страниц без Word и разрезание таблиц по страницам.
+
+«Продолжение таблицы N» раньше делалось либо фиксированным числом строк
+(risk_table5.split_table5_like_example), либо через COM: Word
+перепагинировал документ и на каждую строку отвечал, на какой она
+странице. Это медленно, только под Windows и не работает на Linux-узлах.
+
+Здесь раскладка оценивается по самому DOCX:
+  - страница — w:sectPr (pgSz, pgMar) секции, в которой стоит блок;
+  - ширины колонок — w:tblGrid (+ gridSpan), поля ячеек — tblCellMar;
+  - высота строки — max(trHeight, текст ячеек), exact — ровно trHeight;
+  - текст переносится по словам с метриками глифов Times New Roman
+    (TTF через Pillow, если шрифт есть в системе, иначе встроенная таблица);
+  - абзацы — кегль/интервалы/отступы с учётом стилей (basedOn), разрывы
+    страниц (w:br, pageBreakBefore, sectPr) и картинки (wp:extent).
+
+    layout = PageLayout(doc)
+    cuts = layout.table_cuts(tbl, header_rows=1)      # строки, с которых начинаются новые страницы
+    split_table_at_pages(doc, tbl, number=2, header_rows=1, layout=layout)
+
+Оценка приблизительная, поэтому режем с запасом SAFETY: лишняя строка на
+следующей странице лучше, чем разрыв, который Word сделает сам раньше нашего
+«Продолжения».
+"""
+from __future__ import annotations
+
+import re
+from copy import deepcopy
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from docx.document import Document as DocxDocument
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from logger import logger
+
+_W_P = qn("w:p")
+_W_TBL = qn("w:tbl")
+_W_TR = qn("w:tr")
+_W_TC = qn("w:tc")
+_W_SDT = qn("w:sdt")
+_W_VAL = qn("w:val")
+
+SAFETY = 0.03            # запас от высоты страницы на неточность метрик
+ROW_BORDER = 10          # twips на границу строки (Table Grid: 0,5 pt)
+LINE_FACTOR = 1.15       # одинарный интервал TNR: (ascent + descent) / em
+DEFAULT_SZ = 20          # кегль по умолчанию OOXML, полупункты (10 pt)
+DEFAULT_CELL_MAR = 108   # поля ячейки слева/справа по умолчанию, twips
+
+
+def _int(v, default: int = 0) -> int:
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return default
+
+
+def _on(el) -> bool:
+    """w:b, w:cantSplit, … — включено, если элемент есть и val не false/0."""
+    return el is not None and el.get(_W_VAL) not in ("0", "false", "off")
+
+
+# ===== 1) Метрики Times New Roman =====
+# ширины глифов, 1/1000 em (латиница — AFM Times-Roman, кириллица — TNR)
+_TNR_WIDTHS: Tuple[Tuple[int, str], ...] = (
+    (200, "|"),
+    (250, " ,."),
+    (278, "/:;\\ijlt"),
+    (300, "²³"),
+    (333, "!'()-[]`frI"),
+    (389, "Jsз"),
+    (400, "°"),
+    (408, '"'),
+    (410, "г"),
+    (437, "т"),
+    (444, "?acezасеёэ"),
+    (456, "ья"),
+    (469, "^в"),
+    (480, "{}"),
+    (486, "к"),
+    (500, "#$*_0123456789bdghknopquvxy«»–µбдлопрухч"),
+    (517, "ъ"),
+    (535, "ийнпц"),
+    (541, "~"),
+    (556, "FPSР"),
+    (564, "+<=>±×"),
+    (578, "БГЬ"),
+    (611, "ELTZЕЁТ"),
+    (633, "м"),
+    (648, "ф"),
+    (667, "BCRВСЧЭЯ"),
+    (672, "ы"),
+    (682, "Д"),
+    (691, "ж"),
+    (706, "УЪ"),
+    (722, "ADGHKNOQUVXYwАИЙКЛНОПХЦ"),
+    (747, "ю"),
+    (750, "Ф"),
+    (770, "шщ"),
+    (778, "&m"),
+    (833, "%"),
+    (885, "Ы"),
+    (889, "MМ"),
+    (896, "Ж"),
+    (921, "@"),
+    (944, "W"),
+    (1000, "—№"),
+    (1014, "Ю"),
+    (1020, "ШЩ"),
+)
+_BUILTIN: Dict[str, int] = {ch: w for w, chars in _TNR_WIDTHS for ch in chars}
+_DEFAULT_GLYPH = 500
+_BOLD_FACTOR = 1.06      # TNR Bold в среднем шире обычного начертания
+
+_TTF_CANDIDATES = (
+    "times.ttf", "Times New Roman.ttf", "TimesNewRoman.ttf",
+    "LiberationSerif-Regular.ttf",   # метрически совместим с TNR
+)
+
+
+@lru_cache(maxsize=1)
+def _ttf_font():
+    """TTF Times New Roman (или метрический аналог) через Pillow; None — нет шрифта/Pillow."""
+    try:
+        from PIL import ImageFont
+    except Exception:
+        return None
+    for name in _TTF_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, 1000)
+        except Exception:
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def glyph_width(ch: str) -> int:
+    """Ширина символа Times New Roman, 1/1000 em."""
+    font = _ttf_font()
+    if font is not None:
+        try:
+            return int(round(font.getlength(ch)))
+        except Exception:
+            pass
+    return _BUILTIN.get(ch, _DEFAULT_GLYPH)
+
+
+@lru_cache(maxsize=16384)
+def word_width(word: str, bold: bool = False) -> int:
+    """Ширина слова, 1/1000 em."""
+    w = sum(glyph_width(ch) for ch in word)
+    return int(w * _BOLD_FACTOR) if bold else w
+
+
+def to_twips(width_milli_em: int, sz: int) -> float:
+    """1/1000 em при кегле sz (полупункты) -> twips."""
+    return width_milli_em * sz / 100.0
+
+
+# ===== 2) Страница =====
+@dataclass(frozen=True)
+class PageGeometry:
+    """Размер страницы и поля, twips."""
+    width: int = 11906
+    height: int = 16838
+    top: int = 1134
+    bottom: int = 1134
+    left: int = 1701
+    right: int = 850
+
+    @property
+    def content_width(self) -> int:
+        return self.width - self.left - self.right
+
+    @property
+    def content_height(self) -> int:
+        return self.height - self.top - self.bottom
+
+
+def page_geometry(sectPr) -> PageGeometry:
+    """Геометрия из w:sectPr (pgSz/pgMar); чего нет — A4 как в шаблонах."""
+    if sectPr is None:
+        return PageGeometry()
+    d = PageGeometry()
+    sz = sectPr.find(qn("w:pgSz"))
+    mar = sectPr.find(qn("w:pgMar"))
+
+    def g(el, attr: str, default: int) -> int:
+        return _int(el.get(qn(f"w:{attr}")), default) if el is not None else default
+
+    return PageGeometry(
+        width=g(sz, "w", d.width),
+        height=g(sz, "h", d.height),
+        # отрицательный top/bottom — «не сдвигать текст под колонтитул», для оценки важен модуль
+        top=abs(g(mar, "top", d.top)),
+        bottom=abs(g(mar, "bottom", d.bottom)),
+        left=g(mar, "left", d.left),
+        right=g(mar, "right", d.right),
+    )
+
+
+# ===== 3) Стили: кегль, жирность, интервалы, отступы =====
+@dataclass(frozen=True)
+class ParaProps:
+    sz: int = DEFAULT_SZ
+    bold: bool = False
+    before: int = 0
+    after: int = 0
+    line: int = 240
+    line_rule: str = "auto"
+    ind_left: int = 0
+    ind_right: int = 0
+    first_line: int = 0          # hanging — отрицательный
+    page_break_before: bool = False
+
+
+_PPR_KEYS = ("before", "after", "line", "line_rule", "ind_left", "ind_right",
+             "first_line", "page_break_before")
+
+
+def _ppr_values(pPr) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    if pPr is None:
+        return out
+    sp = pPr.find(qn("w:spacing"))
+    if sp is not None:
+        for attr, key in (("before", "before"), ("after", "after"), ("line", "line")):
+            v = sp.get(qn(f"w:{attr}"))
+            if v is not None:
+                out[key] = _int(v)
+        rule = sp.get(qn("w:lineRule"))
+        if rule is not None:
+            out["line_rule"] = rule
+    ind = pPr.find(qn("w:ind"))
+    if ind is not None:
+        for attrs, key in ((("left", "start"), "ind_left"), (("right", "end"), "ind_right")):
+            for a in attrs:
+                v = ind.get(qn(f"w:{a}"))
+                if v is not None:
+                    out[key] = _int(v)
+                    break
+        if ind.get(qn("w:hanging")) is not None:
+            out["first_line"] = -_int(ind.get(qn("w:hanging")))
+        elif ind.get(qn("w:firstLine")) is not None:
+            out["first_line"] = _int(ind.get(qn("w:firstLine")))
+    pb = pPr.find(qn("w:pageBreakBefore"))
+    if pb is not None:
+        out["page_break_before"] = _on(pb)
+    return out
+
+
+def _rpr_values(rPr) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    if rPr is None:
+        return out
+    sz = rPr.find(qn("w:sz"))
+    if sz is not None:
+        out["sz"] = _int(sz.get(_W_VAL), DEFAULT_SZ)
+    b = rPr.find(qn("w:b"))
+    if b is not None:
+        out["bold"] = _on(b)
+    return out
+
+
+class _StyleSheet:
+    """Свойства абзаца/рана из styles.xml с наследованием basedOn; результаты кэшируются."""
+
+    def __init__(self, doc: DocxDocument):
+        self._styles: Dict[str, object] = {}
+        self._default_para: Optional[str] = None
+        self._defaults: Dict[str, object] = {}
+        self._cache: Dict[Tuple[Optional[str], Optional[str]], Dict[str, object]] = {}
+        try:
+            root = doc.styles.element
+        except Exception:
+            return
+        for st in root.iterchildren(qn("w:style")):
+            sid = st.get(qn("w:styleId"))
+            if sid:
+                self._styles[sid] = st
+                if st.get(qn("w:type")) == "paragraph" and st.get(qn("w:default")) in ("1", "true"):
+                    self._default_para = sid
+        dd = root.find(qn("w:docDefaults"))
+        if dd is not None:
+            self._defaults.update(_ppr_values(dd.find(f"{qn('w:pPrDefault')}/{qn('w:pPr')}")))
+            self._defaults.update(_rpr_values(dd.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}")))
+
+    def _chain(self, sid: Optional[str]) -> List[object]:
+        chain: List[object] = []
+        seen = set()
+        while sid and sid in self._styles and sid not in seen:
+            seen.add(sid)
+            st = self._styles[sid]
+            chain.append(st)
+            based = st.find(qn("w:basedOn"))
+            sid = based.get(_W_VAL) if based is not None else None
+        return chain[::-1]
+
+    def _style_values(self, sid: Optional[str]) -> Dict[str, object]:
+        out: Dict[str, object] = {}
+        for st in self._chain(sid):
+            out.update(_ppr_values(st.find(qn("w:pPr"))))
+            out.update(_rpr_values(st.find(qn("w:rPr"))))
+        return out
+
+    def resolve(self, para_style: Optional[str], table_style: Optional[str]) -> Dict[str, object]:
+        """docDefaults < стиль таблицы < стиль абзаца (прямое форматирование — у вызывающего)."""
+        key = (para_style, table_style)
+        hit = self._cache.get(key)
+        if hit is None:
+            hit = dict(self._defaults)
+            if table_style:
+                hit.update(self._style_values(table_style))
+            hit.update(self._style_values(para_style or self._default_para))
+            self._cache[key] = hit
+        return hit
+
+
+# ===== 4) Оценка раскладки =====
+class PageLayout:
+    """Высоты абзацев/строк таблиц и положение блоков на странице, twips."""
+
+    def __init__(self, doc: DocxDocument, *, safety: float = SAFETY):
+        self.doc = doc
+        self.safety = safety
+        self.styles = _StyleSheet(doc)
+        self._row_heights: Dict[object, List[int]] = {}
+
+    def forget(self, *tbls) -> None:
+        """Таблицы изменены (разрезаны, строки перенесены) — пересчитать их высоты."""
+        for t in tbls:
+            self._row_heights.pop(t, None)
+
+    # ---------- страница ----------
+    def geometry_of(self, elm) -> PageGeometry:
+        """Геометрия секции, в которой стоит блок тела: ближайший следующий sectPr."""
+        body = self.doc.element.body
+        for nxt in elm.itersiblings():
+            if nxt.tag == _W_P:
+                s = nxt.find(f"{qn('w:pPr')}/{qn('w:sectPr')}")
+                if s is not None:
+                    return page_geometry(s)
+        return page_geometry(body.find(qn("w:sectPr")))
+
+    def usable_height(self, geom: PageGeometry) -> int:
+        return int(geom.content_height * (1.0 - self.safety))
+
+    # ---------- абзац ----------
+    def para_props(self, p, table_style: Optional[str] = None) -> Tuple[ParaProps, Dict[str, object]]:
+        pPr = p.find(qn("w:pPr"))
+        ps = pPr.find(qn("w:pStyle")) if pPr is not None else None
+        vals = dict(self.styles.resolve(ps.get(_W_VAL) if ps is not None else None, table_style))
+        vals.update(_ppr_values(pPr))
+        mark = _rpr_values(pPr.find(qn("w:rPr")) if pPr is not None else None)
+        props = ParaProps(**{k: v for k, v in vals.items() if k in _PPR_KEYS or k in ("sz", "bold")})
+        return props, mark
+
+    def _runs(self, p, props: ParaProps) -> Iterator[Tuple[str, int, bool, int]]:
+        """(текст, sz, bold, высота картинки) по ранам абзаца; '\n' — w:br/w:cr."""
+        for r in p.iter(qn("w:r")):
+            rv = _rpr_values(r.find(qn("w:rPr")))
+            sz = int(rv.get("sz", props.sz))
+            bold = bool(rv.get("bold", props.bold))
+            parts: List[str] = []
+            pic = 0
+            for ch in r:
+                if ch.tag == qn("w:t") and ch.text:
+                    parts.append(ch.text)
+                elif ch.tag == qn("w:tab"):
+                    parts.append("    ")
+                elif ch.tag in (qn("w:br"), qn("w:cr")) and ch.get(qn("w:type")) != "page":
+                    parts.append("\n")
+                elif ch.tag == qn("w:drawing"):
+                    for ext in ch.iter(qn("wp:extent")):
+                        pic = max(pic, _int(ext.get("cy")) // 635)   # EMU -> twips
+                        break
+            yield "".join(parts), sz, bold, pic
+
+    def _line_height(self, props: ParaProps, sz: int) -> int:
+        natural = sz * 10 * LINE_FACTOR       # полупункты -> twips
+        if props.line_rule == "exact":
+            return props.line
+        if props.line_rule == "atLeast":
+            return int(max(props.line, natural))
+        return int(natural * props.line / 240.0)
+
+    def paragraph_height(self, p, width: int, table_style: Optional[str] = None) -> int:
+        """Высота абзаца при ширине текста width (twips) — с интервалами до/после."""
+        props, mark = self.para_props(p, table_style)
+        avail = max(width - props.ind_left - props.ind_right, 200)
+
+        lines: List[int] = []           # кегль каждой строки (максимальный на строке)
+        pics = 0
+        x = float(props.first_line)
+        line_sz = 0
+
+        def new_line():
+            nonlocal x, line_sz
+            lines.append(line_sz or int(mark.get("sz", props.sz)))
+            x, line_sz = 0.0, 0
+
+        for text, sz, bold, pic in self._runs(p, props):
+            pics += pic
+            for li, chunk in enumerate(text.split("\n")):
+                if li:
+                    new_line()
+                for wi, word in enumerate(chunk.split(" ")):
+                    space = to_twips(glyph_width(" "), sz) if (wi or x > 0) else 0.0
+                    w = to_twips(word_width(word, bold), sz)
+                    if x > 0 and x + space + w > avail:
+                        new_line()
+                        space = 0.0
+                    x += space + w
+                    while x > avail:                       # слово длиннее строки
+                        new_line()
+                        x = w = max(w - avail, 0.0)
+                    if word:
+                        line_sz = max(line_sz, sz)
+        new_line()
+
+        h = sum(self._line_height(props, sz) for sz in lines) + pics
+        return int(h + props.before + props.after)
+
+    # ---------- таблица ----------
+    @staticmethod
+    def _table_style(tbl) -> Optional[str]:
+        st = tbl.find(f"{qn('w:tblPr')}/{qn('w:tblStyle')}")
+        return st.get(_W_VAL) if st is not None else None
+
+    @staticmethod
+    def _grid(tbl) -> List[int]:
+        return [_int(gc.get(qn("w:w"))) for gc in tbl.iterfind(f"{qn('w:tblGrid')}/{qn('w:gridCol')}")]
+
+    def _cell_margins(self, tbl) -> Tuple[int, int, int, int]:
+        """Поля ячеек (top, bottom, left, right): tblPr, иначе стиль таблицы, иначе 0/108."""
+        out = {"top": 0, "bottom": 0, "left": DEFAULT_CELL_MAR, "right": DEFAULT_CELL_MAR}
+        sources = []
+        sid = self._table_style(tbl)
+        for st in self.styles._chain(sid):
+            sources.append(st.find(f"{qn('w:tblPr')}/{qn('w:tblCellMar')}"))
+        sources.append(tbl.find(f"{qn('w:tblPr')}/{qn('w:tblCellMar')}"))
+        for mar in sources:
+            if mar is None:
+                continue
+            for side, alias in (("top", "top"), ("bottom", "bottom"), ("left", "start"), ("right", "end")):
+                el = mar.find(qn(f"w:{side}"))
+                if el is None:
+                    el = mar.find(qn(f"w:{alias}"))
+                if el is not None:
+                    out[side] = _int(el.get(qn("w:w")))
+        return out["top"], out["bottom"], out["left"], out["right"]
+
+    def cell_height(self, tc, width: int, table_style: Optional[str], margins: Tuple[int, int, int, int]) -> int:
+        top, bottom, left, right = margins
+        inner = max(width - left - right, 200)
+        h = top + bottom
+        for ch in tc:
+            if ch.tag == _W_P:
+                h += self.paragraph_height(ch, inner, table_style)
+            elif ch.tag == _W_TBL:
+                h += sum(self.row_heights(ch))
+        return h
+
+    @staticmethod
+    def _tc_width(tc, grid: Sequence[int], col: int) -> int:
+        """Ширина ячейки по tblGrid (gridSpan), без сетки — tcW в twips."""
+        width = sum(grid[col:col + tc.grid_span])
+        if not width:
+            tcW = tc.find(f"{qn('w:tcPr')}/{qn('w:tcW')}")
+            if tcW is not None and tcW.get(qn("w:type")) in (None, "dxa"):
+                width = _int(tcW.get(qn("w:w")))
+        return width
+
+    def row_heights(self, tbl) -> List[int]:
+        """Высоты строк таблицы (twips); vMerge-блок добирает высоту в последней строке."""
+        cached = self._row_heights.get(tbl)
+        if cached is not None:
+            return cached
+
+        grid = self._grid(tbl)
+        style = self._table_style(tbl)
+        margins = self._cell_margins(tbl)
+        heights: List[int] = []
+        open_blocks: Dict[int, Tuple[int, int]] = {}   # колонка -> (первая строка, высота содержимого)
+        merged: List[Tuple[int, int, int]] = []         # (первая строка, высота, последняя строка)
+
+        for ri, tr in enumerate(tbl.iterchildren(_W_TR)):
+            content = 0
+            col = 0
+            for tc in tr.iterchildren(_W_TC):
+                span = tc.grid_span
+                vm = tc.vMerge
+                if vm != "continue":
+                    if col in open_blocks:
+                        merged.append(open_blocks.pop(col) + (ri - 1,))
+                    h = self.cell_height(tc, self._tc_width(tc, grid, col), style, margins)
+                    if vm == "restart":
+                        open_blocks[col] = (ri, h)
+                    else:
+                        content = max(content, h)
+                col += span
+
+            trh = tr.find(f"{qn('w:trPr')}/{qn('w:trHeight')}")
+            val = _int(trh.get(_W_VAL)) if trh is not None else 0
+            if trh is not None and trh.get(qn("w:hRule")) == "exact":
+                heights.append(val)
+            else:
+                heights.append(max(val, content + ROW_BORDER))
+
+        last = len(heights) - 1
+        merged.extend(b + (last,) for b in open_blocks.values())
+        for first, need, end in merged:
+            have = sum(heights[first:end + 1])
+            if need + ROW_BORDER > have:
+                heights[end] += need + ROW_BORDER - have
+
+        self._row_heights[tbl] = heights
+        return heights
+
+    @staticmethod
+    def header_rows(tbl) -> int:
+        """Число строк-шапки (w:tblHeader подряд с начала таблицы)."""
+        n = 0
+        for tr in tbl.iterchildren(_W_TR):
+            if not _on(tr.find(f"{qn('w:trPr')}/{qn('w:tblHeader')}")):
+                break
+            n += 1
+        return n
+
+    @staticmethod
+    def cut_allowed(tbl) -> List[bool]:
+        """Можно ли начать новую таблицу с этой строки: в ней нет vMerge-продолжений."""
+        return [
+            not any(tc.vMerge == "continue" for tc in tr.iterchildren(_W_TC))
+            for tr in tbl.iterchildren(_W_TR)
+        ]
+
+    @staticmethod
+    def cant_split(tbl) -> List[bool]:
+        """w:cantSplit по строкам: строку нельзя разорвать между страницами."""
+        return [_on(tr.find(f"{qn('w:trPr')}/{qn('w:cantSplit')}")) for tr in tbl.iterchildren(_W_TR)]
+
+    @staticmethod
+    def _advance_row(y: int, h: int, page_h: int, top: int, whole: bool) -> int:
+        """
+        Положение после строки высотой h: не влезла — целиком на следующую
+        страницу (cantSplit) или остаток переносится (Word рвёт строку сам).
+        top — шапка, которую Word повторяет вверху страницы.
+        """
+        if y + h <= page_h or y <= top:
+            y += h
+        elif whole:
+            y = top + h
+        else:
+            y = top + (y + h - page_h)
+        room = page_h - top
+        while room > 0 and y > page_h:
+            y -= room
+        return y
+
+    # ---------- поток документа ----------
+    def _flow(self, blocks: Iterable, y: int, page_h: int, width: int, stop) -> Tuple[int, bool]:
+        """Продвинуть y по блокам до stop; (y, нашли ли stop)."""
+        for el in blocks:
+            if el is stop:
+                return y, True
+            if el.tag == _W_P:
+                props, _ = self.para_props(el)
+                if props.page_break_before and y > 0:
+                    y = 0
+                h = self.paragraph_height(el, width)
+                y = y + h if y + h <= page_h or y == 0 else h
+                y %= max(page_h, 1)
+                if any(br.get(qn("w:type")) == "page" for br in el.iter(qn("w:br"))):
+                    y = 0
+                if el.find(f"{qn('w:pPr')}/{qn('w:sectPr')}") is not None:
+                    y = 0
+            elif el.tag == _W_TBL:
+                rh = self.row_heights(el)
+                hdr = sum(rh[:self.header_rows(el)])
+                for h, whole in zip(rh, self.cant_split(el)):
+                    y = self._advance_row(y, h, page_h, hdr, whole)
+            elif el.tag == _W_SDT:
+                content = el.find(qn("w:sdtContent"))
+                if content is not None:
+                    y, found = self._flow(content, y, page_h, width, stop)
+                    if found:
+                        return y, True
+        return y, False
+
+    def offset_of(self, elm) -> int:
+        """Где по вертикали (от верхнего поля страницы) начинается блок тела elm, twips."""
+        geom = self.geometry_of(elm)
+        y, _ = self._flow(self.doc.element.body, 0, self.usable_height(geom), geom.content_width, elm)
+        return y
+
+    # ---------- разрезы ----------
+    def table_cuts(self, tbl, *, header_rows: int, repeat_header: bool = True,
+                   lead: Optional[int] = None) -> List[int]:
+        """
+        Номера строк, с которых начинаются части таблицы на следующих страницах.
+        header_rows — шапка (в первой части всегда); repeat_header — шапка
+        повторяется в каждой части; lead — высота «Продолжения» над частью.
+        Одна часть — всегда хотя бы одна строка данных; внутри vMerge не режем.
+        """
+        geom = self.geometry_of(tbl)
+        page_h = self.usable_height(geom)
+        heights = self.row_heights(tbl)
+        allowed = self.cut_allowed(tbl)
+        if len(heights) <= header_rows + 1:
+            return []
+        if lead is None:
+            lead = self._line_height(ParaProps(), 24)     # TNR 12, одна строка
+        hdr = sum(heights[:header_rows])
+        restart = lead + (hdr if repeat_header else 0)
+
+        cuts: List[int] = []
+        part_start = header_rows
+        y = self.offset_of(tbl) + hdr
+        for ri in range(header_rows, len(heights)):
+            h = heights[ri]
+            # строка выше целой страницы всё равно разорвётся — перед ней не режем
+            if y + h > page_h and ri > part_start and h <= page_h - restart:
+                c = ri
+                while c > part_start and not allowed[c]:
+                    c -= 1
+                if c > part_start:
+                    cuts.append(c)
+                    part_start = c
+                    y = restart + sum(heights[c:ri])
+            y = self._advance_row(y, h, page_h, restart if cuts else hdr, whole=True)
+        return cuts
+
+
+# ===== 5) Разрезание =====
+_CONT_RE = r"(?i)^\s*продолжение\s+таблицы\s*{n}\b"
+
+
+def continuation_paragraph(title: str, *, page_break_before: bool = True):
+    """Абзац «Продолжение таблицы N» — как у Word-сплиттеров: справа, TNR 12 bold, без интервалов."""
+    p = OxmlElement("w:p")
+    pPr = OxmlElement("w:pPr")
+    pPr.append(OxmlElement("w:keepNext"))
+    if page_break_before:
+        pPr.append(OxmlElement("w:pageBreakBefore"))
+    sp = OxmlElement("w:spacing")
+    sp.set(qn("w:before"), "0")
+    sp.set(qn("w:after"), "0")
+    pPr.append(sp)
+    ind = OxmlElement("w:ind")
+    ind.set(qn("w:firstLine"), "0")
+    pPr.append(ind)
+    jc = OxmlElement("w:jc")
+    jc.set(_W_VAL, "right")
+    pPr.append(jc)
+    p.append(pPr)
+
+    r = OxmlElement("w:r")
+    rPr = OxmlElement("w:rPr")
+    fonts = OxmlElement("w:rFonts")
+    for a in ("ascii", "hAnsi", "cs", "eastAsia"):
+        fonts.set(qn(f"w:{a}"), "Times New Roman")
+    rPr.append(fonts)
+    rPr.append(OxmlElement("w:b"))
+    sz = OxmlElement("w:sz")
+    sz.set(_W_VAL, "24")
+    rPr.append(sz)
+    r.append(rPr)
+    t = OxmlElement("w:t")
+    t.text = title
+    r.append(t)
+    p.append(r)
+    return p
+
+
+_TRPR_AFTER_HEADER = ("w:tblCellSpacing", "w:jc", "w:hidden", "w:ins", "w:del", "w:trPrChange")
+_TRPR_AFTER_CANTSPLIT = ("w:trHeight", "w:tblHeader") + _TRPR_AFTER_HEADER
+
+
+def _mark_header(tr) -> None:
+    trPr = tr.get_or_add_trPr()
+    if trPr.find(qn("w:tblHeader")) is None:
+        trPr.insert_element_before(OxmlElement("w:tblHeader"), *_TRPR_AFTER_HEADER)
+
+
+def caption_number(tbl, lookback: int = 3) -> Optional[str]:
+    """Номер из подписи «Таблица N» в абзацах прямо перед таблицей."""
+    for i, el in enumerate(tbl.itersiblings(preceding=True)):
+        if i >= lookback or el.tag != _W_P:
+            break
+        m = re.match(r"(?i)^\s*таблица\s*(\d+)\b", "".join(t.text or "" for t in el.iter(qn("w:t"))))
+        if m:
+            return m.group(1)
+    return None
+
+
+def has_continuation(tbl, number: int | str, lookahead: int = 8) -> bool:
+    """После таблицы уже есть «Продолжение таблицы N» (повторный запуск)."""
+    pat = _CONT_RE.format(n=re.escape(str(number)))
+    for i, el in enumerate(tbl.itersiblings()):
+        if i >= lookahead:
+            break
+        if el.tag == _W_P and re.match(pat, "".join(t.text or "" for t in el.iter(qn("w:t")))):
+            return True
+    return False
+
+
+def split_rows(tbl, cuts: Sequence[int], *, header_rows: int, repeat_header: bool,
+               make_separator) -> List[object]:
+    """
+    Разрезать tbl перед строками cuts за один проход: строки переносятся
+    (не копируются) в клоны таблицы (tblPr/tblGrid), перед каждым клоном —
+    make_separator() (один элемент или список). Возвращает новые таблицы.
+    """
+    trs = list(tbl.iterchildren(_W_TR))
+    shell = deepcopy(tbl)
+    for tr in shell.findall(_W_TR):
+        shell.remove(tr)
+    header = trs[:header_rows]
+
+    new_tbls = []
+    anchor = tbl
+    bounds = list(cuts) + [len(trs)]
+    for a, b in zip(bounds, bounds[1:]):
+        sep = make_separator()
+        for el in (sep if isinstance(sep, list) else [sep]):
+            anchor.addnext(el)
+            anchor = el
+        part = deepcopy(shell)
+        if repeat_header:
+            for tr in header:
+                tr2 = deepcopy(tr)
+                _mark_header(tr2)
+                part.append(tr2)
+        for tr in trs[a:b]:
+            part.append(tr)           # append переносит w:tr из исходной таблицы
+        anchor.addnext(part)
+        anchor = part
+        new_tbls.append(part)
+    return new_tbls
+
+
+def split_table_at_pages(
+    doc: DocxDocument,
+    tbl,
+    *,
+    number: int | str | None = None,
+    header_rows: int = 1,
+    repeat_header: bool = True,
+    layout: Optional[PageLayout] = None,
+) -> int:
+    """
+    Разрезает таблицу (w:tbl или docx Table) по оценённым границам страниц:
+    каждая следующая часть — с новой страницы, под абзацем «Продолжение
+    таблицы N», с копией шапки (repeat_header). number — по умолчанию из
+    подписи «Таблица N» перед таблицей. Возвращает число новых частей.
+    """
+    tbl = getattr(tbl, "_tbl", tbl)
+    number = number if number is not None else caption_number(tbl)
+    if number is None:
+        logger.warning("Разрезание по страницам: у таблицы нет подписи «Таблица N» — пропускаем.")
+        return 0
+    if has_continuation(tbl, number):
+        return 0
+    layout = layout or PageLayout(doc)
+    title = f"Продолжение таблицы {number}"
+    lead = layout.paragraph_height(continuation_paragraph(title), layout.geometry_of(tbl).content_width)
+    cuts = layout.table_cuts(tbl, header_rows=header_rows, repeat_header=repeat_header, lead=lead)
+    if not cuts:
+        return 0
+
+    if repeat_header:
+        for tr in list(tbl.iterchildren(_W_TR))[:header_rows]:
+            _mark_header(tr)
+    parts = split_rows(tbl, cuts, header_rows=header_rows, repeat_header=repeat_header,
+                       make_separator=lambda: continuation_paragraph(title))
+    layout.forget(tbl)
+    logger.info(f"Таблица {number}: {len(parts) + 1} частей по оценке страниц (строки {cuts}).")
+    return len(parts)
+
+
+def mark_header_rows(tbl, header_rows: int) -> None:
+    """
+    Шапка повторяется на каждой странице и не рвётся между страницами
+    (tblHeader + cantSplit) — без Word, как word_update_all._set_repeat_header.
+    """
+    tbl = getattr(tbl, "_tbl", tbl)
+    for tr in list(tbl.iterchildren(_W_TR))[:max(1, header_rows)]:
+        _mark_header(tr)
+        trPr = tr.get_or_add_trPr()
+        if trPr.find(qn("w:cantSplit")) is None:
+            trPr.insert_element_before(OxmlElement("w:cantSplit"), *_TRPR_AFTER_CANTSPLIT)
+
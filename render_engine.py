@@ -0,0 +1,1359 @@
+# render_engine.py
+"""
+Headless-движок рендера протоколов OQ/PQ (+ отчёт ОТЧ) — без Qt.
+
+Весь пайплайн, который раньше жил в RenderWorker.run (ui/main_window.py):
+контекст -> 2 прохода рендера тестового DOCX -> основной шаблон ->
+таблицы помещений/оборудования -> вставка тестов -> Таблица 5 ->
+постобработка -> сохранение -> (опционально) Word-финализация -> ОТЧ.
+
+GUI использует его через RenderWorker, а на сервере/сборочной машине
+можно рендерить из консоли:
+
+    python -m render_engine job.json [--no-word]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from docx.document import Document as DocxDocument
+from docx.image.exceptions import UnrecognizedImageError
+from docx.image.image import Image
+from docx.shared import Mm
+from docx.table import Table
+from docxtpl import DocxTemplate, InlineImage, RichText
+
+import image_prep
+import io_manager
+import page_layout
+from document_index import (
+    EQUIPMENT_DATES, REPORT_TABLE1, REPORT_TABLE2, ROOMS, SUPPLY_AIR, TEST11_3, TEST_11_2,
+    DocumentIndex,
+)
+import scans_index
+import table_index
+import table_processor
+import template_cache
+import template_renderer
+import word_repeat_headers
+import word_pool
+import workbook_cache
+from logger import logger
+from risk_table5 import get_risk_rows, insert_table5_into_doc, split_table5_like_example
+from row_builder import RowBuilder, row_cells, rows_of
+from table_view import TableView
+from test11_calc import parse_decimal
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+ProgressFn = Callable[[int, str], None]
+
+
+# =============================================================================
+# 1) Защита от падения tpl.render() из-за битых/неподдерживаемых картинок
+# =============================================================================
+# docxtpl вставляет картинки лениво: ошибка может прилететь при tpl.render(),
+# когда InlineImage превращается в строку. Этот патч гарантирует "не упасть".
+from docxtpl.inline_image import InlineImage as _TplInlineImage  # noqa
+
+_old_inlineimage_str = _TplInlineImage.__str__
+
+
+def _safe_inlineimage_str(self):
+    try:
+        return _old_inlineimage_str(self)
+    except UnrecognizedImageError:
+        desc = getattr(self, "image_descriptor", None)
+        logger.warning(f"Пропущена битая/неподдерживаемая картинка (UnrecognizedImageError): {desc}")
+        return ""
+    except Exception as e:
+        desc = getattr(self, "image_descriptor", None)
+        logger.warning(f"Пропущена картинка (ошибка вставки: {e}): {desc}")
+        return ""
+
+
+_TplInlineImage.__str__ = _safe_inlineimage_str
+
+
+# =============================================================================
+# 2) Безопасное создание InlineImage + фильтрация расширений
+# =============================================================================
+_IMG_EXT = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".gif"}  # только картинки (НЕ pdf)
+
+
+def safe_inline_image(tpl: DocxTemplate, path: str, *, width_mm: int = 160, label: str = ""):
+    """
+    1) Отсекаем несуществующие / не файлы
+    2) Отсекаем расширения (только картинки)
+    3) Проверяем, что это реально картинка: Image.from_file()
+    4) Создаём InlineImage
+    """
+    if not path:
+        return None
+
+    pp = Path(path)
+    if not pp.exists() or not pp.is_file():
+        logger.warning(f"Пропущен файл для {label} (не найден): {path}")
+        return None
+
+    ext = pp.suffix.lower()
+    if ext not in _IMG_EXT:
+        logger.warning(f"Пропущен файл для {label} (не картинка / pdf не поддерживается): {path}")
+        return None
+
+    # ранняя проверка (иначе может упасть позже на render)
+    try:
+        Image.from_file(str(pp))
+    except UnrecognizedImageError:
+        logger.warning(f"Пропущен файл для {label} (битая/неподдерживаемая картинка): {path}")
+        return None
+    except Exception as e:
+        logger.warning(f"Пропущен файл для {label} (ошибка проверки картинки: {e}): {path}")
+        return None
+
+    try:
+        return InlineImage(tpl, str(pp), width=Mm(width_mm))
+    except Exception as e:
+        logger.warning(f"Пропущен файл для {label} (ошибка создания InlineImage: {e}): {path}")
+        return None
+
+
+def make_inline_images(tpl: DocxTemplate, paths: list[str], *, label: str, width_mm: int = 160) -> list[InlineImage]:
+    out: list[InlineImage] = []
+    # EXIF-поворот + уменьшение до ширины вставки + пережатие (с кэшем на диске)
+    for p in image_prep.prepare_images(paths, width_mm=width_mm):
+        ii = safe_inline_image(tpl, p, width_mm=width_mm, label=label)
+        if ii is not None:
+            out.append(ii)
+    return out
+
+
+
+# =============================================================================
+# 3) Автозаполнение "Тест 11.2. Проверка кратности воздухообмена в ЧП"
+# =============================================================================
+def _fill_test_112(doc: DocxDocument, rooms: List[Dict[str, Any]], index: DocumentIndex | None = None):
+    t112 = (index or DocumentIndex(doc)).first(TEST_11_2)
+    if t112 is None:
+        return
+    view = TableView(t112)
+
+    hdr_cols_row_idx = view.find_row("результаты испытани")
+    if hdr_cols_row_idx is not None:
+        hdr_cols_row_idx = hdr_cols_row_idx + 1 if hdr_cols_row_idx + 1 < len(view) else None
+    if hdr_cols_row_idx is None:
+        for i in range(len(view)):
+            line = view.line(i)
+            if ("номер" in line and "объем" in line) or ("общий расход" in line):
+                hdr_cols_row_idx = i
+                break
+    if hdr_cols_row_idx is None:
+        return
+
+    col_total = view.find_col("общий", "расход", rows=(hdr_cols_row_idx,))
+    col_fact = view.find_col("фактическ", rows=(hdr_cols_row_idx,))
+    if col_total is None and col_fact is None:
+        return
+
+    def is_spacer(ri: int) -> bool:
+        return all(view.norm(ri, ci) in ("", "¤") for ci in range(view.width(ri)))
+
+    data_start = hdr_cols_row_idx + 2  # пропускаем вторую строку заголовка
+    while data_start < len(view) and is_spacer(data_start):
+        data_start += 1
+
+    data_end = len(view)
+    for i in range(data_start, len(view)):
+        if view.norm(i, 0).startswith("комментар"):
+            data_end = i
+            break
+    if data_end <= data_start:
+        return
+
+    need = len(rooms)
+    have = data_end - data_start
+    trs = view.trs
+    if need > have:
+        rb = RowBuilder(trs[data_end - 1], t112)
+        added = [rb.build({}) for _ in range(need - have)]
+        t112._tbl.extend(added)
+        trs.extend(added)
+        data_end = data_start + need
+
+    for idx, room in enumerate(rooms):
+        r = data_start + idx
+        if r >= len(trs):
+            break
+        cells = row_cells(trs[r], t112)
+        total_flow = (room.get("total_flow") or "").strip()
+        exch_act = (room.get("exchange_actual") or "").strip()
+
+        if col_total is not None and col_total < len(cells) and total_flow:
+            cells[col_total].text = total_flow
+        if col_fact is not None and col_fact < len(cells) and exch_act:
+            cells[col_fact].text = exch_act
+
+
+# =============================================================================
+# 4) Форматирование дат поверки в таблице оборудования
+# =============================================================================
+def _fix_weird_ddmmyyyy(s: str) -> str:
+    # "26.062026" -> "26.06.2026"
+    m = re.match(r"^(\d{1,2})\.(\d{2})(\d{4})$", s)
+    if m:
+        return f"{m.group(1)}.{m.group(2)}.{m.group(3)}"
+    return s
+
+
+def _parse_date_any(s: str):
+    s = (s or "").strip().replace("\u00a0", " ")
+    s = re.sub(r"\s+", " ", s).replace("г.", "").replace("г", "").strip(" .")
+    if not s:
+        return None
+
+    s = s.split()[0]  # убрать время
+    s = _fix_weird_ddmmyyyy(s)
+
+    fmts = ["%Y-%m-%d", "%d.%m.%Y", "%d-%m-%Y", "%Y.%m.%d", "%d/%m/%Y", "%Y/%m/%d"]
+    for fmt in fmts:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except Exception:
+            pass
+
+    m = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})$", s)
+    if m:
+        try:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except Exception:
+            return None
+
+    m = re.match(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})$", s)
+    if m:
+        try:
+            return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+        except Exception:
+            return None
+
+    return None
+
+
+def _fmt_date(d: date) -> str:
+    return d.strftime("%d.%m.%Y")
+
+
+def _format_date_range_cell(text: str) -> str:
+    if not text or not text.strip():
+        return text
+
+    raw = re.sub(r"\s*\n\s*", " ", text).strip()
+
+    if "/" in raw:
+        parts = [p.strip() for p in raw.split("/") if p.strip()]
+        if len(parts) >= 2:
+            d1 = _parse_date_any(parts[0])
+            d2 = _parse_date_any(parts[1])
+            if d1 and d2:
+                return f"{_fmt_date(d1)} / {_fmt_date(d2)}"
+            return raw
+
+    date_like = re.findall(r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}\.\d{1,2}\.\d{4}|\d{1,2}\.\d{2}\d{4}", raw)
+    if len(date_like) >= 2:
+        d1 = _parse_date_any(date_like[0])
+        d2 = _parse_date_any(date_like[1])
+        if d1 and d2:
+            return f"{_fmt_date(d1)} / {_fmt_date(d2)}"
+
+    d = _parse_date_any(raw)
+    if d:
+        return _fmt_date(d)
+
+    return raw
+
+
+def postprocess_equipment_dates(doc: DocxDocument, index: DocumentIndex | None = None) -> None:
+    """
+    Ищет в документе столбец 'Дата поверки/ Действительно до:' и
+    форматирует значения в 'ДД.ММ.ГГГГ / ДД.ММ.ГГГГ'.
+    """
+    hdr_needle = "дата поверки/ действительно до"
+    if index is None:
+        index = DocumentIndex(doc)
+    for t in index.tables(EQUIPMENT_DATES):
+        view = TableView(t)
+        hdr_row_idx = index.row(t, EQUIPMENT_DATES)
+        col_idx = view.find_col(hdr_needle, rows=(hdr_row_idx,))
+        if col_idx is None:
+            continue
+
+        for ri in range(hdr_row_idx + 1, len(view)):
+            old = view.text(ri, col_idx)
+            new = _format_date_range_cell(old)
+            if new != old:
+                view.cell(ri, col_idx).text = new
+                view.touch(ri)
+
+
+# =============================================================================
+# 5) ОТЧ: Таблица 1 (помещения) / Таблица 2 (из Excel) / подпись Таблицы 2
+# =============================================================================
+def _norm_key(s: str) -> str:
+    s = "" if s is None else str(s)
+    s = re.sub(r"(?i)^\s*тест\s*\d+(?:[.,]\d+)?\.?\s*", "", s).strip()
+    s = (
+        s.replace("\u00A0", " ")
+         .replace("\u202F", " ")
+         .replace("\u200B", "")
+         .replace("\u00AD", "")
+    )
+    s = re.sub(r"\s+", " ", s).strip().lower()
+    s = s.replace("ё", "е")
+    # ключ без знаков
+    return re.sub(r"[^0-9a-zа-я]+", "", s)
+
+
+def _set_cell_text_keep_style(cell, text: str) -> None:
+    text = "" if text is None else str(text)
+
+    if cell.paragraphs:
+        p0 = cell.paragraphs[0]
+        if p0.runs:
+            p0.runs[0].text = text
+            for r in p0.runs[1:]:
+                r.text = ""
+            for p in cell.paragraphs[1:]:
+                for r in p.runs:
+                    r.text = ""
+            return
+
+    cell.text = text
+
+
+def _load_table2_rows_from_excel(xlsx_path: str, sheet_name: str | None = None) -> dict[str, dict]:
+    """
+    Возвращает словарь:
+      norm(test_name) -> {"test":..., "crit":..., "fact":..., "eval":...}
+    """
+    book = workbook_cache.get_book(xlsx_path)
+    rows = book.rows(sheet_name if sheet_name and sheet_name in book.sheets else book.sheet_names[0])
+
+    # ожидаем шапку в первой строке
+    # A: тест, B: критерий, C: факт, D: оценка
+    out: dict[str, dict] = {}
+    for values in rows[1:]:
+        test, crit, fact, evl = (tuple(values[:4]) + (None,) * 4)[:4]
+
+        if not test:
+            continue
+
+        row = {
+            "test": str(test).strip(),
+            "crit": "" if crit is None else str(crit).strip(),
+            "fact": "" if fact is None else str(fact).strip(),
+            "eval": "" if evl  is None else str(evl).strip(),
+        }
+        out[_norm_key(row["test"])] = row
+
+    return out
+
+
+def fill_report_table2_from_excel(
+    doc: DocxDocument,
+    selected_tests: list[str],
+    xlsx_path: str,
+    *,
+    sheet_name: str | None = None,
+    default_eval: str = "Соответствует",
+    index: DocumentIndex | None = None,
+) -> tuple[bool, list[str]]:
+    """
+    Заполняет Таблицу 2 в ОТЧ-OQ данными из Excel по выбранным тестам.
+    Возвращает: (ok, missing_tests)
+    """
+
+    # 1) грузим Excel
+    rows_map = _load_table2_rows_from_excel(xlsx_path, sheet_name=sheet_name)
+
+    # 2) находим таблицу 2 (по заголовку столбцов)
+    target_table: Table | None = (index or DocumentIndex(doc)).first(REPORT_TABLE2)
+    if target_table is None:
+        return False, selected_tests[:]  # не нашли таблицу
+
+    # 3) ищем шаблонную строку с маркерами (лучший вариант)
+    token_row_idx = None
+    tokens = {"#T2_TEST", "#T2_CRIT", "#T2_FACT", "#T2_EVAL"}
+    for ri, row in enumerate(target_table.rows):
+        row_tokens = { (c.text or "").strip() for c in row.cells }
+        if tokens.issubset(row_tokens):
+            token_row_idx = ri
+            break
+
+    # если шаблонной строки нет:
+    # - если есть хотя бы 2 строки, возьмем 2ю как базовую
+    # - иначе создадим строку через add_row (стиль может быть не идеальный)
+    if token_row_idx is None:
+        if len(target_table.rows) >= 2:
+            token_row_idx = 1
+        else:
+            target_table.add_row()
+            token_row_idx = 1
+
+    rb = RowBuilder(target_table.rows[token_row_idx]._tr, target_table)
+
+    # 4) готовим данные в порядке выбора пользователя
+    missing: list[str] = []
+    chosen_rows: list[dict] = []
+    for tname in selected_tests:
+        key = _norm_key(tname)
+        row = rows_map.get(key)
+        if not row:
+            missing.append(tname)
+            # можно пропускать, либо вставлять пустую строку — выберу пропуск
+            continue
+        chosen_rows.append(row)
+
+    # если ничего не нашли — хотя бы очистим шаблонную строку
+    need = max(1, len(chosen_rows))
+
+    # сколько строк данных сейчас начиная с token_row_idx
+    trs = rows_of(target_table)
+    have = len(trs) - token_row_idx
+    if need > have:
+        added = [rb.build({}) for _ in range(need - have)]
+        target_table._tbl.extend(added)
+        trs.extend(added)
+
+    # 5) заполняем строки
+    for i in range(need):
+        data = chosen_rows[i] if i < len(chosen_rows) else {"test": "", "crit": "", "fact": "", "eval": ""}
+
+        for cell in row_cells(trs[token_row_idx + i], target_table):
+            token = (cell.text or "").strip()
+
+            if token == "#T2_TEST":
+                _set_cell_text_keep_style(cell, data.get("test", ""))
+            elif token == "#T2_CRIT":
+                _set_cell_text_keep_style(cell, data.get("crit", ""))
+            elif token == "#T2_FACT":
+                _set_cell_text_keep_style(cell, data.get("fact", ""))
+            elif token == "#T2_EVAL":
+                ev = data.get("eval", "").strip() or default_eval
+                _set_cell_text_keep_style(cell, ev)
+            else:
+                # если маркеров нет (fallback-режим), попробуем по колонкам
+                # (тут можно оставить как есть)
+                pass
+
+    return True, missing
+
+
+def fill_report_table1_rooms_by_hashes(
+    doc: DocxDocument, rooms: list[dict], index: DocumentIndex | None = None
+) -> bool:
+    """
+    Ищет таблицу, где строка данных содержит маркеры:
+      #, ##, ###, ####, #$, #$$, #$$$, #%, #%%, #%%%
+    и заполняет её из rooms (num, name, klass, area, volume, dp, airflow, exchange, temp, rh).
+    """
+    token_to_key = {
+        "#": "num",
+        "##": "name",
+        "###": "klass",
+        "####": "area",
+        "#$": "volume",
+        "#$$": "dp",
+        "#$$$": "airflow",
+        "#%": "exchange",
+        "#%%": "temp",
+        "#%%%": "rh",
+    }
+
+    # 1) найти таблицу и "шаблонную" строку с #..#%%%
+    if index is None:
+        index = DocumentIndex(doc)
+    target_table = index.first(REPORT_TABLE1)
+    if target_table is None:
+        return False
+    tmpl_row_idx = index.row(target_table, REPORT_TABLE1)
+
+    # 2) копируем шаблонную строку (чтобы формат 1:1 сохранялся)
+    rb = RowBuilder(target_table.rows[tmpl_row_idx]._tr, target_table)
+
+    need = max(1, len(rooms))  # если комнат 0 — оставим одну строку пустой
+    trs = rows_of(target_table)
+    have = len(trs) - tmpl_row_idx
+
+    if need > have:
+        added = [rb.build({}) for _ in range(need - have)]
+        target_table._tbl.extend(added)
+        trs.extend(added)
+
+    # 3) заполняем
+    for i in range(need):
+        room = rooms[i] if i < len(rooms) else {}
+
+        for cell in row_cells(trs[tmpl_row_idx + i], target_table):
+            token = (cell.text or "").strip()
+            key = token_to_key.get(token)
+            if not key:
+                continue
+            _set_cell_text_keep_style(cell, (room.get(key) or "").strip())
+
+    return True
+
+def fix_table2_caption_glue(doc: DocxDocument, caption: str = "Таблица 2") -> bool:
+    """
+    1) Удаляет пустые абзацы между подписью и таблицей
+    2) Делает таблицу inline (убирает tblpPr/tblOverlap)
+    3) КЛЮЧЕВОЕ: ставит keepNext на абзац подписи, чтобы Word не оставлял подпись сиротой
+    """
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    def norm(s: str) -> str:
+        s = (s or "").replace("\u00A0", " ")
+        s = re.sub(r"\s+", " ", s).strip().lower()
+        return s
+
+    cap_p = None
+    for p in doc.paragraphs:
+        if norm(p.text) == norm(caption):
+            cap_p = p
+            break
+    if cap_p is None:
+        return False
+
+    # ✅ Главное: подпись не должна отрываться от таблицы
+    pf = cap_p.paragraph_format
+    pf.keep_with_next = True
+    pf.keep_together = True
+    pf.widow_control = True
+
+    def norm(s: str) -> str:
+        s = (s or "").replace("\u00A0", " ")
+        s = re.sub(r"\s+", " ", s).strip().lower()
+        return s
+
+    # 0) найти абзац подписи
+    cap_p = None
+    for p in doc.paragraphs:
+        if norm(p.text) == norm(caption):
+            cap_p = p
+            break
+    if cap_p is None:
+        return False
+
+    # 1) keepNext на подпись (чтобы не отрывалась от таблицы)
+    pPr = cap_p._p.get_or_add_pPr()
+    if pPr.find(qn("w:keepNext")) is None:
+        pPr.append(OxmlElement("w:keepNext"))
+
+    # (опционально) чуть безопаснее: не разрывать саму подпись
+    if pPr.find(qn("w:keepLines")) is None:
+        pPr.append(OxmlElement("w:keepLines"))
+
+    # 2) найти следующий элемент и удалить пустые абзацы между подписью и таблицей
+    p_el = cap_p._p
+    sib = p_el.getnext()
+
+    while sib is not None and sib.tag != qn("w:tbl"):
+        if sib.tag == qn("w:p"):
+            # удаляем реально пустые (в т.ч. с одними пробелами)
+            txt = "".join(t.text for t in sib.iter() if t.tag == qn("w:t"))
+            if norm(txt) == "":
+                nxt = sib.getnext()
+                sib.getparent().remove(sib)
+                sib = nxt
+                continue
+        sib = sib.getnext()
+
+    if sib is None or sib.tag != qn("w:tbl"):
+        return False
+
+    # 3) убрать "плавающее" позиционирование таблицы
+    tbl_el = sib
+    tblPr = tbl_el.find(qn("w:tblPr"))
+    if tblPr is not None:
+        for child_tag in (qn("w:tblpPr"), qn("w:tblOverlap")):
+            ch = tblPr.find(child_tag)
+            if ch is not None:
+                tblPr.remove(ch)
+
+    return True
+
+
+
+# =============================================================================
+# 6) Контекст шаблона: поля формы -> ctx_fields (протокол) / ctx_fields_report (ОТЧ)
+# =============================================================================
+def default_paths(mode: str, base: Path | None = None) -> Dict[str, Path]:
+    """Пути по умолчанию для режима OQ/PQ (те же, что в форме GUI)."""
+    base = Path(base) if base else PROJECT_ROOT
+    mode = (mode or "").upper()
+    return {
+        "tpl": base / f"Шаблон {mode}.docx",
+        "tests": base / f"Тесты {mode}.docx",
+        "xls_tests": base / f"tests {mode}.xlsx",
+        "xls_eq": base / "ПЕРЕЧЕНЬ ПРИБОРОВ OQ.xlsx",
+        "scans_dir": base / "Сканы поверок",
+        "risk_doc": base / "risk_analysis_from_docx.xlsx",
+    }
+
+
+def report_paths(mode: str, out_base: Path, base: Path | None = None) -> tuple[str | None, str | None, str | None]:
+    """
+    Пути отчёта ОТЧ-<mode>: (шаблон, выходной файл, Excel для Таблицы 2).
+    Если чего-то нет на диске — None + warning в лог (как раньше в GUI).
+    """
+    base = Path(base) if base else PROJECT_ROOT
+    mode = (mode or "").upper()
+    tpl_report_path = out_report_path = xls_report_path = None
+    if mode not in ("OQ", "PQ"):
+        return None, None, None
+
+    candidate_tpl = base / f"Шаблон ОТЧ-{mode}.docx"
+    if candidate_tpl.exists():
+        tpl_report_path = str(candidate_tpl)
+        out_report_path = str(out_base.with_name(out_base.stem + f"_{mode}_ОТЧ-{mode}.docx"))
+    else:
+        logger.warning(f"Шаблон отчёта ОТЧ-{mode} не найден: {candidate_tpl}")
+
+    candidate_xls = base / f"ОТЧ-{mode}.xlsx"
+    if candidate_xls.exists():
+        xls_report_path = str(candidate_xls)
+    else:
+        logger.warning(f"Excel отчёта ОТЧ-{mode} не найден: {candidate_xls}")
+
+    return tpl_report_path, out_report_path, xls_report_path
+
+
+def strip_test_numbers(tests: List[str]) -> List[str]:
+    """'Тест 11.3. Проверка ...' -> 'Проверка ...' (как ожидают тест-таблицы и Таблица 5)."""
+    return [
+        re.sub(r"(?i)^тест\s*\d+(?:\.\d+)?\.?\s*", "", s).strip()
+        for s in tests if isinstance(s, str) and s.strip()
+    ]
+
+
+def norm_doc_id(raw: str) -> str:
+    s = (raw or "").strip().upper()
+    # если пользователь вставил уже с префиксом — срежем
+    prefixes = (
+        "ПРТ-OQ-", "ПРТ-PQ-", "ПРТ-IQ-",
+        "ОТЧ-OQ-", "ОТЧ-PQ-", "ОТЧ-IQ-",
+        "ПРТ-", "ОТЧ-",
+    )
+    for p in prefixes:
+        if s.startswith(p):
+            s = s[len(p):]
+            break
+    return s
+
+
+@lru_cache(maxsize=1)
+def _morph():
+    # pymorphy3 грузит словари ~секунду — только по требованию и один раз на процесс
+    from pymorphy3 import MorphAnalyzer
+    return MorphAnalyzer()
+
+
+def object_genitive(object_text: str) -> str:
+    """Название объекта в родительном падеже ('Чистое помещение' -> 'Чистого помещения')."""
+    object_text = (object_text or "").strip()
+    if not object_text:
+        return ""
+
+    morph = _morph()
+    words = object_text.split()
+    parsed = [morph.parse(w)[0] for w in words]
+    adj_idx = next((i for i, p in enumerate(parsed[:-1]) if "ADJF" in p.tag), None)
+    noun_idx = adj_idx + 1 if adj_idx is not None and adj_idx + 1 < len(parsed) else None
+    if adj_idx is not None and noun_idx is not None and "NOUN" in parsed[noun_idx].tag:
+        adj = parsed[adj_idx]
+        noun = parsed[noun_idx]
+        gender = noun.tag.gender
+        number = noun.tag.number
+        adj_gent = adj.inflect({"gent", gender, number})
+        noun_gent = noun.inflect({"gent"})
+        if adj_gent and noun_gent:
+            before = " ".join(words[:adj_idx])
+            after = " ".join(words[noun_idx + 1:])
+            return f"{before} {adj_gent.word} {noun_gent.word} {after}".strip()
+        return object_text
+
+    first_noun = next((p for p in parsed if "NOUN" in p.tag), None)
+    if first_noun:
+        infl = first_noun.inflect({"gent"})
+        if infl:
+            idx = parsed.index(first_noun)
+            return " ".join(words[:idx] + [infl.word] + words[idx + 1:])
+    return object_text
+
+
+def build_ctx_fields(fields: Dict[str, Any], mode: str, sel_tests: List[str]) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Поля формы (простые строки) -> (ctx_fields протокола, ctx_fields отчёта ОТЧ).
+
+    fields: object, object_rd (опц., иначе склоняем через pymorphy3), prt, year,
+            customer, address, developed, checked, date_dev, date_check, date_test, date_end
+    """
+    mode = (mode or "").upper()
+    doc_id = norm_doc_id(fields.get("prt", ""))
+
+    object_text = (fields.get("object") or "").strip()
+    object_rd = fields.get("object_rd")
+    if object_rd is None:
+        object_rd = object_genitive(object_text)
+
+    def rt(text: str) -> RichText:
+        return RichText(text, bold=False, italic=False, underline=False)
+
+    def s(key: str) -> str:
+        return str(fields.get(key) or "").strip()
+
+    ctx_fields: Dict[str, Any] = {
+        "объект": object_text,
+        "объект1": object_rd,
+        # основной документ (OQ/PQ): {{prt}} = ПРТ-<ввод>
+        "prt": rt(f"ПРТ-{doc_id}" if doc_id else ""),
+        "year": s("year"),
+        "customer": s("customer"),
+        "address": s("address"),
+        "Разработал": s("developed"),
+        "Проверил": s("checked"),
+        "Дата_Разработки": s("date_dev"),
+        "Дата_Проверки": s("date_check"),
+        "ДАТА_начала_испытания": s("date_test"),
+        "ДАТА_окончания": s("date_end"),
+        "Тесты_маркированным_списком": RichText("\n".join(f"• {t}" for t in sel_tests), bold=False),
+    }
+
+    # отчёт ОТЧ-(OQ/PQ): {{prt}} = ОТЧ-<mode>-<ввод>, {{prt1}} = ПРТ-<mode>-<ввод>
+    ctx_fields_report = dict(ctx_fields)
+    ctx_fields_report["prt"] = rt(f"ОТЧ-{mode}-{doc_id}" if doc_id else "")
+    ctx_fields_report["prt1"] = rt(f"ПРТ-{mode}-{doc_id}" if doc_id else "")
+
+    return ctx_fields, ctx_fields_report
+
+
+# =============================================================================
+# 7) Задание на рендер
+# =============================================================================
+@dataclass
+class RenderJob:
+    """Всё, что нужно для рендера одного протокола (и его ОТЧ). Без Qt-объектов."""
+    tpl_path: str
+    tests_doc_path: str
+    xls_tests_path: str
+    xls_eq_path: str
+    out_path: str
+    selected_tests: List[str]
+    rooms: Sequence[Mapping[str, Any]]
+    equipment: List[Dict[str, Any]]
+    ctx_fields: Dict[str, Any]
+    risk_path: str
+    scans_dir: str = ""
+    app1_images: List[str] = field(default_factory=list)
+    app4_images: List[str] = field(default_factory=list)
+    app5_images: List[str] = field(default_factory=list)
+
+    # ОТЧ-<code> (опционально)
+    tpl_report_path: Optional[str] = None
+    out_report_path: Optional[str] = None
+    ctx_fields_report: Optional[Dict[str, Any]] = None
+    xls_report_path: Optional[str] = None
+    report_code: str = ""
+
+    # финализация через MS Word (поля, разрезание таблиц) — только Windows + pywin32
+    use_word: bool = True
+
+    # Тест 11 из калькулятора (в памяти): DOCX тестов с заполненной таблицей — вместо
+    # файла tests_doc_path, и суммарные расходы по помещениям — вместо разбора таблицы
+    tests_doc_data: Optional[bytes] = None
+    test11_flows: Optional[List[Optional[Decimal]]] = None
+
+    def __post_init__(self):
+        # снимок на момент запуска: параллельные задания не делят изменяемых словарей
+        self.rooms = freeze_rooms(self.rooms)
+        self.equipment = [dict(e) for e in self.equipment]
+
+    @property
+    def tests_source(self):
+        """Путь к DOCX тестов или его байты (get_template принимает оба)."""
+        return self.tests_doc_data if self.tests_doc_data is not None else self.tests_doc_path
+
+    @property
+    def do_report(self) -> bool:
+        return bool(self.tpl_report_path and self.out_report_path and self.ctx_fields_report is not None)
+
+
+@dataclass
+class RenderResult:
+    out_path: str
+    out_report_path: Optional[str] = None
+    missing: List[str] = field(default_factory=list)
+    message: str = ""
+
+
+# =============================================================================
+# 8) Пайплайн
+# =============================================================================
+def find_scan_paths(equipment: List[Dict[str, Any]], scans_dir: str) -> List[str]:
+    """Сканы поверок по серийному номеру из 'name_sn' (имя файла или папки «з.н. …»)."""
+    if not equipment or not scans_dir or not os.path.isdir(scans_dir):
+        return []
+    return scans_index.get_index(scans_dir).find_for_equipment(equipment)
+
+
+def _robust_extract_total_flows_from_test11(
+    docx_doc: DocxDocument, index: DocumentIndex | None = None
+) -> list[Decimal | None]:
+    """Запасной разбор Теста 11: суммируем 'фактический' по блокам 'Помещение …'."""
+    flows: list[Decimal | None] = []
+
+    for t in (index or DocumentIndex(docx_doc)).tables(SUPPLY_AIR):
+        view = TableView(t)
+        hdr_idx = view.find_row("результаты испытани")
+        if hdr_idx is None or hdr_idx + 1 >= len(view):
+            continue
+        hdr_idx += 1
+
+        rows_for_header = range(hdr_idx, min(hdr_idx + 2, len(view)))
+        col_fact = view.find_col("фактическ", rows=rows_for_header)
+        col_sum = view.find_col("фактическ", "суммарн", rows=rows_for_header)
+
+        cur_sum: Decimal | None = None
+        room_started = False
+
+        data_start = hdr_idx + len(rows_for_header)
+
+        for r in range(data_start, len(view)):
+            row_text = view.line(r)
+
+            if row_text.startswith("комментар"):
+                if room_started:
+                    flows.append(cur_sum)
+                break
+
+            if row_text.startswith("помещение"):
+                if room_started:
+                    flows.append(cur_sum)
+                room_started = True
+                cur_sum = None
+                continue
+
+            if not room_started:
+                continue
+
+            if col_sum is not None and col_sum < view.width(r):
+                v = parse_decimal(view.text(r, col_sum))
+                if v is not None:
+                    cur_sum = v
+                    continue
+
+            if col_fact is not None and col_fact < view.width(r):
+                v = parse_decimal(view.text(r, col_fact))
+                if v is not None:
+                    cur_sum = (cur_sum or Decimal("0")) + v
+
+        if room_started:
+            flows.append(cur_sum)
+
+    return flows
+
+
+def extract_total_flows(tests_doc: DocxDocument) -> list[Decimal | None]:
+    index = DocumentIndex(tests_doc)
+    total1 = table_processor.extract_total_flows_from_test11(tests_doc, index)
+    if total1 and any(v is not None for v in total1):
+        return total1
+    return _robust_extract_total_flows_from_test11(tests_doc, index)
+
+
+def freeze_rooms(rooms: Sequence[Mapping[str, Any]]) -> Tuple[Mapping[str, Any], ...]:
+    """Снимок помещений только для чтения — задание не видит правок в GUI и не портит их."""
+    return tuple(MappingProxyType(dict(r)) for r in rooms)
+
+
+def with_room_metrics(rooms: Sequence[Mapping[str, Any]], total_flows: list[Decimal | None]) -> List[Dict[str, Any]]:
+    """
+    Копии помещений с total_flow (из Теста 11 или проектный) и exchange_actual = расход / объём.
+    Исходные словари не меняются: OQ и PQ рендерятся параллельно из одного списка помещений.
+    """
+    out: List[Dict[str, Any]] = []
+    for idx, src in enumerate(rooms):
+        room = dict(src)
+        out.append(room)
+        if idx < len(total_flows) and total_flows[idx] is not None:
+            val = total_flows[idx].quantize(Decimal("1.00"))
+            room["total_flow"] = f"{val}".replace(".", ",")
+        else:
+            pr = (room.get("airflow") or "").strip().replace(" ", "").replace("\u00a0", "")
+            pr = pr.replace(".", ",")
+            try:
+                q = Decimal(pr.replace(",", ".")).quantize(Decimal("1.00"))
+                room["total_flow"] = f"{q}".replace(".", ",")
+            except InvalidOperation:
+                room["total_flow"] = pr or ""
+
+        vol_raw = (room.get("volume") or "").replace(",", ".")
+        try:
+            vol = Decimal(vol_raw)
+            tf_raw = (room.get("total_flow") or "").replace(",", ".")
+            tf = Decimal(tf_raw) if tf_raw else None
+            if vol and vol > 0 and tf is not None:
+                exch = tf / vol
+                room["exchange_actual"] = str(exch.quantize(Decimal("1.00"))).replace(".", ",")
+            else:
+                room["exchange_actual"] = ""
+        except (InvalidOperation, ZeroDivisionError):
+            room["exchange_actual"] = ""
+    return out
+
+
+def paginate_without_word(doc: DocxDocument, index: DocumentIndex) -> None:
+    """
+    То, что в Word-режиме делают COM-сплиттеры, — по оценке раскладки page_layout:
+    Таблица 3 (помещения) и Таблица 5 режутся на «Продолжение таблицы N»,
+    у таблиц Теста 11.3 шапка повторяется на каждой странице.
+    """
+    layout = page_layout.PageLayout(doc)
+    rooms_tbl = index.first(ROOMS)
+    try:
+        if rooms_tbl is not None:
+            page_layout.split_table_at_pages(doc, rooms_tbl, header_rows=1, layout=layout)
+        split_table5_like_example(doc, layout=layout)
+    except Exception as e:
+        logger.warning(f"Не удалось разрезать таблицы по страницам: {e}")
+    for tbl in index.tables(TEST11_3):
+        page_layout.mark_header_rows(tbl, 2)
+
+
+def _attach_images(tpl: DocxTemplate, context: Dict[str, Any], job: RenderJob, scan_paths: List[str]) -> None:
+    context["App1Scans"] = make_inline_images(tpl, job.app1_images, label="Приложение 1")
+    context["App4Scans"] = make_inline_images(tpl, job.app4_images, label="Приложение 4")
+    context["App5Scans"] = make_inline_images(tpl, job.app5_images, label="Приложение 5")
+    context["Scans"] = make_inline_images(tpl, scan_paths, label="Приложение 2")
+
+
+def _render_report(job: RenderJob, rooms: Sequence[Mapping[str, Any]], scan_paths: List[str], rep: str) -> None:
+    """ОТЧ-<code>: рендер шаблона + Таблица 1 (помещения) + Таблица 2 (Excel) + Word-финализация."""
+    context_r = template_renderer.build_context(job.ctx_fields_report, rooms)
+    if scan_paths:
+        context_r["Scan_paths"] = scan_paths
+
+    tpl_r = template_cache.get_template(job.tpl_report_path)
+    _attach_images(tpl_r, context_r, job, scan_paths)
+    tpl_r.render(context_r)
+
+    doc_r = template_renderer.rendered_document(tpl_r)
+    index_r = DocumentIndex(doc_r)
+
+    # 1) Таблица 1 (помещения)
+    ok1 = fill_report_table1_rooms_by_hashes(doc_r, rooms, index_r)
+    if not ok1:
+        logger.warning(
+            f"{rep}: Таблица 1 с маркерами #/##/... не найдена — помещения не заполнены.")
+
+    # 2) Таблица 2 (из Excel по выбранным тестам)
+    if job.xls_report_path:
+        ok2, missing2 = fill_report_table2_from_excel(
+            doc_r,
+            job.selected_tests,  # порядок как выбран пользователем
+            job.xls_report_path,
+            default_eval="Соответствует",
+            index=index_r,
+        )
+        if not ok2:
+            logger.warning(f"{rep}: Таблица 2 не найдена (по заголовку/маркерам).")
+        if missing2:
+            logger.warning(f"{rep}: в Excel нет строк для тестов:\n" + "\n".join(missing2))
+    else:
+        logger.warning(f"{rep}: Excel отчёта не задан — Таблица 2 не заполнена.")
+
+    # 3) "Таблица 2" приклеить к следующей таблице
+    try:
+        fix_table2_caption_glue(doc_r)
+    except Exception as e:
+        logger.warning(f"{rep}: не удалось применить fix_table2_caption_glue: {e}")
+
+    # 4) Без Word: Таблица 2 режется по оценке страниц (page_layout)
+    if not job.use_word:
+        table2 = index_r.first(REPORT_TABLE2)
+        if table2 is not None:
+            try:
+                page_layout.split_table_at_pages(doc_r, table2, number=2, header_rows=1)
+            except Exception as e:
+                logger.warning(f"{rep}: не удалось разрезать Таблицу 2 по страницам: {e}")
+
+    # 5) Сохранение
+    doc_r.save(job.out_report_path)
+
+    if not job.use_word:
+        return
+
+    # один документ — один проход Word: Таблица 2 по фактическим страницам,
+    # поля, колонтитулы, содержание (Word уже запущен сессией render_job)
+    try:
+        word_pool.finalize(job.out_report_path, word_pool.REPORT_OPS)
+    except Exception as e:
+        logger.warning(f"{rep}: не удалось разрезать Таблицу 2 / обновить поля через Word: {e}")
+
+
+def render_job(job: RenderJob, progress: ProgressFn | None = None) -> RenderResult:
+    """
+    Рендерит протокол (и ОТЧ, если задан) по заданию.
+    progress(step, message) — необязательный колбэк прогресса (GUI: сигнал QThread).
+    Ошибки не глотаются — их ловит вызывающий (RenderWorker / CLI).
+    """
+    # поток под ОТЧ; выход из with дожидается его и при ошибке в протоколе.
+    # Сессия Word — один экземпляр на протокол и ОТЧ (закрывается после задания
+    # или остаётся тёплым, если пул в режиме keep_warm)
+    word = word_pool.session() if job.use_word else nullcontext()
+    with word, ThreadPoolExecutor(max_workers=1, thread_name_prefix="otch") as report_pool:
+        return _render_job(job, progress, report_pool)
+
+
+def _drain_report(future: Future, label: str) -> None:
+    """Дождаться фонового ОТЧ после ошибки протокола и записать его исход в лог."""
+    err = future.exception()
+    if err is not None:
+        logger.error(f"{label} не сформирован: {err}", exc_info=err)
+    else:
+        logger.info(f"{label} сформирован, несмотря на ошибку протокола")
+
+
+def _render_job(job: RenderJob, progress: ProgressFn | None, report_pool: ThreadPoolExecutor) -> RenderResult:
+    def emit(step: int, message: str) -> None:
+        if progress is not None:
+            progress(step, message)
+        else:
+            logger.info(message)
+
+    step = 0
+    emit(step, "Валидация файлов…")
+    io_manager.validate_file(Path(job.tpl_path))
+    if job.tests_doc_data is None:
+        io_manager.validate_file(Path(job.tests_doc_path))
+    io_manager.validate_file(Path(job.xls_tests_path))
+    io_manager.validate_file(Path(job.xls_eq_path))
+    io_manager.validate_file(Path(job.risk_path))
+    Path(job.out_path).parent.mkdir(parents=True, exist_ok=True)
+
+    # второй документ (ОТЧ-<code>) — опционально
+    do_report = job.do_report
+    if do_report:
+        io_manager.validate_file(Path(job.tpl_report_path))
+        Path(job.out_report_path).parent.mkdir(parents=True, exist_ok=True)
+
+        if job.xls_report_path:
+            io_manager.validate_file(Path(job.xls_report_path))
+        else:
+            logger.warning(f"ОТЧ-{job.report_code}: не указан Excel-файл с данными для Таблицы 2.")
+
+    # тест-таблицы: ненайденные / неоднозначные / повторы — сразу, до рендера
+    # (индекс исходного файла тестов живёт в .cache и пересобирается по mtime)
+    try:
+        if job.tests_doc_data is None:
+            index = table_index.load_index(job.tests_doc_path)
+        else:
+            index = table_index.TestTableIndex.from_document(template_cache.get_template(job.tests_doc_data).get_docx())
+        for line in index.check(job.selected_tests).lines():
+            logger.warning(f"Тест-таблицы: {line}")
+    except Exception as e:
+        logger.debug(f"Проверка тест-таблиц по индексу пропущена: {e}")
+
+    # ---------- 1. Базовый контекст ----------
+    step += 1
+    emit(step, "Сбор контекста…")
+    context = template_renderer.build_context(job.ctx_fields, job.rooms)
+
+    # ---------- 2. Скан-файлы (поверки оборудования) ----------
+    step += 1
+    emit(step, "Сбор сканов оборудования…")
+    scan_paths = find_scan_paths(job.equipment, job.scans_dir)
+    if scan_paths:
+        context["Scan_paths"] = scan_paths
+
+    missing: list[str] = []
+    rep = (job.report_code or "").upper()
+    report_future: Future | None = None
+
+    # ---------- 3. Рендер тестового DOCX (1-й проход) ----------
+    # Весь пайплайн — в памяти: после render() tpl.docx уже готовый Document,
+    # сохранять его во временный файл и парсить заново не нужно
+    # (для правки колонтитулов — template_renderer.rendered_document).
+    # Расходы из калькулятора Теста 11 уже в памяти — этот проход нужен только
+    # для extract_total_flows, поэтому он пропускается (номер шага сохраняется,
+    # чтобы шкала прогресса в GUI не съезжала).
+    step += 1
+    flows = job.test11_flows
+    if flows is None:
+        emit(step, "Рендер тестового документа…")
+        tpl_tests = template_cache.get_template(job.tests_source)
+        tpl_tests.render(context)
+
+        # ---------- 4. Извлечь расход и посчитать кратность ----------
+        flows = extract_total_flows(tpl_tests.docx)
+    rooms = with_room_metrics(job.rooms, flows)
+
+    # ---------- 5. Пересобрать контекст ----------
+    context = template_renderer.build_context(job.ctx_fields, rooms)
+    if scan_paths:
+        context["Scan_paths"] = scan_paths
+
+    # ОТЧ-<code> зависит только от rooms (с расходами), сканов и списка тестов —
+    # всё известно уже здесь, поэтому отчёт рендерится параллельно шагам 6–12
+    if do_report:
+        report_future = report_pool.submit(_render_report, job, rooms, scan_paths, rep or "ОТЧ")
+        emit(step, f"Рендер {rep or 'ОТЧ'} (параллельно)…")
+
+    try:
+        # ---------- 6. Перерендер тестового DOCX (2-й проход) ----------
+        step += 1
+        emit(step, "Перерендер тестовых таблиц с расчётами…")
+        tpl_tests2 = template_cache.get_template(job.tests_source)
+        tpl_tests2.render(context)
+        tests_doc = tpl_tests2.docx  # он же — источник тест-таблиц на шаге 9 (файл не перечитывается)
+
+        # ---------- 7. Рендер основного шаблона ----------
+        step += 1
+        emit(step, "Рендер основного шаблона…")
+        tpl_main = template_cache.get_template(job.tpl_path)
+        _attach_images(tpl_main, context, job, scan_paths)
+        tpl_main.render(context)
+        doc = template_renderer.rendered_document(tpl_main)
+        # виды таблиц — один проход; вставленные дальше таблицы индекс разметит сам
+        index = DocumentIndex(doc)
+
+        # ---------- 8. Таблицы помещений/оборудования ----------
+        step += 1
+        emit(step, "Обработка таблицы помещений…")
+        table_processor.process_rooms_table(doc, rooms, index)
+
+        step += 1
+        emit(step, "Обработка таблицы оборудования…")
+        table_processor.process_equipment_table(doc, job.equipment, index)
+        postprocess_equipment_dates(doc, index)
+
+        # ---------- 9. Вставка выбранных тестов ----------
+        step += 1
+        emit(step, "Вставка тестовых таблиц…")
+        missing = table_processor.insert_test_tables(doc, tests_doc, job.selected_tests) or []
+
+        # ---------- 10. Таблица 5 ----------
+        step += 1
+        emit(step, "Вставка Таблицы 5 (анализ рисков)…")
+        try:
+            risk_rows = get_risk_rows(job.risk_path, job.selected_tests)
+            insert_table5_into_doc(doc, risk_rows, index)
+        except Exception as e:
+            logger.warning(f"Таблица 5 не вставлена: {e}")
+
+        # ---------- 11. Постобработка ----------
+        step += 1
+        emit(step, "Заполнение результатов тестов…")
+        table_processor.process_test_results_tables(doc, rooms, index)
+        _fill_test_112(doc, rooms, index)
+
+        supply_air = index.tables(SUPPLY_AIR)
+        if word_repeat_headers.split_test_results_table(
+            doc,
+            split_phrase="Результаты испытания",
+            header_rows=2,
+            table_must_contain="Проверка расхода приточного воздуха",
+            tables=supply_air,
+        ):
+            index.refresh(*supply_air)  # хвосты-результаты индекс разметит как новые таблицы
+
+        step += 1
+        emit(step, "Унификация шрифта…")
+        table_processor.enforce_tnr_face_only_everywhere(doc)
+
+        try:
+            for table in doc.tables:
+                table.style = "Table Grid"
+        except Exception as e:
+            logger.warning(f"Не удалось применить стиль 'Table Grid': {e}")
+
+        # без Word: «Продолжение таблицы N» по оценке страниц, шапка Теста 11.3 на каждой странице
+        if not job.use_word:
+            paginate_without_word(doc, index)
+
+        # ---------- 12. Сохранение основного документа ----------
+        step += 1
+        emit(step, "Сохранение…")
+        doc.save(job.out_path)
+
+        # обновление полей/колонтитулов + разрезание таблицы 5 через Word (если нужно)
+        if job.use_word:
+            try:
+                word_pool.finalize(job.out_path, word_pool.PROTOCOL_OPS)
+            except Exception as e:
+                logger.warning(f"Не удалось обновить поля/разрезать таблицу 5 через Word: {e}")
+    except BaseException:
+        # ОТЧ уже считается в фоне — дождаться его, иначе его ошибка (или
+        # недописанный файл) потеряется за ошибкой протокола
+        if report_future is not None:
+            _drain_report(report_future, rep or "ОТЧ")
+        raise
+
+    # ---------- 13. Дождаться ОТЧ-<code> ----------
+    if report_future is not None:
+        step += 1
+        emit(step, f"Завершение {rep or 'ОТЧ'}…")
+        report_future.result()
+
+    msg = f"Документ сохранён:\n{job.out_path}"
+    if do_report and job.out_report_path:
+        rep_name = f"ОТЧ-{rep}" if rep else "ОТЧ"
+        msg += f"\n\n{rep_name} сохранён:\n{job.out_report_path}"
+
+    return RenderResult(
+        out_path=job.out_path,
+        out_report_path=job.out_report_path if do_report else None,
+        missing=missing,
+        message=msg,
+    )
+
+
+# =============================================================================
+# 9) Задание из JSON + CLI
+# =============================================================================
+def job_from_dict(d: Dict[str, Any], *, base: Path | None = None) -> RenderJob:
+    """
+    Описание задания (JSON) -> RenderJob. Неуказанные пути берутся как в GUI (default_paths).
+
+    {
+      "mode": "OQ",                      # OQ | PQ
+      "out": "out/Протокол.docx",        # база имени; итог: <stem>_<mode>.docx
+      "tpl": ..., "tests": ..., "xls_tests": ..., "xls_eq": ..., "risk": ..., "scans_dir": ...,
+      "rooms": [{...}] | "rooms_file": "rooms.csv|json",
+      "selected_tests": [...],           # по умолчанию — все из xls_tests
+      "equipment": [{...}],              # по умолчанию — всё оборудование из xls_eq
+      "fields": {"object": ..., "prt": ..., "year": ..., ...},
+      "app1_images": [...], "app4_images": [...], "app5_images": [...],
+      "report": true                     # ОТЧ-<mode>, если шаблон есть рядом с проектом
+    }
+    """
+    base = Path(base) if base else PROJECT_ROOT
+    mode = str(d.get("mode") or "OQ").upper()
+    defaults = default_paths(mode, PROJECT_ROOT)
+
+    def path_of(key: str, default_key: str) -> str:
+        v = d.get(key)
+        if not v:
+            return str(defaults[default_key])
+        p = Path(v)
+        return str(p if p.is_absolute() else base / p)
+
+    tpl_path = path_of("tpl", "tpl")
+    tests_path = path_of("tests", "tests")
+    xls_tests = path_of("xls_tests", "xls_tests")
+    xls_eq = path_of("xls_eq", "xls_eq")
+    risk_path = path_of("risk", "risk_doc")
+    scans_dir = path_of("scans_dir", "scans_dir")
+
+    out_raw = d.get("out")
+    if not out_raw:
+        raise ValueError("В задании не указан путь сохранения ('out').")
+    out_base = Path(out_raw)
+    if not out_base.is_absolute():
+        out_base = base / out_base
+    out_path = out_base.with_name(out_base.stem + f"_{mode}.docx")
+
+    if d.get("rooms_file"):
+        rooms_file = Path(d["rooms_file"])
+        rooms = io_manager.load_rooms_file(rooms_file if rooms_file.is_absolute() else base / rooms_file)
+    else:
+        rooms = [dict(r) for r in (d.get("rooms") or [])]
+
+    sel_tests_raw = d.get("selected_tests")
+    if sel_tests_raw is None:
+        sel_tests_raw = io_manager.load_tests_list(Path(xls_tests))
+
+    equipment = d.get("equipment")
+    if equipment is None:
+        by_sheets = io_manager.load_equipment_by_sheets(Path(xls_eq))
+        equipment = [it for items in by_sheets.values() for it in items]
+
+    sel_tests = strip_test_numbers(sel_tests_raw)
+    ctx_fields, ctx_fields_report = build_ctx_fields(d.get("fields") or {}, mode, sel_tests)
+
+    tpl_report_path = out_report_path = xls_report_path = None
+    if d.get("report", True):
+        tpl_report_path, out_report_path, xls_report_path = report_paths(mode, out_base, PROJECT_ROOT)
+
+    def images(key: str) -> List[str]:
+        return [str(p if Path(p).is_absolute() else base / p) for p in (d.get(key) or [])]
+
+    return RenderJob(
+        tpl_path=tpl_path,
+        tests_doc_path=tests_path,
+        xls_tests_path=xls_tests,
+        xls_eq_path=xls_eq,
+        out_path=str(out_path),
+        selected_tests=sel_tests,
+        rooms=rooms,
+        equipment=list(equipment),
+        ctx_fields=ctx_fields,
+        risk_path=risk_path,
+        scans_dir=scans_dir,
+        app1_images=images("app1_images"),
+        app4_images=images("app4_images"),
+        app5_images=images("app5_images"),
+        tpl_report_path=tpl_report_path,
+        out_report_path=out_report_path,
+        ctx_fields_report=ctx_fields_report if (tpl_report_path and out_report_path) else None,
+        xls_report_path=xls_report_path,
+        report_code=mode,
+        use_word=bool(d.get("use_word", True)),
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m render_engine",
+        description="Рендер протокола OQ/PQ (+ ОТЧ) без GUI по JSON-заданию",
+    )
+    p.add_argument("job", help="JSON-файл задания (см. job_from_dict)")
+    p.add_argument("--no-word", action="store_true", help="Не запускать MS Word для финализации (Linux/сервер)")
+    args = p.parse_args(argv)
+
+    job_path = Path(args.job).resolve()
+    with open(job_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if args.no_word:
+        data["use_word"] = False
+
+    t0 = time.perf_counter()
+    try:
+        job = job_from_dict(data, base=job_path.parent)
+        result = render_job(job)
+    except Exception:
+        logger.exception("Ошибка рендера:")
+        return 1
+
+    print(result.message)
+    if result.missing:
+        print("Не вставлены тесты:\n" + "\n".join(result.missing))
+    print(f"Время: {time.perf_counter() - t0:.1f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,9 @@ from __future__ import annotations
 
 import re
 from copy import deepcopy
+from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 
-from openpyxl import load_workbook
-
 from docx.document import Document as DocxDocument
 from docx.table import Table, _Cell
 from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -14,6 +13,11 @@ from docx.shared import Pt
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 
+from document_index import TABLE5, DocumentIndex
+from page_layout import PageLayout
+from row_builder import RowBuilder
+import workbook_cache
+
 
 # =============================================================================
 # Нормализация / сравнение тестов (очень важно для совпадений)
@@ -85,29 +89,28 @@ def _selected_tests_to_names(selected_tests: List[str]) -> List[str]:
     return names
 
 
+def _keys_match(sk: str, tk: str) -> bool:
+    return bool(sk) and bool(tk) and ((sk in tk) or (tk in sk))
+
+
 def _is_match(selected_name: str, test_from_excel: str) -> bool:
     """
     Матч "вхождение ключа" в любую сторону.
     """
-    sk = _match_key(selected_name)
-    tk = _match_key(test_from_excel)
-    if not sk or not tk:
-        return False
-    return (sk in tk) or (tk in sk)
+    return _keys_match(_match_key(selected_name), _match_key(test_from_excel))
 
 
 # =============================================================================
 # Excel: чтение строк
 # =============================================================================
 
-def _build_header_map(ws) -> Dict[str, int]:
+def _build_header_map(header: Tuple) -> Dict[str, int]:
     """
     Мапа "нормализованный заголовок" -> индекс колонки (1-based).
     Считаем, что заголовок в 1-й строке.
     """
     header_map: Dict[str, int] = {}
-    for c in range(1, ws.max_column + 1):
-        v = ws.cell(row=1, column=c).value
+    for c, v in enumerate(header, start=1):
         if v is None:
             continue
         header_map[_norm_basic(str(v))] = c
@@ -122,133 +125,213 @@ def _h(header_map: Dict[str, int], *variants: str) -> int | None:
     return None
 
 
-def get_risk_rows(xlsx_path: str, selected_tests: List[str]) -> List[Dict[str, str]]:
+def _sval(v) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def _ival(v) -> str:
+    if v is None:
+        return ""
+    s = str(v).strip()
+    # 2.0 -> 2
+    if re.fullmatch(r"\d+\.0", s):
+        s = s[:-2]
+    return s
+
+
+# длина фрагмента ключа в обратном индексе (n-граммы)
+_GRAM = 3
+
+
+@dataclass(frozen=True)
+class _RiskRow:
+    fields: Tuple[Tuple[str, str], ...]     # risk, cause, prob_letter, ... rpn — в порядке вывода
+    tests: Tuple[str, ...]                  # тесты ячейки как в Excel
+    merge_key: Tuple                        # ключ схлопывания: все поля, кроме tests
+
+
+class RiskIndex:
     """
-    Возвращает строки для Таблицы 5:
-    - берём только те строки Excel, где в "Аттестационное испытание" есть хотя бы 1 выбранный тест
-    - ВНУТРИ строки оставляем только выбранные тесты (в порядке выбора пользователем)
-    - одинаковые строки (по всем полям кроме тестов) схлопываем, объединяя тесты
+    Лист анализа рисков, разобранный один раз: значения строк, ключи
+    сравнения тестов (_match_key) и обратный индекс n-грамм ключей.
+
+    Раньше на каждую комбинацию (выбранный тест × тест в ячейке × строка)
+    обе строки заново гонялись через регэкспы _norm_basic/_match_key. Теперь
+    выбранный тест нормализуется один раз и сверяется только с РАЗНЫМИ
+    ключами-кандидатами из индекса:
+      - sk in tk: у tk есть все n-граммы sk -> кандидаты по самой редкой из них;
+      - tk in sk: tk начинается внутри sk -> кандидаты по первым n-граммам tk,
+        которые встречаются в sk (+ короткие ключи короче n-граммы).
+    Итог проверяется тем же _keys_match, поэтому семантика прежняя.
     """
-    wb = load_workbook(xlsx_path, data_only=True)
-    ws = wb.active
-
-    header_map = _build_header_map(ws)
-
-    cols = {
-        "risk": _h(header_map, "Риск"),
-        "cause": _h(header_map, "Возможная причина"),
-        "prob_l": _h(header_map, "Вероятность_оценка", "Вероятность оценка"),
-        "prob_s": _h(header_map, "Вероятность_балл", "Вероятность балл"),
-        "sev_l": _h(header_map, "Тяжесть_оценка", "Тяжесть оценка"),
-        "sev_s": _h(header_map, "Тяжесть_балл", "Тяжесть балл"),
-        "det_l": _h(header_map, "Необнаружение_оценка", "Необнаружение оценка"),
-        "det_s": _h(header_map, "Необнаружение_балл", "Необнаружение балл"),
-        "level_l": _h(header_map, "Уровень_риска", "Уровень риска"),
-        "rpn": _h(header_map, "ПЧР", "RPN"),
-        "tests": _h(header_map, "Аттестационное испытание", "Квалификационное испытание"),
-    }
-
-    if any(v is None for v in cols.values()):
-        raise ValueError(f"Не найдены все нужные колонки в Excel (ожидается строка 1). Найдено: {cols}")
-
-    sel_names = _selected_tests_to_names(selected_tests)
-    sel_names = [s for s in sel_names if s.strip()]  # сохранить порядок выбора
-
-    def sval(v) -> str:
-        return "" if v is None else str(v).strip()
-
-    def ival(v) -> str:
-        if v is None:
-            return ""
-        s = str(v).strip()
-        # 2.0 -> 2
-        if re.fullmatch(r"\d+\.0", s):
-            s = s[:-2]
-        return s
-
-    raw_rows: List[Dict[str, str | List[str]]] = []
-
-    for r in range(2, ws.max_row + 1):
-        risk = sval(ws.cell(row=r, column=cols["risk"]).value)
-        cause = sval(ws.cell(row=r, column=cols["cause"]).value)
-        tests_raw = ws.cell(row=r, column=cols["tests"]).value
-        tests_list = _split_tests_cell("" if tests_raw is None else str(tests_raw))
-
-        if not (risk or cause or tests_list):
-            continue
+
+    def __init__(self, rows: List[_RiskRow]):
+        self.rows = rows
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}   # ключ теста -> [(строка, позиция в ячейке)]
+        for ri, row in enumerate(rows):
+            for pos, t in enumerate(row.tests):
+                tk = _match_key(t)
+                if tk:
+                    self._postings.setdefault(tk, []).append((ri, pos))
+
+        self._grams: Dict[str, set] = {}        # n-грамма -> ключи, где она есть
+        self._starts: Dict[str, List[str]] = {} # первая n-грамма -> ключи
+        self._short: List[str] = []             # ключи короче n-граммы
+        for tk in self._postings:
+            if len(tk) < _GRAM:
+                self._short.append(tk)
+                continue
+            self._starts.setdefault(tk[:_GRAM], []).append(tk)
+            for i in range(len(tk) - _GRAM + 1):
+                self._grams.setdefault(tk[i:i + _GRAM], set()).add(tk)
+
+        self._memo: Dict[str, Tuple[str, ...]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple]) -> "RiskIndex":
+        """rows — значения листа построчно, первая строка — шапка."""
+        header_map = _build_header_map(rows[0] if rows else ())
+
+        cols = {
+            "risk": _h(header_map, "Риск"),
+            "cause": _h(header_map, "Возможная причина"),
+            "prob_l": _h(header_map, "Вероятность_оценка", "Вероятность оценка"),
+            "prob_s": _h(header_map, "Вероятность_балл", "Вероятность балл"),
+            "sev_l": _h(header_map, "Тяжесть_оценка", "Тяжесть оценка"),
+            "sev_s": _h(header_map, "Тяжесть_балл", "Тяжесть балл"),
+            "det_l": _h(header_map, "Необнаружение_оценка", "Необнаружение оценка"),
+            "det_s": _h(header_map, "Необнаружение_балл", "Необнаружение балл"),
+            "level_l": _h(header_map, "Уровень_риска", "Уровень риска"),
+            "rpn": _h(header_map, "ПЧР", "RPN"),
+            "tests": _h(header_map, "Аттестационное испытание", "Квалификационное испытание"),
+        }
+
+        if any(v is None for v in cols.values()):
+            raise ValueError(f"Не найдены все нужные колонки в Excel (ожидается строка 1). Найдено: {cols}")
+
+        out: List[_RiskRow] = []
+        for values in rows[1:]:
+            def v(name: str):
+                c = cols[name] - 1
+                return values[c] if c < len(values) else None
+
+            risk = _sval(v("risk"))
+            cause = _sval(v("cause"))
+            tests_raw = v("tests")
+            tests_list = _split_tests_cell("" if tests_raw is None else str(tests_raw))
+
+            if not (risk or cause or tests_list):
+                continue
+
+            fields = (
+                ("risk", risk),
+                ("cause", cause),
+                ("prob_letter", _sval(v("prob_l"))),
+                ("prob_score", _ival(v("prob_s"))),
+                ("sev_letter", _sval(v("sev_l"))),
+                ("sev_score", _ival(v("sev_s"))),
+                ("det_letter", _sval(v("det_l"))),
+                ("det_score", _ival(v("det_s"))),
+                ("level_letter", _sval(v("level_l"))),
+                ("rpn", _ival(v("rpn"))),
+            )
+            merge_key = (_match_key(risk), _match_key(cause)) + tuple(val for _, val in fields[2:])
+            out.append(_RiskRow(fields=fields, tests=tuple(tests_list), merge_key=merge_key))
+        return cls(out)
+
+    # ---------- поиск ----------
+    def _candidates(self, sk: str) -> set:
+        if len(sk) < _GRAM:
+            # короткий выбранный ключ — прямая проверка всех ключей
+            return set(self._postings)
+        out = set(self._short)
+        grams = [sk[i:i + _GRAM] for i in range(len(sk) - _GRAM + 1)]
+        # sk in tk
+        rarest = min((self._grams.get(g, ()) for g in grams), key=len)
+        out.update(rarest)
+        # tk in sk
+        for g in set(grams):
+            out.update(self._starts.get(g, ()))
+        return out
+
+    def keys_for(self, selected_name: str) -> Tuple[str, ...]:
+        """Ключи тестов из Excel, совпадающие с выбранным тестом (_is_match)."""
+        sk = _match_key(selected_name)
+        hit = self._memo.get(sk)
+        if hit is None:
+            hit = self._memo[sk] = tuple(tk for tk in self._candidates(sk) if _keys_match(sk, tk)) if sk else ()
+        return hit
+
+    def select(self, selected_tests: List[str]) -> List[Dict[str, str | List[str]]]:
+        """
+        Строки под выбранные тесты (см. get_risk_rows): внутри строки — только
+        выбранные тесты в порядке выбора, одинаковые строки схлопнуты.
+        """
+        sel_names = _selected_tests_to_names(selected_tests)
+        sel_names = [s for s in sel_names if s.strip()]  # сохранить порядок выбора
 
         # ОСТАВЛЯЕМ ТОЛЬКО выбранные тесты (и в ПОРЯДКЕ выбора)
-        matched_tests: List[str] = []
+        matched: Dict[int, List[str]] = {}
         if sel_names:
             for sname in sel_names:
-                for t in tests_list:
-                    if _is_match(sname, t):
-                        if t not in matched_tests:
-                            matched_tests.append(t)
-            if not matched_tests:
-                continue
-        else:
-            matched_tests = tests_list
-
-        row = {
-            "risk": risk,
-            "cause": cause,
-            "prob_letter": sval(ws.cell(row=r, column=cols["prob_l"]).value),
-            "prob_score": ival(ws.cell(row=r, column=cols["prob_s"]).value),
-            "sev_letter": sval(ws.cell(row=r, column=cols["sev_l"]).value),
-            "sev_score": ival(ws.cell(row=r, column=cols["sev_s"]).value),
-            "det_letter": sval(ws.cell(row=r, column=cols["det_l"]).value),
-            "det_score": ival(ws.cell(row=r, column=cols["det_s"]).value),
-            "level_letter": sval(ws.cell(row=r, column=cols["level_l"]).value),
-            "rpn": ival(ws.cell(row=r, column=cols["rpn"]).value),
-            "tests": matched_tests,
-        }
-        raw_rows.append(row)
-
-    # СХЛОПНУТЬ дубли по всем полям, кроме tests
-    merged: List[Dict[str, str | List[str]]] = []
-    index: Dict[Tuple, int] = {}
-
-    for rr in raw_rows:
-        k = (
-            _match_key(rr["risk"]),
-            _match_key(rr["cause"]),
-            rr["prob_letter"],
-            rr["prob_score"],
-            rr["sev_letter"],
-            rr["sev_score"],
-            rr["det_letter"],
-            rr["det_score"],
-            rr["level_letter"],
-            rr["rpn"],
-        )
-        if k in index:
-            ex = merged[index[k]]
-            ex_tests = ex["tests"]  # type: ignore[assignment]
-            for t in rr["tests"]:   # type: ignore[operator]
-                if t not in ex_tests:
-                    ex_tests.append(t)
+                hits = sorted(h for tk in self.keys_for(sname) for h in self._postings[tk])
+                for ri, pos in hits:
+                    t = self.rows[ri].tests[pos]
+                    lst = matched.setdefault(ri, [])
+                    if t not in lst:
+                        lst.append(t)
         else:
-            index[k] = len(merged)
-            merged.append(rr)
+            matched = {ri: list(row.tests) for ri, row in enumerate(self.rows)}
+
+        # СХЛОПНУТЬ дубли по всем полям, кроме tests
+        merged: List[Dict[str, str | List[str]]] = []
+        index: Dict[Tuple, int] = {}
+
+        for ri in sorted(matched):
+            row = self.rows[ri]
+            tests = matched[ri]
+            if row.merge_key in index:
+                ex_tests = merged[index[row.merge_key]]["tests"]
+                for t in tests:
+                    if t not in ex_tests:
+                        ex_tests.append(t)  # type: ignore[union-attr]
+            else:
+                index[row.merge_key] = len(merged)
+                merged.append({**dict(row.fields), "tests": tests})
+
+        return merged
 
-    # Привести к финальному виду (tests -> list[str] оставляем, дальше в docx вставке сделаем буллеты)
-    return [r for r in merged]  # type: ignore[return-value]
+
+def get_risk_index(xlsx_path: str) -> RiskIndex:
+    """Индекс книги рисков (активный лист): один на версию файла, из workbook_cache."""
+    return workbook_cache.derived(xlsx_path, "risk_index", lambda book: RiskIndex.from_rows(book.rows()))
+
+
+def get_risk_rows(xlsx_path: str, selected_tests: List[str]) -> List[Dict[str, str]]:
+    """
+    Возвращает строки для Таблицы 5:
+    - берём только те строки Excel, где в "Аттестационное испытание" есть хотя бы 1 выбранный тест
+    - ВНУТРИ строки оставляем только выбранные тесты (в порядке выбора пользователем)
+    - одинаковые строки (по всем полям кроме тестов) схлопываем, объединяя тесты
+    """
+    # tests -> list[str], дальше в docx вставке сделаем буллеты
+    return get_risk_index(xlsx_path).select(selected_tests)  # type: ignore[return-value]
 
 
 # =============================================================================
 # DOCX: вставка Таблицы 5 по плейсхолдерам, НЕ ТРОГАЯ ШАПКУ
 # =============================================================================
 
-def _find_table5_and_template_row(doc: DocxDocument) -> Tuple[Table, int]:
+def _find_table5_and_template_row(doc: DocxDocument, index: DocumentIndex | None = None) -> Tuple[Table, int]:
     """
-    Ищем строку-шаблон по маркеру <<T5_RISK>>.
+    Ищем строку-шаблон по маркеру <<T5_RISK>> (вид TABLE5 в DocumentIndex).
     """
-    for tbl in doc.tables:
-        for ri, row in enumerate(tbl.rows):
-            if any("<<T5_RISK>>" in c.text for c in row.cells):
-                return tbl, ri
-    raise ValueError("Не найдена Таблица 5: нет строки с <<T5_RISK>>.")
+    if index is None:
+        index = DocumentIndex(doc)
+    tbl = index.first(TABLE5)
+    if tbl is None:
+        raise ValueError("Не найдена Таблица 5: нет строки с <<T5_RISK>>.")
+    return tbl, index.row(tbl, TABLE5)
 
 
 def _remove_rows_from(table: Table, start_idx: int) -> None:
@@ -319,7 +402,23 @@ def _set_diag_cell(cell: _Cell, top_left: str, bottom_right: str,
         _set_para_text_keep_runs(p, "")
 
 
-def insert_table5_into_doc(doc: DocxDocument, risk_rows: List[Dict[str, str]]) -> None:
+# (буква, балл) диагональных ячеек 2..5
+_DIAG_KEYS = (
+    ("prob_letter", "prob_score"),
+    ("sev_letter", "sev_score"),
+    ("det_letter", "det_score"),
+    ("level_letter", "rpn"),
+)
+
+
+def _first_run(p):
+    """w:r, в который _set_para_text_keep_runs пишет текст абзаца."""
+    return p.runs[0]._r if p.runs else p.add_run("")._r
+
+
+def insert_table5_into_doc(
+    doc: DocxDocument, risk_rows: List[Dict[str, str]], index: DocumentIndex | None = None
+) -> None:
     """
     Заполняем Таблицу 5 по строкам из get_risk_rows():
     - Шапку не трогаем
@@ -327,27 +426,30 @@ def insert_table5_into_doc(doc: DocxDocument, risk_rows: List[Dict[str, str]]) -
     - Вставляем новые строки, копируя формат строки-шаблона
     - Риск объединяем по вертикали, если одинаковый подряд
     """
-    table, tpl_row_idx = _find_table5_and_template_row(doc)
-
-    tpl_tr = deepcopy(table.rows[tpl_row_idx]._tr)
+    table, tpl_row_idx = _find_table5_and_template_row(doc, index)
+
+    # ВАЖНО: в шаблоне ожидается 7 визуальных колонок:
+    # 0 риск | 1 причина | 2 prob | 3 sev | 4 det | 5 level | 6 tests
+    # Прототип строки: формат диагональных ячеек и пустые ранны-слоты — один раз
+    rb = RowBuilder(table.rows[tpl_row_idx]._tr, table)
+    cells = rb.cells
+    for col, key in ((0, "risk"), (1, "cause"), (6, "tests")):
+        _set_cell_lines(cells[col], [""])
+        rb.bind(key, _first_run(cells[col].paragraphs[0]))
+    for col, (k_top, k_bot) in enumerate(_DIAG_KEYS, start=2):
+        _set_diag_cell(cells[col], "", "")
+        rb.bind(k_top, _first_run(cells[col].paragraphs[0]))
+        rb.bind(k_bot, _first_run(cells[col].paragraphs[1]))
 
     # удаляем плейсхолдер-строку и всё ниже (чтобы заглушки не оставались)
     _remove_rows_from(table, tpl_row_idx)
 
+    trs = []
     for rr in (risk_rows or []):
-        table._tbl.append(deepcopy(tpl_tr))
-        new_row = table.rows[-1]
-        cells = new_row.cells
-
-        # ВАЖНО: в шаблоне ожидается 7 визуальных колонок:
-        # 0 риск | 1 причина | 2 prob | 3 sev | 4 det | 5 level | 6 tests
-        _set_cell_lines(cells[0], [str(rr.get("risk", "") or "")])
-        _set_cell_lines(cells[1], [str(rr.get("cause", "") or "")])
-
-        _set_diag_cell(cells[2], str(rr.get("prob_letter", "") or ""), str(rr.get("prob_score", "") or ""))
-        _set_diag_cell(cells[3], str(rr.get("sev_letter", "") or ""), str(rr.get("sev_score", "") or ""))
-        _set_diag_cell(cells[4], str(rr.get("det_letter", "") or ""), str(rr.get("det_score", "") or ""))
-        _set_diag_cell(cells[5], str(rr.get("level_letter", "") or ""), str(rr.get("rpn", "") or ""))
+        values = {k: str(rr.get(k, "") or "") for k in ("risk", "cause")}
+        for k_top, k_bot in _DIAG_KEYS:
+            values[k_top] = str(rr.get(k_top, "") or "")
+            values[k_bot] = str(rr.get(k_bot, "") or "")
 
         tests_list = rr.get("tests")  # может быть list[str]
         if isinstance(tests_list, list):
@@ -357,7 +459,12 @@ def insert_table5_into_doc(doc: DocxDocument, risk_rows: List[Dict[str, str]]) -
             raw = str(tests_list or "").strip()
             lines = [f"•→{x.strip()}" for x in raw.splitlines() if x.strip()] if raw else []
 
-        _set_cell_lines(cells[6], lines if lines else [""])
+        values["tests"] = lines[0] if len(lines) == 1 else ""
+        tr = rb.build(values)
+        if len(lines) > 1:
+            _set_cell_lines(rb.cell(tr, 6), lines)
+        trs.append(tr)
+    table._tbl.extend(trs)
 
     # Объединяем одинаковые риски подряд (как в образце)
     if not risk_rows:
@@ -372,8 +479,8 @@ def insert_table5_into_doc(doc: DocxDocument, risk_rows: List[Dict[str, str]]) -
             j += 1
 
         if j - i > 1:
-            top_cell = table.rows[tpl_row_idx + i].cells[0]
-            bottom_cell = table.rows[tpl_row_idx + (j - 1)].cells[0]
+            top_cell = rb.cell(trs[i], 0)
+            bottom_cell = rb.cell(trs[j - 1], 0)
             top_cell.merge(bottom_cell)
             _set_cell_lines(top_cell, [str(risk_rows[i].get("risk", "") or "")])
 
@@ -444,17 +551,19 @@ def split_table5_like_example(
     doc: DocxDocument,
     *,
     header_rows: int = 2,
-    first_page_data_rows: int = 4,
+    first_page_data_rows: Optional[int] = None,
     next_page_data_rows: int = 6,
+    layout: Optional[PageLayout] = None,
 ) -> None:
     """
     Делит Таблицу 5 "как в 6_OQ — копия":
-      - В первой части оставляем шапку (2 строки) + N строк данных
+      - В первой части оставляем шапку (2 строки) + строки данных, что влезли на страницу
       - Затем: разрыв страницы + 'Продолжение таблицы 5' + таблица ТОЛЬКО со строками данных (без шапки)
-      - Если данных много — повторяем блоки (каждый блок по next_page_data_rows)
+      - Если данных много — повторяем блоки
 
-    Важно: python-docx не умеет реально мерить «влезло/не влезло в страницу»,
-    поэтому режем детерминированно по числу строк (как в примере).
+    Границы страниц оценивает page_layout (без Word). Если задан
+    first_page_data_rows — режем детерминированно по числу строк, как раньше:
+    первый блок N строк, дальше по next_page_data_rows.
     """
 
     body = doc.element.body
@@ -488,19 +597,19 @@ def split_table5_like_example(
         return
 
     header_trs = tr_list[:header_rows]
-    data_trs = tr_list[header_rows:]
 
-    if len(data_trs) <= first_page_data_rows:
+    # строки, с которых начинаются следующие страницы
+    if first_page_data_rows is None:
+        layout = layout or PageLayout(doc)
+        cuts = layout.table_cuts(tbl_xml, header_rows=header_rows, repeat_header=False)
+    else:
+        cuts = list(range(header_rows + first_page_data_rows, len(tr_list), next_page_data_rows))
+    if not cuts:
         return  # всё влезло в первую часть
 
     # чанки данных
-    chunks: List[List[OxmlElement]] = []
-    chunks.append(data_trs[:first_page_data_rows])
-
-    rest = data_trs[first_page_data_rows:]
-    while rest:
-        chunks.append(rest[:next_page_data_rows])
-        rest = rest[next_page_data_rows:]
+    bounds = [header_rows] + cuts + [len(tr_list)]
+    chunks: List[List[OxmlElement]] = [tr_list[a:b] for a, b in zip(bounds, bounds[1:])]
 
     # 1) Обрезаем первую таблицу: header + первый chunk
     keep_first = set(header_trs + chunks[0])
@@ -0,0 +1,140 @@
+# row_builder.py
+"""
+Быстрое заполнение таблиц «по строке-шаблону» (помещения, оборудование,
+Таблица 5, тест 11.2, Таблица 2 ОТЧ).
+
+Раньше на каждую запись делалось
+    tbl._tbl.append(deepcopy(sample_tr)); row = tbl.rows[-1]; row.cells ...
+а tbl.rows[-1] каждый раз строит обёртки для ВСЕХ строк таблицы — O(N²),
+плюс на каждую ячейку — десяток вызовов paragraph_format/font.
+
+Здесь шаблон форматируется один раз (прототип: pPr/rPr/trPr уже готовы),
+в нём отмечаются «слоты» — элементы (обычно w:r), куда пишется текст, а
+каждая строка — это deepcopy прототипа + запись текста по слотам:
+
+    rb = RowBuilder(sample_tr, tbl)
+    for cell in rb.cells:               # форматирование — один раз
+        ...
+        rb.bind("num", run._r)
+    tbl._tbl.extend(rb.build({"num": "1"}) for room in rooms)
+"""
+from __future__ import annotations
+
+import re
+from copy import deepcopy
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from docx.oxml.ns import qn
+from docx.oxml.table import CT_Row
+from docx.oxml.text.run import CT_R
+from docx.table import Table, _Cell, _Row
+from lxml import etree
+
+# символы, которые CT_R.text превращает в отдельные элементы (w:tab, w:br, w:cr)
+_SPECIAL = re.compile(r"[\t\n\r]")
+_W_T = qn("w:t")
+_XML_SPACE = qn("xml:space")
+
+
+def row_cells(tr: CT_Row, table: Table) -> Tuple[_Cell, ...]:
+    """Ячейки строки по колонкам сетки — как _Row.cells, но без обхода table.rows."""
+    return _Row(tr, table).cells
+
+
+def rows_of(table: Table) -> List[CT_Row]:
+    """Все w:tr таблицы — один раз, вместо table.rows[i] в цикле."""
+    return list(table._tbl.tr_lst)
+
+
+def _path(root, elm) -> Optional[Tuple[int, ...]]:
+    """Путь от root до elm индексами детей (None — elm не внутри root)."""
+    path: List[int] = []
+    while elm is not root:
+        parent = elm.getparent()
+        if parent is None:
+            return None
+        path.append(parent.index(elm))
+        elm = parent
+    return tuple(reversed(path))
+
+
+def _walk(root, path: Tuple[int, ...]):
+    for i in path:
+        root = root[i]
+    return root
+
+
+class RowBuilder:
+    """Прототип строки таблицы + слоты для текста."""
+
+    def __init__(self, sample_tr: CT_Row, table: Table):
+        self.proto: CT_Row = deepcopy(sample_tr)
+        self.table = table
+        self._pending: Dict[Hashable, Any] = {}
+        self._slots: Dict[Hashable, Tuple[int, ...]] | None = None
+        self._cols: List[Optional[int]] | None = None
+
+    @property
+    def row(self) -> _Row:
+        """Обёртка python-docx над прототипом (высота строки и т.п.)."""
+        return _Row(self.proto, self.table)
+
+    @property
+    def cells(self) -> Tuple[_Cell, ...]:
+        """Ячейки прототипа по колонкам сетки — для однократного форматирования."""
+        return row_cells(self.proto, self.table)
+
+    def bind(self, key: Hashable, elm) -> None:
+        """
+        Слот `key` -> элемент прототипа с сеттером .text (CT_R).
+        Повторный bind того же ключа перезаписывает слот; если к build()
+        элемент уже удалён из прототипа, слот пропускается.
+        """
+        self._pending[key] = elm
+        self._slots = None
+
+    def _compiled(self) -> Dict[Hashable, Tuple[int, ...]]:
+        if self._slots is None:
+            slots = {}
+            for key, elm in self._pending.items():
+                p = _path(self.proto, elm)
+                if p is not None:
+                    slots[key] = p
+            self._slots = slots
+        return self._slots
+
+    def build(self, values: Mapping[Hashable, Any]) -> CT_Row:
+        """Новая строка: копия прототипа с текстом из values (по слотам)."""
+        tr = deepcopy(self.proto)
+        for key, path in self._compiled().items():
+            text = values.get(key)
+            if not text:
+                continue
+            text = str(text)
+            elm = _walk(tr, path)
+            if isinstance(elm, CT_R) and not _SPECIAL.search(text) and len(elm) == (elm.rPr is not None):
+                # пустой ран-слот: w:t напрямую (как CT_R.text, но без clear_content/xpath)
+                t = etree.SubElement(elm, _W_T)
+                t.text = text
+                if len(text.strip()) < len(text):
+                    t.set(_XML_SPACE, "preserve")
+            else:
+                elm.text = text
+        return tr
+
+    def _grid(self) -> List[Optional[int]]:
+        # колонка сетки -> номер w:tc среди детей w:tr (None — vMerge-продолжение)
+        if self._cols is None:
+            cols: List[Optional[int]] = []
+            for tc in self.proto.tc_lst:
+                i = None if tc.vMerge == "continue" else self.proto.index(tc)
+                cols.extend([i] * tc.grid_span)
+            self._cols = cols
+        return self._cols
+
+    def cell(self, tr: CT_Row, col: int) -> _Cell:
+        """Ячейка колонки сетки `col` в строке, построенной build()."""
+        i = self._grid()[col]
+        if i is None:
+            return row_cells(tr, self.table)[col]
+        return _Cell(tr[i], self.table)
@@ -0,0 +1,208 @@
+# scans_index.py
+"""
+Индекс папки «Сканы поверок»: серийный номер -> лучший файл скана.
+
+Раньше на каждый прибор делался полный os.walk по дереву (на сетевой папке —
+десятки секунд). Теперь дерево обходится один раз, результат лежит в
+.cache/scans, а при следующем запуске перечитываются только папки, у которых
+изменился mtime (добавили/удалили/переименовали файл или подпапку).
+
+Ключ ищется и в имени файла («140104025.jpg»), и в имени папки
+(«Анемометр Testo 417 з.н 84360366/…»). Порядок предпочтения:
+совпадение по имени файла > по папке, картинка > PDF, затем самый новый файл
+(в папке прибора рядом лежат поверки прошлых лет), затем путь по алфавиту.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_utils import cache_dir
+from logger import logger
+
+_FORMAT = 2
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+# pdf пропускаем как картинку (InlineImage не умеет PDF), но в индексе держим — как было
+SCAN_EXTS = IMAGE_EXTS + (".pdf",)
+
+# «з.н. 140104025», «з.н 84360366», «зав. № 123»
+_FOLDER_SERIAL_RE = re.compile(r"(?<!\w)(?:з\.\s*н|зав\.\s*№?)\.?\s*[:№]?\s*([0-9A-Za-zА-Яа-я][\w/\-]*)", re.IGNORECASE)
+
+# повторная проверка mtime не чаще, чем раз в N секунд (OQ и PQ стартуют одновременно)
+REFRESH_INTERVAL = 2.0
+
+
+def serial_key(s: str) -> str:
+    return re.sub(r"[^0-9a-zA-Z]+", "", (s or "")).lower()
+
+
+def serial_from_name_sn(name_sn: str) -> str:
+    """'Анемометр Testo 417, 84360366' -> '84360366' (как в старом find_scan_paths)."""
+    try:
+        _, serial = [p.strip() for p in (name_sn or "").rsplit(",", 1)]
+    except ValueError:
+        serial = (name_sn or "").strip()
+    return serial
+
+
+def _file_key(name: str) -> str:
+    stem = Path(name).stem
+    # «84360366.jpg.png» -> «84360366»
+    while Path(stem).suffix.lower() in IMAGE_EXTS:
+        stem = Path(stem).stem
+    return serial_key(stem)
+
+
+def _folder_key(name: str) -> str:
+    m = _FOLDER_SERIAL_RE.search(name or "")
+    return serial_key(m.group(1)) if m else ""
+
+
+@dataclass
+class _Dir:
+    mtime_ns: int
+    files: Dict[str, int] = field(default_factory=dict)  # имя -> mtime_ns, только SCAN_EXTS
+    subdirs: List[str] = field(default_factory=list)
+
+
+class ScansIndex:
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.dirs: Dict[str, _Dir] = {}          # относительный путь папки -> содержимое
+        self._best: Dict[str, str] | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def refresh(self) -> int:
+        """Обходит дерево, перечитывая только изменившиеся папки. Возвращает их число."""
+        rescanned = 0
+        seen: Dict[str, _Dir] = {}
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            full = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime = os.stat(full).st_mtime_ns
+            except OSError:
+                continue
+            d = self.dirs.get(rel)
+            if d is None or d.mtime_ns != mtime:
+                d = _Dir(mtime_ns=mtime)
+                try:
+                    with os.scandir(full) as it:
+                        for e in it:
+                            try:
+                                if e.is_dir():
+                                    d.subdirs.append(e.name)
+                                elif os.path.splitext(e.name)[1].lower() in SCAN_EXTS:
+                                    d.files[e.name] = e.stat().st_mtime_ns
+                            except OSError:
+                                continue
+                except OSError as ex:
+                    logger.warning(f"Сканы: не удалось прочитать папку {full}: {ex}")
+                rescanned += 1
+            seen[rel] = d
+            stack.extend(os.path.join(rel, s) if rel else s for s in d.subdirs)
+
+        if rescanned or len(seen) != len(self.dirs):
+            self.dirs = seen
+            self._best = None
+        self._checked_at = time.monotonic()
+        return rescanned
+
+    def _build_best(self) -> Dict[str, str]:
+        cands: Dict[str, Tuple[Tuple[Any, ...], str]] = {}
+
+        def offer(key: str, rank: Tuple[Any, ...], path: str) -> None:
+            if key and (key not in cands or rank < cands[key][0]):
+                cands[key] = (rank, path)
+
+        for rel, d in self.dirs.items():
+            # ближайшая папка с «з.н.» вверх по пути (сканы могут лежать в подпапках по годам)
+            folder_key = next((k for k in map(_folder_key, reversed(Path(rel).parts)) if k), "")
+            for fn, mtime in d.files.items():
+                path = os.path.join(self.root, rel, fn)
+                not_image = os.path.splitext(fn)[1].lower() not in IMAGE_EXTS
+                offer(_file_key(fn), (0, not_image, -mtime, path), path)
+                offer(folder_key, (1, not_image, -mtime, path), path)
+        return {k: p for k, (_, p) in cands.items()}
+
+    def find(self, serial: str) -> Optional[str]:
+        if self._best is None:
+            self._best = self._build_best()
+        return self._best.get(serial_key(serial))
+
+    def find_for_equipment(self, equipment: List[Dict[str, Any]]) -> List[str]:
+        """Сканы в порядке списка оборудования (без повторов)."""
+        out: List[str] = []
+        for eq in equipment:
+            path = self.find(serial_from_name_sn(eq.get("name_sn", "")))
+            if path and path not in out:
+                out.append(path)
+        return out
+
+
+# =============================================================================
+# Общий индекс на процесс + файл кэша
+# =============================================================================
+_indexes: Dict[str, ScansIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _store_file(root: str) -> Path:
+    h = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+    return cache_dir("scans") / f"{h}.pkl"
+
+
+def _load(root: str) -> ScansIndex:
+    idx = ScansIndex(root)
+    store = _store_file(idx.root)
+    if store.exists():
+        try:
+            with open(store, "rb") as f:
+                fmt, saved_root, dirs = pickle.load(f)
+            if fmt == _FORMAT and saved_root == idx.root:
+                idx.dirs = dirs
+        except Exception as e:
+            logger.debug(f"Индекс сканов {store.name} не прочитан ({e}) — строю заново")
+    return idx
+
+
+def _save(idx: ScansIndex) -> None:
+    store = _store_file(idx.root)
+    try:
+        tmp = store.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((_FORMAT, idx.root, idx.dirs), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, store)
+    except OSError as e:
+        logger.debug(f"Индекс сканов не сохранён: {e}")
+
+
+def get_index(scans_dir: str) -> ScansIndex:
+    """Индекс папки сканов: из памяти/с диска, с дочиткой изменившихся папок."""
+    root = os.path.abspath(scans_dir)
+    with _indexes_lock:
+        idx = _indexes.get(root)
+        if idx is None:
+            idx = _indexes[root] = _load(root)
+
+    with idx._lock:
+        if not idx.dirs or time.monotonic() - idx._checked_at > REFRESH_INTERVAL:
+            t0 = time.perf_counter()
+            n = idx.refresh()
+            if n:
+                _save(idx)
+            logger.debug(
+                f"Индекс сканов: папок {len(idx.dirs)}, перечитано {n} за {time.perf_counter() - t0:.2f} с"
+            )
+    return idx
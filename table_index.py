@@ -0,0 +1,212 @@
+# table_index.py
+"""
+Индекс тест-таблиц документа «Тесты OQ/PQ.docx».
+
+find_table_obj_by_title на каждый выбранный тест заново собирал текст всех
+ячеек документа через python-docx. Здесь документ проходится один раз
+(чистый lxml), а поиск по названию — та же логика, но по готовым строкам:
+
+    idx = TestTableIndex.from_document(doc)
+    tbl = idx.table(doc, "Проверка расхода приточного воздуха")
+
+Для исходного файла тестов индекс хранится на диске (.cache/test_tables) и
+пересобирается только при изменении файла (mtime/размер): load_index(path).
+check(titles) заранее сообщает о ненайденных, неоднозначных и дублирующихся названиях.
+
+XML-фрагменты таблиц на диске не хранятся: файл тестов — тоже Jinja-шаблон,
+и вставляются таблицы из его отрендеренной копии (tpl.docx), а фрагменты
+исходника содержали бы неподставленные плейсхолдеры.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from docx import Document
+from docx.document import Document as DocxDocument
+from docx.oxml.ns import qn
+from docx.table import Table
+
+from file_utils import cache_dir
+from logger import logger
+
+_FORMAT = 2  # версия формата файла индекса
+
+_W_P = qn("w:p")
+_W_TBL = qn("w:tbl")
+_W_TR = qn("w:tr")
+_W_TC = qn("w:tc")
+_W_T = qn("w:t")
+
+
+def norm_text(s: str) -> str:
+    return re.sub(r'[^\w\s]', '', (s or "").lower()).strip()
+
+
+def title_target(title: str) -> str:
+    """Как в find_table_obj_by_title: отрезаем «Тест N.» и нормализуем."""
+    sub = title.split('.', 1)[1] if '.' in title else title
+    return norm_text(sub)
+
+
+def cell_text(tc) -> str:
+    # как _Cell.text: абзацы ячейки (без вложенных таблиц) через \n
+    return "\n".join("".join(t.text or "" for t in p.iter(_W_T)) for p in tc.iterchildren(_W_P))
+
+
+def _table_text(tbl) -> str:
+    return " ".join(cell_text(tc) for tr in tbl.iterchildren(_W_TR) for tc in tr.iterchildren(_W_TC))
+
+
+def _first_row_text(tbl) -> str:
+    tr = next(tbl.iterchildren(_W_TR), None)
+    if tr is None:
+        return ""
+    tc = next(tr.iterchildren(_W_TC), None)
+    return cell_text(tc) if tc is not None else ""
+
+
+@dataclass
+class IndexReport:
+    missing: List[str] = field(default_factory=list)
+    # название -> заголовки всех подходящих таблиц (берётся первая)
+    ambiguous: Dict[str, List[str]] = field(default_factory=dict)
+    # заголовок таблицы -> сколько раз встречается в документе
+    duplicate_tables: Dict[str, int] = field(default_factory=dict)
+    # название, выбранное несколько раз
+    duplicate_titles: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.missing or self.ambiguous or self.duplicate_tables or self.duplicate_titles)
+
+    def lines(self) -> List[str]:
+        out = [f"не найдена таблица: {t}" for t in self.missing]
+        out += [f"неоднозначно «{t}» ({len(h)} табл.): " + " | ".join(h) for t, h in self.ambiguous.items()]
+        out += [f"таблица повторяется {n} раз(а): {h}" for h, n in self.duplicate_tables.items()]
+        out += [f"тест выбран повторно: {t}" for t in self.duplicate_titles]
+        return out
+
+
+class TestTableIndex:
+    """Тексты таблиц/абзацев тела документа — для поиска тест-таблицы по названию."""
+
+    def __init__(self, body):
+        self.headers: List[str] = []          # первая ячейка первой строки (как есть)
+        self.texts: List[str] = []            # нормализованный текст таблицы
+        self.paras: List[Tuple[str, int]] = []  # (нормализованный текст абзаца, номер следующей таблицы)
+        self.key: Tuple[str, int, int] | None = None
+        self._found: Dict[str, Optional[int]] = {}
+
+        pending: List[str] = []  # абзацы, ещё не увидевшие «свою» таблицу
+        for child in body.iterchildren():
+            if child.tag == _W_TBL:
+                n = len(self.texts)
+                self.headers.append(_first_row_text(child).strip())
+                self.texts.append(norm_text(_table_text(child)))
+                self.paras.extend((p, n) for p in pending)
+                pending.clear()
+            elif child.tag == _W_P:
+                pending.append(norm_text("".join(n.text for n in child.iter() if n.text)))
+
+    @classmethod
+    def from_document(cls, doc: DocxDocument) -> "TestTableIndex":
+        return cls(doc.element.body)
+
+    # ------------------------------------------------------------------
+    def lookup(self, title: str) -> Optional[int]:
+        """Номер таблицы (среди doc.tables) по названию теста или None."""
+        target = title_target(title)
+        if target in self._found:
+            return self._found[target]
+        found = next((i for i, txt in enumerate(self.texts) if target in txt), None)
+        if found is None:
+            found = next((n for txt, n in self.paras if target in txt), None)
+        self._found[target] = found
+        return found
+
+    def matches(self, title: str) -> List[int]:
+        target = title_target(title)
+        return [i for i, txt in enumerate(self.texts) if target in txt]
+
+    def table(self, doc: DocxDocument, title: str) -> Table:
+        """Table из doc (того же, по которому строился индекс)."""
+        i = self.lookup(title)
+        if i is None:
+            raise ValueError(f"Test-table «{title}» not found.")
+        return doc.tables[i]
+
+    def check(self, titles: List[str]) -> IndexReport:
+        rep = IndexReport()
+        seen = set()
+        for t in titles:
+            target = title_target(t)
+            if target in seen:
+                rep.duplicate_titles.append(t)
+                continue
+            seen.add(target)
+            hits = self.matches(t)
+            if not hits and self.lookup(t) is None:
+                rep.missing.append(t)
+            elif len(hits) > 1:
+                rep.ambiguous[t] = [self.headers[i] for i in hits]
+        counts: Dict[str, int] = {}
+        for h in self.headers:
+            if h:
+                counts[h] = counts.get(h, 0) + 1
+        rep.duplicate_tables = {h: n for h, n in counts.items() if n > 1}
+        return rep
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_found"] = {}
+        return state
+
+
+# =============================================================================
+# Хранилище на диске
+# =============================================================================
+def _index_file(path: str) -> Path:
+    h = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+    return cache_dir("test_tables") / f"{h}.pkl"
+
+
+def load_index(docx_path, *, use_disk: bool = True) -> TestTableIndex:
+    """
+    Индекс исходного файла тестов. Берётся с диска, если файл не менялся;
+    иначе строится заново и сохраняется.
+    """
+    path = os.path.abspath(os.fspath(docx_path))
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    store = _index_file(path) if use_disk else None
+
+    if store is not None and store.exists():
+        try:
+            with open(store, "rb") as f:
+                fmt, idx = pickle.load(f)
+            if fmt == _FORMAT and idx.key == key:
+                return idx
+        except Exception as e:
+            logger.debug(f"Индекс тестов {store.name} не прочитан ({e}) — пересобираю")
+
+    idx = TestTableIndex.from_document(Document(path))
+    idx.key = key
+    rep = idx.check([])
+    for line in rep.lines():
+        logger.warning(f"{Path(path).name}: {line}")
+    if store is not None:
+        try:
+            tmp = store.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump((_FORMAT, idx), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, store)
+        except OSError as e:
+            logger.debug(f"Индекс тестов не сохранён: {e}")
+    logger.debug(f"Индекс тест-таблиц построен: {Path(path).name}, таблиц: {len(idx.texts)}")
+    return idx
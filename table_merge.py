@@ -0,0 +1,79 @@
+# table_merge.py
+"""
+Вертикальное объединение ячеек (w:vMerge) напрямую в XML.
+
+_Cell.merge() на каждый вызов заново раскладывает сетку, ищет ячейку под
+текущей и переносит абзацы; объединение блока из k строк вызовами
+c = c.merge(next) — это O(k²) таких проходов. Здесь блок объединяется за
+один проход по его w:tc:
+
+    tcs = column_tcs(trs[top:bottom + 1], col)
+    top_tc = vmerge(tcs)          # restart / continue, нижние ячейки — пустой абзац
+    ...текст верхней ячейки пишет вызывающий...
+
+Результат — как у python-docx: vMerge через CT_Tc.vMerge (порядок tcPr по
+схеме), у нижних ячеек с содержимым остаётся один пустой <w:p/>.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+from docx.oxml.table import CT_Row, CT_Tc
+
+
+def tc_at(tr: CT_Row, col: int) -> Optional[CT_Tc]:
+    """w:tc, который НАЧИНАЕТСЯ в колонке сетки col (None — колонка внутри gridSpan или за краем)."""
+    offset = 0
+    for tc in tr.tc_lst:
+        if offset == col:
+            return tc
+        offset += tc.grid_span
+        if offset > col:
+            return None
+    return None
+
+
+def column_tcs(trs: Sequence[CT_Row], col: int) -> List[CT_Tc]:
+    """
+    Ячейки колонки col в строках trs — для vmerge(). ValueError, если в какой-то
+    строке колонка не начинается с w:tc или ширина (gridSpan) не совпадает.
+    """
+    tcs: List[CT_Tc] = []
+    for tr in trs:
+        tc = tc_at(tr, col)
+        if tc is None:
+            raise ValueError(f"нет w:tc в колонке сетки {col}")
+        if tcs and tc.grid_span != tcs[0].grid_span:
+            raise ValueError(f"разная ширина ячеек в колонке сетки {col}")
+        tcs.append(tc)
+    return tcs
+
+
+def clear_tc(tc: CT_Tc) -> None:
+    """Содержимое ячейки -> один пустой абзац (как у нижних ячеек после _Cell.merge)."""
+    if tc._is_empty:
+        return
+    for elm in list(tc.iter_block_items()):
+        tc.remove(elm)
+    tc.append(tc._new_p())
+
+
+def set_vmerge(tc: CT_Tc, restart: bool) -> None:
+    # continue — значение w:val по умолчанию, python-docx пишет его как голый <w:vMerge/>
+    tc.vMerge = "restart" if restart else "continue"
+
+
+def vmerge(tcs: Sequence[CT_Tc], *, clear: bool = True) -> Optional[CT_Tc]:
+    """
+    Объединить ячейки (сверху вниз, одна колонка) по вертикали: первая —
+    restart, остальные — continue. clear — очистить нижние ячейки.
+    Возвращает верхнюю ячейку; текст в неё пишет вызывающий.
+    """
+    if not tcs:
+        return None
+    set_vmerge(tcs[0], restart=True)
+    for tc in tcs[1:]:
+        if clear:
+            clear_tc(tc)
+        set_vmerge(tc, restart=False)
+    return tcs[0]
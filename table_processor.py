@@ -10,13 +10,22 @@ def clear_paragraph(paragraph: Paragraph):
 
 Paragraph.clear = clear_paragraph
 from docx import Document
+from docx.document import Document as DocxDocument
 from docx.table import Table
 from docx.oxml import OxmlElement, CT_P, CT_Tbl
 from docx.oxml.ns import qn
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
 from docx.shared import Cm, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
 from docx.enum.table import WD_ROW_HEIGHT_RULE, WD_ALIGN_VERTICAL
+from document_index import (
+    EQUIPMENT, RESULTS, ROOMS, TEST, TEST11_FLOWS, TEST11_TITLE, DocumentIndex,
+)
 from logger import logger
+from row_builder import RowBuilder, rows_of
+from table_merge import column_tcs, vmerge
+from table_view import TableView
+from table_index import TestTableIndex
 
 
 # -----------------------------------------------------------------------------
@@ -24,25 +33,20 @@ from logger import logger
 # -----------------------------------------------------------------------------
 TEST_TITLE_RE = re.compile(r"^\s*Тест\s*11[\.\s]", re.IGNORECASE)
 
-def make_test_titles_bold(doc: Document) -> None:
+def make_test_titles_bold(doc: Document, index: DocumentIndex | None = None) -> None:
     """Делает жирным именно фразы вида 'Тест 11.x ...' в первой строке таблиц тестов."""
-    for tbl in doc.tables:
-        if not tbl.rows:
-            continue
-        # работаем только с таблицами, у которых в первой строке есть 'Тест 11'
-        if not _is_test11_table(tbl):
-            # но всё равно проверим параграфы первой строки на всякий случай
-            pass
+    if index is None:
+        index = DocumentIndex(doc)
+    # только таблицы, у которых в первой строке есть абзац 'Тест 11…'
+    for tbl in index.tables(TEST11_TITLE):
         for cell in tbl.rows[0].cells:
             for p in cell.paragraphs:
                 # ищем сам заголовок 'Тест 11.x ...' (а не служебные подписи типа 'Дата проведения')
                 if TEST_TITLE_RE.search(p.text or ""):
-                    if not p.runs:
-                        p.add_run("")
                     for r in p.runs:
-                        _force_face_only_tnr(r)   # гарнитура = TNR
-                        r.font.bold = True        # только жирность
+                        r.font.bold = True        # только жирность (гарнитура — enforce_tnr_styles)
 def find_table_obj_by_title(src_doc: Document, title: str) -> Table:
+    # для нескольких названий подряд дешевле TestTableIndex (см. insert_test_tables)
     sub = title.split('.', 1)[1] if '.' in title else title
     target = re.sub(r'[^\w\s]', '', sub.lower()).strip()
     for tbl in src_doc.tables:
@@ -89,58 +93,79 @@ def fix_table_xml(tbl_xml: OxmlElement) -> OxmlElement:
 # ---------------------------------------------------------------------------
 
 
-def _force_face_only_tnr(run) -> None:
-    """Ставит TNR для всех семейств (ascii/hAnsi/cs/eastAsia), НЕ меняя размер и жирность."""
-    run.font.name = "Times New Roman"
-    r = run._element
-    rPr = r.get_or_add_rPr()
-    rFonts = rPr.rFonts
-    if rFonts is None:
-        rFonts = OxmlElement('w:rFonts')
-        rPr.append(rFonts)
-    for attr in ("ascii", "hAnsi", "cs", "eastAsia"):
-        rFonts.set(qn(f"w:{attr}"), "Times New Roman")
+TNR = "Times New Roman"
+_FONT_SLOTS = tuple(qn(f"w:{a}") for a in ("ascii", "hAnsi", "cs", "eastAsia"))
+# тема (minorHAnsi и т.п.) в rFonts важнее явного имени — её убираем
+_THEME_SLOTS = tuple(qn(f"w:{a}") for a in ("asciiTheme", "hAnsiTheme", "cstheme", "eastAsiaTheme"))
+_W_RFONTS = qn("w:rFonts")
+_W_R = qn("w:r")
+_W_PPR = qn("w:pPr")
 
 
-def _apply_face_only_to_paragraphs(paragraphs) -> None:
-    for p in paragraphs:
-        if not p.runs:
-            p.add_run("")
-        for r in p.runs:
-            _force_face_only_tnr(r)
+def _set_rfonts_tnr(rFonts) -> None:
+    for a in _THEME_SLOTS:
+        rFonts.attrib.pop(a, None)
+    for a in _FONT_SLOTS:
+        rFonts.set(a, TNR)
 
-def enforce_tnr_face_only_everywhere(doc: Document) -> None:
-    """Ставит TNR для всего документа, не меняя размер/жирность/курсив и т.п."""
-    # Тело документа: абзацы вне таблиц
-    _apply_face_only_to_paragraphs(doc.paragraphs)
 
-    # Таблицы в теле документа
-    for t in doc.tables:
-        for row in t.rows:
-            for cell in row.cells:
-                _apply_face_only_to_paragraphs(cell.paragraphs)
+def _child(parent, tag: str, index: int | None = None):
+    el = parent.find(qn(tag))
+    if el is None:
+        el = OxmlElement(tag)
+        if index is None:
+            parent.append(el)
+        else:
+            parent.insert(index, el)
+    return el
 
-    # Колонтитулы всех секций
-    for sec in doc.sections:
-        _apply_face_only_to_paragraphs(sec.header.paragraphs)
-        for t in sec.header.tables:
-            for row in t.rows:
-                for cell in row.cells:
-                    _apply_face_only_to_paragraphs(cell.paragraphs)
 
-        _apply_face_only_to_paragraphs(sec.footer.paragraphs)
-        for t in sec.footer.tables:
-            for row in t.rows:
-                for cell in row.cells:
-                    _apply_face_only_to_paragraphs(cell.paragraphs)
+def enforce_tnr_styles(doc: Document) -> None:
+    """TNR во всех семействах (ascii/hAnsi/cs/eastAsia) — в docDefaults и во всех стилях, где задан шрифт."""
+    styles = doc.styles.element
+    defaults = _child(styles, "w:docDefaults", 0)
+    rPr = _child(_child(defaults, "w:rPrDefault", 0), "w:rPr")
+    _child(rPr, "w:rFonts", 0)  # rFonts — первый в rPr
+    for rFonts in styles.iter(_W_RFONTS):
+        _set_rfonts_tnr(rFonts)
 
 
+def _strip_conflicting_run_fonts(root) -> int:
+    """
+    Из rFonts ранов и знаков абзаца убирает всё, что не TNR (другие гарнитуры, темы);
+    пустой rFonts удаляется — ран наследует TNR из стиля. Возвращает число правок.
+    """
+    n = 0
+    for rFonts in root.iter(_W_RFONTS):
+        rPr = rFonts.getparent()
+        holder = rPr.getparent() if rPr is not None else None
+        if holder is None or holder.tag not in (_W_R, _W_PPR):
+            continue  # rPrChange (правки), sdtPr и т.п. не трогаем
+        bad = [a for a in _THEME_SLOTS if a in rFonts.attrib]
+        bad += [a for a in _FONT_SLOTS if rFonts.get(a) not in (None, TNR)]
+        if not bad:
+            continue
+        for a in bad:
+            del rFonts.attrib[a]
+        if not any(k != qn("w:hint") for k in rFonts.attrib):
+            rPr.remove(rFonts)
+        n += 1
+    return n
+
+
+def enforce_tnr_face_only_everywhere(doc: Document) -> None:
+    """
+    TNR для всего документа, не меняя размер/жирность/курсив и т.п.:
+    шрифт задаётся стилями (enforce_tnr_styles), а у ранов тела и колонтитулов
+    снимаются только конфликтующие rFonts — один проход lxml без обёрток python-docx.
+    """
+    enforce_tnr_styles(doc)
+    n = _strip_conflicting_run_fonts(doc.element.body)
+    for rel in doc.part.rels.values():
+        if not rel.is_external and rel.reltype in (RT.HEADER, RT.FOOTER):
+            n += _strip_conflicting_run_fonts(rel.target_part.element)
+    logger.debug(f"TNR: снято конфликтующих rFonts — {n}")
 
-def _is_test11_table(tbl) -> bool:
-    if not tbl.rows or not tbl.rows[0].cells:
-        return False
-    head = " ".join(c.text for c in tbl.rows[0].cells)
-    return re.search(r"^\s*Тест\s*11[\.\s]", head, flags=re.IGNORECASE) is not None
 
 def _force_run_font_tnr(run, size_pt: int, bold: bool | None = None):
     """
@@ -162,31 +187,6 @@ def _force_run_font_tnr(run, size_pt: int, bold: bool | None = None):
         rFonts.set(qn(f"w:{attr}"), "Times New Roman")
 
 
-def _looks_like_test_table(tbl) -> bool:
-    """
-    Распознаём ВСЕ тестовые таблицы:
-      • «результатные»: содержит «номер помещения» и «площад» и («точк» или «№»),
-        ИЛИ содержит «результат» и «испытан»;
-      • «описательные»: содержит хотя бы одно из: «дата проведения»,
-        «контролируемый параметр», «критерий приемлемости», «квалификационное испытание».
-    """
-    if not tbl.rows:
-        return False
-    hdr = " ".join(c.text for c in tbl.rows[0].cells).lower()
-
-    # результатные варианты
-    points_like = ("номер помещения" in hdr and "площад" in hdr and ("точк" in hdr or "№" in hdr))
-    results_like = ("результат" in hdr and "испытан" in hdr)
-
-    # описательные варианты
-    desc_keys = ("дата провед", "контролируемый параметр", "критерий приемлемости", "квалификационное испытание")
-    desc_like = any(k in hdr for k in desc_keys)
-
-    return points_like or results_like or desc_like
-
-
-
-
 # def _apply_tnr_to_test_table(tbl):
 #     """Шапка: TNR 11pt жирный, тело: TNR 10pt."""
 #     for ri, row in enumerate(tbl.rows):
@@ -254,27 +254,16 @@ def _format_table_tnr_no_margins(tbl) -> None:
                 # на всякий случай выравнивание влево, чтобы не выглядело как «отступ»
                 p.alignment = WD_ALIGN_PARAGRAPH.LEFT
 
-    # 3) только гарнитура TNR (без изменения размера/жирности)
-    for row in tbl.rows:
-        for cell in row.cells:
-            for p in cell.paragraphs:
-                if not p.runs:
-                    p.add_run("")
-                for r in p.runs:
-                    _force_face_only_tnr(r)
+    # гарнитура TNR — для всего документа в конце (enforce_tnr_face_only_everywhere)
 
 
 # -----------------------------------------------------------------------------
 # 2) ОБРАБОТКА ТАБЛИЦ ПОМЕЩЕНИЙ
 # -----------------------------------------------------------------------------
 
-def process_rooms_table(doc: Document, rooms: List[Dict[str, str]]) -> None:
+def process_rooms_table(doc: Document, rooms: List[Dict[str, str]], index: DocumentIndex | None = None) -> None:
     logger.debug("Начинаем process_rooms_table")
-    tbl = next(
-        (t for t in doc.tables
-         if t.rows and "Номер помещения" in t.rows[0].cells[0].text),
-        None
-    )
+    tbl = (index or DocumentIndex(doc)).first(ROOMS)
     if not tbl:
         raise ValueError("Таблица помещений не найдена (header 'Номер помещения').")
 
@@ -303,8 +292,6 @@ def process_rooms_table(doc: Document, rooms: List[Dict[str, str]]) -> None:
                 key = run.text.strip()
                 if key in header_map:
                     run.text = header_map[key]
-                    run.font.name = "Times New Roman"
-                    _force_face_only_tnr(run)
 
     ph2key = {
         "#": "num", "##": "name", "###": "klass", "####": "area",
@@ -316,42 +303,44 @@ def process_rooms_table(doc: Document, rooms: List[Dict[str, str]]) -> None:
     sample_tr = None
     for row in tbl.rows[1:]:
         if any(cell.text.strip() in ph2key for cell in row.cells):
-            sample_tr = deepcopy(row._tr)
+            sample_tr = row._tr
             break
 
     if sample_tr is None:
         raise ValueError("В таблице помещений не найден placeholder row.")
 
+    # Прототип строки: высота, выравнивание и формат абзацев/шрифта — один раз
+    rb = RowBuilder(sample_tr, tbl)
+    proto = rb.row
+    proto.height = Cm(1.46)
+    proto.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+    for cell in rb.cells:
+        cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+
+    for cell in rb.cells:
+        placeholder = cell.text.strip()
+        cell.text = ""
+        for para in cell.paragraphs:
+            para.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+            pf = para.paragraph_format
+            pf.first_line_indent = Cm(0)
+            pf.left_indent = Cm(0)
+            pf.right_indent = Cm(0)
+            pf.space_before = Pt(0)
+            pf.space_after = Pt(0)
+            pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
+            pf.line_spacing = 1.1
+        if placeholder in ph2key:
+            run = cell.paragraphs[0].add_run("")
+            run.font.name = "Times New Roman"
+            run.font.size = Pt(10)
+            rb.bind(ph2key[placeholder], run._r)
+
     # Удаляем все строки после заголовка
-    while len(tbl.rows) > 1:
-        tbl._tbl.remove(tbl.rows[1]._tr)
-
-    for room in rooms:
-        tbl._tbl.append(deepcopy(sample_tr))
-        new_row = tbl.rows[-1]
-        # Устанавливаем высоту строки и вертикальное выравнивание
-        new_row.height = Cm(1.46)
-        new_row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
-        for cell in new_row.cells:
-            cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-        for idx, cell in enumerate(new_row.cells):
-            placeholder = cell.text.strip()
-            cell.text = ""
-            for para in cell.paragraphs:
-                para.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-                pf = para.paragraph_format
-                pf.first_line_indent = Cm(0)
-                pf.left_indent = Cm(0)
-                pf.right_indent = Cm(0)
-                pf.space_before = Pt(0)
-                pf.space_after = Pt(0)
-                pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-                pf.line_spacing = 1.1
-            if placeholder in ph2key:
-                run = cell.paragraphs[0].add_run(room.get(ph2key[placeholder], ""))
-                run.font.name = "Times New Roman"
-                run.font.size = Pt(10)
+    for tr in rows_of(tbl)[1:]:
+        tbl._tbl.remove(tr)
+
+    tbl._tbl.extend(rb.build(room) for room in rooms)
 
     logger.debug("process_rooms_table выполнен")
 
@@ -361,7 +350,9 @@ def process_rooms_table(doc: Document, rooms: List[Dict[str, str]]) -> None:
 # 3) ОБРАБОТКА ТАБЛИЦ ОБОРУДОВАНИЯ
 # -----------------------------------------------------------------------------
 
-def process_equipment_table(doc: Document, equipment: List[Dict[str, str]]) -> None:
+def process_equipment_table(
+    doc: Document, equipment: List[Dict[str, str]], index: DocumentIndex | None = None
+) -> None:
     """
     Заполняет таблицу средств измерений.
     Ищем таблицу, где в ЛЮБОЙ строке встречаются плейсхолдеры @1..@4.
@@ -370,44 +361,48 @@ def process_equipment_table(doc: Document, equipment: List[Dict[str, str]]) -> N
     """
     logger.debug("Начинаем process_equipment_table")
 
-    PH = ("@1", "@2", "@3", "@4")
-
-    # 1) Найти таблицу по наличию плейсхолдеров в ЛЮБОЙ строке
-    tbl = None
-    for t in doc.tables:
-        found = False
-        for r in t.rows:
-            if any(any(ph in c.text for ph in PH) for c in r.cells):
-                found = True
-                break
-        if found:
-            tbl = t
-            break
+    # 1) Таблица и шаблонная строка — первая строка, где лежат @1..@4 (см. document_index.RULES)
+    if index is None:
+        index = DocumentIndex(doc)
+    tbl = index.first(EQUIPMENT)
     if tbl is None:
         raise ValueError("Таблица оборудования не найдена (в таблице нет @1..@4).")
-
-    # 2) Найти шаблонную строку — ту, где реально лежат @1..@4
-    sample_idx = None
-    for i, row in enumerate(tbl.rows):
-        if any(any(ph in c.text for ph in PH) for c in row.cells):
-            sample_idx = i
-            break
-    if sample_idx is None:
-        raise ValueError("Не нашли шаблонную строку в таблице оборудования.")
+    sample_idx = index.row(tbl, EQUIPMENT)
 
     # Сохраняем все строки ДО шаблонной (это заголовочный блок)
     header_rows_to_keep = sample_idx
-    sample_tr = deepcopy(tbl.rows[sample_idx]._tr)
+    trs = rows_of(tbl)
+    rb = RowBuilder(trs[sample_idx], tbl)
+
+    # 2) Удалить все строки, начиная с sample_idx
+    for tr in trs[header_rows_to_keep:]:
+        tbl._tbl.remove(tr)
+
+    # 3) Прототип: чистим ранны, формат абзацев и один ран на ячейку (@1..@4 по порядку)
+    for ci, cell in enumerate(rb.cells):
+        for p in cell.paragraphs:
+            # формат абзаца
+            pf = p.paragraph_format
+            pf.first_line_indent = Cm(0)
+            pf.left_indent = Cm(0)
+            pf.right_indent = Cm(0)
+            pf.space_before = Pt(0)
+            pf.space_after = Pt(0)
+            pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
+            pf.line_spacing = 1.1
+            p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+            for r in list(p.runs):
+                p._p.remove(r._r)
 
-    # 3) Удалить все строки, начиная с sample_idx
-    for i in range(len(tbl.rows) - 1, header_rows_to_keep - 1, -1):
-        tbl._tbl.remove(tbl.rows[i]._tr)
+        run = cell.paragraphs[0].add_run("")
+        run.font.name = "Times New Roman"
+        run.font.size = Pt(10)
+        rb.bind(ci, run._r)
 
     # 4) Заполнять
+    rows = []
     for eq in equipment:
-        tbl._tbl.append(deepcopy(sample_tr))
-        new_row = tbl.rows[-1]
-
         # Сформировать значения
         date_str = (eq.get("date") or "").strip()
         until_str = (eq.get("until") or "").strip()
@@ -419,29 +414,8 @@ def process_equipment_table(doc: Document, equipment: List[Dict[str, str]]) -> N
             eq.get("cert", "") or "",      # @3
             date_full,                     # @4
         ]
-
-        # 5) Очистка содержимого ячеек строки-шаблона и запись текста
-        for ci, cell in enumerate(new_row.cells):
-            # чистим все ранны в абзацах
-            for p in cell.paragraphs:
-                # формат абзаца
-                pf = p.paragraph_format
-                pf.first_line_indent = Cm(0)
-                pf.left_indent = Cm(0)
-                pf.right_indent = Cm(0)
-                pf.space_before = Pt(0)
-                pf.space_after = Pt(0)
-                pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-                pf.line_spacing = 1.1
-                p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-
-                for r in list(p.runs):
-                    p._p.remove(r._r)
-
-            text = values[ci] if ci < len(values) else ""
-            run = cell.paragraphs[0].add_run(text)
-            run.font.name = "Times New Roman"
-            run.font.size = Pt(10)
+        rows.append(rb.build(dict(enumerate(values))))
+    tbl._tbl.extend(rows)
 
     logger.debug("process_equipment_table выполнен")
 
@@ -452,53 +426,43 @@ def process_equipment_table(doc: Document, equipment: List[Dict[str, str]]) -> N
 # -----------------------------------------------------------------------------
 # 4) ВСТАВКА ТЕСТОВЫХ ТАБЛИЦ
 # -----------------------------------------------------------------------------
-def extract_total_flows_from_test11(doc: Document) -> list[Decimal]:
+def extract_total_flows_from_test11(doc: Document, index: DocumentIndex | None = None) -> list[Decimal]:
     """
     Возвращает список «фактический суммарный» по помещениям в порядке следования,
     сканируя таблицу «Тест 11. Проверка расхода приточного воздуха».
     Берём столбец с заголовком, содержащим 'фактический суммарный',
     и собираем непустые верхушки vMerge-блоков (по одной на помещение).
     """
-    def norm(s: str) -> str:
-        return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip().lower()
-
-    for tbl in doc.tables:
-        if not tbl.rows:
+    for tbl in (index or DocumentIndex(doc)).tables(TEST11_FLOWS):
+        view = TableView(tbl)
+        # найти индекс колонки «фактический суммарный»
+        fact_sum_col = view.find_col("фактический суммарный", rows=(0,))
+        if fact_sum_col is None:
             continue
-        hdr = " ".join(norm(c.text) for c in tbl.rows[0].cells)
-        if "расход приточного воздуха" in hdr and "фактический суммарный" in hdr:
-            # найти индекс колонки «фактический суммарный»
-            fact_sum_col = None
-            for ci, c in enumerate(tbl.rows[0].cells):
-                if "фактический суммарный" in norm(c.text):
-                    fact_sum_col = ci
-                    break
-            if fact_sum_col is None:
-                continue
 
-            vals: list[Decimal] = []
-            last_seen = None
-            for r in tbl.rows[1:]:
-                if fact_sum_col >= len(r.cells):
-                    continue
-                t = norm(r.cells[fact_sum_col].text)
-                # в vMerge верхняя ячейка содержит число, нижние — пустые
-                if t and t != last_seen:
-                    # вытащим число (запятая/точка)
-                    num = re.sub(r"[^\d,.\-]", "", t).replace(",", ".")
-                    try:
-                        vals.append(Decimal(num))
-                    except Exception:
-                        pass
-                    last_seen = t
-            return vals
+        vals: list[Decimal] = []
+        last_seen = None
+        for ri in range(1, len(view)):
+            if fact_sum_col >= view.width(ri):
+                continue
+            t = view.norm(ri, fact_sum_col)
+            # в vMerge верхняя ячейка содержит число, нижние — пустые
+            if t and t != last_seen:
+                # вытащим число (запятая/точка)
+                num = re.sub(r"[^\d,.\-]", "", t).replace(",", ".")
+                try:
+                    vals.append(Decimal(num))
+                except Exception:
+                    pass
+                last_seen = t
+        return vals
     return []
 
 
 
 def insert_test_tables(
     doc: Document,
-    tests_docx_path: str,
+    tests_docx_path,
     selected_tests: List[str]
 ) -> List[str]:
     """
@@ -506,15 +470,27 @@ def insert_test_tables(
     (поддерживаются варианты {{ TABLE }}, __TABLE__, ___TABLE_PLACEHOLDER___),
     перенумеровывает заголовки "Тест 11.x …" и приводит таблицы к единому формату:
     Times New Roman (шапка 11pt жирный, тело 10pt), без абзацных отступов и без внутренних полей ячеек.
+
+    tests_docx_path — путь к .docx или уже разобранный Document (например, tpl.docx
+    после рендера): тогда файл повторно не читается. Заголовки в источнике правятся на месте.
+    Поиск по названию — через table_index (один проход по документу).
     """
-    src = Document(tests_docx_path)
+    if isinstance(tests_docx_path, DocxDocument):
+        src = tests_docx_path
+    else:
+        src = Document(tests_docx_path)
+    index = TestTableIndex.from_document(src)
+
+    def get_table(title: str) -> Table:
+        return index.table(src, title)
+
     elems: List[OxmlElement] = []
     missing: List[str] = []
 
     # 1) подобрать и подготовить таблицы из источника
     for idx, title in enumerate(selected_tests, start=1):
         try:
-            tbl = find_table_obj_by_title(src, title)
+            tbl = get_table(title)
 
             # перенумеровка заголовка "Тест 11.{idx} ..."
             header_cell = tbl.rows[0].cells[0]
@@ -527,7 +503,6 @@ def insert_test_tables(
                 for run in list(p0.runs):
                     p0._p.remove(run._r)
                 r = p0.add_run(new_title)
-                _force_face_only_tnr(r)  # только гарнитура
                 r.font.bold = True
 
             elems.append(fix_table_xml(deepcopy(tbl._tbl)))
@@ -569,40 +544,36 @@ def insert_test_tables(
                     pf.line_spacing = 1.1
                     pf.contextual_spacing = False
 
-        # Шапка: Times New Roman 11, жирный
-        hdr = tbl.rows[0]
-        for cell in hdr.cells:
-            for p in cell.paragraphs:
-                for r in p.runs:
-                    _force_face_only_tnr(r)
+        # шрифт шапки/тела — TNR через стили, см. enforce_tnr_face_only_everywhere
 
 # -----------------------------------------------------------------------------
 # 5) ЗАПОЛНЕНИЕ РЕЗУЛЬТАТОВ ТЕСТОВЫХ ТАБЛИЦ ДАННЫМИ ПОМЕЩЕНИЙ
 # -----------------------------------------------------------------------------
 
-def process_test_results_tables(doc: Document, rooms: List[Dict[str, str]]) -> None:
+def process_test_results_tables(
+    doc: Document, rooms: List[Dict[str, str]], index: DocumentIndex | None = None
+) -> None:
     """
     Ищет в результатных тестовых таблицах блоки точек измерений и:
       - объединяет колонки 0 и 1 ТОЛЬКО по строкам с номером точки (цифра в колонке "№ точки"),
       - НЕ включает строку "Среднее" в объединение (это ключ к исправлению),
       - центрирует ячейки блока (кроме первых двух),
-      - в конце приводит тест-таблицы к единому формату (если есть _looks_like_test_table/_format_table_tnr_no_margins).
+      - в конце приводит тест-таблицы к единому формату (_format_table_tnr_no_margins).
+    Таблицы и строка шапки результата — из DocumentIndex (виды RESULTS и TEST).
     """
     logger.debug("Начинаем process_test_results_tables")
+    if index is None:
+        index = DocumentIndex(doc)
 
     def norm(s: str) -> str:
         return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip()
 
-    def is_results_header(row) -> bool:
-        j = " ".join(norm(c.text).lower() for c in row.cells)
-        return ("номер" in j and "помещени" in j) and ("площад" in j) and ("точк" in j or "№" in j)
+    def is_comments_row(view: TableView, ri: int) -> bool:
+        return "комментарии" in view.norm(ri, 0) if view.width(ri) else False
 
-    def is_comments_row(row) -> bool:
-        return "КОММЕНТАРИИ" in norm(row.cells[0].text).upper() if row.cells else False
-
-    def find_point_col(header_row) -> int | None:
-        for ci, c in enumerate(header_row.cells):
-            t = norm(c.text).lower()
+    def find_point_col(view: TableView, hdr: int) -> int | None:
+        for ci in range(view.width(hdr)):
+            t = view.norm(hdr, ci)
             # "№ точки" / "точк" / просто "№"
             if "точк" in t or t == "№" or "№ точки" in t:
                 return ci
@@ -619,43 +590,38 @@ def process_test_results_tables(doc: Document, rooms: List[Dict[str, str]]) -> N
         except Exception:
             return None
 
-    # Полная перезапись текста ячейки без изменения tcPr (vMerge и т.п. остаётся)
-    def rewrite_cell_text_center(cell, text: str, size_pt: int = 10):
-        # удалить все параграфы
-        for p in list(cell.paragraphs):
-            p._element.getparent().remove(p._element)
-
-        p = cell.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        pf = p.paragraph_format
-        pf.first_line_indent = Cm(0)
-        pf.left_indent = Cm(0)
-        pf.right_indent = Cm(0)
-        pf.space_before = Pt(0)
-        pf.space_after = Pt(0)
-        pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-        pf.line_spacing = 1.1
-
-        r = p.add_run(text or "")
-        r.font.name = "Times New Roman"
-        r.font.size = Pt(size_pt)
-
-    for tbl in doc.tables:
-        if not tbl.rows:
-            continue
-
-        # 1) Найти строку шапки результата
-        hdr_idx = None
-        for i, row in enumerate(tbl.rows):
-            if is_results_header(row):
-                hdr_idx = i
-        if hdr_idx is None:
-            continue
+    # Абзац-прототип для верхней ячейки блока: формат — один раз, на ячейку — deepcopy
+    proto_p = OxmlElement("w:p")
+    p = Paragraph(proto_p, None)
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    pf = p.paragraph_format
+    pf.first_line_indent = Cm(0)
+    pf.left_indent = Cm(0)
+    pf.right_indent = Cm(0)
+    pf.space_before = Pt(0)
+    pf.space_after = Pt(0)
+    pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
+    pf.line_spacing = 1.1
+    r = p.add_run("")
+    r.font.name = "Times New Roman"
+    r.font.size = Pt(10)
 
-        hdr_row = tbl.rows[hdr_idx]
+    # Полная перезапись текста ячейки без изменения tcPr (vMerge и т.п. остаётся)
+    def rewrite_tc_text_center(tc, text: str):
+        for p_el in tc.p_lst:
+            tc.remove(p_el)
+        p_el = deepcopy(proto_p)
+        if text:
+            p_el.r_lst[0].text = text
+        tc.append(p_el)
+
+    for tbl in index.tables(RESULTS):
+        # 1) Строка шапки результата (последняя подходящая — см. правило RESULTS)
+        hdr_idx = index.row(tbl, RESULTS)
+        view = TableView(tbl)
 
         # 2) Найти колонку "№ точки"
-        point_col = find_point_col(hdr_row)
+        point_col = find_point_col(view, hdr_idx)
         if point_col is None:
             # запасной вариант (часто это 2)
             point_col = 2
@@ -663,9 +629,9 @@ def process_test_results_tables(doc: Document, rooms: List[Dict[str, str]]) -> N
             continue
 
         # 3) Диапазон данных: от строки после шапки до "КОММЕНТАРИИ" или конца таблицы
-        end_idx = len(tbl.rows)
-        for i in range(hdr_idx + 1, len(tbl.rows)):
-            if is_comments_row(tbl.rows[i]):
+        end_idx = len(view)
+        for i in range(hdr_idx + 1, len(view)):
+            if is_comments_row(view, i):
                 end_idx = i
                 break
 
@@ -679,15 +645,14 @@ def process_test_results_tables(doc: Document, rooms: List[Dict[str, str]]) -> N
         cur: list[int] = []
 
         for ri in range(data_start, end_idx):
-            row = tbl.rows[ri]
-            if point_col >= len(row.cells):
+            if point_col >= view.width(ri):
                 # если вдруг “кривой” ряд — закрываем текущий блок
                 if cur:
                     blocks.append(cur)
                     cur = []
                 continue
 
-            num = get_point_number(row.cells[point_col].text)
+            num = get_point_number(view.text(ri, point_col))
 
             if num is None:
                 # это "Среднее" / пусто / текст — закрываем блок
@@ -713,38 +678,29 @@ def process_test_results_tables(doc: Document, rooms: List[Dict[str, str]]) -> N
 
             top = block[0]
 
-            # Колонка 0
-            try:
-                c0 = tbl.rows[top].cells[0]
-                v0 = norm(c0.text)
-                for ri in block[1:]:
-                    c0 = c0.merge(tbl.rows[ri].cells[0])
-                rewrite_cell_text_center(c0, v0, size_pt=10)
-            except Exception as e:
-                logger.warning(f"Не удалось объединить колонку 0 в блоке {block}: {e}")
-
-            # Колонка 1
-            try:
-                c1 = tbl.rows[top].cells[1]
-                v1 = norm(c1.text)
-                for ri in block[1:]:
-                    c1 = c1.merge(tbl.rows[ri].cells[1])
-                rewrite_cell_text_center(c1, v1, size_pt=10)
-            except Exception as e:
-                logger.warning(f"Не удалось объединить колонку 1 в блоке {block}: {e}")
+            # Колонки 0 и 1: vMerge по w:tc блока за один проход (table_merge).
+            # Колонка 1 внутри gridSpan колонки 0 — уже объединена вместе с ней.
+            for col in (0, 1):
+                if col and view.cell(top, col)._tc is view.cell(top, 0)._tc:
+                    continue
+                try:
+                    v = norm(view.text(top, col))
+                    tc = vmerge(column_tcs([view.trs[ri] for ri in block], col))
+                    rewrite_tc_text_center(tc, v)
+                except Exception as e:
+                    logger.warning(f"Не удалось объединить колонку {col} в блоке {block}: {e}")
+                view.touch(*block)
 
             # Центрирование остальных колонок внутри блока (только строк точек)
             for ri in block:
-                row = tbl.rows[ri]
-                for ci, cell in enumerate(row.cells):
+                for ci, cell in enumerate(view.cells(ri)):
                     if ci >= 2 and cell.paragraphs:
                         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
 
     # ФИНАЛ: привести тест-таблицы к общему виду (если ваши хелперы определены)
     try:
-        for t in doc.tables:
-            if _looks_like_test_table(t):
-                _format_table_tnr_no_margins(t)
+        for t in index.tables(TEST):
+            _format_table_tnr_no_margins(t)
     except Exception:
         pass
 
@@ -0,0 +1,120 @@
+# table_view.py
+"""
+Кэш сетки ячеек и текста таблицы python-docx.
+
+table.rows[i] строит обёртки для всех строк таблицы, row.cells каждый раз
+заново раскладывает gridSpan/vMerge, cell.text — заново склеивает ранны.
+В постобработке всё это вызывалось во вложенных циклах. TableView
+раскладывает строку и читает текст ячейки один раз:
+
+    view = TableView(tbl)
+    hdr = view.find_row("результаты испытани")
+    col = view.find_col("фактическ", rows=(hdr + 1, hdr + 2))
+    for ri in range(hdr + 2, len(view)):
+        if view.norm(ri, 0).startswith("комментар"): ...
+        view.cell(ri, col).text = "…"
+        view.touch(ri)
+
+Ячейки — как у row.cells (gridSpan повторяет ячейку, vMerge-продолжение —
+верхнюю), текст — как cell.text. Кто меняет текст или объединяет ячейки,
+сообщает строки через touch() — сбрасываются только они; после вставки или
+удаления строк — reload().
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from docx.oxml.table import CT_Row
+from docx.table import Table, _Cell
+
+from row_builder import row_cells, rows_of
+
+
+def norm(s: str) -> str:
+    """Пробелы/NBSP схлопнуты, нижний регистр — общий вид для поиска по ключевым словам."""
+    return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip().lower()
+
+
+class TableView:
+    """Строки таблицы, их ячейки по сетке и текст ячеек — с кэшем."""
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.reload()
+
+    def reload(self) -> None:
+        """Перечитать строки (после вставки/удаления) и сбросить весь кэш."""
+        self.trs: List[CT_Row] = rows_of(self.table)
+        self._cells: Dict[int, Tuple[_Cell, ...]] = {}
+        self._text: Dict[object, str] = {}   # w:tc -> cell.text
+        self._norm: Dict[object, str] = {}   # w:tc -> norm(cell.text)
+
+    def __len__(self) -> int:
+        return len(self.trs)
+
+    def touch(self, *rows: int) -> None:
+        """Строки изменены (текст, объединение ячеек) — забыть их сетку и текст."""
+        for ri in rows:
+            cells = self._cells.pop(ri, None)
+            for c in cells if cells is not None else row_cells(self.trs[ri], self.table):
+                self._text.pop(c._tc, None)
+                self._norm.pop(c._tc, None)
+
+    # ---------- ячейки и текст ----------
+    def cells(self, ri: int) -> Tuple[_Cell, ...]:
+        cells = self._cells.get(ri)
+        if cells is None:
+            cells = self._cells[ri] = row_cells(self.trs[ri], self.table)
+        return cells
+
+    def cell(self, ri: int, ci: int) -> _Cell:
+        return self.cells(ri)[ci]
+
+    def width(self, ri: int) -> int:
+        return len(self.cells(ri))
+
+    def text(self, ri: int, ci: int) -> str:
+        tc = self.cells(ri)[ci]._tc
+        t = self._text.get(tc)
+        if t is None:
+            t = self._text[tc] = self.cells(ri)[ci].text
+        return t
+
+    def texts(self, ri: int) -> List[str]:
+        return [self.text(ri, ci) for ci in range(self.width(ri))]
+
+    def norm(self, ri: int, ci: int) -> str:
+        tc = self.cells(ri)[ci]._tc
+        t = self._norm.get(tc)
+        if t is None:
+            t = self._norm[tc] = norm(self.text(ri, ci))
+        return t
+
+    def line(self, ri: int) -> str:
+        """norm(" ".join(c.text for c in row.cells))."""
+        return " ".join(t for t in (self.norm(ri, ci) for ci in range(self.width(ri))) if t)
+
+    # ---------- поиск ----------
+    def find_row(self, *needles: str, start: int = 0, stop: Optional[int] = None,
+                 last: bool = False) -> Optional[int]:
+        """Строка, текст которой (line) содержит все needles; None — нет такой."""
+        found = None
+        for ri in range(start, len(self) if stop is None else min(stop, len(self))):
+            line = self.line(ri)
+            if all(n in line for n in needles):
+                if not last:
+                    return ri
+                found = ri
+        return found
+
+    def find_col(self, *needles: str, rows: Iterable[int]) -> Optional[int]:
+        """Колонка сетки, чья ячейка (в первой из rows, где нашлась) содержит все needles."""
+        for ri in rows:
+            if not 0 <= ri < len(self):
+                continue
+            for ci in range(self.width(ri)):
+                t = self.norm(ri, ci)
+                if all(n in t for n in needles):
+                    return ci
+        return None
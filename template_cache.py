@@ -0,0 +1,243 @@
+# template_cache.py
+"""
+Кэш «скомпилированных» DOCX-шаблонов на процесс.
+
+DocxTemplate(path) при каждом рендере заново читает файл, патчит XML
+(patch_xml — десятки регэкспов) и компилирует Jinja для тела и каждого
+колонтитула. Для одного и того же шаблона результат всегда один и тот же,
+поэтому здесь он хранится по ключу (путь, mtime, размер):
+
+    tpl = template_cache.get_template(path)   # дешёвый клон, готовый к render()
+    tpl.render(context)
+
+Вместо пути можно передать байты DOCX, собранного в памяти (калькулятор Теста 11).
+
+Клон — обычный DocxTemplate: свой python-docx Document (из байтов в памяти),
+но общие скомпилированные Jinja-шаблоны. Вытеснение — LRU по оценке памяти.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Template, TemplateError
+
+from logger import logger
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_P_SPLIT_RE = re.compile(r"<w:p([ >])")
+_P_JOIN_RE = re.compile(r"\n<w:p([ >])")
+
+
+@dataclass
+class _Entry:
+    key: Tuple[str, int, int]
+    data: bytes
+    body: Optional[Template] = None
+    # partname колонтитула -> (шаблон, кодировка)
+    parts: Dict[str, Tuple[Template, str]] = field(default_factory=dict)
+    nbytes: int = 0
+
+
+_lock = threading.Lock()
+_cache: "OrderedDict[str, _Entry]" = OrderedDict()
+_max_bytes = DEFAULT_MAX_BYTES
+_total_bytes = 0
+_hits = 0
+_misses = 0
+
+
+def _source(template: DocxTemplate, xml: str) -> str:
+    # то же, что DocxTemplate.render_xml_part до вызова Jinja
+    return _P_SPLIT_RE.sub(r"\n<w:p\1", template.patch_xml(xml))
+
+
+def _with_docx_context(exc: TemplateError, src: str) -> TemplateError:
+    # как DocxTemplate.render_xml_part: строки DOCX вокруг ошибки — в exc.docx_context
+    if getattr(exc, "lineno", None) is not None:
+        line_number = max(exc.lineno - 4, 0)
+        exc.docx_context = map(
+            lambda x: re.sub(r"<[^>]+>", "", x),
+            src.splitlines()[line_number: (line_number + 7)],
+        )
+    return exc
+
+
+def _compile(template: DocxTemplate, xml: str) -> Tuple[Template, int]:
+    src = _source(template, xml)
+    try:
+        tpl = Template(src)
+    except TemplateError as exc:
+        raise _with_docx_context(exc, src)
+    # скомпилированный код Jinja по объёму сопоставим с исходником (str — до 4 байт/символ)
+    return tpl, 2 * len(src)
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """DocxTemplate, который берёт байты и скомпилированный Jinja из общего кэша."""
+
+    def __init__(self, entry: _Entry, path: str):
+        # у DOCX из памяти файла нет — docxtpl (save() без render()) читает из байтов
+        super().__init__(io.BytesIO(entry.data) if path.startswith("<mem:") else path)
+        self._entry = entry
+
+    def init_docx(self, reload: bool = True):
+        if not self.docx or (self.is_rendered and reload):
+            self.docx = Document(io.BytesIO(self._entry.data))
+            self.is_rendered = False
+
+    def _render_compiled(self, template: Template, part, context, xml: Callable[[], str]) -> str:
+        # то же, что DocxTemplate.render_xml_part после вызова Jinja;
+        # xml() — исходник части, нужен только для текста ошибки
+        self.current_rendering_part = part
+        try:
+            dst_xml = template.render(context)
+        except TemplateError as exc:
+            raise _with_docx_context(exc, _source(self, xml()))
+        dst_xml = _P_JOIN_RE.sub(r"<w:p\1", dst_xml)
+        dst_xml = (
+            dst_xml.replace("{_{", "{{")
+            .replace("}_}", "}}")
+            .replace("{_%", "{%")
+            .replace("%_}", "%}")
+        )
+        return self.resolve_listing(dst_xml)
+
+    def build_xml(self, context, jinja_env=None):
+        if jinja_env is not None:
+            return super().build_xml(context, jinja_env)
+        entry = self._entry
+        body = entry.body
+        if body is None:
+            tpl, n = _compile(self, self.get_xml())
+            with _lock:
+                # параллельный рендер мог скомпилировать раньше — берём его результат
+                if entry.body is None:
+                    entry.body = tpl
+                    _account(entry, n)
+                body = entry.body
+        return self._render_compiled(body, self.docx._part, context, self.get_xml)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        if jinja_env is not None:
+            yield from super().build_headers_footers_xml(context, uri, jinja_env)
+            return
+        entry = self._entry
+        for relKey, part in self.get_headers_footers(uri):
+            name = str(part.partname)
+            compiled = entry.parts.get(name)
+            if compiled is None:
+                xml = self.get_part_xml(part)
+                tpl, n = _compile(self, xml)
+                with _lock:
+                    if name not in entry.parts:
+                        entry.parts[name] = (tpl, self.get_headers_footers_encoding(xml))
+                        _account(entry, n)
+                    compiled = entry.parts[name]
+            tpl, encoding = compiled
+            yield relKey, self._render_compiled(
+                tpl, part, context, lambda part=part: self.get_part_xml(part)
+            ).encode(encoding)
+
+
+def _account(entry: _Entry, n: int) -> None:
+    # вызывать под _lock
+    global _total_bytes
+    entry.nbytes += n
+    if _cache.get(entry.key[0]) is entry:
+        _total_bytes += n
+        _evict()
+
+
+def _evict() -> None:
+    global _total_bytes
+    # последний (только что использованный) шаблон не вытесняем даже если он больше лимита
+    while _total_bytes > _max_bytes and len(_cache) > 1:
+        path, old = _cache.popitem(last=False)
+        _total_bytes -= old.nbytes
+        logger.debug(f"template_cache: вытеснен {os.path.basename(path)} ({old.nbytes // 1024} КБ)")
+
+
+def get_template(path) -> DocxTemplate:
+    """
+    Клон шаблона из кэша. path — путь (при изменении файла на диске — перечитывается)
+    или байты DOCX, собранного в памяти (ключ — хэш содержимого).
+    """
+    if isinstance(path, (bytes, bytearray)):
+        data = bytes(path)
+        name = f"<mem:{hashlib.sha1(data).hexdigest()[:16]}>"
+        return _get(name, (name, 0, len(data)), lambda: data)
+
+    path = os.path.abspath(os.fspath(path))
+    st = os.stat(path)
+
+    def read() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    return _get(path, (path, st.st_mtime_ns, st.st_size), read)
+
+
+def _get(path: str, key: Tuple[str, int, int], read) -> DocxTemplate:
+    global _total_bytes, _hits, _misses
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry.key == key:
+            _cache.move_to_end(path)
+            _hits += 1
+            return CachedDocxTemplate(entry, path)
+        if entry is not None:
+            _total_bytes -= _cache.pop(path).nbytes
+
+    data = read()
+    entry = _Entry(key=key, data=data, nbytes=len(data))
+
+    with _lock:
+        _misses += 1
+        cur = _cache.get(path)
+        if cur is not None and cur.key == key:
+            # другой поток прочитал тот же файл раньше — берём его запись (с уже скомпилированным)
+            _cache.move_to_end(path)
+            entry = cur
+        else:
+            if cur is not None:
+                _total_bytes -= _cache.pop(path).nbytes
+            _cache[path] = entry
+            _total_bytes += entry.nbytes
+            _evict()
+    logger.debug(f"template_cache: загружен {os.path.basename(path)}")
+    return CachedDocxTemplate(entry, path)
+
+
+def set_max_bytes(max_bytes: int) -> None:
+    global _max_bytes
+    with _lock:
+        _max_bytes = max(0, int(max_bytes))
+        _evict()
+
+
+def clear() -> None:
+    global _total_bytes, _hits, _misses
+    with _lock:
+        _cache.clear()
+        _total_bytes = _hits = _misses = 0
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return {
+            "templates": len(_cache),
+            "bytes": _total_bytes,
+            "max_bytes": _max_bytes,
+            "hits": _hits,
+            "misses": _misses,
+        }
@@ -3,9 +3,12 @@
 from typing import Dict, Any, List, Optional
 from docxtpl import DocxTemplate, InlineImage
 from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.parts.hdrftr import FooterPart, HeaderPart
 from docx.shared import Mm
 from logger import logger
-from file_utils import temp_docx
+import template_cache
 
 AREA_THRESHOLDS = [
     (2,1),(4,2),(6,3),(8,4),(10,5),
@@ -49,6 +52,43 @@ def build_context(
     logger.debug("Контекст для Jinja собран (rooms с point)")
     return ctx
 
+def rendered_document(tpl: DocxTemplate) -> Document:
+    """
+    Возвращает tpl.docx после render() как полноценный python-docx Document — без save/reload.
+
+    docxtpl подменяет колонтитулы «голыми» XmlPart, а кэш related_parts документа
+    остаётся на старых (неотрендеренных) частях: правки через sec.header/footer
+    уходили бы мимо сохраняемого файла. Отрендеренный XML оборачиваем в
+    HeaderPart/FooterPart и перевешиваем связь на него через публичный API python-docx.
+    """
+    doc = tpl.docx
+    part = doc.part
+    part_cls = {RT.HEADER: HeaderPart, RT.FOOTER: FooterPart}
+    for rId, rel in list(part.rels.items()):
+        cls = part_cls.get(rel.reltype)
+        if cls is None or rel.is_external:
+            continue
+        rendered = rel.target_part
+        if type(rendered) is cls and part.related_parts.get(rId) is rendered:
+            continue
+        if type(rendered) is not cls:
+            wrapped = cls(rendered.partname, rendered.content_type, rendered.element, rendered.package)
+            for r in rendered.rels.values():
+                wrapped.load_rel(r.reltype, r.target_ref if r.is_external else r.target_part, r.rId, r.is_external)
+            rendered = wrapped
+        del part.rels[rId]
+        part.rels.add_relationship(rel.reltype, rendered, rId)
+
+    # InlineImage вставляет разметку с отступами; при перечитывании файла python-docx
+    # выкидывал эти пробельные узлы — делаем то же самое, чтобы XML был как раньше
+    for inline in doc.element.body.iter(qn("wp:inline")):
+        for el in inline.iter():
+            if el.text is not None and not el.text.strip():
+                el.text = None
+            if el.tail is not None and not el.tail.strip():
+                el.tail = None
+    return doc
+
 def render_template(
     tpl_path: str,
     context: Dict[str, Any],
@@ -62,7 +102,7 @@ def render_template(
     :param out_path: если указан — сохранить итоговый документ сразу по этому пути
     :return: объект python-docx Document для дальнейшей обработки
     """
-    tpl = DocxTemplate(tpl_path)
+    tpl = template_cache.get_template(tpl_path)
 
     # --- 1) Подготовка InlineImage для нескольких сканов ---
     if "Scan_paths" in context:
@@ -92,13 +132,11 @@ def render_template(
     tpl.render(context)
 
     # --- 4) сохранение и возврат Document ---
+    # после render() tpl.docx уже и есть итоговый документ (замен картинок/медиа
+    # через replace_pic мы не используем) — без записи и повторного парсинга
     if out_path:
         tpl.save(out_path)
         logger.info(f"Шаблон отререндерен и сохранён в {out_path}")
-        return Document(out_path)
-
-    with temp_docx() as tmp:
-        tpl.save(tmp)
-        doc = Document(tmp)
-        logger.info("Шаблон отререндерен во временный файл")
-        return doc
+    else:
+        logger.info("Шаблон отререндерен в памяти")
+    return rendered_document(tpl)
@@ -0,0 +1,328 @@
+# test11_calc.py
+"""
+Тест 11 «Проверка расхода приточного воздуха» — расчёт без Qt.
+
+По каждому помещению: средняя скорость по фильтру (по точкам замера),
+расход фильтра S × средняя × 3600, суммарный расход помещения и вердикт
+«суммарный ≥ проектного». Арифметика — Decimal (28 знаков), публикуемые
+значения квантуются ROUND_HALF_UP до 2 знаков — как в калькуляторе.
+
+    rooms = compute(areas, speeds, criteria)    # speeds[помещение][фильтр][точка]
+    rooms[0].avgs, rooms[0].flows, rooms[0].total, rooms[0].passed
+
+Большой проект считается одним вызовом: суммы/средние/расходы — массивами
+NumPy (float64), а значения, которые во float оказались вплотную к границе
+округления или к критерию, пересчитываются поштучно в Decimal. Поэтому
+результат совпадает с поштучным расчётом (filter_avg/filter_flow/room_total).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Context, Decimal, InvalidOperation, localcontext
+from typing import Any, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+ROUNDING_MODE = ROUND_HALF_UP
+SPEED_PLACES = 2
+FLOW_PLACES = 2
+AREA_PLACES = 2
+SEC_PER_HOUR = Decimal(3600)
+
+# арифметика — как в контексте по умолчанию (28 знаков, HALF_EVEN); HALF_UP — только при квантовании
+_CTX = Context(prec=28, rounding=ROUND_HALF_EVEN)
+
+# меньше точек — быстрее поштучно в Decimal, чем собирать массивы
+NUMPY_MIN_POINTS = 256
+# относительный допуск float64 для «почти ничьей» (ошибка сумм/произведений на порядки меньше)
+_REL_TOL = 1e-9
+
+Num = Optional[Decimal]
+
+
+# =============================================================================
+# 1) Числа
+# =============================================================================
+def to_decimal(s: Any) -> Decimal:
+    if isinstance(s, Decimal):
+        return s
+    s = (str(s).strip()
+         .replace("\u00A0", "")
+         .replace("\u202F", "")
+         .replace(" ", "")
+         .replace(",", "."))
+    try:
+        return Decimal(s)
+    except InvalidOperation:
+        raise ValueError(f"Некорректное число: «{s}»")
+
+
+def parse_decimal(s: Any) -> Num:
+    """to_decimal без исключений: пусто/мусор/NaN/∞ -> None."""
+    if s is None:
+        return None
+    if not isinstance(s, Decimal):
+        s = str(s).strip()
+        if not s:
+            return None
+        try:
+            s = to_decimal(s)
+        except Exception:
+            return None
+    return s if s.is_finite() else None
+
+
+def quantize(x: Decimal, places: int = 2) -> Decimal:
+    return x.quantize(Decimal(10) ** -places, rounding=ROUNDING_MODE)
+
+
+def fmt(n: Decimal, places: int = 2) -> str:
+    return str(quantize(n, places)).replace(".", ",")
+
+
+def fmt_speed(x: Decimal) -> str: return fmt(x, SPEED_PLACES)
+def fmt_flow(x: Decimal) -> str: return fmt(x, FLOW_PLACES)
+def fmt_area(x: Decimal) -> str: return fmt(x, AREA_PLACES)
+
+
+# =============================================================================
+# 2) Поштучный расчёт (эталон)
+# =============================================================================
+def filter_avg(points: Sequence[Num]) -> Num:
+    """Средняя скорость по точкам; None, если точка не задана или отрицательна."""
+    if not points or any(v is None or v < 0 for v in points):
+        return None
+    with localcontext(_CTX):
+        return sum(points, Decimal(0)) / Decimal(len(points))
+
+
+def filter_flow(area: Num, avg: Num) -> Num:
+    """Расход фильтра, м³/ч: S × средняя × 3600."""
+    if area is None or area <= 0 or avg is None:
+        return None
+    with localcontext(_CTX):
+        return area * avg * SEC_PER_HOUR
+
+
+def room_total(flows: Sequence[Num]) -> Num:
+    """Суммарный расход помещения; None, если хоть один фильтр не посчитан."""
+    if not flows or any(f is None for f in flows):
+        return None
+    with localcontext(_CTX):
+        return sum(flows, Decimal(0))
+
+
+def verdict(total: Num, criterion: Num) -> Optional[bool]:
+    if total is None or criterion is None:
+        return None
+    return total >= criterion
+
+
+@dataclass
+class RoomResult:
+    """Опубликованные (уже квантованные) значения помещения; None — не посчитано."""
+    avgs: List[Num] = field(default_factory=list)
+    flows: List[Num] = field(default_factory=list)
+    total: Num = None
+    passed: Optional[bool] = None
+
+
+def _q(x: Num, places: int) -> Num:
+    return quantize(x, places) if x is not None else None
+
+
+def compute_room(area: Num, speeds: Sequence[Sequence[Num]], criterion: Num = None) -> RoomResult:
+    avgs = [filter_avg(pts) for pts in speeds]
+    flows = [filter_flow(area, a) for a in avgs]
+    total = room_total(flows)
+    return RoomResult(
+        avgs=[_q(a, SPEED_PLACES) for a in avgs],
+        flows=[_q(f, FLOW_PLACES) for f in flows],
+        total=_q(total, FLOW_PLACES),
+        passed=verdict(total, criterion),
+    )
+
+
+# =============================================================================
+# 3) Пакетный расчёт
+# =============================================================================
+def _near_half(x, places: int):
+    # x·10^p близко к …,5 — HALF_UP во float ненадёжен
+    y = x * (10 ** places)
+    frac = y - np.floor(y)
+    return np.abs(frac - 0.5) <= _REL_TOL * np.maximum(1.0, np.abs(y))
+
+
+def _published(k: int, places: int) -> Decimal:
+    return Decimal(int(k)).scaleb(-places)
+
+
+def _f(x: Num) -> float:
+    return math.nan if x is None else float(x)
+
+
+def compute(
+    areas: Sequence[Num],
+    speeds: Sequence[Sequence[Sequence[Num]]],
+    criteria: Sequence[Num] = (),
+    *,
+    use_numpy: Optional[bool] = None,
+) -> List[RoomResult]:
+    """
+    Все помещения за один вызов. areas/criteria — по помещениям (короче speeds — недостающие None),
+    speeds — [помещение][фильтр][точка] (Decimal или None). S ≤ 0 считается незаданной.
+    """
+    n_rooms = len(speeds)
+
+    def at(seq: Sequence[Num], r: int) -> Num:
+        return seq[r] if r < len(seq) else None
+
+    n_points = sum(len(pts) for room in speeds for pts in room)
+    if use_numpy is False or (use_numpy is None and n_points < NUMPY_MIN_POINTS):
+        return [compute_room(at(areas, r), speeds[r], at(criteria, r)) for r in range(n_rooms)]
+
+    flat: List[Num] = []
+    point_filter: List[int] = []
+    filter_room: List[int] = []
+    filter_n: List[int] = []
+    for r, room in enumerate(speeds):
+        for pts in room:
+            point_filter.extend([len(filter_room)] * len(pts))
+            filter_room.append(r)
+            filter_n.append(len(pts))
+            flat.extend(pts)
+    n_filters = len(filter_room)
+
+    v = np.fromiter((_f(x) for x in flat), dtype=float, count=len(flat))
+    pf = np.asarray(point_filter, dtype=np.intp)
+    fr = np.asarray(filter_room, dtype=np.intp)
+    n = np.asarray(filter_n, dtype=float)
+
+    bad = np.isnan(v) | (v < 0)
+    ok_avg = (np.bincount(pf, weights=bad, minlength=n_filters) == 0) & (n > 0)
+    sums = np.bincount(pf, weights=np.where(bad, 0.0, v), minlength=n_filters)
+    avg = np.divide(sums, n, out=np.zeros(n_filters), where=n > 0)
+
+    area = np.array([_f(a) if a is not None and a > 0 else math.nan for a in (at(areas, r) for r in range(n_rooms))])
+    area_f = area[fr] if n_filters else np.zeros(0)
+    ok_flow = ok_avg & ~np.isnan(area_f)
+    flow = np.where(ok_flow, area_f * avg * float(SEC_PER_HOUR), 0.0)
+
+    total = np.bincount(fr, weights=flow, minlength=n_rooms)
+    ok_total = (np.bincount(fr, weights=~ok_flow, minlength=n_rooms) == 0) & (np.bincount(fr, minlength=n_rooms) > 0)
+    crit = np.array([_f(at(criteria, r)) for r in range(n_rooms)])
+    ok_verdict = ok_total & ~np.isnan(crit)
+
+    # где float мог округлить не так, как Decimal, — помещение считаем поштучно
+    risky_f = (ok_avg & _near_half(avg, SPEED_PLACES)) | (ok_flow & _near_half(flow, FLOW_PLACES))
+    risky = np.bincount(fr, weights=risky_f, minlength=n_rooms) > 0
+    risky |= ok_total & _near_half(total, FLOW_PLACES)
+    with np.errstate(invalid="ignore"):
+        risky |= ok_verdict & (np.abs(total - crit) <= _REL_TOL * np.maximum(1.0, np.abs(crit)))
+
+    k_avg = np.floor(avg * 10 ** SPEED_PLACES + 0.5)
+    k_flow = np.floor(flow * 10 ** FLOW_PLACES + 0.5)
+    k_total = np.floor(total * 10 ** FLOW_PLACES + 0.5)
+    passed = total >= np.nan_to_num(crit)
+
+    out: List[RoomResult] = []
+    f = 0
+    for r in range(n_rooms):
+        nf = len(speeds[r])
+        if risky[r]:
+            out.append(compute_room(at(areas, r), speeds[r], at(criteria, r)))
+        else:
+            sl = range(f, f + nf)
+            out.append(RoomResult(
+                avgs=[_published(k_avg[i], SPEED_PLACES) if ok_avg[i] else None for i in sl],
+                flows=[_published(k_flow[i], FLOW_PLACES) if ok_flow[i] else None for i in sl],
+                total=_published(k_total[r], FLOW_PLACES) if ok_total[r] else None,
+                passed=bool(passed[r]) if ok_verdict[r] else None,
+            ))
+        f += nf
+    return out
+
+
+# =============================================================================
+# 4) Живой пересчёт (калькулятор)
+# =============================================================================
+class LiveCalc:
+    """
+    Разобранные значения полей + «грязные» фильтры/помещения.
+
+    Правка точки пересчитывает только её фильтр, сумму помещения и вердикт;
+    одинаковый текст повторно не разбирается. recalc() возвращает, что
+    изменилось, — обновлять надо только эти подписи.
+    """
+
+    def __init__(self, shape: Sequence[Sequence[int]] = ()):
+        self.reset(shape)
+
+    def reset(self, shape: Sequence[Sequence[int]]) -> None:
+        """shape[помещение][фильтр] = число точек. Всё становится «грязным»."""
+        n = len(shape)
+        self.texts: List[List[List[str]]] = [[[""] * k for k in room] for room in shape]
+        self.values: List[List[List[Num]]] = [[[None] * k for k in room] for room in shape]
+        self._area_text: List[Optional[str]] = [None] * n
+        self._crit_text: List[Optional[str]] = [None] * n
+        self.areas: List[Num] = [None] * n
+        self.criteria: List[Num] = [None] * n
+        # неквантованные — сумма помещения считается от них, как в compute_room
+        self._flows: List[List[Num]] = [[None] * len(room) for room in shape]
+        self.results: List[RoomResult] = [
+            RoomResult(avgs=[None] * len(room), flows=[None] * len(room)) for room in shape
+        ]
+        self._dirty_filters = {(r, f) for r, room in enumerate(shape) for f in range(len(room))}
+        self._dirty_rooms = set(range(n))
+
+    def set_point(self, r: int, f: int, p: int, text: str) -> None:
+        if self.texts[r][f][p] == text:
+            return
+        self.texts[r][f][p] = text
+        v = parse_decimal(text)
+        if v != self.values[r][f][p]:
+            self.values[r][f][p] = v
+            self._dirty_filters.add((r, f))
+
+    def points_from(self, r: int, f: int, p: int) -> Iterator[Tuple[int, int, int]]:
+        """(помещение, фильтр, точка) подряд, начиная с заданной — порядок вставки из буфера."""
+        for rr in range(r, len(self.texts)):
+            for ff in range(f if rr == r else 0, len(self.texts[rr])):
+                for pp in range(p if (rr, ff) == (r, f) else 0, len(self.texts[rr][ff])):
+                    yield rr, ff, pp
+
+    def set_area(self, r: int, text: str) -> None:
+        if self._area_text[r] == text:
+            return
+        self._area_text[r] = text
+        a = parse_decimal(text)
+        a = a if a is not None and a > 0 else None
+        if a != self.areas[r]:
+            self.areas[r] = a
+            self._dirty_filters.update((r, f) for f in range(len(self.values[r])))
+
+    def set_criterion(self, r: int, text: str) -> None:
+        if self._crit_text[r] == text:
+            return
+        self._crit_text[r] = text
+        self.criteria[r] = parse_decimal(text)
+        self._dirty_rooms.add(r)
+
+    def recalc(self) -> Tuple[Set[Tuple[int, int]], Set[int]]:
+        """Пересчёт грязного. Возвращает (пересчитанные (помещение, фильтр), пересчитанные помещения)."""
+        filters, self._dirty_filters = self._dirty_filters, set()
+        for r, f in filters:
+            res = self.results[r]
+            avg = filter_avg(self.values[r][f])
+            flow = filter_flow(self.areas[r], avg)
+            self._flows[r][f] = flow
+            res.avgs[f] = _q(avg, SPEED_PLACES)
+            res.flows[f] = _q(flow, FLOW_PLACES)
+
+        rooms, self._dirty_rooms = self._dirty_rooms | {r for r, _ in filters}, set()
+        for r in rooms:
+            total = room_total(self._flows[r])
+            self.results[r].total = _q(total, FLOW_PLACES)
+            self.results[r].passed = verdict(total, self.criteria[r])
+        return filters, rooms
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import batch_render
+
+
+def test_json_defaults_are_merged_into_jobs(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps({
+        "defaults": {"mode": "OQ", "use_word": False, "fields": {"year": "2025", "object": "A"}},
+        "jobs": [
+            {"out": "a.docx", "fields": {"object": "B"}},
+            {"out": "b.docx", "mode": "PQ"},
+        ],
+    }), encoding="utf-8")
+
+    jobs = batch_render.load_manifest(path)
+    assert jobs == [
+        {"mode": "OQ", "use_word": False, "out": "a.docx", "fields": {"year": "2025", "object": "B"}},
+        {"mode": "PQ", "use_word": False, "out": "b.docx", "fields": {"year": "2025", "object": "A"}},
+    ]
+
+
+def test_json_plain_list(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps([{"out": "a.docx"}]), encoding="utf-8")
+    assert batch_render.load_manifest(path) == [{"out": "a.docx"}]
+
+
+@pytest.mark.parametrize("data", [{"jobs": {"out": "a.docx"}}, ["a.docx"]])
+def test_json_bad_jobs_are_reported(tmp_path, data):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    with pytest.raises(ValueError, match="jobs.json"):
+        batch_render.load_manifest(path)
+
+
+def test_csv_rows_split_job_keys_and_fields(tmp_path):
+    path = tmp_path / "jobs.csv"
+    path.write_text(
+        "mode;out;selected_tests;report;use_word;object;prt\n"
+        "PQ;out/a.docx;Тест 1| Тест 2 |;нет;1;Корпус 1;12\n"
+        "OQ;out/b.docx;;;;Корпус 2;\n",
+        encoding="utf-8-sig",  # Excel сохраняет CSV с BOM
+    )
+    jobs = batch_render.load_manifest(path)
+    assert jobs[0] == {
+        "mode": "PQ", "out": "out/a.docx", "selected_tests": ["Тест 1", "Тест 2"],
+        "report": False, "use_word": True, "fields": {"object": "Корпус 1", "prt": "12"},
+    }
+    # пустые колонки задания не попадают в словарь — берутся умолчания job_from_dict
+    assert jobs[1] == {"mode": "OQ", "out": "out/b.docx", "fields": {"object": "Корпус 2", "prt": ""}}
+
+
+def test_csv_comma_delimiter(tmp_path):
+    path = tmp_path / "jobs.csv"
+    path.write_text("out,name\na.docx,Первый\n", encoding="utf-8")
+    assert batch_render.load_manifest(path) == [{"out": "a.docx", "name": "Первый"}]
+
+
+def test_failed_job_is_reported_not_raised(tmp_path):
+    outcome = batch_render._run_one(0, {"mode": "OQ"}, str(tmp_path), no_word=True)
+    assert not outcome.ok
+    assert "out" in outcome.error
+    assert outcome.name.startswith("#1 OQ")
@@ -0,0 +1,78 @@
+from docx import Document
+
+import document_index as di
+from document_index import DocumentIndex
+
+
+def _table(doc, rows):
+    tbl = doc.add_table(rows=len(rows), cols=len(rows[0]))
+    for tr, texts in zip(tbl.rows, rows):
+        for cell, text in zip(tr.cells, texts):
+            cell.text = text
+    return tbl
+
+
+def _doc():
+    doc = Document()
+    _table(doc, [["Номер помещения", "Площадь"], ["#", "####"]])
+    _table(doc, [["Наименование", "Зав. №"], ["@1", "@2"]])
+    _table(doc, [["Тест 11.1 Проверка расхода приточного воздуха", ""],
+                 ["Номер помещения", "Площадь, м², № точки"],
+                 ["101", "12,5"],
+                 ["Номер помещения", "Площадь, м², № точки"]])
+    _table(doc, [["Вид опасности", "Риск"], ["<<T5_RISK>>", ""]])
+    return doc
+
+
+def test_classify_rows_and_kinds():
+    doc = _doc()
+    index = DocumentIndex(doc)
+    t = doc.tables
+
+    assert index.first(di.ROOMS)._tbl is t[0]._tbl
+    assert index.first(di.EQUIPMENT)._tbl is t[1]._tbl
+    assert index.row(t[1], di.EQUIPMENT) == 1
+    assert index.kinds(t[2]) >= {di.TEST11_TITLE, di.SUPPLY_AIR}
+    # RESULTS запоминает последнюю подходящую строку (шапка повторяется по помещениям)
+    assert index.row(t[2], di.RESULTS) == 3
+    assert index.tables(di.TABLE5)[0]._tbl is t[3]._tbl
+    assert index.first(di.REPORT_TABLE2) is None
+
+
+def test_merged_cells_text_as_python_docx():
+    doc = Document()
+    tbl = _table(doc, [["", "Номер помещения"], ["", "x"]])
+    tbl.cell(0, 0).merge(tbl.cell(1, 0)).text = "Номер помещения"  # vMerge
+    hits = di.classify(tbl._tbl)
+    assert hits[di.ROOMS] == 0
+    assert di._row_cells(tbl._tbl.tr_lst[1], {0: "Номер помещения"})[0] == "Номер помещения"
+
+
+def test_new_tables_are_classified_and_refresh_reclassifies():
+    doc = _doc()
+    index = DocumentIndex(doc)
+    assert index.tables(di.REPORT_TABLE1) == []
+
+    added = _table(doc, [["#", "##", "#%%%"]])
+    assert [t._tbl for t in index.tables(di.REPORT_TABLE1)] == [added._tbl]
+
+    rooms = doc.tables[0]
+    rooms.cell(0, 0).text = "Помещение"
+    assert di.ROOMS in index.kinds(rooms)  # без refresh разметка прежняя
+    index.refresh(rooms)
+    assert di.ROOMS not in index.kinds(rooms)
+    assert index.first(di.ROOMS) is None
+
+
+def test_rule_options():
+    assert di.Rule("k", all_of=("a",), col=1).matches(["a", "b"], "a b") is False
+    assert di.Rule("k", cells=frozenset({"#"})).matches([" # ", "x"], "# x")
+    assert di.Rule("k", regex=r"^Тест\s*11").matches(["строка\nТест 11.2"], "")
+    rows = [["x"], ["шапка"], ["шапка"]]
+    doc = Document()
+    tbl = _table(doc, rows)
+    first = di.Rule("k", all_of=("шапка",), rows=None)
+    last = di.Rule("k", all_of=("шапка",), rows=None, last=True)
+    assert di.classify(tbl._tbl, [first]) == {"k": 1}
+    assert di.classify(tbl._tbl, [last]) == {"k": 2}
+    assert di.classify(tbl._tbl, [di.Rule("k", all_of=("шапка",), rows=1)]) == {}
@@ -0,0 +1,63 @@
+import io
+
+from PIL import Image
+
+import image_prep
+
+
+def _jpeg(path, size, orientation=None, quality=40):
+    img = Image.new("RGB", size, (200, 30, 30))
+    for x in range(size[0] // 2):
+        img.putpixel((x, 0), (0, 0, 255))
+    kw = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        kw["exif"] = exif
+    img.save(path, format="JPEG", quality=quality, **kw)
+
+
+def test_small_jpeg_without_exif_is_left_as_is(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "scan.jpg"
+    _jpeg(path, (120, 80))
+    data = path.read_bytes()
+
+    assert image_prep.prepare_image(str(path)) == str(path)
+    assert path.read_bytes() == data
+    # повторный вызов берёт маркер .orig из кэша
+    assert image_prep.prepare_image(str(path)) == str(path)
+
+
+def test_opaque_png_stays_png(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "screen.png"
+    Image.new("RGB", (3000, 200), (255, 255, 255)).save(path)
+
+    out = image_prep.prepare_image(str(path), width_mm=100, dpi=100)
+    assert out.endswith(".png")
+    with Image.open(out) as img:
+        assert img.format == "PNG"
+
+
+def test_exif_rotated_image_comes_out_rotated(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "rot.jpg"
+    _jpeg(path, (120, 80), orientation=6)  # 90° по часовой
+
+    out = image_prep.prepare_image(str(path))
+    assert out != str(path)
+    with Image.open(out) as img:
+        assert img.size == (80, 120)
+        assert img.getexif().get(0x0112, 1) == 1
+
+
+def test_oversized_image_is_downscaled(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "big.jpg"
+    _jpeg(path, (4000, 2000), quality=95)
+
+    out = image_prep.prepare_image(str(path), width_mm=150, dpi=200)
+    max_px = int(round(150 / 25.4 * 200))
+    with Image.open(io.BytesIO(open(out, "rb").read())) as img:
+        assert img.size == (max_px, int(round(2000 * max_px / 4000)))
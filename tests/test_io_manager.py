@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from io_manager import _parse_equipment_df
+
+
+def test_parse_equipment_df_columnwise():
+    df = pd.DataFrame({
+        " Наименование ": [" Анемометр ", None, "Термометр,", "", "Гигрометр"],
+        "Зав. номер": ["84360366", "1", np.nan, "2", " "],
+        "Дата поверки": [pd.Timestamp(2025, 3, 1), pd.NaT, "01.02.2025", None, None],
+        "Срок действия поверки": [2.0, None, None, None, None],
+    })
+    assert _parse_equipment_df(df) == [
+        {"name_sn": "Анемометр, 84360366", "params": "", "cert": "", "date": "2025-03-01 00:00:00", "until": "2.0"},
+        {"name_sn": "Термометр", "params": "", "cert": "", "date": "01.02.2025", "until": ""},
+        {"name_sn": "Гигрометр", "params": "", "cert": "", "date": "", "until": ""},
+    ]
+    # как из read_excel(dtype=str): строковые колонки
+    df = pd.DataFrame({"Наименование": [" Анемометр ", np.nan], "Зав. номер": [np.nan, "1"]}, dtype=str)
+    assert _parse_equipment_df(df) == [{"name_sn": "Анемометр", "params": "", "cert": "", "date": "", "until": ""}]
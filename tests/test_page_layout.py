@@ -0,0 +1,50 @@
+from docx import Document
+from docx.enum.table import WD_ROW_HEIGHT_RULE
+from docx.shared import Twips
+
+from page_layout import PageLayout, split_table_at_pages, word_width
+
+
+def _doc(rows=60, height=567):
+    doc = Document()
+    doc.add_paragraph("Таблица 2")
+    t = doc.add_table(rows=rows, cols=2)
+    for ri, row in enumerate(t.rows):
+        row.height = Twips(height)
+        row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+        row.cells[0].text = "Шапка" if ri == 0 else str(ri)
+    return doc, t
+
+
+def test_metrics_and_wrapping():
+    assert word_width("Ш") > word_width("ш") > word_width("i")
+    assert word_width("Тест", bold=True) > word_width("Тест")
+    doc = Document()
+    short = doc.add_paragraph("Проверка")._p
+    long = doc.add_paragraph(" ".join(["Проверка расхода приточного воздуха"] * 20))._p
+    layout = PageLayout(doc)
+    assert layout.paragraph_height(long, 5000) > 5 * layout.paragraph_height(short, 5000)
+
+
+def test_exact_rows_cut_at_page_boundary():
+    doc, t = _doc()
+    layout = PageLayout(doc)
+    assert layout.row_heights(t._tbl) == [567] * 60
+    cuts = layout.table_cuts(t._tbl, header_rows=1)
+    page = layout.usable_height(layout.geometry_of(t._tbl))
+    assert cuts and (layout.offset_of(t._tbl) + 567 * cuts[0]) <= page < layout.offset_of(t._tbl) + 567 * (cuts[0] + 1)
+
+
+def test_split_moves_rows_and_repeats_header():
+    doc, t = _doc()
+    parts = split_table_at_pages(doc, t, header_rows=1)
+    assert parts >= 2
+    assert len(doc.tables) == parts + 1
+    texts = []
+    for tbl in doc.tables:
+        assert tbl.cell(0, 0).text == "Шапка"
+        texts += [r.cells[0].text for r in tbl.rows[1:]]
+    assert texts == [str(i) for i in range(1, 60)]
+    conts = [p.text for p in doc.paragraphs if p.text.startswith("Продолжение")]
+    assert conts == ["Продолжение таблицы 2"] * parts
+    assert split_table_at_pages(doc, doc.tables[0], header_rows=1) == 0   # повторный запуск
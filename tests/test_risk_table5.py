@@ -0,0 +1,52 @@
+import random
+
+from openpyxl import Workbook
+
+from risk_table5 import RiskIndex, _is_match, _selected_tests_to_names
+
+_HEADERS = [
+    "Риск", "Возможная причина", "Вероятность_оценка", "Вероятность_балл", "Тяжесть_оценка",
+    "Тяжесть_балл", "Необнаружение_оценка", "Необнаружение_балл", "Уровень_риска", "ПЧР",
+    "Аттестационное испытание",
+]
+_WORDS = ["проверка", "расхода", "воздуха", "обучении / ознакомлении", "HEPA", "ЛВП", "11.2", "дверей", "ё", "A"]
+
+
+def _sheet(rnd, rows=120):
+    ws = Workbook().active
+    ws.append(_HEADERS)
+    for _ in range(rows):
+        tests = ["Тест " + " ".join(rnd.sample(_WORDS, rnd.randint(1, 3))) for _ in range(rnd.randint(0, 3))]
+        ws.append([f"Риск {rnd.randint(1, 4)}", "причина", "В", 2.0, "Т", 3, "Н", 1, "Н", 6, "\n".join(tests)])
+    return ws
+
+
+def _brute(ws, selected):
+    """Прежний перебор: выбранный тест × тест в ячейке × строка."""
+    names = [s for s in _selected_tests_to_names(selected) if s.strip()]
+    out = []
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        tests = [t for t in (row[-1] or "").split("\n") if t]
+        matched = [] if names else tests
+        for s in names:
+            for t in tests:
+                if _is_match(s, t) and t not in matched:
+                    matched.append(t)
+        if matched:
+            out.append((row[0], matched))
+    return out
+
+
+def test_index_matches_brute_force_in_selection_order():
+    rnd = random.Random(3)
+    ws = _sheet(rnd)
+    idx = RiskIndex.from_rows(list(ws.iter_rows(values_only=True)))
+    for _ in range(40):
+        selected = [f"0{i}. " + " ".join(rnd.sample(_WORDS, rnd.randint(1, 2))) for i in range(rnd.randint(1, 4))]
+        got = idx.select(selected)
+        merged = {}
+        for risk, tests in _brute(ws, selected):
+            lst = merged.setdefault(risk, [])
+            lst += [t for t in tests if t not in lst]
+        assert [(r["risk"], r["tests"]) for r in got] == list(merged.items())
+        assert all(r["prob_score"] == "2" for r in got)
@@ -0,0 +1,87 @@
+from copy import deepcopy
+
+from docx import Document
+from docx.enum.table import WD_ALIGN_VERTICAL, WD_ROW_HEIGHT_RULE
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+from docx.shared import Cm, Pt
+from lxml import etree
+
+import table_processor
+from row_builder import RowBuilder, rows_of
+
+PH2KEY = {"#": "num", "##": "name", "###": "klass", "####": "area"}
+ROOMS = [
+    {"num": "101", "name": "Коридор", "klass": "D", "area": "12,5"},
+    {"num": "102", "name": " Шлюз ", "klass": "", "area": "4"},
+    {"num": "103", "name": "Чистое помещение", "klass": "C", "area": "31,25"},
+]
+
+
+def _rooms_doc():
+    doc = Document()
+    tbl = doc.add_table(rows=2, cols=4)
+    for cell, text in zip(tbl.rows[0].cells, ("Номер помещения", "Наименование", "Класс", "Площадь")):
+        cell.text = text
+    for cell, ph in zip(tbl.rows[1].cells, PH2KEY):
+        cell.text = ph
+    return doc
+
+
+def _old_fill(tbl, rooms):
+    """Заполнение до RowBuilder: строка за строкой через tbl.rows[-1]."""
+    sample_tr = deepcopy(tbl.rows[1]._tr)
+    while len(tbl.rows) > 1:
+        tbl._tbl.remove(tbl.rows[1]._tr)
+    for room in rooms:
+        tbl._tbl.append(deepcopy(sample_tr))
+        new_row = tbl.rows[-1]
+        new_row.height = Cm(1.46)
+        new_row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+        for cell in new_row.cells:
+            cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+        for cell in new_row.cells:
+            placeholder = cell.text.strip()
+            cell.text = ""
+            for para in cell.paragraphs:
+                para.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+                pf = para.paragraph_format
+                pf.first_line_indent = Cm(0)
+                pf.left_indent = Cm(0)
+                pf.right_indent = Cm(0)
+                pf.space_before = Pt(0)
+                pf.space_after = Pt(0)
+                pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
+                pf.line_spacing = 1.1
+            if placeholder in PH2KEY:
+                run = cell.paragraphs[0].add_run(room.get(PH2KEY[placeholder], ""))
+                run.font.name = "Times New Roman"
+                run.font.size = Pt(10)
+
+
+def _rows_xml(tbl):
+    return [etree.tostring(tr) for tr in rows_of(tbl)[1:]]
+
+
+def test_rooms_rows_match_old_per_row_fill():
+    new_doc, old_doc = _rooms_doc(), _rooms_doc()
+    table_processor.process_rooms_table(new_doc, ROOMS)
+    _old_fill(old_doc.tables[0], ROOMS)
+
+    assert _rows_xml(new_doc.tables[0]) == _rows_xml(old_doc.tables[0])
+    assert [c.text for c in new_doc.tables[0].rows[2].cells] == ["102", " Шлюз ", "", "4"]
+
+
+def test_build_fills_slots_and_cell_lookup():
+    doc = _rooms_doc()
+    tbl = doc.tables[0]
+    rb = RowBuilder(tbl.rows[1]._tr, tbl)
+    for cell, key in zip(rb.cells, ("a", "b", "c", "d")):
+        cell.text = ""
+        rb.bind(key, cell.paragraphs[0].add_run()._r)
+    gone = rb.cells[3].paragraphs[0].runs[-1]
+    gone._r.getparent().remove(gone._r)  # слот, удалённый из прототипа, пропускается
+
+    tr = rb.build({"a": 1, "b": "две\nстроки", "c": "", "d": "x"})
+    assert [rb.cell(tr, i).text for i in range(4)] == ["1", "две\nстроки", "", ""]
+    # прототип не меняется
+    assert [c.text for c in rb.cells] == ["", "", "", ""]
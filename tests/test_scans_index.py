@@ -0,0 +1,65 @@
+import os
+
+import scans_index
+
+
+def _touch(path, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_file_name_beats_folder_and_image_beats_pdf(tmp_path):
+    by_file = _touch(tmp_path / "2025" / "84360366.jpg")
+    _touch(tmp_path / "Анемометр Testo 417 з.н 84360366" / "a.jpg")
+    _touch(tmp_path / "140104025.pdf")
+    png = _touch(tmp_path / "архив" / "140104025.jpg.png")
+
+    idx = scans_index.ScansIndex(str(tmp_path))
+    idx.refresh()
+    assert idx.find("84360366") == by_file
+    assert idx.find("140104025") == png
+    assert idx.find("000") is None
+
+
+def test_folder_match_prefers_newest_scan(tmp_path):
+    folder = tmp_path / "Термометр з.н. 555-A"
+    _touch(folder / "2024" / "a_поверка.jpg", mtime=1_700_000_000)
+    newest = _touch(folder / "2025" / "z_поверка.jpg", mtime=1_740_000_000)
+    _touch(folder / "поверка.pdf", mtime=1_750_000_000)
+
+    idx = scans_index.ScansIndex(str(tmp_path))
+    idx.refresh()
+    assert idx.find("555-A") == newest
+    assert idx.find_for_equipment([{"name_sn": "Термометр, 555-A"}, {"name_sn": "Термометр, 555A"}]) == [newest]
+
+
+def test_refresh_rereads_only_changed_dirs(tmp_path):
+    _touch(tmp_path / "a" / "111.jpg")
+    _touch(tmp_path / "b" / "222.jpg")
+    idx = scans_index.ScansIndex(str(tmp_path))
+    assert idx.refresh() == 3
+    assert idx.refresh() == 0
+    assert idx.find("333") is None
+
+    added = _touch(tmp_path / "b" / "333.jpg")
+    st = os.stat(tmp_path / "b")
+    os.utime(tmp_path / "b", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert idx.refresh() == 1
+    assert idx.find("333") == added
+
+
+def test_index_persists_between_processes(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(scans_index, "_indexes", {})
+    root = tmp_path / "scans"
+    path = _touch(root / "Прибор з.н. 42" / "скан.png")
+
+    assert scans_index.get_index(str(root)).find("42") == path
+
+    loaded = scans_index._load(str(root))
+    assert loaded.dirs.keys() == {"", "Прибор з.н. 42"}
+    assert loaded.refresh() == 0
+    assert loaded.find("42") == path
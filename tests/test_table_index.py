@@ -0,0 +1,105 @@
+import os
+import pickle
+
+import pytest
+from docx import Document
+
+import table_index
+
+
+def _tests_doc(extra_table=False):
+    doc = Document()
+    doc.add_paragraph("Тест 1. Проверка расхода приточного воздуха")
+    doc.add_table(rows=2, cols=2).cell(0, 0).text = "Тест 1. Проверка расхода приточного воздуха"
+    # название только в абзаце перед таблицей
+    doc.add_paragraph("Тест 2. Проверка перепада давления")
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "Помещение"
+    for _ in range(2):
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "Тест 3. Измерение освещённости"
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "Тест 4. Измерение освещённости аварийное"
+    if extra_table:
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "Тест 5. Проверка шума"
+    return doc
+
+
+def test_lookup_and_table():
+    doc = _tests_doc()
+    idx = table_index.TestTableIndex.from_document(doc)
+
+    # номер теста в названии не важен — ищется текст после «Тест N.»
+    assert idx.lookup("Тест 7. Проверка расхода приточного воздуха") == 0
+    assert idx.lookup("Проверка перепада давления") == 1
+    assert idx.lookup("Тест 9. Нет такого") is None
+    assert idx.table(doc, "Проверка перепада давления")._tbl is doc.tables[1]._tbl
+    with pytest.raises(ValueError, match="Нет такого"):
+        idx.table(doc, "Тест 9. Нет такого")
+
+
+def test_check_reports_missing_ambiguous_and_duplicates():
+    idx = table_index.TestTableIndex.from_document(_tests_doc())
+    rep = idx.check([
+        "Тест 1. Проверка расхода приточного воздуха",
+        "Тест 2. Нет такого",
+        "Тест 3. Измерение освещённости",
+        "Тест 8. Проверка расхода приточного воздуха",
+    ])
+    assert rep.missing == ["Тест 2. Нет такого"]
+    assert rep.ambiguous == {"Тест 3. Измерение освещённости": [
+        "Тест 3. Измерение освещённости",
+        "Тест 3. Измерение освещённости",
+        "Тест 4. Измерение освещённости аварийное",
+    ]}
+    assert rep.duplicate_tables == {"Тест 3. Измерение освещённости": 2}
+    assert rep.duplicate_titles == ["Тест 8. Проверка расхода приточного воздуха"]
+    assert len(rep.lines()) == 4
+
+    assert not table_index.TestTableIndex.from_document(Document()).check(["Тест 1. А"]).ambiguous
+
+
+def test_pickle_drops_lookup_memo():
+    idx = table_index.TestTableIndex.from_document(_tests_doc())
+    idx.lookup("Проверка перепада давления")
+    assert idx._found
+
+    copy = pickle.loads(pickle.dumps(idx))
+    assert copy._found == {}
+    assert copy.texts == idx.texts and copy.paras == idx.paras
+    assert copy.lookup("Проверка перепада давления") == 1
+
+
+def test_load_index_reused_until_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "Тесты.docx"
+    _tests_doc().save(path)
+
+    built = []
+    real = table_index.TestTableIndex.from_document.__func__
+
+    def counting(cls, doc):
+        built.append(1)
+        return real(cls, doc)
+
+    monkeypatch.setattr(table_index.TestTableIndex, "from_document", classmethod(counting))
+
+    first = table_index.load_index(path)
+    again = table_index.load_index(path)
+    assert len(built) == 1 and again is not first
+    assert again.texts == first.texts
+    assert list((tmp_path / "cache" / "test_tables").glob("*.tmp")) == []
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    table_index.load_index(path)
+    assert len(built) == 2
+
+    # тот же mtime, другой размер
+    st = os.stat(path)
+    _tests_doc(extra_table=True).save(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.stat(path).st_size != st.st_size
+    idx = table_index.load_index(path)
+    assert len(built) == 3
+    assert idx.lookup("Проверка шума") == len(idx.texts) - 1
+
+    table_index.load_index(path, use_disk=False)
+    assert len(built) == 4
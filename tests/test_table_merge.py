@@ -0,0 +1,38 @@
+from docx import Document
+from lxml import etree
+
+from table_merge import column_tcs, tc_at, vmerge
+
+
+def _table():
+    doc = Document()
+    t = doc.add_table(rows=5, cols=3)
+    for ri, row in enumerate(t.rows):
+        for ci, cell in enumerate(row.cells):
+            cell.text = f"R{ri} C{ci}"
+    return t
+
+
+def test_vmerge_matches_python_docx_merge():
+    a, b = _table(), _table()
+    top = a.cell(1, 1)
+    for ri in (2, 3):
+        top = top.merge(a.cell(ri, 1))
+    vmerge(column_tcs(b._tbl.tr_lst[1:4], 1))
+    for tr_a, tr_b in zip(a._tbl.tr_lst[2:4], b._tbl.tr_lst[2:4]):
+        assert etree.tostring(tr_a) == etree.tostring(tr_b)   # нижние: continue + пустой абзац
+    assert [c.text for c in b.column_cells(1)][1:4] == ["R1 C1"] * 3
+    assert b.cell(1, 1)._tc.vMerge == "restart"
+
+
+def test_column_inside_grid_span_is_rejected():
+    t = _table()
+    t.cell(0, 0).merge(t.cell(0, 1))
+    assert tc_at(t._tbl.tr_lst[0], 1) is None
+    assert tc_at(t._tbl.tr_lst[0], 2) is t._tbl.tr_lst[0].tc_lst[1]
+    try:
+        column_tcs(t._tbl.tr_lst[0:2], 1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ожидали ValueError")
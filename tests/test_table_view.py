@@ -0,0 +1,37 @@
+from docx import Document
+
+from table_view import TableView
+
+
+def _table():
+    doc = Document()
+    t = doc.add_table(rows=4, cols=3)
+    for ri, row in enumerate(t.rows):
+        for ci, cell in enumerate(row.cells):
+            cell.text = f"R{ri} C{ci}"
+    t.cell(0, 0).merge(t.cell(0, 1))      # gridSpan
+    t.cell(1, 2).merge(t.cell(3, 2))      # vMerge
+    return t
+
+
+def test_grid_and_text_match_python_docx():
+    t = _table()
+    view = TableView(t)
+    assert len(view) == 4
+    for ri, row in enumerate(t.rows):
+        assert view.texts(ri) == [c.text for c in row.cells]
+        assert [c._tc for c in view.cells(ri)] == [c._tc for c in row.cells]
+    assert view.find_row("r2 c1") == 2
+    assert view.find_col("c2", rows=(5, 1)) == 2
+
+
+def test_touch_drops_cached_text():
+    t = _table()
+    view = TableView(t)
+    assert view.norm(3, 2).startswith("r1 c2")     # продолжение vMerge — текст верхней
+    view.cell(1, 2).text = "Новое  значение"
+    assert view.text(1, 2) != "Новое  значение"    # кэш
+    view.touch(1)
+    assert view.text(1, 2) == "Новое  значение"
+    assert view.norm(3, 2) == "новое значение"
+    assert view.line(1) == "r1 c0 r1 c1 новое значение"
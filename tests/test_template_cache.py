@@ -0,0 +1,37 @@
+import pytest
+from docx import Document
+from jinja2 import TemplateSyntaxError
+
+import template_cache
+
+
+def _docx(path, *lines):
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    doc.save(path)
+
+
+def test_syntax_error_keeps_docx_context(tmp_path):
+    path = tmp_path / "bad.docx"
+    _docx(path, "Протокол", "Объект: {{ obj.name ", "конец")
+    with pytest.raises(TemplateSyntaxError) as ei:
+        template_cache.get_template(path).render({})
+    assert any("Объект" in line for line in ei.value.docx_context)
+
+
+def test_concurrent_miss_counts_bytes_once(tmp_path):
+    path = tmp_path / "ok.docx"
+    _docx(path, "{{ a }}")
+    template_cache.clear()
+    key = (str(path), 0, 0)
+    data = path.read_bytes()
+
+    def read_racing():
+        # второй поток промахивается по тому же пути, пока первый читает файл
+        template_cache._get(str(path), key, lambda: data)
+        return data
+
+    template_cache._get(str(path), key, read_racing)
+    st = template_cache.stats()
+    assert st["templates"] == 1 and st["bytes"] == len(data)
@@ -0,0 +1,41 @@
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.shared import Mm
+from docxtpl import DocxTemplate
+from PIL import Image
+
+import template_renderer
+
+
+def _template(path):
+    logo = path.with_name("logo.png")
+    Image.new("RGB", (20, 10), (0, 0, 255)).save(logo)
+    doc = Document()
+    sec = doc.sections[0]
+    sec.header.paragraphs[0].text = "Протокол {{ prt }}"
+    sec.header.paragraphs[0].add_run().add_picture(str(logo), width=Mm(10))
+    sec.footer.paragraphs[0].text = "{{ obj }}"
+    doc.add_paragraph("Тело {{ obj }}")
+    doc.save(path)
+
+
+def test_header_edits_survive_save(tmp_path):
+    src = tmp_path / "tpl.docx"
+    _template(src)
+    tpl = DocxTemplate(str(src))
+    tpl.render({"prt": "П-12", "obj": "Корпус 1"})
+
+    doc = template_renderer.rendered_document(tpl)
+    sec = doc.sections[0]
+    assert sec.header.paragraphs[0].text == "Протокол П-12"
+    sec.header.add_paragraph("Добавлено после рендера")
+    sec.footer.paragraphs[0].text += " (изм.)"
+
+    out = tmp_path / "out.docx"
+    doc.save(out)
+    sec = Document(out).sections[0]
+    assert [p.text for p in sec.header.paragraphs] == ["Протокол П-12", "Добавлено после рендера"]
+    assert sec.footer.paragraphs[0].text == "Корпус 1 (изм.)"
+    # картинка колонтитула (связь самой части колонтитула) не потерялась
+    assert [r.reltype for r in sec.header.part.rels.values()] == [RT.IMAGE]
+    assert Document(out).paragraphs[0].text == "Тело Корпус 1"
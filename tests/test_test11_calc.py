@@ -0,0 +1,186 @@
+import random
+from decimal import Decimal
+
+import pytest
+from docx import Document
+from docx.oxml.ns import qn
+
+import test11_calc as t11
+
+
+def _speeds(rng, n_rooms, n_filters, n_points):
+    return [
+        [[Decimal(rng.randint(0, 999)) / 100 for _ in range(n_points)] for _ in range(n_filters)]
+        for _ in range(n_rooms)
+    ]
+
+
+def test_room_values_match_calculator_formulas():
+    res = t11.compute([Decimal("0.36")], [[[Decimal("0.45"), Decimal("0.47")], [Decimal("0.5"), Decimal("0.5")]]],
+                      [Decimal("1200")])
+    room = res[0]
+    assert room.avgs == [Decimal("0.46"), Decimal("0.50")]
+    assert room.flows == [Decimal("596.16"), Decimal("648.00")]
+    assert room.total == Decimal("1244.16")
+    assert room.passed is True
+    assert t11.fmt_flow(room.total) == "1244,16"
+
+
+def test_missing_values_and_bad_area():
+    speeds = [[[Decimal("1"), None]], [[Decimal("1"), Decimal("-1")]], [[Decimal("1")]], [[Decimal("1")]]]
+    res = t11.compute([Decimal("1"), Decimal("1"), Decimal("0"), None], speeds, [Decimal("1")] * 4, use_numpy=True)
+    assert [r.avgs for r in res] == [[None], [None], [Decimal("1.00")], [Decimal("1.00")]]
+    assert all(r.total is None and r.passed is None for r in res)
+
+
+def test_numpy_batch_equals_decimal_reference():
+    rng = random.Random(11)
+    speeds = _speeds(rng, 40, 6, 9)
+    areas = [Decimal(rng.randint(1, 500)) / 100 for _ in speeds]
+    criteria = [Decimal(rng.randint(0, 40000)) for _ in speeds]
+    assert t11.compute(areas, speeds, criteria, use_numpy=True) == t11.compute(areas, speeds, criteria, use_numpy=False)
+
+
+def test_half_up_ties_and_exact_criterion():
+    # средняя 0,125 -> 0,13 (HALF_UP); расход 0,125·1·3600 = 450 ровно на критерии
+    speeds = [[[Decimal("0.12"), Decimal("0.13")]], [[Decimal("0.005"), Decimal("0.0")]]]
+    areas = [Decimal("1"), Decimal("0.5")]
+    criteria = [Decimal("450"), Decimal("4.5")]
+    for use_numpy in (True, False):
+        res = t11.compute(areas, speeds, criteria, use_numpy=use_numpy)
+        assert res[0].avgs == [Decimal("0.13")]
+        assert res[0].passed is True
+        assert res[1].avgs == [Decimal("0.00")]          # 0,0025 -> 0,00
+        assert res[1].flows == [Decimal("4.50")]
+        assert res[1].passed is True
+
+
+def test_live_calc_tracks_edits_incrementally():
+    rng = random.Random(13)
+    shape = [[3, 2], [4], [2, 2, 2]]
+    live = t11.LiveCalc(shape)
+    texts = [[["" for _ in range(k)] for k in room] for room in shape]
+    areas = ["0,36", "", "1,2"]
+    for r, a in enumerate(areas):
+        live.set_area(r, a)
+        live.set_criterion(r, "1500")
+    live.recalc()
+
+    for _ in range(300):
+        r = rng.randrange(len(shape))
+        f = rng.randrange(len(shape[r]))
+        p = rng.randrange(shape[r][f])
+        texts[r][f][p] = rng.choice(["", "-1", "x", "0,5", f"{rng.randint(0, 99)},{rng.randint(0, 99)}"])
+        live.set_point(r, f, p, texts[r][f][p])
+        filters, rooms = live.recalc()
+        assert filters <= {(r, f)} and rooms == {rr for rr, _ in filters}
+
+        expected = t11.compute([t11.parse_decimal(a) for a in areas],
+                               [[[t11.parse_decimal(x) for x in pts] for pts in room] for room in texts],
+                               [Decimal("1500")] * len(shape))
+        assert live.results == expected
+
+    live.set_point(0, 0, 0, texts[0][0][0])
+    live.set_criterion(0, "1500")
+    assert live.recalc() == (set(), set())
+    live.set_area(2, "2")
+    assert live.recalc() == ({(2, 0), (2, 1), (2, 2)}, {2})
+
+
+# ---------- блок результатов Теста 11 (tools/test11_airflow_calc) ----------
+FILTER, S, NUM, SPEED, FACT_L, FACT_R, CRIT = range(7)
+
+
+def _block_table(with_mean):
+    doc = Document()
+    rows = [
+        ["Помещение {room}", "Фильтр", "S", "№", "Скорость", "Расход", "Суммарный"],
+        ["{filter_num}", "{S}", "{num}", "{avg_speed}", "{fact}", "{fact}", "1500"],
+    ]
+    if with_mean:
+        # колонка фильтра в «Среднем» входит в объединение — подпись в колонке №
+        rows.append(["", "", "Среднее", "", "", "", ""])
+    rows.append(["Примечание", "", "", "", "", "", ""])
+    tbl = doc.add_table(rows=len(rows), cols=7)
+    for tr, texts in zip(tbl.rows, rows):
+        for cell, text in zip(tr.cells, texts):
+            cell.text = text
+    return tbl
+
+
+def _tc_text(tc):
+    return "".join(t.text or "" for t in tc.iter(qn("w:t")))
+
+
+def _rooms(calc, n_rooms, n_filters, n_points):
+    return [
+        calc.Test11Room(
+            room_value=f"{100 + r}:Комната {r}", klass="C", s_text=f"0,{r}5",
+            speeds=[[f"{r},{f}{p}" for p in range(n_points)] for f in range(n_filters)],
+            avgs=[f"ср{r}.{f}" for f in range(n_filters)],
+            flows=[f"q{r}.{f}" for f in range(n_filters)],
+            total=f"Σ{r}", criterion="2000" if r == 1 else None,
+        )
+        for r in range(n_rooms)
+    ]
+
+
+def _expected(rooms, with_mean):
+    """(вид строки, помещение, фильтр, точка) — в порядке вывода."""
+    out = []
+    for r, room in enumerate(rooms):
+        if r:
+            out.append(("head", r, None, None))
+        for f, pts in enumerate(room.speeds):
+            out += [("pt", r, f, p) for p in range(len(pts))]
+            if with_mean:
+                out.append(("mean", r, f, None))
+    return out
+
+
+def _vmerge(kind, f, p, col):
+    if kind == "head":
+        return None
+    first = kind == "pt" and p == 0
+    if col in (FILTER, S, FACT_L):
+        return "restart" if first else "continue"
+    if col in (FACT_R, CRIT):
+        return "restart" if first and f == 0 else "continue"
+    return None
+
+
+@pytest.mark.parametrize("shape", [(2, 2, 3), (3, 4, 5), (1, 1, 1), (2, 3, 1), (1, 2, 2)])
+@pytest.mark.parametrize("with_mean", [True, False])
+def test_results_block_rows_texts_and_vmerge(shape, with_mean):
+    calc = pytest.importorskip("tools.test11_airflow_calc")
+    tbl = _block_table(with_mean)
+    rooms = _rooms(calc, *shape)
+    cols = calc.Test11Columns(filter=FILTER, S=S, num=NUM, speed=SPEED,
+                              fact_left=FACT_L, fact_right=FACT_R, criterion=CRIT)
+    calc.write_results_block(tbl, 0, 1, 2 if with_mean else None, cols, rooms)
+
+    trs = list(tbl._tbl.tr_lst)
+    expected = _expected(rooms, with_mean)
+    assert len(trs) == 1 + len(expected) + 1
+    assert _tc_text(trs[0].tc_lst[0]) == "Помещение 100:Комната 0"
+    assert _tc_text(trs[-1].tc_lst[0]) == "Примечание"
+
+    for tr, (kind, r, f, p) in zip(trs[1:-1], expected):
+        tcs = tr.tc_lst
+        texts = [_tc_text(tc) for tc in tcs]
+        room = rooms[r]
+        if kind == "head":
+            assert texts[0] == f"Помещение {room.room_value}"
+            assert all(tc.vMerge is None for tc in tcs)
+            continue
+        assert [tc.vMerge for tc in tcs] == [_vmerge(kind, f, p, c) for c in range(7)]
+        if kind == "mean":
+            assert texts[NUM] == "Среднее" and texts[SPEED] == room.avgs[f]
+            continue
+        assert texts[NUM] == str(p + 1) and texts[SPEED] == room.speeds[f][p]
+        first = p == 0
+        assert texts[FILTER] == (str(f + 1) if first else "")
+        assert texts[S] == (room.s_text if first else "")
+        assert texts[FACT_L] == (room.flows[f] if first else "")
+        assert texts[FACT_R] == (room.total if first and f == 0 else "")
+        assert texts[CRIT] == ((room.criterion or "1500") if first and f == 0 else "")
@@ -0,0 +1,68 @@
+import math
+import random
+
+from word_facade import (
+    FakeDocument, first_row_past_page, first_row_past_page_linear, split_by_pages,
+)
+
+
+def _doc(rows, seed, page_height=5000):
+    rnd = random.Random(seed)
+    doc = FakeDocument(page_height=page_height)
+    doc.add_paragraph(rnd.randint(0, page_height - 1000))
+    t = doc.add_table([400] + [rnd.randint(100, 900) for _ in range(rows)])
+    doc.repaginate()
+    return doc, t
+
+
+def test_search_matches_linear_with_log_probes():
+    for seed in range(50):
+        doc, t = _doc(200, seed)
+        probe = doc.probe(t)
+        page = probe.row_page(1)
+        expected = first_row_past_page_linear(probe, page, 2)
+        for hint in (None, 1, 7, 30):
+            doc.probes = 0
+            assert first_row_past_page(probe, page, 2, hint=hint) == expected
+            assert doc.probes <= 2 * math.ceil(math.log2(200)) + 2
+
+
+def test_nothing_past_page():
+    doc, t = _doc(3, 0, page_height=100000)
+    probe = doc.probe(t)
+    assert first_row_past_page(probe, probe.row_page(1), 2) is None
+
+
+def test_unreadable_rows_are_skipped_like_linear():
+    for seed in range(200):
+        rnd = random.Random(seed)
+        doc, t = _doc(60, seed, page_height=3000)
+        probe = doc.probe(t)
+        page = probe.row_page(1)
+        pages = doc._pages[id(t)]
+        cut = next((i for i, pg in enumerate(pages) if pg > page), len(pages) - 1)
+        # Word не ответил про саму строку разреза и/или случайные строки
+        for i in {cut, *rnd.sample(range(1, 60), rnd.randint(1, 20))}:
+            pages[i] = None
+        expected = first_row_past_page_linear(probe, page, 2)
+        for hint in (None, 1, 5, cut, 40):
+            assert first_row_past_page(probe, page, 2, hint=hint) == expected
+
+
+def test_split_by_pages_fits_each_part_on_one_page():
+    doc, t = _doc(300, 1)
+    data = list(t.heights[1:])
+    splits = split_by_pages(doc, t, header_rows=1, title="Продолжение таблицы 2", max_splits=100)
+    parts = doc.tables()
+    assert splits == len(parts) - 1 > 5
+    assert [h for p in parts for h in p.heights[1:]] == data
+    doc.repaginate()
+    for p in parts:
+        pages = doc._pages[id(p)]
+        assert pages[0] == pages[-1]
+    assert all(p.title == "Продолжение таблицы 2" for p in parts[1:])
+
+    doc2, t2 = _doc(300, 1)
+    split_by_pages(doc2, t2, header_rows=1, title="x", max_splits=100,
+                   search=first_row_past_page_linear)
+    assert doc.probes < doc2.probes / 2
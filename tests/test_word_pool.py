@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from word_pool import FakeBackend, WordPool
+
+
+def test_session_launches_word_once():
+    backend = FakeBackend()
+    pool = WordPool(backend)
+    with pool.session():
+        pool.finalize("protocol.docx", ("split_table5", "test11_3_headers", "fields", "toc"))
+        pool.finalize("report.docx", ("split_table2", "fields", "toc"))
+        assert backend.quits == 0
+    assert backend.launches == 1 and backend.quits == 1
+    assert backend.saved == ["protocol.docx", "report.docx"]
+    assert [op for _, op in backend.log][:4] == ["split_table5", "test11_3_headers", "fields", "toc"]
+    assert len(backend.threads) == 1 and threading.get_ident() not in backend.threads
+    pool.shutdown()
+
+
+def test_quit_outside_session_and_keep_warm():
+    backend = FakeBackend()
+    pool = WordPool(backend)
+    pool.finalize("a.docx", ("fields",))
+    pool.finalize("b.docx", ("fields",))
+    assert backend.launches == 2 and backend.quits == 2
+
+    warm = FakeBackend()
+    pool = WordPool(warm, keep_warm=True, idle_timeout=0)
+    pool.finalize("a.docx", ("fields",))
+    pool.finalize("b.docx", ("fields",))
+    assert warm.launches == 1 and warm.quits == 0
+    pool.shutdown()
+    assert warm.quits == 1
+
+
+def test_failed_op_and_dead_word():
+    backend = FakeBackend(fail_ops=("split_table2",))
+    pool = WordPool(backend, keep_warm=True, idle_timeout=0)
+    res = pool.finalize("report.docx", ("split_table2", "fields", lambda app, doc, c: 42))
+    assert isinstance(res["split_table2"], RuntimeError) and res["<lambda>"] == 42
+    assert [op for _, op in backend.log] == ["split_table2", "fields", "<lambda>"]
+    assert backend.saved == ["report.docx"]
+
+    backend.kill()
+    pool.finalize("report.docx", ("fields",))
+    assert backend.launches == 2
+    pool.shutdown()
+
+
+def test_closed_pool_starts_no_thread():
+    backend = FakeBackend()
+    pool = WordPool(backend, keep_warm=True, idle_timeout=0)
+    pool.finalize("a.docx", ("fields",))
+    pool.shutdown()
+    threads = threading.active_count()
+    pool._idle_fire()            # таймер простоя сработал после shutdown()
+    assert pool._executor is None and threading.active_count() == threads
+    with pytest.raises(RuntimeError):
+        pool.finalize("b.docx", ("fields",))
+    assert backend.launches == 1
+
+
+def test_missing_pywin32_is_a_logged_no_op():
+    class NoWin32(FakeBackend):
+        def thread_init(self):
+            raise ImportError("No module named 'pythoncom'")
+
+    pool = WordPool(NoWin32())
+    assert pool.finalize("a.docx", ("split_table5", "fields")) == {}
+    pool.shutdown()
+
+
+@pytest.mark.parametrize("error", [OSError("документ не открылся"), ImportError("No module named 'pythoncom'")])
+def test_shutdown_during_finalize_keeps_original_error(error):
+    class ClosingBackend(FakeBackend):
+        def open(self, app, path):
+            # shutdown() из другого потока (atexit/GUI) посреди finalize
+            t = threading.Thread(target=pool.shutdown)
+            t.start()
+            while not pool._closed:
+                time.sleep(0.001)
+            closer.append(t)
+            raise error
+
+    closer = []
+    backend = ClosingBackend()
+    pool = WordPool(backend)
+    if isinstance(error, ImportError):
+        assert pool.finalize("a.docx", ("fields",)) == {}
+    else:
+        with pytest.raises(OSError, match="не открылся"):
+            pool.finalize("a.docx", ("fields",))
+    closer[0].join()
+    assert backend.quits == 1 and pool._executor is None
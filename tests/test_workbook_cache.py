@@ -0,0 +1,50 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook
+
+import workbook_cache
+
+
+def _book(path, extra=None):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Оборудование"
+    ws.append(["Наименование", "Зав. номер", "Дата поверки", "Балл", None])
+    ws.append(["Анемометр", 84360366, datetime(2025, 3, 1), 2.0])
+    ws.append([None, None, None, None])
+    ws.append(["Термометр", "A-1", None, 2.5, None])
+    if extra:
+        ws.append([extra])
+    wb.create_sheet("Пусто")
+    wb.save(path)
+
+
+def test_frame_matches_read_excel_and_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "eq.xlsx"
+    _book(path)
+
+    for sheet in ("Оборудование", "Пусто"):
+        pd.testing.assert_frame_equal(
+            workbook_cache.frame(path, sheet), pd.read_excel(path, sheet_name=sheet, dtype=str)
+        )
+    book = workbook_cache.get_book(path)
+    assert book.sheet_names == ["Оборудование", "Пусто"] and book.rows()[1][1] == 84360366
+
+    # новая сессия: книга берётся из снимка, Excel не читается
+    workbook_cache.clear()
+    monkeypatch.setattr(workbook_cache, "_read_book", lambda *a: (_ for _ in ()).throw(AssertionError))
+    assert workbook_cache.get_book(path).sheets == book.sheets
+    calls = []
+    assert workbook_cache.derived(path, "n", lambda b: calls.append(1) or len(b.rows())) == 4
+    assert workbook_cache.derived(path, "n", lambda b: calls.append(1) or 0) == 4 and calls == [1]
+    monkeypatch.undo()
+
+    # файл изменился -> перечитывается
+    monkeypatch.setenv("OQGEN_CACHE_DIR", str(tmp_path / "cache"))
+    _book(path, extra="Гигрометр")
+    os.utime(path, ns=(book.stamp[0] + 10**9, book.stamp[0] + 10**9))
+    assert workbook_cache.get_book(path).rows()[-1] == ("Гигрометр",)
+    assert workbook_cache.derived(path, "n", lambda b: len(b.sheets)) == 2   # derived сброшен вместе с книгой
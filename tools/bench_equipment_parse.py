@@ -0,0 +1,127 @@
+"""
+Замер разбора перечня приборов: io_manager._parse_equipment_df по колонкам
+против прежнего построчного (iterrows) на синтетической книге.
+
+    python tools/bench_equipment_parse.py --rows 10000 --sheets 20
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+import io_manager  # noqa: E402
+import workbook_cache  # noqa: E402
+
+HEADERS = [
+    "№ п/п", "Наименование ", "Зав. (серийный) номер", "Определяемые показатели",
+    "№ свидетельства о поверке", "Дата поверки", "Срок действия поверки",
+]
+
+
+def parse_iterrows(df: pd.DataFrame) -> List[dict]:
+    """Прежняя реализация _parse_equipment_df — эталон результата и времени."""
+    df = df.copy()
+    df.rename(columns=lambda c: str(c).strip(), inplace=True)
+
+    name_col  = next((c for c in df.columns if "Наименование" in c), None)
+    sn_col    = next((c for c in df.columns if "зав" in str(c).lower()), None)
+    param_col = next((c for c in df.columns if "Определяемые показатели" in c), None)
+    cert_col  = next((c for c in df.columns if "№ свидетельств" in c or "№ свидетельтва" in c), None)
+    date_col  = next((c for c in df.columns if "Дата поверки" in c), None)
+    until_col = next((c for c in df.columns if "Срок действия поверки" in c), None)
+
+    if not name_col or not sn_col:
+        raise ValueError("Нет колонок «Наименование»/«Зав. (серийный) номер»")
+
+    items: List[dict] = []
+    for _, row in df.iterrows():
+        nm = str(row[name_col]).strip() if pd.notna(row[name_col]) else ""
+        if not nm:
+            continue
+        sn = str(row[sn_col]).strip() if pd.notna(row[sn_col]) else ""
+        items.append({
+            "name_sn": f"{nm}, {sn}".strip(", "),
+            "params": str(row[param_col]).strip() if param_col and pd.notna(row.get(param_col)) else "",
+            "cert":   str(row[cert_col]).strip()  if cert_col  and pd.notna(row.get(cert_col))  else "",
+            "date":   str(row[date_col]).strip()  if date_col  and pd.notna(row.get(date_col))  else "",
+            "until":  str(row[until_col]).strip() if until_col and pd.notna(row.get(until_col)) else "",
+        })
+    return items
+
+
+def make_book(path: Path, rows: int, sheets: int, seed: int) -> None:
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    per_sheet = max(1, rows // sheets)
+    day0 = datetime(2024, 1, 1)
+    for si in range(sheets):
+        ws = wb.create_sheet(f"Лист {si + 1}")
+        ws.append(HEADERS)
+        for ri in range(per_sheet):
+            if rnd.random() < 0.03:
+                ws.append([])                    # пустая строка-разделитель
+                continue
+            d = day0 + timedelta(days=rnd.randint(0, 700))
+            ws.append([
+                ri + 1,
+                rnd.choice(["Анемометр Testo 417", " Термогигрометр ИВА-6 ", "Счетчик частиц", ""]),
+                rnd.choice([rnd.randint(10**7, 10**9), f"SN-{rnd.randint(1, 9999)}", None]),
+                rnd.choice(["Скорость воздуха", "Температура, влажность", None]),
+                f"С-{rnd.randint(1, 99)}/{rnd.randint(1, 99999)}" if rnd.random() < 0.9 else None,
+                d if rnd.random() < 0.8 else d.strftime("%d.%m.%Y"),
+                d + timedelta(days=365),
+            ])
+    wb.save(path)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=10000, help="строк всего (делятся между листами)")
+    ap.add_argument("--sheets", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3)
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "perechen.xlsx"
+        make_book(path, a.rows, a.sheets, a.seed)
+        book = workbook_cache.get_book(path)
+        frames = [workbook_cache.frame(path, s) for s in book.sheet_names]
+
+        def timed(fn):
+            best = float("inf")
+            for _ in range(a.repeat):
+                t0 = time.perf_counter()
+                out = [fn(df) for df in frames]
+                best = min(best, time.perf_counter() - t0)
+            return out, best
+
+        old, t_old = timed(parse_iterrows)
+        new, t_new = timed(io_manager._parse_equipment_df)
+        if old != new:
+            print("ОШИБКА: результаты различаются")
+            return 1
+
+        n = sum(len(x) for x in new)
+        print(f"{a.sheets} листов, {n} приборов")
+        print(f"  iterrows:      {t_old * 1000:8.1f} мс")
+        print(f"  по колонкам:   {t_new * 1000:8.1f} мс   (x{t_old / t_new:.1f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,48 @@
+"""
+Замер поиска строки разреза на поддельном Word (word_facade.FakeDocument):
+деление пополам против прежнего линейного перебора. Работает без Word.
+
+    python tools/bench_word_split.py --rows 400 --probe-ms 5
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from word_facade import (  # noqa: E402
+    FakeDocument, first_row_past_page, first_row_past_page_linear, split_by_pages,
+)
+
+
+def run(search, rows: int, probe_ms: float, seed: int):
+    rnd = random.Random(seed)
+    doc = FakeDocument(page_height=14000, probe_cost=probe_ms / 1000.0)
+    doc.add_paragraph(3000)
+    t = doc.add_table([900] + [rnd.randint(300, 1500) for _ in range(rows)])
+    t0 = time.perf_counter()
+    splits = split_by_pages(doc, t, header_rows=1, title="Продолжение таблицы 2",
+                            max_splits=rows, search=search)
+    return splits, doc.probes, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=400)
+    ap.add_argument("--probe-ms", type=float, default=0.0, help="задержка на запрос (имитация COM)")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+    for name, fn in (("линейно", first_row_past_page_linear), ("пополам", first_row_past_page)):
+        splits, probes, dt = run(fn, a.rows, a.probe_ms, a.seed)
+        print(f"{name:8}: разрезов {splits}, запросов страниц {probes}, {dt:.3f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,36 @@
 from __future__ import annotations
 
 import argparse
+import io
 import re
 import sys
 from copy import deepcopy
 from dataclasses import dataclass
 from datetime import datetime
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP, getcontext
+from decimal import Decimal
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from PySide6.QtCore import Qt, QTimer, QObject, QEvent
+from PySide6.QtCore import Qt, QTimer, QAbstractTableModel, QEventLoop, QModelIndex, Signal
 from PySide6.QtGui import QKeySequence
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
     QFileDialog, QMessageBox, QSpinBox, QTableWidget, QTableWidgetItem,
-    QGridLayout, QVBoxLayout, QHBoxLayout, QScrollArea, QFrame
+    QTableView, QAbstractItemView, QVBoxLayout, QHBoxLayout, QFrame
 )
 
 from docx import Document
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+from docx.table import _Cell, _Row
 
-# ---------- Настройки точности ----------
-getcontext().prec = 28
+# при запуске скриптом (python tools/test11_airflow_calc.py) корня проекта нет в sys.path — нужен для test11_calc/table_merge
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
 
-ROUNDING_MODE = ROUND_HALF_UP
-SPEED_PLACES = 2
-FLOW_PLACES = 2
-AREA_PLACES = 2
-SEC_PER_HOUR = Decimal(3600)
+import table_merge  # noqa: E402
+from test11_calc import (  # noqa: E402
+    LiveCalc, compute, fmt_area, fmt_flow, fmt_speed, parse_decimal, to_decimal,
+)
 
 # ---------- CLI ----------
 CLI = argparse.Namespace(
@@ -44,36 +45,25 @@ CLI = argparse.Namespace(
     airflows=[],  # проектные расходы м3/ч по помещениям
     auto_save="",
     auto_close=False,
+    in_memory=False,  # «Сохранить» не пишет файл, а отдаёт Test11Result (run_calculator)
 )
 
-# ---------- Decimal utils ----------
-def to_decimal(s: str) -> Decimal:
-    s = (str(s).strip()
-         .replace("\u00A0", "")
-         .replace("\u202F", "")
-         .replace(" ", "")
-         .replace(",", "."))
-    try:
-        return Decimal(s)
-    except InvalidOperation:
-        raise ValueError(f"Некорректное число: «{s}»")
 
-def fmt(n: Decimal, places=2) -> str:
-    q = Decimal(10) ** -places
-    return str(n.quantize(q, rounding=ROUNDING_MODE)).replace(".", ",")
+def make_config(**kw) -> argparse.Namespace:
+    """Настройки окна: значения по умолчанию из CLI + kw (списки — по помещениям)."""
+    return argparse.Namespace(**{**vars(CLI), **kw})
 
-def fmt_speed(x: Decimal) -> str: return fmt(x, SPEED_PLACES)
-def fmt_flow(x: Decimal) -> str: return fmt(x, FLOW_PLACES)
-def fmt_area(x: Decimal) -> str: return fmt(x, AREA_PLACES)
 
-def _safe_parse_decimal(s: str) -> Optional[Decimal]:
-    s = (s or "").strip()
-    if not s:
-        return None
-    try:
-        return to_decimal(s)
-    except Exception:
-        return None
+@dataclass
+class Test11Result:
+    """Результат калькулятора в памяти: DOCX тестов с заполненной таблицей и итоги по помещениям."""
+    template: str
+    docx: bytes
+    flows: List[Optional[Decimal]]
+
+# ---------- Decimal utils ----------
+# арифметика и форматирование — в test11_calc (общие с основным приложением)
+_safe_parse_decimal = parse_decimal
 
 def _to_int(s: str, default: int = 0) -> int:
     try:
@@ -81,6 +71,11 @@ def _to_int(s: str, default: int = 0) -> int:
     except Exception:
         return default
 
+def _set_text(w, text: str):
+    # setText с перерисовкой/пересчётом геометрии — только если текст правда другой
+    if w.text() != text:
+        w.setText(text)
+
 # ---------- DOCX helpers ----------
 def write_cell_text(cell, text: str):
     p = cell.paragraphs[0] if cell.paragraphs else cell.add_paragraph()
@@ -112,64 +107,14 @@ def get_cell_safe(row, col_idx):
         return None
     return None
 
-def write_if_cell(row, col_idx, text: str):
-    c = get_cell_safe(row, col_idx)
-    if c is not None:
-        write_cell_text(c, text)
-
 def _norm_head(s: str) -> str:
     s = s.replace("\u00A0", " ").replace("\u202F", " ").lower()
     s = s.replace("ё", "е")
     return re.sub(r"[^a-zа-я]+", "", s)
 
-def insert_copies_after_tr(last_tr, template_tr, times=1):
-    cur = last_tr
-    for _ in range(times):
-        cp = deepcopy(template_tr)
-        cur.addnext(cp)
-        cur = cp
-    return cur
-
-# --- vMerge ---
-def clear_vmerge(cell):
-    tcPr = cell._tc.get_or_add_tcPr()
-    for child in list(tcPr):
-        if child.tag.endswith("}vMerge"):
-            tcPr.remove(child)
-
+# --- vMerge (общий движок — table_merge) ---
 def set_vmerge(cell, restart=False):
-    tcPr = cell._tc.get_or_add_tcPr()
-    for child in list(tcPr):
-        if child.tag.endswith("}vMerge"):
-            tcPr.remove(child)
-    vMerge = OxmlElement("w:vMerge")
-    vMerge.set(qn("w:val"), "restart" if restart else "continue")
-    tcPr.append(vMerge)
-
-def vmerge_cells(cells, top_value):
-    if not cells:
-        return
-    for c in cells:
-        clear_vmerge(c)
-    write_cell_text(cells[0], top_value)
-    set_vmerge(cells[0], restart=True)
-    for c in cells[1:]:
-        write_cell_text(c, "")
-        set_vmerge(c, restart=False)
-
-def collect_column_cells(table, start_row, n_rows, col_idx):
-    if col_idx is None:
-        return []
-    if start_row < 0 or start_row + n_rows > len(table.rows):
-        return []
-    out = []
-    for r in range(start_row, start_row + n_rows):
-        row = table.rows[r]
-        c = get_cell_safe(row, col_idx)
-        if c is None:
-            return []
-        out.append(c)
-    return out
+    table_merge.set_vmerge(cell._tc, restart)
 
 # --- поиск таблицы Test11 ---
 def find_table_and_template_row(doc):
@@ -197,16 +142,18 @@ def find_table_and_template_row(doc):
     return None, None, None, None, None, None, None, None
 
 def find_header_row(table, below_row_idx):
+    rows = list(table.rows)
     for r in range(below_row_idx - 1, -1, -1):
-        row_text = " | ".join(cell_text_all_runs(c).lower() for c in iter_cells_safe(table.rows[r]))
+        row_text = " | ".join(cell_text_all_runs(c).lower() for c in iter_cells_safe(rows[r]))
         if ("помещен" in row_text) or ("{$#}" in row_text) or ("{room}" in row_text) or ("###" in row_text):
             return r
     return None
 
 def find_yes_no_columns(table, before_row_idx):
     col_yes = col_no = None
+    rows = list(table.rows)
     for r in range(before_row_idx - 1, -1, -1):
-        for c, cell in enumerate(iter_cells_safe(table.rows[r])):
+        for c, cell in enumerate(iter_cells_safe(rows[r])):
             t = _norm_head(cell_text_all_runs(cell))
             if col_yes is None and (("да" in t) or ("yes" in t)):
                 col_yes = c
@@ -220,9 +167,10 @@ def find_mean_row_near(table, start_row, span):
     keys = ("средне", "average")
     def norm(s: str) -> str:
         return " ".join(s.replace("\u00A0", " ").replace("\u202F", " ").lower().split())
-    end = min(start_row + span + 2, len(table.rows))
+    rows = list(table.rows)
+    end = min(start_row + span + 2, len(rows))
     for r in range(start_row, end):
-        row_text = norm(" | ".join(cell_text_all_runs(c) for c in iter_cells_safe(table.rows[r])))
+        row_text = norm(" | ".join(cell_text_all_runs(c) for c in iter_cells_safe(rows[r])))
         if any(k in row_text for k in keys):
             return r
     return None
@@ -277,6 +225,143 @@ def replace_room_in_row(row, room_value: str, klass: str = ""):
             base = base.replace("###", klass)
         write_cell_text(c0, base)
 
+# ---------- Потоковая сборка блока результатов ----------
+@dataclass
+class Test11Columns:
+    """Колонки сетки строки-шаблона (как в find_table_and_template_row)."""
+    filter: int
+    S: int
+    num: int
+    speed: int
+    fact_left: int
+    fact_right: Optional[int] = None
+    criterion: Optional[int] = None
+
+
+@dataclass
+class Test11Room:
+    """Готовые (отформатированные) значения одного помещения."""
+    room_value: str
+    klass: str
+    s_text: str
+    speeds: List[List[str]]        # [фильтр][точка]
+    avgs: List[str]                # средняя по фильтру
+    flows: List[str]               # расход по фильтру
+    total: str                     # фактический суммарный по помещению
+    criterion: Optional[str] = None
+
+
+def _grid_map(tr) -> List[Optional[int]]:
+    # колонка сетки -> индекс w:tc среди детей w:tr; None — продолжение vMerge (ячейку не трогаем)
+    out: List[Optional[int]] = []
+    for tc in tr.tc_lst:
+        idx = None if tc.vMerge == "continue" else tr.index(tc)
+        out.extend([idx] * tc.grid_span)
+    return out
+
+
+def _cell_at(table, tr, grid, col):
+    if col is None or col < 0 or col >= len(grid) or grid[col] is None:
+        return None
+    return _Cell(tr[grid[col]], table)
+
+
+def iter_results_rows(table, header_tr, data_tr, mean_tr, cols: Test11Columns, rooms: List[Test11Room]):
+    """
+    Строки блока результатов за один проход, по порядку:
+      [шапка помещения (кроме первого)] + по каждому фильтру: точки + «Среднее».
+    vMerge (restart/continue) ставится сразу в прототипах строк, поэтому
+    ни объединение, ни запись не обращаются к table.rows.
+    Шапка первого помещения правится на месте вызывающим.
+    """
+    grid = _grid_map(data_tr)
+    filter_cols = [c for c in (cols.filter, cols.S, cols.fact_left) if c is not None]
+    room_cols = [c for c in (cols.fact_right, cols.criterion) if c is not None]
+    default_criterion = cell_text_all_runs(_cell_at(table, data_tr, grid, cols.criterion))
+
+    def proto(tpl, tpl_grid, restart_cols):
+        tr = deepcopy(tpl)
+        for col in filter_cols + room_cols:
+            c = _cell_at(table, tr, tpl_grid, col)
+            if c is None:
+                continue
+            write_cell_text(c, "")
+            set_vmerge(c, restart=col in restart_cols)
+        return tr
+
+    p_room_first = proto(data_tr, grid, filter_cols + room_cols)
+    p_filter_first = proto(data_tr, grid, filter_cols)
+    p_other = proto(data_tr, grid, [])
+    mean_grid = _grid_map(mean_tr) if mean_tr is not None else []
+    p_mean = proto(mean_tr, mean_grid, []) if mean_tr is not None else None
+
+    def put(tr, tpl_grid, col, text):
+        c = _cell_at(table, tr, tpl_grid, col)
+        if c is not None:
+            write_cell_text(c, text)
+
+    for r, room in enumerate(rooms):
+        if r > 0:
+            tr = deepcopy(header_tr)
+            replace_room_in_row(_Row(tr, table), room.room_value, room.klass)
+            yield tr
+
+        for f, pts in enumerate(room.speeds):
+            for i, speed in enumerate(pts):
+                if i:
+                    tr = deepcopy(p_other)
+                else:
+                    tr = deepcopy(p_room_first if f == 0 else p_filter_first)
+                    put(tr, grid, cols.filter, str(f + 1))
+                    put(tr, grid, cols.S, room.s_text)
+                    put(tr, grid, cols.fact_left, room.flows[f])
+                    if f == 0:
+                        put(tr, grid, cols.fact_right, room.total)
+                        put(tr, grid, cols.criterion, room.criterion or default_criterion)
+                put(tr, grid, cols.num, str(i + 1))
+                put(tr, grid, cols.speed, speed)
+                yield tr
+
+            if p_mean is not None:
+                tr = deepcopy(p_mean)
+                put(tr, mean_grid, cols.speed, room.avgs[f])
+                yield tr
+
+
+def append_rows_after(anchor_tr, rows):
+    """Вставляет строки подряд после anchor_tr (без переиндексации таблицы). Возвращает последнюю."""
+    last = anchor_tr
+    for tr in rows:
+        last.addnext(tr)
+        last = tr
+    return last
+
+
+def write_results_block(table, header_row_idx: int, tpl_row: int, mean_row_idx: Optional[int],
+                        cols: Test11Columns, rooms: List[Test11Room]) -> None:
+    """
+    Заменяет строку-шаблон (и строку «Среднее») блоком результатов всех помещений.
+    Строки до шаблона и после «Среднего» (комментарии и т.п.) остаются на месте.
+    """
+    rows = list(table.rows)
+    data_tr = rows[tpl_row]._tr
+    mean_tr = rows[mean_row_idx]._tr if mean_row_idx is not None else None
+
+    header_row = rows[header_row_idx]
+    replace_room_in_row(header_row, rooms[0].room_value, rooms[0].klass)
+    header_tpl = deepcopy(header_row._tr)
+
+    # шаблоны читаем до удаления: _grid_map/ячейки не зависят от положения в таблице
+    data_tpl = deepcopy(data_tr)
+    mean_tpl = deepcopy(mean_tr) if mean_tr is not None else None
+
+    anchor = data_tr.getprevious()
+    for tr in (data_tr, mean_tr):
+        if tr is not None and tr.getparent() is not None:
+            tr.getparent().remove(tr)
+
+    append_rows_after(anchor, iter_results_rows(table, header_tpl, data_tpl, mean_tpl, cols, rooms))
+
 # ---------- Excel-like QTableWidget ----------
 class SpreadsheetTable(QTableWidget):
     """QTableWidget с Excel-вставкой/копированием."""
@@ -339,7 +424,7 @@ class SpreadsheetTable(QTableWidget):
                 it.setText(val)
         return True
 
-# ---------- Пастинг матрицы в QLineEdit скоростей ----------
+# ---------- Пастинг матрицы скоростей ----------
 def _split_paste_matrix(text: str) -> List[str]:
     text = text.strip()
     if not text:
@@ -358,33 +443,179 @@ def _split_paste_matrix(text: str) -> List[str]:
             vals.extend([c.strip() for c in re.split(r"\s+", line) if c.strip() != ""])
     return vals
 
-class SpeedPasteFilter(QObject):
+# ---------- Сетка скоростей (model/view) ----------
+class SpeedGridModel(QAbstractTableModel):
     """
-    Ctrl+V в любом speed QLineEdit:
-    если в буфере матрица, вставляем последовательно в speed_fields_flat начиная с текущего.
+    Скорости всех помещений одной таблицей: строка — фильтр помещения,
+    столбцы — «Помещение», «Фильтр», точки и итоги. Тексты и разобранные
+    значения лежат в LiveCalc, виджетов на точку нет: QTableView рисует
+    и редактирует (делегатом) только видимые ячейки.
     """
-    def __init__(self, get_flat_list, schedule_live_update):
-        super().__init__()
-        self._get_flat_list = get_flat_list
-        self._schedule_live_update = schedule_live_update
-
-    def eventFilter(self, obj, event):
-        if event.type() == QEvent.KeyPress:
-            if event.matches(QKeySequence.Paste):
-                data = QApplication.clipboard().text()
-                if any(sym in data for sym in ("\n", "\r", "\t", ";")):
-                    vals = _split_paste_matrix(data)
-                    if not vals:
-                        return True
-                    flat = self._get_flat_list()
-                    if not hasattr(obj, "_flat_idx"):
-                        return False
-                    start = int(getattr(obj, "_flat_idx"))
-                    for w, v in zip(flat[start:], vals):
-                        w.setText(v)
-                    self._schedule_live_update()
-                    return True
-        return False
+    HEAD = ["Помещение", "Фильтр"]
+    TAIL = ["S, м²", "Средняя (м/с)", "Итого факт (м³/ч)",
+            "Критерий (м³/ч)", "Итого помещения (м³/ч)", "Результат"]
+
+    def __init__(self, live: LiveCalc, on_edited, parent=None):
+        super().__init__(parent)
+        self._live = live
+        self._on_edited = on_edited
+        self._rows: List[Tuple[int, int]] = []  # строка -> (помещение, фильтр)
+        self._first_row: List[int] = []         # помещение -> его первая строка
+        self._room_titles: List[str] = []
+        self._points = 0
+
+    def reset(self, room_nums: List[str]):
+        """Перестроить строки под текущую форму LiveCalc (после live.reset)."""
+        self.beginResetModel()
+        texts = self._live.texts
+        self._rows = [(r, f) for r, room in enumerate(texts) for f in range(len(room))]
+        self._first_row = []
+        n = 0
+        for room in texts:
+            self._first_row.append(n)
+            n += len(room)
+        self._room_titles = [f"Помещение {n}" for n in room_nums]
+        self._points = max((len(pts) for room in texts for pts in room), default=0)
+        self.endResetModel()
+
+    def _tail0(self) -> int:
+        return len(self.HEAD) + self._points
+
+    def point_at(self, row: int, col: int) -> Optional[Tuple[int, int, int]]:
+        p = col - len(self.HEAD)
+        if not (0 <= row < len(self._rows)) or p < 0:
+            return None
+        r, f = self._rows[row]
+        return (r, f, p) if p < len(self._live.texts[r][f]) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._tail0() + len(self.TAIL)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or orientation != Qt.Horizontal:
+            return None
+        if section < len(self.HEAD):
+            return self.HEAD[section]
+        if section < self._tail0():
+            return f"Точка {section - len(self.HEAD) + 1}"
+        return self.TAIL[section - self._tail0()]
+
+    def flags(self, index):
+        if self.point_at(index.row(), index.column()) is not None:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+        if len(self.HEAD) <= index.column() < self._tail0():
+            return Qt.NoItemFlags  # у фильтра меньше точек, чем столбцов
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        row, col = index.row(), index.column()
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter) if col >= len(self.HEAD) else None
+        if role not in (Qt.DisplayRole, Qt.EditRole) or not (0 <= row < len(self._rows)):
+            return None
+        r, f = self._rows[row]
+        pt = self.point_at(row, col)
+        if pt is not None:
+            return self._live.texts[r][f][pt[2]]
+        if col == 0:
+            return self._room_titles[r] if f == 0 else ""
+        if col == 1:
+            return str(f + 1)
+        if col < self._tail0():
+            return None
+        return self._summary(r, f, col - self._tail0())
+
+    def _summary(self, r: int, f: int, k: int) -> str:
+        live = self._live
+        res = live.results[r]
+        flow = res.flows[f]
+        if k == 0:
+            return fmt_area(live.areas[r]) if live.areas[r] is not None else "—"
+        if k == 1:
+            # средняя без площади не показывается — как и расход
+            return fmt_speed(res.avgs[f]) if flow is not None else "—"
+        if k == 2:
+            return fmt_flow(flow) if flow is not None else "—"
+        if f != 0:
+            return ""  # итоги помещения — в строке его первого фильтра
+        if k == 3:
+            return fmt_flow(live.criteria[r]) if live.criteria[r] is not None else "—"
+        if k == 4:
+            return fmt_flow(res.total) if res.total is not None else "—"
+        return "—" if res.passed is None else ("ДА" if res.passed else "НЕТ")
+
+    def setData(self, index, value, role=Qt.EditRole):
+        pt = self.point_at(index.row(), index.column()) if role == Qt.EditRole else None
+        if pt is None:
+            return False
+        self._live.set_point(*pt, "" if value is None else str(value))
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self._on_edited()
+        return True
+
+    def set_points(self, row: int, col: int, vals: List[str]) -> int:
+        """Значения подряд (помещение → фильтр → точка), начиная с ячейки (row, col)."""
+        start = self.point_at(row, col)
+        if start is None:
+            return 0
+        n = 0
+        last = start
+        for last, v in zip(self._live.points_from(*start), vals):
+            self._live.set_point(*last, v)
+            n += 1
+        if n:
+            self._emit_points(row, self._first_row[last[0]] + last[1])
+        return n
+
+    def clear_points(self, indexes) -> None:
+        rows = []
+        for idx in indexes:
+            pt = self.point_at(idx.row(), idx.column())
+            if pt is not None:
+                self._live.set_point(*pt, "")
+                rows.append(idx.row())
+        if rows:
+            self._emit_points(min(rows), max(rows))
+
+    def _emit_points(self, top: int, bottom: int) -> None:
+        self.dataChanged.emit(self.index(top, len(self.HEAD)), self.index(bottom, self._tail0() - 1),
+                              [Qt.DisplayRole, Qt.EditRole])
+        self._on_edited()
+
+    def refresh(self, filters, rooms) -> None:
+        """Итоги только пересчитанных фильтров/помещений (LiveCalc.recalc)."""
+        c0 = self._tail0()
+        for r, f in filters:
+            row = self._first_row[r] + f
+            self.dataChanged.emit(self.index(row, c0), self.index(row, c0 + 2), [Qt.DisplayRole])
+        for r in rooms:
+            row = self._first_row[r]
+            self.dataChanged.emit(self.index(row, c0 + 3), self.index(row, c0 + 5), [Qt.DisplayRole])
+
+
+class SpeedGridView(QTableView):
+    """
+    Ctrl+V: если в буфере матрица (из Excel), значения вставляются подряд по точкам
+    начиная с текущей ячейки — через фильтры и помещения. Delete — очистить выделенное.
+    """
+    def keyPressEvent(self, e):
+        idx = self.currentIndex()
+        if e.matches(QKeySequence.Paste) and idx.isValid():
+            data = QApplication.clipboard().text()
+            if any(sym in data for sym in ("\n", "\r", "\t", ";")):
+                vals = _split_paste_matrix(data)
+            else:
+                vals = [data.strip()] if data.strip() else []
+            if vals:
+                self.model().set_points(idx.row(), idx.column(), vals)
+            return
+        if e.key() == Qt.Key_Delete and self.state() != QAbstractItemView.EditingState:
+            self.model().clear_points(self.selectedIndexes())
+            return
+        super().keyPressEvent(e)
 
 # ---------- Data ----------
 @dataclass
@@ -397,48 +628,36 @@ class RoomRow:
 
 # ---------- Main Window ----------
 class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
+    closed = Signal()
+
+    def __init__(self, cfg: Optional[argparse.Namespace] = None, parent=None):
+        super().__init__(parent)
+        self.cfg = cfg if cfg is not None else CLI
+        self.result: Optional[Test11Result] = None
         self.setWindowTitle("Калькулятор расхода воздуха (мультипомещения)")
 
         self._live_job: Optional[QTimer] = None
+        self._live = LiveCalc()  # разобранные скорости + грязные фильтры/помещения
 
         self.rooms_table = SpreadsheetTable()
         self.rooms_table.setColumnCount(5)
         self.rooms_table.setHorizontalHeaderLabels(["Помещение", "Название", "S, м²", "Фильтров", "Точек"])
         self.rooms_table.verticalHeader().setVisible(True)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.speeds_root = QWidget()
-        self.speeds_layout = QVBoxLayout(self.speeds_root)
-        self.speeds_layout.setContentsMargins(6, 6, 6, 6)
-        self.speeds_layout.setSpacing(10)
-        self.scroll.setWidget(self.speeds_root)
-
-        self.speed_fields: List[List[List[QLineEdit]]] = []  # [room][filter][point]
-        self.speed_fields_flat: List[QLineEdit] = []
-
-        self.room_crit_labels: List[QLabel] = []
-        self.room_total_labels: List[QLabel] = []
-        self.room_pass_labels: List[QLabel] = []
-        self.filter_s_labels: List[List[QLabel]] = []
-        self.filter_avg_labels: List[List[QLabel]] = []
-        self.filter_flow_labels: List[List[QLabel]] = []
+        # скорости [room][filter][point] — в self._live, на экране — одна виртуальная таблица
+        self.speed_model = SpeedGridModel(self._live, on_edited=self._schedule_live_update, parent=self)
+        self.speed_view = SpeedGridView()
+        self.speed_view.setModel(self.speed_model)
+        self.speed_view.verticalHeader().setVisible(False)
 
         self._build_ui()
 
-        self._speed_paste_filter = SpeedPasteFilter(
-            get_flat_list=lambda: self.speed_fields_flat,
-            schedule_live_update=self._schedule_live_update
-        )
-
-        if CLI.template:
-            self.template_path.setText(CLI.template)
-        if CLI.rooms and CLI.rooms > 0:
-            self.rooms_count.setValue(CLI.rooms)
+        if self.cfg.template:
+            self.template_path.setText(self.cfg.template)
+        if self.cfg.rooms and self.cfg.rooms > 0:
+            self.rooms_count.setValue(self.cfg.rooms)
         else:
-            self.rooms_count.setValue(max(1, int(CLI.rooms or 1)))
+            self.rooms_count.setValue(max(1, int(self.cfg.rooms or 1)))
 
         self.create_rooms()
 
@@ -488,7 +707,7 @@ class MainWindow(QMainWindow):
         line.setFrameShadow(QFrame.Sunken)
         main.addWidget(line)
 
-        main.addWidget(self.scroll, 1)
+        main.addWidget(self.speed_view, 1)
 
         r4 = QHBoxLayout()
         r4.addWidget(QLabel("Средняя скорость (справочно):"))
@@ -516,11 +735,11 @@ class MainWindow(QMainWindow):
         self.rooms_table.setRowCount(n)
 
         for r in range(n):
-            num = (CLI.nums[r] if r < len(CLI.nums) and CLI.nums[r] else str(r + 1))
-            name = (CLI.names[r] if r < len(CLI.names) else "")
-            s = (CLI.areas[r] if r < len(CLI.areas) else "1")
-            f = (CLI.filters[r] if r < len(CLI.filters) else "1")
-            p = (CLI.points[r] if r < len(CLI.points) else "2")
+            num = (self.cfg.nums[r] if r < len(self.cfg.nums) and self.cfg.nums[r] else str(r + 1))
+            name = (self.cfg.names[r] if r < len(self.cfg.names) else "")
+            s = (self.cfg.areas[r] if r < len(self.cfg.areas) else "1")
+            f = (self.cfg.filters[r] if r < len(self.cfg.filters) else "1")
+            p = (self.cfg.points[r] if r < len(self.cfg.points) else "2")
 
             for c, val in enumerate([num, name, s, f, p]):
                 it = self.rooms_table.item(r, c)
@@ -548,23 +767,6 @@ class MainWindow(QMainWindow):
         return out
 
     # ---------- speeds ----------
-    def _clear_speeds_ui(self):
-        while self.speeds_layout.count():
-            item = self.speeds_layout.takeAt(0)
-            w = item.widget()
-            if w is not None:
-                w.deleteLater()
-
-        self.speed_fields = []
-        self.speed_fields_flat = []
-
-        self.room_crit_labels = []
-        self.room_total_labels = []
-        self.room_pass_labels = []
-        self.filter_s_labels = []
-        self.filter_avg_labels = []
-        self.filter_flow_labels = []
-
     def create_speed_fields(self):
         rooms = self._get_rooms()
         if not rooms:
@@ -585,113 +787,8 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", f"Фильтров и Точек должны быть > 0 (строка {i}).")
                 return
 
-        self._clear_speeds_ui()
-
-        for r_idx, rr in enumerate(rooms):
-            nf = _to_int(rr.filters, 1)
-            np = _to_int(rr.points, 2)
-
-            room_box = QFrame()
-            room_box.setFrameShape(QFrame.StyledPanel)
-            vb = QVBoxLayout(room_box)
-            vb.setContentsMargins(8, 8, 8, 8)
-            vb.setSpacing(6)
-
-            title = QLabel(f"Помещение {rr.num}")
-            title.setStyleSheet("font-weight: 700;")
-            vb.addWidget(title)
-
-            summ = QHBoxLayout()
-            summ.addWidget(QLabel("Критерий (м³/ч):"))
-            lbl_crit = QLabel("—")
-            lbl_crit.setFixedWidth(120)
-            summ.addWidget(lbl_crit)
-
-            summ.addSpacing(16)
-            summ.addWidget(QLabel("Итого факт. (м³/ч):"))
-            lbl_total = QLabel("—")
-            lbl_total.setFixedWidth(120)
-            summ.addWidget(lbl_total)
-
-            summ.addSpacing(16)
-            summ.addWidget(QLabel("Результат:"))
-            lbl_pass = QLabel("—")
-            lbl_pass.setStyleSheet("font-weight: 700;")
-            lbl_pass.setFixedWidth(60)
-            summ.addWidget(lbl_pass)
-
-            summ.addStretch(1)
-            vb.addLayout(summ)
-
-            self.room_crit_labels.append(lbl_crit)
-            self.room_total_labels.append(lbl_total)
-            self.room_pass_labels.append(lbl_pass)
-
-            room_speed_filters: List[List[QLineEdit]] = []
-            room_s_lbls: List[QLabel] = []
-            room_avg_lbls: List[QLabel] = []
-            room_flow_lbls: List[QLabel] = []
-
-            for f_idx in range(nf):
-                fl_title = QLabel(f"  Фильтр {f_idx+1}")
-                fl_title.setStyleSheet("font-style: italic;")
-                vb.addWidget(fl_title)
-
-                grid = QGridLayout()
-                grid.setHorizontalSpacing(10)
-                grid.setVerticalSpacing(4)
-
-                filt_points: List[QLineEdit] = []
-                for p_idx in range(np):
-                    lab = QLabel(f"    № точки {p_idx+1} (м/с):")
-                    e = QLineEdit()
-                    e.setFixedWidth(120)
-                    e._flat_idx = len(self.speed_fields_flat)  # type: ignore[attr-defined]
-                    e.installEventFilter(self._speed_paste_filter)
-                    e.textChanged.connect(lambda *_: self._schedule_live_update())
-                    grid.addWidget(lab, p_idx, 0, Qt.AlignRight)
-                    grid.addWidget(e, p_idx, 1, Qt.AlignLeft)
-
-                    filt_points.append(e)
-                    self.speed_fields_flat.append(e)
-
-                vb.addLayout(grid)
-
-                row_sum = QHBoxLayout()
-                row_sum.addWidget(QLabel("    S, м²:"))
-                lbl_s = QLabel("—")
-                lbl_s.setFixedWidth(100)
-                row_sum.addWidget(lbl_s)
-
-                row_sum.addSpacing(16)
-                row_sum.addWidget(QLabel("Средняя (м/с):"))
-                lbl_avg = QLabel("—")
-                lbl_avg.setFixedWidth(100)
-                row_sum.addWidget(lbl_avg)
-
-                row_sum.addSpacing(16)
-                row_sum.addWidget(QLabel("Итого факт (м³/ч):"))
-                lbl_flow = QLabel("—")
-                lbl_flow.setFixedWidth(120)
-                row_sum.addWidget(lbl_flow)
-
-                row_sum.addStretch(1)
-                vb.addLayout(row_sum)
-
-                room_s_lbls.append(lbl_s)
-                room_avg_lbls.append(lbl_avg)
-                room_flow_lbls.append(lbl_flow)
-
-                room_speed_filters.append(filt_points)
-
-            self.speed_fields.append(room_speed_filters)
-            self.filter_s_labels.append(room_s_lbls)
-            self.filter_avg_labels.append(room_avg_lbls)
-            self.filter_flow_labels.append(room_flow_lbls)
-
-            self.speeds_layout.addWidget(room_box)
-
-        self.speeds_layout.addStretch(1)
+        self._live.reset([[_to_int(rr.points, 2)] * _to_int(rr.filters, 1) for rr in rooms])
+        self.speed_model.reset([rr.num for rr in rooms])
         self._schedule_live_update()
 
     # ---------- live update ----------
@@ -703,89 +800,23 @@ class MainWindow(QMainWindow):
         self._live_job.start(120)
 
     def _live_update(self):
+        live = self._live
         rooms = self._get_rooms()
-        n = len(rooms)
-
-        crit: List[Optional[Decimal]] = []
-        for r in range(n):
-            txt = (CLI.airflows[r] if r < len(CLI.airflows) else "") or ""
-            crit.append(_safe_parse_decimal(txt))
+        # площадь/критерий — дёшево (по строке на помещение); неизменённый текст не разбирается
+        for r in range(min(len(rooms), len(live.areas))):
+            live.set_area(r, rooms[r].s_m2)
+            live.set_criterion(r, (self.cfg.airflows[r] if r < len(self.cfg.airflows) else "") or "")
 
-        for r_idx, rr in enumerate(rooms):
-            S = _safe_parse_decimal(rr.s_m2)
-            if S is not None and S <= 0:
-                S = None
-
-            if r_idx < len(self.room_crit_labels):
-                self.room_crit_labels[r_idx].setText(fmt_flow(crit[r_idx]) if crit[r_idx] is not None else "—")
+        filters, changed_rooms = live.recalc()
 
-            if r_idx >= len(self.speed_fields):
-                if r_idx < len(self.room_total_labels):
-                    self.room_total_labels[r_idx].setText("—")
-                if r_idx < len(self.room_pass_labels):
-                    self.room_pass_labels[r_idx].setText("—")
-                continue
-
-            total_room = Decimal(0)
-            have_all = True
-
-            nf = len(self.speed_fields[r_idx])
-            for f_idx in range(nf):
-                if r_idx < len(self.filter_s_labels) and f_idx < len(self.filter_s_labels[r_idx]):
-                    self.filter_s_labels[r_idx][f_idx].setText(fmt_area(S) if S is not None else "—")
-
-                pts = self.speed_fields[r_idx][f_idx]
-                vals: List[Decimal] = []
-                ok = True
-                for e in pts:
-                    v = _safe_parse_decimal(e.text())
-                    if v is None or v < 0:
-                        ok = False
-                        break
-                    vals.append(v)
-
-                if (not ok) or (S is None) or (len(vals) != len(pts)):
-                    if r_idx < len(self.filter_avg_labels) and f_idx < len(self.filter_avg_labels[r_idx]):
-                        self.filter_avg_labels[r_idx][f_idx].setText("—")
-                    if r_idx < len(self.filter_flow_labels) and f_idx < len(self.filter_flow_labels[r_idx]):
-                        self.filter_flow_labels[r_idx][f_idx].setText("—")
-                    have_all = False
-                    continue
+        self.speed_model.refresh(filters, changed_rooms)
 
-                avg = sum(vals, Decimal(0)) / Decimal(len(vals))
-                flow = S * avg * SEC_PER_HOUR
-
-                if r_idx < len(self.filter_avg_labels) and f_idx < len(self.filter_avg_labels[r_idx]):
-                    self.filter_avg_labels[r_idx][f_idx].setText(fmt_speed(avg))
-                if r_idx < len(self.filter_flow_labels) and f_idx < len(self.filter_flow_labels[r_idx]):
-                    self.filter_flow_labels[r_idx][f_idx].setText(fmt_flow(flow))
-
-                total_room += flow
-
-            if r_idx < len(self.room_total_labels):
-                self.room_total_labels[r_idx].setText(fmt_flow(total_room) if have_all and nf > 0 else "—")
-            if r_idx < len(self.room_pass_labels):
-                if have_all and nf > 0 and (crit[r_idx] is not None):
-                    self.room_pass_labels[r_idx].setText("ДА" if total_room >= crit[r_idx] else "НЕТ")
-                else:
-                    self.room_pass_labels[r_idx].setText("—")
-
-        try:
-            if self.speed_fields and self.speed_fields[0]:
-                vals = []
-                for e in self.speed_fields[0][0]:
-                    v = _safe_parse_decimal(e.text())
-                    if v is None:
-                        vals = []
-                        break
-                    vals.append(v)
-                if vals:
-                    avg0 = sum(vals, Decimal(0)) / Decimal(len(vals))
-                    self.avg_ref.setText(fmt_speed(avg0))
-                else:
-                    self.avg_ref.setText("—")
-        except Exception:
-            self.avg_ref.setText("—")
+        if (0, 0) in filters:
+            vals = live.values[0][0]
+            if vals and all(v is not None for v in vals):
+                _set_text(self.avg_ref, fmt_speed(sum(vals, Decimal(0)) / Decimal(len(vals))))
+            else:
+                _set_text(self.avg_ref, "—")
 
     # ---------- calc / save ----------
     def _collect_inputs_strict(self):
@@ -821,27 +852,26 @@ class MainWindow(QMainWindow):
             room_filters.append(nf)
             room_points.append(np)
 
-        if not self.speed_fields or len(self.speed_fields) != n_rooms:
+        fields = self._live.texts
+        if not fields or len(fields) != n_rooms:
             raise ValueError("Нажмите «Создать поля для скоростей» и заполните скорости.")
 
         speeds: List[List[List[Decimal]]] = []
-        avgs: List[List[Decimal]] = []
 
         for r in range(n_rooms):
-            if len(self.speed_fields[r]) != room_filters[r]:
+            if len(fields[r]) != room_filters[r]:
                 raise ValueError(f"Несовпадение кол-ва фильтров в скоростях (помещение {r+1}).")
 
             sp_room: List[List[Decimal]] = []
-            avg_room: List[Decimal] = []
 
             for f in range(room_filters[r]):
-                pts = self.speed_fields[r][f]
+                pts = fields[r][f]
                 if len(pts) != room_points[r]:
                     raise ValueError(f"Несовпадение кол-ва точек (помещение {r+1}, фильтр {f+1}).")
 
                 row_vals: List[Decimal] = []
                 for i in range(room_points[r]):
-                    raw = pts[i].text().strip()
+                    raw = pts[i].strip()
                     if raw == "":
                         raise ValueError(f"Пустая скорость: пом. {r+1}, фильтр {f+1}, точка {i+1}.")
                     v = to_decimal(raw)
@@ -850,19 +880,15 @@ class MainWindow(QMainWindow):
                     row_vals.append(v)
 
                 sp_room.append(row_vals)
-                avg_room.append(sum(row_vals, Decimal(0)) / Decimal(room_points[r]))
 
             speeds.append(sp_room)
-            avgs.append(avg_room)
 
-        room_sum_flow: List[Decimal] = []
-        for r in range(n_rooms):
-            total = sum((room_S[r] * avgs[r][f] * SEC_PER_HOUR for f in range(room_filters[r])), Decimal(0))
-            room_sum_flow.append(total)
+        # опубликованные (квантованные) средние/расходы/суммы — одним вызовом
+        results = compute(room_S, speeds)
 
         criterion_texts: List[Optional[str]] = []
         for r in range(n_rooms):
-            txt = ((CLI.airflows[r] if r < len(CLI.airflows) else "") or "").strip()
+            txt = ((self.cfg.airflows[r] if r < len(self.cfg.airflows) else "") or "").strip()
             if txt:
                 try:
                     criterion_texts.append(fmt_flow(to_decimal(txt)))
@@ -872,7 +898,7 @@ class MainWindow(QMainWindow):
                 criterion_texts.append(None)
 
         return (n_rooms, room_nums, room_names, room_S, room_filters, room_points,
-                speeds, avgs, room_sum_flow, criterion_texts)
+                speeds, results, criterion_texts)
 
     def calculate_only(self):
         try:
@@ -885,10 +911,10 @@ class MainWindow(QMainWindow):
     def save_docx(self):
         try:
             (n_rooms, room_nums, room_names, room_S, room_filters, room_points,
-             speeds, avgs, room_sum_flow, criterion_texts) = self._collect_inputs_strict()
+             speeds, results, criterion_texts) = self._collect_inputs_strict()
 
             # ВАЖНО: room_klasses вычисляем ТОЛЬКО тут (когда уже есть n_rooms)
-            room_klasses = list(getattr(CLI, "klasses", []) or [])
+            room_klasses = list(getattr(self.cfg, "klasses", []) or [])
             if len(room_klasses) < n_rooms:
                 room_klasses += [""] * (n_rooms - len(room_klasses))
 
@@ -934,140 +960,43 @@ class MainWindow(QMainWindow):
             if first_yes_no is not None and first_yes_no > 0:
                 col_criterion = first_yes_no - 1  # слева от ДА/НЕТ
 
-            data_tr_template = deepcopy(table.rows[tpl_row]._tr)
+            if col_criterion in (col_yes, col_no):
+                col_criterion = None
 
             mean_row_idx = find_mean_row_near(table, tpl_row, room_points[0])
-            has_mean = (mean_row_idx is not None)
-            mean_tr_template = deepcopy(table.rows[mean_row_idx]._tr) if has_mean else None
-
-            def merge_block(start_row, n_rows, filter_label, S_value: Decimal):
-                filter_cells = collect_column_cells(table, start_row, n_rows, col_filter)
-                s_cells = collect_column_cells(table, start_row, n_rows, col_S)
-                factL_cells = collect_column_cells(table, start_row, n_rows, col_fact_left)
-                vmerge_cells(filter_cells, str(filter_label))
-                vmerge_cells(s_cells, fmt_area(S_value))
-                if factL_cells:
-                    vmerge_cells(factL_cells, cell_text_all_runs(factL_cells[0]))
-
-            # --- room 0 ---
-            replace_room_in_row(
-                table.rows[header_row_idx],
-                make_room_value(room_nums[0], room_names[0]),
-                room_klasses[0],
+            cols = Test11Columns(
+                filter=col_filter, S=col_S, num=col_num, speed=col_speed,
+                fact_left=col_fact_left, fact_right=col_fact_right, criterion=col_criterion,
             )
-
-            if room_points[0] > 1:
-                last_tr = table.rows[tpl_row]._tr
-                last_tr = insert_copies_after_tr(last_tr, data_tr_template, times=room_points[0] - 1)
-
-            block_fact_value = fmt_flow(room_S[0] * avgs[0][0] * SEC_PER_HOUR)
-            for i in range(room_points[0]):
-                row = table.rows[tpl_row + i]
-                write_if_cell(row, col_num, str(i + 1))
-                write_if_cell(row, col_speed, fmt_speed(speeds[0][0][i]))
-                write_if_cell(row, col_fact_left, block_fact_value if i == 0 else "")
-                if col_fact_right is not None:
-                    write_if_cell(row, col_fact_right, "")
-
-            if has_mean:
-                if tpl_row + room_points[0] >= len(table.rows):
-                    last_tr = table.rows[len(table.rows) - 1]._tr
-                    last_tr = insert_copies_after_tr(last_tr, mean_tr_template, times=1)
-                write_if_cell(table.rows[tpl_row + room_points[0]], col_speed, fmt_speed(avgs[0][0]))
-
-            block_height_for_room0 = room_points[0] + (1 if has_mean else 0)
-            merge_block(tpl_row, block_height_for_room0, 1, room_S[0])
-
-            room_block_starts: List[List[int]] = [[tpl_row]]
-            current_end_row = tpl_row + block_height_for_room0 - 1
-
-            for f in range(2, room_filters[0] + 1):
-                last_tr = table.rows[current_end_row]._tr
-                for _ in range(room_points[0]):
-                    last_tr = insert_copies_after_tr(last_tr, data_tr_template, times=1)
-                if has_mean:
-                    last_tr = insert_copies_after_tr(last_tr, mean_tr_template, times=1)
-
-                block_start = current_end_row + 1
-                current_end_row = block_start + room_points[0] + (1 if has_mean else 0) - 1
-
-                block_fact_value = fmt_flow(room_S[0] * avgs[0][f - 1] * SEC_PER_HOUR)
-                for i in range(room_points[0]):
-                    row = table.rows[block_start + i]
-                    write_if_cell(row, col_num, str(i + 1))
-                    write_if_cell(row, col_speed, fmt_speed(speeds[0][f - 1][i]))
-                    write_if_cell(row, col_fact_left, block_fact_value if i == 0 else "")
-                    if col_fact_right is not None:
-                        write_if_cell(row, col_fact_right, "")
-                if has_mean:
-                    write_if_cell(table.rows[block_start + room_points[0]], col_speed, fmt_speed(avgs[0][f - 1]))
-
-                merge_block(block_start, room_points[0] + (1 if has_mean else 0), f, room_S[0])
-                room_block_starts[0].append(block_start)
-
-            header_tr_template = deepcopy(table.rows[header_row_idx]._tr)
-
-            for r in range(1, n_rooms):
-                last_tr = table.rows[current_end_row]._tr
-                last_tr = insert_copies_after_tr(last_tr, header_tr_template, times=1)
-                room_header_row = current_end_row + 1
-                current_end_row = room_header_row
-
-                replace_room_in_row(
-                    table.rows[room_header_row],
-                    make_room_value(room_nums[r], room_names[r]),
-                    room_klasses[r],
+            blocks = [
+                Test11Room(
+                    room_value=make_room_value(room_nums[r], room_names[r]),
+                    klass=room_klasses[r],
+                    s_text=fmt_area(room_S[r]),
+                    speeds=[[fmt_speed(v) for v in speeds[r][f]] for f in range(room_filters[r])],
+                    avgs=[fmt_speed(a) for a in results[r].avgs],
+                    flows=[fmt_flow(f) for f in results[r].flows],
+                    total=fmt_flow(results[r].total),
+                    criterion=criterion_texts[r] if r < len(criterion_texts) else None,
                 )
+                for r in range(n_rooms)
+            ]
+            write_results_block(table, header_row_idx, tpl_row, mean_row_idx, cols, blocks)
+
+            if self.cfg.in_memory:
+                # встроенный режим: документ и итоги — вызывающему, без файла
+                buf = io.BytesIO()
+                doc.save(buf)
+                self.result = Test11Result(
+                    template=template_path,
+                    docx=buf.getvalue(),
+                    flows=[res.total for res in results],
+                )
+                if self.cfg.auto_close:
+                    self.close()
+                return
 
-                starts_this_room: List[int] = []
-                for f in range(1, room_filters[r] + 1):
-                    for _ in range(room_points[r]):
-                        last_tr = insert_copies_after_tr(last_tr, data_tr_template, times=1)
-                    if has_mean:
-                        last_tr = insert_copies_after_tr(last_tr, mean_tr_template, times=1)
-
-                    block_start = current_end_row + 1
-                    current_end_row = block_start + room_points[r] + (1 if has_mean else 0) - 1
-
-                    block_fact_value = fmt_flow(room_S[r] * avgs[r][f - 1] * SEC_PER_HOUR)
-                    for i in range(room_points[r]):
-                        row = table.rows[block_start + i]
-                        write_if_cell(row, col_num, str(i + 1))
-                        write_if_cell(row, col_speed, fmt_speed(speeds[r][f - 1][i]))
-                        write_if_cell(row, col_fact_left, block_fact_value if i == 0 else "")
-                        if col_fact_right is not None:
-                            write_if_cell(row, col_fact_right, "")
-                    if has_mean:
-                        write_if_cell(table.rows[block_start + room_points[r]], col_speed, fmt_speed(avgs[r][f - 1]))
-
-                    merge_block(block_start, room_points[r] + (1 if has_mean else 0), f, room_S[r])
-                    starts_this_room.append(block_start)
-
-                room_block_starts.append(starts_this_room)
-
-            def block_height_fn(room_idx: int) -> int:
-                return room_points[room_idx] + (1 if has_mean else 0)
-
-            for r, starts in enumerate(room_block_starts):
-                if not starts:
-                    continue
-                first_start = starts[0]
-                last_start = starts[-1]
-                seg_start = first_start
-                seg_rows = (last_start + block_height_fn(r)) - seg_start
-
-                if col_fact_right is not None:
-                    cellsR = collect_column_cells(table, seg_start, seg_rows, col_fact_right)
-                    if cellsR:
-                        vmerge_cells(cellsR, fmt_flow(room_sum_flow[r]))
-
-                if col_criterion is not None and col_criterion not in (col_yes, col_no):
-                    cellsC = collect_column_cells(table, seg_start, seg_rows, col_criterion)
-                    if cellsC:
-                        top_val = criterion_texts[r] if (r < len(criterion_texts) and criterion_texts[r]) else cell_text_all_runs(cellsC[0])
-                        vmerge_cells(cellsC, top_val)
-
-            out_path = (CLI.auto_save or "").strip()
+            out_path = (self.cfg.auto_save or "").strip()
             if not out_path:
                 ts = datetime.now().strftime("%Y%m%d_%H%M%S")
                 default_name = f"Расчет_воздуха_{ts}.docx"
@@ -1083,15 +1012,38 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Файл занят", "Документ открыт в Word. Закройте и повторите.")
                 return
 
-            if not CLI.auto_save:
+            if not self.cfg.auto_save:
                 QMessageBox.information(self, "Готово", f"Файл сохранён:\n{out_path}")
 
-            if CLI.auto_close:
+            if self.cfg.auto_close:
                 self.close()
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"{e}")
 
+    def closeEvent(self, e):
+        super().closeEvent(e)
+        self.closed.emit()
+
+
+def run_calculator(parent=None, **cfg) -> Optional[Test11Result]:
+    """
+    Калькулятор внутри приложения (без отдельного процесса и временного DOCX).
+    cfg — как у CLI, но списками: template, rooms, nums, names, klasses, areas,
+    filters, points, airflows, auto_close. Окно модальное; возвращает результат
+    последнего «Сохранить DOCX» или None, если окно закрыли без сохранения.
+    """
+    wnd = MainWindow(make_config(**cfg, in_memory=True, auto_save=""), parent)
+    wnd.setWindowFlag(Qt.Window, True)
+    wnd.setWindowModality(Qt.ApplicationModal)
+    loop = QEventLoop()
+    wnd.closed.connect(loop.quit)
+    wnd.show()
+    loop.exec()
+    result = wnd.result
+    wnd.deleteLater()
+    return result
+
 # ---------- CLI parse ----------
 def _parse_args(argv):
     p = argparse.ArgumentParser(description="Калькулятор Test 11 (расход приточного воздуха)")
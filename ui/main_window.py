@@ -6,13 +6,9 @@ import os
 import re
 import tempfile
 import uuid
-from copy import deepcopy
-from collections import OrderedDict
 from datetime import datetime, date
-from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
-from ui import word_table2_otch_splitter
+from typing import List, Dict, Any
 
 from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QDragEnterEvent, QDropEvent, QGuiApplication, QKeySequence, QShortcut
@@ -24,111 +20,22 @@ from PySide6.QtWidgets import (
     QTabWidget, QAbstractItemView
 )
 
-from docx import Document
-from docx.document import Document as DocxDocument
-from docx.table import Table
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docxtpl import DocxTemplate, RichText, InlineImage
-from docx.shared import Mm, Pt
-from docx.image.exceptions import UnrecognizedImageError
-from docx.image.image import Image
-
-from pymorphy3 import MorphAnalyzer
-
-import word_test11_splitter
-
-from file_utils import temp_docx
 import io_manager
-import template_renderer
-import table_processor
+import render_engine
 from logger import logger
 
-from risk_table5 import get_risk_rows, insert_table5_into_doc
-import word_table5_splitter
-import word_update_all
-
-
-
-
-# =============================================================================
-# 1) Защита от падения tpl.render() из-за битых/неподдерживаемых картинок
-# =============================================================================
-# docxtpl вставляет картинки лениво: ошибка может прилететь при tpl.render(),
-# когда InlineImage превращается в строку. Этот патч гарантирует "не упасть".
-from docxtpl.inline_image import InlineImage as _TplInlineImage  # noqa
-
-_old_inlineimage_str = _TplInlineImage.__str__
-
-
-def _safe_inlineimage_str(self):
-    try:
-        return _old_inlineimage_str(self)
-    except UnrecognizedImageError:
-        desc = getattr(self, "image_descriptor", None)
-        logger.warning(f"Пропущена битая/неподдерживаемая картинка (UnrecognizedImageError): {desc}")
-        return ""
-    except Exception as e:
-        desc = getattr(self, "image_descriptor", None)
-        logger.warning(f"Пропущена картинка (ошибка вставки: {e}): {desc}")
-        return ""
-
-
-_TplInlineImage.__str__ = _safe_inlineimage_str
-
-
-# =============================================================================
-# 2) Безопасное создание InlineImage + фильтрация расширений
-# =============================================================================
-_IMG_EXT = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".gif"}  # только картинки (НЕ pdf)
-
-
-def safe_inline_image(tpl: DocxTemplate, path: str, *, width_mm: int = 160, label: str = ""):
-    """
-    1) Отсекаем несуществующие / не файлы
-    2) Отсекаем расширения (только картинки)
-    3) Проверяем, что это реально картинка: Image.from_file()
-    4) Создаём InlineImage
-    """
-    if not path:
-        return None
-
-    pp = Path(path)
-    if not pp.exists() or not pp.is_file():
-        logger.warning(f"Пропущен файл для {label} (не найден): {path}")
-        return None
-
-    ext = pp.suffix.lower()
-    if ext not in _IMG_EXT:
-        logger.warning(f"Пропущен файл для {label} (не картинка / pdf не поддерживается): {path}")
-        return None
-
-    # ранняя проверка (иначе может упасть позже на render)
-    try:
-        Image.from_file(str(pp))
-    except UnrecognizedImageError:
-        logger.warning(f"Пропущен файл для {label} (битая/неподдерживаемая картинка): {path}")
-        return None
-    except Exception as e:
-        logger.warning(f"Пропущен файл для {label} (ошибка проверки картинки: {e}): {path}")
-        return None
-
-    try:
-        return InlineImage(tpl, str(pp), width=Mm(width_mm))
-    except Exception as e:
-        logger.warning(f"Пропущен файл для {label} (ошибка создания InlineImage: {e}): {path}")
-        return None
-
-
-def make_inline_images(tpl: DocxTemplate, paths: list[str], *, label: str, width_mm: int = 160) -> list[InlineImage]:
-    out: list[InlineImage] = []
-    for p in (paths or []):
-        ii = safe_inline_image(tpl, p, width_mm=width_mm, label=label)
-        if ii is not None:
-            out.append(ii)
-    return out
-
+# Весь пайплайн рендера живёт в render_engine (без Qt); здесь — только форма.
+# Хелперы реэкспортируются для старого кода, который импортировал их отсюда.
+from render_engine import (  # noqa: F401
+    RenderJob,
+    safe_inline_image,
+    make_inline_images,
+    postprocess_equipment_dates,
+    fill_report_table1_rooms_by_hashes,
+    fill_report_table2_from_excel,
+    fix_table2_caption_glue,
+)
 
-# =============================================================================
 
 # =============================================================================
 # 4) Spreadsheet-like table
@@ -574,1190 +481,29 @@ class AppendixImagesDialog(QDialog):
         return self.list.get_paths()
 
 
-# =============================================================================
-# 7) Автозаполнение "Тест 11.2. Проверка кратности воздухообмена в ЧП"
-# =============================================================================
-def _fill_test_112(doc: DocxDocument, rooms: List[Dict[str, Any]]):
-    def norm(s: str) -> str:
-        return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip().lower()
-
-    t112 = None
-    for t in doc.tables:
-        if not t.rows:
-            continue
-        head = " ".join(c.text for c in t.rows[0].cells)
-        h = norm(head)
-        if ("тест" in h and ("11.2" in h or "11,2" in h)) and ("кратност" in h or "чп" in h):
-            t112 = t
-            break
-    if t112 is None:
-        return
-
-    hdr_cols_row_idx = None
-    for i, row in enumerate(t112.rows):
-        line = norm(" ".join(c.text for c in row.cells))
-        if "результаты испытани" in line:
-            hdr_cols_row_idx = i + 1 if (i + 1) < len(t112.rows) else None
-            break
-    if hdr_cols_row_idx is None:
-        for i, row in enumerate(t112.rows):
-            line = norm(" ".join(c.text for c in row.cells))
-            if ("номер" in line and "объем" in line) or ("общий расход" in line):
-                hdr_cols_row_idx = i
-                break
-    if hdr_cols_row_idx is None:
-        return
-
-    def find_col(cells, *needles):
-        for ci, c in enumerate(cells):
-            tt = norm(c.text)
-            if all(n in tt for n in needles):
-                return ci
-        return None
-
-    cols_row = t112.rows[hdr_cols_row_idx]
-    col_total = find_col(cols_row.cells, "общий", "расход")
-    col_fact = find_col(cols_row.cells, "фактическ")
-    if col_total is None and col_fact is None:
-        return
-
-    def is_spacer(row):
-        return all(norm(c.text) in ("", "¤") for c in row.cells)
-
-    data_start = hdr_cols_row_idx + 2  # пропускаем вторую строку заголовка
-    while data_start < len(t112.rows) and is_spacer(t112.rows[data_start]):
-        data_start += 1
-
-    data_end = len(t112.rows)
-    for i in range(data_start, len(t112.rows)):
-        first_cell = norm(t112.rows[i].cells[0].text)
-        if first_cell.startswith("комментар"):
-            data_end = i
-            break
-    if data_end <= data_start:
-        return
-
-    need = len(rooms)
-    have = data_end - data_start
-    if need > have:
-        sample_tr = deepcopy(t112.rows[data_end - 1]._tr)
-        for _ in range(need - have):
-            t112._tbl.append(deepcopy(sample_tr))
-        data_end = data_start + need
-
-    for idx, room in enumerate(rooms):
-        r = data_start + idx
-        if r >= len(t112.rows):
-            break
-        row = t112.rows[r]
-        total_flow = (room.get("total_flow") or "").strip()
-        exch_act = (room.get("exchange_actual") or "").strip()
-
-        if col_total is not None and col_total < len(row.cells) and total_flow:
-            row.cells[col_total].text = total_flow
-        if col_fact is not None and col_fact < len(row.cells) and exch_act:
-            row.cells[col_fact].text = exch_act
-
 
 # =============================================================================
-# 8) Форматирование дат поверки в таблице оборудования
-# =============================================================================
-def _fix_weird_ddmmyyyy(s: str) -> str:
-    # "26.062026" -> "26.06.2026"
-    m = re.match(r"^(\d{1,2})\.(\d{2})(\d{4})$", s)
-    if m:
-        return f"{m.group(1)}.{m.group(2)}.{m.group(3)}"
-    return s
-
-
-def _parse_date_any(s: str):
-    s = (s or "").strip().replace("\u00a0", " ")
-    s = re.sub(r"\s+", " ", s).replace("г.", "").replace("г", "").strip(" .")
-    if not s:
-        return None
-
-    s = s.split()[0]  # убрать время
-    s = _fix_weird_ddmmyyyy(s)
-
-    fmts = ["%Y-%m-%d", "%d.%m.%Y", "%d-%m-%Y", "%Y.%m.%d", "%d/%m/%Y", "%Y/%m/%d"]
-    for fmt in fmts:
-        try:
-            return datetime.strptime(s, fmt).date()
-        except Exception:
-            pass
-
-    m = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})$", s)
-    if m:
-        try:
-            return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-        except Exception:
-            return None
-
-    m = re.match(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})$", s)
-    if m:
-        try:
-            return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
-        except Exception:
-            return None
-
-    return None
-
-
-def _fmt_date(d: date) -> str:
-    return d.strftime("%d.%m.%Y")
-
-
-def _format_date_range_cell(text: str) -> str:
-    if not text or not text.strip():
-        return text
-
-    raw = re.sub(r"\s*\n\s*", " ", text).strip()
-
-    if "/" in raw:
-        parts = [p.strip() for p in raw.split("/") if p.strip()]
-        if len(parts) >= 2:
-            d1 = _parse_date_any(parts[0])
-            d2 = _parse_date_any(parts[1])
-            if d1 and d2:
-                return f"{_fmt_date(d1)} / {_fmt_date(d2)}"
-            return raw
-
-    date_like = re.findall(r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}\.\d{1,2}\.\d{4}|\d{1,2}\.\d{2}\d{4}", raw)
-    if len(date_like) >= 2:
-        d1 = _parse_date_any(date_like[0])
-        d2 = _parse_date_any(date_like[1])
-        if d1 and d2:
-            return f"{_fmt_date(d1)} / {_fmt_date(d2)}"
-
-    d = _parse_date_any(raw)
-    if d:
-        return _fmt_date(d)
-
-    return raw
-
-
-def postprocess_equipment_dates(doc: DocxDocument) -> None:
-    """
-    Ищет в документе столбец 'Дата поверки/ Действительно до:' и
-    форматирует значения в 'ДД.ММ.ГГГГ / ДД.ММ.ГГГГ'.
-    """
-    def norm(s: str) -> str:
-        return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip().lower()
-
-    hdr_needle = "дата поверки/ действительно до"
-    for t in doc.tables:
-        if not t.rows:
-            continue
-
-        hdr_row_idx = None
-        for ri in range(min(3, len(t.rows))):
-            row_text = " ".join(c.text for c in t.rows[ri].cells)
-            if hdr_needle in norm(row_text):
-                hdr_row_idx = ri
-                break
-        if hdr_row_idx is None:
-            continue
-
-        col_idx = None
-        for ci, c in enumerate(t.rows[hdr_row_idx].cells):
-            if hdr_needle in norm(c.text):
-                col_idx = ci
-                break
-        if col_idx is None:
-            continue
-
-        for ri in range(hdr_row_idx + 1, len(t.rows)):
-            cell = t.rows[ri].cells[col_idx]
-            old = cell.text
-            new = _format_date_range_cell(old)
-            if new != old:
-                cell.text = new
-
-
-import time
-import re
-import win32com.client as win32
-from logger import logger
-
-
-
-import re
-from typing import Optional
-
-import win32com.client as win32
-from logger import logger
-
-
-import re
-from copy import deepcopy
-from typing import Optional
-
-from docx.document import Document as DocxDocument
-from docx.table import Table
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-
-
-def _norm_basic(s: str) -> str:
-    s = "" if s is None else str(s)
-    s = (
-        s.replace("\u00A0", " ")
-         .replace("\u202F", " ")
-         .replace("\u200B", "")
-         .replace("\u00AD", "")
-    )
-    s = re.sub(r"\s+", " ", s).strip().lower()
-    s = s.replace("ё", "е")
-    return s
-
-
-def _match_key(s: str) -> str:
-    return re.sub(r"[^0-9a-zа-я]+", "", _norm_basic(s))
-
-
-def _looks_like_table5(tbl: Table) -> bool:
-    """
-    Узнаём Таблицу 5 по шапке (стабильно для ваших шаблонов):
-      - в первых 2 строках должны встречаться "Риск", "Возможная причина"
-      - и "Аттестационное испытание"
-    """
-    if not tbl.rows:
-        return False
-
-    head0 = " ".join(_norm_basic(c.text) for c in tbl.rows[0].cells)
-    head1 = " ".join(_norm_basic(c.text) for c in tbl.rows[1].cells) if len(tbl.rows) > 1 else ""
-
-    return (
-        ("риск" in head0 or "риск" in head1)
-        and ("возможная причина" in head0 or "возможная причина" in head1)
-        and ("аттестационное испытание" in head0 or "аттестационное испытание" in head1)
-    )
-
-
-def _insert_page_break_paragraph_after_table(tbl: Table) -> OxmlElement:
-    """
-    Вставляет ПУСТОЙ абзац с разрывом страницы СРАЗУ после таблицы.
-    """
-    p = OxmlElement("w:p")
-    r = OxmlElement("w:r")
-    br = OxmlElement("w:br")
-    br.set(qn("w:type"), "page")
-    r.append(br)
-    p.append(r)
-    tbl._tbl.addnext(p)
-    return p
-
-
-def _insert_bold_tnr_paragraph_after(el: OxmlElement, text: str) -> OxmlElement:
-    """
-    Вставляет абзац сразу после el:
-      - Times New Roman
-      - 12pt
-      - bold
-      - текст: text
-    """
-    p = OxmlElement("w:p")
-    r = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-
-    rFonts = OxmlElement("w:rFonts")
-    for a in ("ascii", "hAnsi", "cs", "eastAsia"):
-        rFonts.set(qn(f"w:{a}"), "Times New Roman")
-    rPr.append(rFonts)
-
-    b = OxmlElement("w:b")
-    rPr.append(b)
-
-    # 12pt = 24 half-points
-    sz = OxmlElement("w:sz")
-    sz.set(qn("w:val"), "24")
-    rPr.append(sz)
-
-    szCs = OxmlElement("w:szCs")
-    szCs.set(qn("w:val"), "24")
-    rPr.append(szCs)
-
-    r.append(rPr)
-
-    t = OxmlElement("w:t")
-    t.text = text
-    r.append(t)
-
-    p.append(r)
-    el.addnext(p)
-    return p
-
-
-def split_table5_with_continuation_open_doc(
-    doc: DocxDocument,
-    *,
-    split_risk_phrase: str = "Класс чистоты ЧП не соответствует установленным требованиям",
-    continuation_title: str = "Продолжение таблицы 5",
-    header_rows_count: int = 2,
-) -> bool:
-    """
-    Делает разделение Таблицы 5 на 2 таблицы, как в "правильном шаблоне":
-
-    - Находит Таблицу 5 по шапке (Риск / Возможная причина / Аттестационное испытание).
-    - Находит строку, где в 1-й колонке встречается split_risk_phrase.
-    - Всё начиная с этой строки переносит в НОВУЮ таблицу (копией XML),
-      при этом шапка (header_rows_count) остаётся и в первой, и во второй таблице.
-    - Между таблицами вставляет:
-        1) разрыв страницы
-        2) абзац "Продолжение таблицы 5" (TNR 12 bold)
-    - Ничего не "перерисовывает" — копирует XML => формат ЕДИНЫЙ 1:1.
-
-    Возвращает True если разделение сделано, иначе False.
-    """
-
-    # 1) Найти Таблицу 5
-    t5: Optional[Table] = None
-    for t in doc.tables:
-        if _looks_like_table5(t):
-            t5 = t
-            break
-    if t5 is None:
-        return False
-
-    # 2) Если уже есть "Продолжение таблицы 5" где-то в документе — не плодим дубль
-    if any(continuation_title in (p.text or "") for p in doc.paragraphs):
-        return False
-
-    if len(t5.rows) <= header_rows_count:
-        return False
-
-    # 3) Найти row-индекс (внутри t5), с которого нужно переносить во 2-ю таблицу
-    target_key = _match_key(split_risk_phrase)
-    split_row_idx = None
-    for ri in range(header_rows_count, len(t5.rows)):
-        c0 = t5.rows[ri].cells[0].text
-        if target_key and target_key in _match_key(c0):
-            split_row_idx = ri
-            break
-
-    # Если фразы нет — НЕ делим (как ты и просишь: делим именно там)
-    if split_row_idx is None:
-        return False
-
-    # Если попали прямо в начало данных — тоже смысла делить нет
-    if split_row_idx <= header_rows_count:
-        return False
-
-    # 4) Достаём XML-строки
-    tbl_el = t5._tbl
-    tr_elems = tbl_el.xpath("./w:tr")
-    if len(tr_elems) != len(t5.rows):
-        # крайне редкая ситуация, но если вдруг — не рискуем
-        return False
-
-    header_trs = tr_elems[:header_rows_count]
-    data_trs = tr_elems[header_rows_count:]
-
-    split_data_pos = split_row_idx - header_rows_count
-    if not (0 < split_data_pos < len(data_trs)):
-        return False
-
-    # 5) Создаём новую таблицу как полную копию, затем чистим строки
-    new_tbl_el = deepcopy(tbl_el)
-    new_tr_elems = new_tbl_el.xpath("./w:tr")
-
-    # В новой таблице оставляем: header + data[split:]
-    keep_idxs_new = set(range(0, header_rows_count)) | set(
-        range(header_rows_count + split_data_pos, header_rows_count + len(data_trs))
-    )
-    for i in range(len(new_tr_elems) - 1, -1, -1):
-        if i not in keep_idxs_new:
-            new_tbl_el.remove(new_tr_elems[i])
-
-    # В старой (первой) таблице оставляем: header + data[:split]
-    for i in range(len(tr_elems) - 1, -1, -1):
-        if i >= header_rows_count + split_data_pos:
-            tbl_el.remove(tr_elems[i])
-
-    # 6) Вставляем: разрыв страницы + "Продолжение..." + новую таблицу
-    p_break = _insert_page_break_paragraph_after_table(t5)
-    p_title = _insert_bold_tnr_paragraph_after(p_break, continuation_title)
-    p_title.addnext(new_tbl_el)
-
-    return True
-
-
-
-
-def update_fields_with_word(docx_path: str) -> None:
-    """
-    Открывает DOCX в Word, режет Таблицу 5, обновляет поля/колонтитулы, сохраняет.
-    """
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = False
-    try:
-        doc = word.Documents.Open(str(docx_path))
-
-        doc.Repaginate()
-        split_table5_with_continuation_open_doc(doc)
-        doc.Repaginate()
-
-        doc.Fields.Update()
-        for sec in doc.Sections:
-            sec.Headers(1).Range.Fields.Update()
-            sec.Footers(1).Range.Fields.Update()
-
-        doc.Save()
-        doc.Close()
-    finally:
-        word.Quit()
-
-def _set_cell_text_keep_style(cell, text: str) -> None:
-    """
-    Ставит текст, стараясь не ломать форматирование ячейки:
-    - если есть runs, пишем в первый run и чистим остальные
-    - иначе fallback на cell.text
-    """
-    text = "" if text is None else str(text)
-
-    if cell.paragraphs:
-        p0 = cell.paragraphs[0]
-        if p0.runs:
-            p0.runs[0].text = text
-            for r in p0.runs[1:]:
-                r.text = ""
-            # чистим остальные параграфы в ячейке
-            for p in cell.paragraphs[1:]:
-                for r in p.runs:
-                    r.text = ""
-            return
-
-    cell.text = text
-
-
-from copy import deepcopy
-import re
-from pathlib import Path
-import openpyxl
-from docx.table import Table
-from docx.document import Document as DocxDocument
-
-
-def _norm_key(s: str) -> str:
-    s = "" if s is None else str(s)
-    s = re.sub(r"(?i)^\s*тест\s*\d+(?:[.,]\d+)?\.?\s*", "", s).strip()
-    s = (
-        s.replace("\u00A0", " ")
-         .replace("\u202F", " ")
-         .replace("\u200B", "")
-         .replace("\u00AD", "")
-    )
-    s = re.sub(r"\s+", " ", s).strip().lower()
-    s = s.replace("ё", "е")
-    # ключ без знаков
-    return re.sub(r"[^0-9a-zа-я]+", "", s)
-
-
-def _set_cell_text_keep_style(cell, text: str) -> None:
-    text = "" if text is None else str(text)
-
-    if cell.paragraphs:
-        p0 = cell.paragraphs[0]
-        if p0.runs:
-            p0.runs[0].text = text
-            for r in p0.runs[1:]:
-                r.text = ""
-            for p in cell.paragraphs[1:]:
-                for r in p.runs:
-                    r.text = ""
-            return
-
-    cell.text = text
-
-
-def _load_table2_rows_from_excel(xlsx_path: str, sheet_name: str | None = None) -> dict[str, dict]:
-    """
-    Возвращает словарь:
-      norm(test_name) -> {"test":..., "crit":..., "fact":..., "eval":...}
-    """
-    wb = openpyxl.load_workbook(xlsx_path, data_only=True)
-    ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb[wb.sheetnames[0]]
-
-    # ожидаем шапку в первой строке
-    # A: тест, B: критерий, C: факт, D: оценка
-    out: dict[str, dict] = {}
-    for r in range(2, ws.max_row + 1):
-        test = ws.cell(r, 1).value
-        crit = ws.cell(r, 2).value
-        fact = ws.cell(r, 3).value
-        evl  = ws.cell(r, 4).value
-
-        if not test:
-            continue
-
-        row = {
-            "test": str(test).strip(),
-            "crit": "" if crit is None else str(crit).strip(),
-            "fact": "" if fact is None else str(fact).strip(),
-            "eval": "" if evl  is None else str(evl).strip(),
-        }
-        out[_norm_key(row["test"])] = row
-
-    return out
-
-
-def fill_report_table2_from_excel(
-    doc: DocxDocument,
-    selected_tests: list[str],
-    xlsx_path: str,
-    *,
-    sheet_name: str | None = None,
-    default_eval: str = "Соответствует",
-) -> tuple[bool, list[str]]:
-    """
-    Заполняет Таблицу 2 в ОТЧ-OQ данными из Excel по выбранным тестам.
-    Возвращает: (ok, missing_tests)
-    """
-
-    # 1) грузим Excel
-    rows_map = _load_table2_rows_from_excel(xlsx_path, sheet_name=sheet_name)
-
-    # 2) находим таблицу 2 (по заголовку столбцов)
-    def norm(s: str) -> str:
-        return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip().lower()
-
-    target_table: Table | None = None
-    for t in doc.tables:
-        if not t.rows:
-            continue
-        head = " ".join(c.text for c in t.rows[0].cells)
-        h = norm(head)
-        if ("тест" in h) and ("критер" in h) and ("фактичес" in h) and ("оценк" in h):
-            target_table = t
-            break
-
-    if target_table is None:
-        return False, selected_tests[:]  # не нашли таблицу
-
-    # 3) ищем шаблонную строку с маркерами (лучший вариант)
-    token_row_idx = None
-    tokens = {"#T2_TEST", "#T2_CRIT", "#T2_FACT", "#T2_EVAL"}
-    for ri, row in enumerate(target_table.rows):
-        row_tokens = { (c.text or "").strip() for c in row.cells }
-        if tokens.issubset(row_tokens):
-            token_row_idx = ri
-            break
-
-    # если шаблонной строки нет:
-    # - если есть хотя бы 2 строки, возьмем 2ю как базовую
-    # - иначе создадим строку через add_row (стиль может быть не идеальный)
-    if token_row_idx is None:
-        if len(target_table.rows) >= 2:
-            token_row_idx = 1
-        else:
-            target_table.add_row()
-            token_row_idx = 1
-
-    base_tr = deepcopy(target_table.rows[token_row_idx]._tr)
-
-    # 4) готовим данные в порядке выбора пользователя
-    missing: list[str] = []
-    chosen_rows: list[dict] = []
-    for tname in selected_tests:
-        key = _norm_key(tname)
-        row = rows_map.get(key)
-        if not row:
-            missing.append(tname)
-            # можно пропускать, либо вставлять пустую строку — выберу пропуск
-            continue
-        chosen_rows.append(row)
-
-    # если ничего не нашли — хотя бы очистим шаблонную строку
-    need = max(1, len(chosen_rows))
-
-    # сколько строк данных сейчас начиная с token_row_idx
-    have = len(target_table.rows) - token_row_idx
-    if need > have:
-        for _ in range(need - have):
-            target_table._tbl.append(deepcopy(base_tr))
-
-    # 5) заполняем строки
-    for i in range(need):
-        row = target_table.rows[token_row_idx + i]
-        data = chosen_rows[i] if i < len(chosen_rows) else {"test": "", "crit": "", "fact": "", "eval": ""}
-
-        for cell in row.cells:
-            token = (cell.text or "").strip()
-
-            if token == "#T2_TEST":
-                _set_cell_text_keep_style(cell, data.get("test", ""))
-            elif token == "#T2_CRIT":
-                _set_cell_text_keep_style(cell, data.get("crit", ""))
-            elif token == "#T2_FACT":
-                _set_cell_text_keep_style(cell, data.get("fact", ""))
-            elif token == "#T2_EVAL":
-                ev = data.get("eval", "").strip() or default_eval
-                _set_cell_text_keep_style(cell, ev)
-            else:
-                # если маркеров нет (fallback-режим), попробуем по колонкам
-                # (тут можно оставить как есть)
-                pass
-
-    return True, missing
-
-
-def fill_report_table1_rooms_by_hashes(doc: DocxDocument, rooms: list[dict]) -> bool:
-    """
-    Ищет таблицу, где строка данных содержит маркеры:
-      #, ##, ###, ####, #$, #$$, #$$$, #%, #%%, #%%%
-    и заполняет её из rooms (num, name, klass, area, volume, dp, airflow, exchange, temp, rh).
-    """
-    token_to_key = {
-        "#": "num",
-        "##": "name",
-        "###": "klass",
-        "####": "area",
-        "#$": "volume",
-        "#$$": "dp",
-        "#$$$": "airflow",
-        "#%": "exchange",
-        "#%%": "temp",
-        "#%%%": "rh",
-    }
-
-    target_table = None
-    tmpl_row_idx = None
-
-    # 1) найти таблицу и "шаблонную" строку с #..#%%%
-    for t in doc.tables:
-        for ri, row in enumerate(t.rows):
-            row_tokens = [c.text.strip() for c in row.cells]
-            if ("#" in row_tokens) and ("##" in row_tokens) and ("#%%%" in row_tokens):
-                target_table = t
-                tmpl_row_idx = ri
-                break
-        if target_table:
-            break
-
-    if not target_table or tmpl_row_idx is None:
-        return False
-
-    # 2) копируем шаблонную строку (чтобы формат 1:1 сохранялся)
-    base_tr = deepcopy(target_table.rows[tmpl_row_idx]._tr)
-
-    need = max(1, len(rooms))  # если комнат 0 — оставим одну строку пустой
-    have = len(target_table.rows) - tmpl_row_idx
-
-    if need > have:
-        for _ in range(need - have):
-            target_table._tbl.append(deepcopy(base_tr))
-
-    # 3) заполняем
-    for i in range(need):
-        row = target_table.rows[tmpl_row_idx + i]
-        room = rooms[i] if i < len(rooms) else {}
-
-        for cell in row.cells:
-            token = (cell.text or "").strip()
-            key = token_to_key.get(token)
-            if not key:
-                continue
-            _set_cell_text_keep_style(cell, (room.get(key) or "").strip())
-
-    return True
-
-def fix_table2_caption_glue(doc: DocxDocument, caption: str = "Таблица 2") -> bool:
-    """
-    1) Удаляет пустые абзацы между подписью и таблицей
-    2) Делает таблицу inline (убирает tblpPr/tblOverlap)
-    3) КЛЮЧЕВОЕ: ставит keepNext на абзац подписи, чтобы Word не оставлял подпись сиротой
-    """
-    from docx.oxml import OxmlElement
-    from docx.oxml.ns import qn
-
-    def norm(s: str) -> str:
-        s = (s or "").replace("\u00A0", " ")
-        s = re.sub(r"\s+", " ", s).strip().lower()
-        return s
-
-    cap_p = None
-    for p in doc.paragraphs:
-        if norm(p.text) == norm(caption):
-            cap_p = p
-            break
-    if cap_p is None:
-        return False
-
-    # ✅ Главное: подпись не должна отрываться от таблицы
-    pf = cap_p.paragraph_format
-    pf.keep_with_next = True
-    pf.keep_together = True
-    pf.widow_control = True
-
-    def norm(s: str) -> str:
-        s = (s or "").replace("\u00A0", " ")
-        s = re.sub(r"\s+", " ", s).strip().lower()
-        return s
-
-    # 0) найти абзац подписи
-    cap_p = None
-    for p in doc.paragraphs:
-        if norm(p.text) == norm(caption):
-            cap_p = p
-            break
-    if cap_p is None:
-        return False
-
-    # 1) keepNext на подпись (чтобы не отрывалась от таблицы)
-    pPr = cap_p._p.get_or_add_pPr()
-    if pPr.find(qn("w:keepNext")) is None:
-        pPr.append(OxmlElement("w:keepNext"))
-
-    # (опционально) чуть безопаснее: не разрывать саму подпись
-    if pPr.find(qn("w:keepLines")) is None:
-        pPr.append(OxmlElement("w:keepLines"))
-
-    # 2) найти следующий элемент и удалить пустые абзацы между подписью и таблицей
-    p_el = cap_p._p
-    sib = p_el.getnext()
-
-    while sib is not None and sib.tag != qn("w:tbl"):
-        if sib.tag == qn("w:p"):
-            # удаляем реально пустые (в т.ч. с одними пробелами)
-            txt = "".join(t.text for t in sib.iter() if t.tag == qn("w:t"))
-            if norm(txt) == "":
-                nxt = sib.getnext()
-                sib.getparent().remove(sib)
-                sib = nxt
-                continue
-        sib = sib.getnext()
-
-    if sib is None or sib.tag != qn("w:tbl"):
-        return False
-
-    # 3) убрать "плавающее" позиционирование таблицы
-    tbl_el = sib
-    tblPr = tbl_el.find(qn("w:tblPr"))
-    if tblPr is not None:
-        for child_tag in (qn("w:tblpPr"), qn("w:tblOverlap")):
-            ch = tblPr.find(child_tag)
-            if ch is not None:
-                tblPr.remove(ch)
-
-    return True
-
-
-
-
-# =============================================================================
-# 9) Render Worker
+# 9) Render Worker — тонкая Qt-обёртка над render_engine
 # =============================================================================
 
 class RenderWorker(QThread):
     progress = Signal(int, str)
     finished = Signal(bool, str, list)
 
-    def __init__(
-            self,
-            tpl_path: str,
-            tests_doc_path: str,
-            xls_tests_path: str,
-            xls_eq_path: str,
-            out_path: str,
-            selected_tests: list[str],
-            rooms: list[dict],
-            equipment: list[dict],
-            ctx_fields: dict,
-            *,
-            risk_path: str,
-            scans_dir: str,
-            app1_images: list[str],
-            app4_images: list[str],
-            app5_images: list[str],
-
-            # NEW:
-            tpl_report_path: str | None = None,
-            out_report_path: str | None = None,
-            ctx_fields_report: dict | None = None,
-            xls_report_path: str | None = None,
-            report_code: str | None = None,  # <-- ДОБАВИЛИ
-    ):
+    def __init__(self, job: RenderJob):
         super().__init__()
-
-        self.tpl_path = tpl_path
-        self.xls_report_path = xls_report_path
-        self.tests_doc_path = tests_doc_path
-        self.xls_tests_path = xls_tests_path
-        self.xls_eq_path = xls_eq_path
-        self.out_path = out_path
-        self.selected_tests = selected_tests
-        self.rooms = rooms
-        self.equipment = equipment
-        self.ctx_fields = ctx_fields
-        self.risk_path = risk_path
-        self.scans_dir = scans_dir
-        self.app1_images = app1_images or []
-        self.app4_images = app4_images or []
-        self.app5_images = app5_images or []
-
-        self.tpl_report_path = tpl_report_path
-        self.out_report_path = out_report_path
-        self.ctx_fields_report = ctx_fields_report
-
-        self.report_code = (report_code or "").upper()  # <-- ДОБАВИЛИ
+        self.job = job
 
     def run(self):
-        missing: list[str] = []
         try:
-            step = 0
-            self.progress.emit(step, "Валидация файлов…")
-            io_manager.validate_file(Path(self.tpl_path))
-            io_manager.validate_file(Path(self.tests_doc_path))
-            io_manager.validate_file(Path(self.xls_tests_path))
-            io_manager.validate_file(Path(self.xls_eq_path))
-            io_manager.validate_file(Path(self.risk_path))
-            Path(self.out_path).parent.mkdir(parents=True, exist_ok=True)
-
-            # второй документ (ОТЧ-<code>) — опционально
-            do_report = bool(self.tpl_report_path and self.out_report_path and self.ctx_fields_report is not None)
-            if do_report:
-                io_manager.validate_file(Path(self.tpl_report_path))
-                Path(self.out_report_path).parent.mkdir(parents=True, exist_ok=True)
-
-                if self.xls_report_path:
-                    io_manager.validate_file(Path(self.xls_report_path))
-                else:
-                    logger.warning(
-                        f"ОТЧ-{getattr(self, 'report_code', '')}: не указан Excel-файл с данными для Таблицы 2.")
-            else:
-                # если отчёт не включен, report_code может быть пустым — это норм
-                pass
-
-            # ---------- 1. Базовый контекст ----------
-            step += 1
-            self.progress.emit(step, "Сбор контекста…")
-            context = template_renderer.build_context(self.ctx_fields, self.rooms)
-
-            # ---------- 2. Скан-файлы (поверки оборудования) ----------
-            step += 1
-            self.progress.emit(step, "Сбор сканов оборудования…")
-            scan_paths: list[str] = []
-
-            def _serial_key(s: str) -> str:
-                return re.sub(r"[^0-9a-zA-Z]+", "", (s or "")).lower()
-
-            if self.equipment and self.scans_dir:
-                for eq in self.equipment:
-                    name_sn = eq.get("name_sn", "")
-                    try:
-                        _, serial = [p.strip() for p in name_sn.rsplit(",", 1)]
-                    except ValueError:
-                        serial = name_sn.strip()
-
-                    key = _serial_key(serial)
-                    found = None
-                    for root, _, files in os.walk(self.scans_dir):
-                        for fn in files:
-                            # pdf пропускаем как картинку (InlineImage не умеет PDF)
-                            if Path(fn).suffix.lower() not in (".jpg", ".jpeg", ".png", ".pdf"):
-                                continue
-                            if _serial_key(Path(fn).stem) == key:
-                                found = os.path.join(root, fn)
-                                break
-                        if found:
-                            scan_paths.append(found)
-                            break
-
-            if scan_paths:
-                context["Scan_paths"] = scan_paths
-
-            # ---------- 3. Рендер тестового DOCX (1-й проход) ----------
-            step += 1
-            self.progress.emit(step, "Рендер тестового документа…")
-            tpl_tests = DocxTemplate(self.tests_doc_path)
-            tpl_tests.render(context)
-
-            with temp_docx() as tmp_tests_path:
-                tpl_tests.save(tmp_tests_path)
-
-                # ---------- 4. Извлечь расход и посчитать кратность ----------
-                tests_doc_parsed = Document(tmp_tests_path)
-
-                def _robust_extract_total_flows_from_test11(docx_doc: DocxDocument):
-                    flows: list[Decimal | None] = []
-
-                    def norm(s: str) -> str:
-                        return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip().lower()
-
-                    def to_dec(s: str) -> Decimal | None:
-                        s = (s or "").strip().replace("\u00a0", "").replace(" ", "").replace(",", ".")
-                        try:
-                            return Decimal(s)
-                        except InvalidOperation:
-                            return None
-
-                    for t in docx_doc.tables:
-                        head = " ".join(c.text for c in t.rows[0].cells) if t.rows else ""
-                        h = norm(head)
-                        if "проверка" in h and "расхода" in h and "приточ" in h:
-                            hdr_idx = None
-                            for i, row in enumerate(t.rows):
-                                if "результаты испытани" in norm(" ".join(c.text for c in row.cells)):
-                                    hdr_idx = i + 1 if (i + 1) < len(t.rows) else None
-                                    break
-                            if hdr_idx is None:
-                                continue
-
-                            rows_for_header = [t.rows[hdr_idx]]
-                            if hdr_idx + 1 < len(t.rows):
-                                rows_for_header.append(t.rows[hdr_idx + 1])
-
-                            def col_idx(*needles):
-                                for row in rows_for_header:
-                                    for ci, c in enumerate(row.cells):
-                                        tt = norm(c.text)
-                                        if all(n in tt for n in needles):
-                                            return ci
-                                return None
-
-                            col_fact = col_idx("фактическ")
-                            col_sum = col_idx("фактическ", "суммарн")
-
-                            cur_sum: Decimal | None = None
-                            room_started = False
-
-                            data_start = hdr_idx + (2 if len(rows_for_header) == 2 else 1)
-
-                            for r in range(data_start, len(t.rows)):
-                                row = t.rows[r]
-                                row_text = norm(" ".join(c.text for c in row.cells))
-
-                                if row_text.startswith("комментар"):
-                                    if room_started:
-                                        flows.append(cur_sum)
-                                    break
-
-                                if row_text.startswith("помещение"):
-                                    if room_started:
-                                        flows.append(cur_sum)
-                                    room_started = True
-                                    cur_sum = None
-                                    continue
-
-                                if not room_started:
-                                    continue
-
-                                if col_sum is not None and col_sum < len(row.cells):
-                                    v = to_dec(row.cells[col_sum].text)
-                                    if v is not None:
-                                        cur_sum = v
-                                        continue
-
-                                if col_fact is not None and col_fact < len(row.cells):
-                                    v = to_dec(row.cells[col_fact].text)
-                                    if v is not None:
-                                        cur_sum = (cur_sum or Decimal("0")) + v
-
-                            if room_started:
-                                flows.append(cur_sum)
-
-                    return flows
-
-                _total1 = table_processor.extract_total_flows_from_test11(tests_doc_parsed)
-                total_flows = (
-                    _total1 if (_total1 and any(v is not None for v in _total1))
-                    else _robust_extract_total_flows_from_test11(tests_doc_parsed)
-                )
-
-                for idx, room in enumerate(self.rooms):
-                    if idx < len(total_flows) and total_flows[idx] is not None:
-                        val = total_flows[idx].quantize(Decimal("1.00"))
-                        room["total_flow"] = f"{val}".replace(".", ",")
-                    else:
-                        pr = (room.get("airflow") or "").strip().replace(" ", "").replace("\u00a0", "")
-                        pr = pr.replace(".", ",")
-                        try:
-                            q = Decimal(pr.replace(",", ".")).quantize(Decimal("1.00"))
-                            room["total_flow"] = f"{q}".replace(".", ",")
-                        except InvalidOperation:
-                            room["total_flow"] = pr or ""
-
-                    vol_raw = (room.get("volume") or "").replace(",", ".")
-                    try:
-                        vol = Decimal(vol_raw)
-                        tf_raw = (room.get("total_flow") or "").replace(",", ".")
-                        tf = Decimal(tf_raw) if tf_raw else None
-                        if vol and vol > 0 and tf is not None:
-                            exch = tf / vol
-                            room["exchange_actual"] = str(exch.quantize(Decimal("1.00"))).replace(".", ",")
-                        else:
-                            room["exchange_actual"] = ""
-                    except (InvalidOperation, ZeroDivisionError):
-                        room["exchange_actual"] = ""
-
-                # ---------- 5. Пересобрать контекст ----------
-                context = template_renderer.build_context(self.ctx_fields, self.rooms)
-                if scan_paths:
-                    context["Scan_paths"] = scan_paths
-
-                # ---------- 6. Перерендер тестового DOCX (2-й проход) ----------
-                step += 1
-                self.progress.emit(step, "Перерендер тестовых таблиц с расчётами…")
-                tpl_tests2 = DocxTemplate(self.tests_doc_path)
-                tpl_tests2.render(context)
-                tpl_tests2.save(tmp_tests_path)
-
-                # ---------- 7. Рендер основного шаблона ----------
-                step += 1
-                self.progress.emit(step, "Рендер основного шаблона…")
-                tpl_main = DocxTemplate(self.tpl_path)
-
-                context["App1Scans"] = make_inline_images(tpl_main, self.app1_images, label="Приложение 1")
-                context["App4Scans"] = make_inline_images(tpl_main, self.app4_images, label="Приложение 4")
-                context["App5Scans"] = make_inline_images(tpl_main, self.app5_images, label="Приложение 5")
-                context["Scans"] = make_inline_images(tpl_main, scan_paths, label="Приложение 2")
-
-                tpl_main.render(context)
-
-                with temp_docx() as tmp_main_path:
-                    tpl_main.save(tmp_main_path)
-                    doc = Document(tmp_main_path)
-
-                    # ---------- 8. Таблицы помещений/оборудования ----------
-                    step += 1
-                    self.progress.emit(step, "Обработка таблицы помещений…")
-                    table_processor.process_rooms_table(doc, self.rooms)
-
-                    step += 1
-                    self.progress.emit(step, "Обработка таблицы оборудования…")
-                    table_processor.process_equipment_table(doc, self.equipment)
-                    postprocess_equipment_dates(doc)
-
-                    # ---------- 9. Вставка выбранных тестов ----------
-                    step += 1
-                    self.progress.emit(step, "Вставка тестовых таблиц…")
-                    missing = table_processor.insert_test_tables(doc, tmp_tests_path, self.selected_tests)
-
-                    # ---------- 10. Таблица 5 ----------
-                    step += 1
-                    self.progress.emit(step, "Вставка Таблицы 5 (анализ рисков)…")
-                    try:
-                        risk_rows = get_risk_rows(self.risk_path, self.selected_tests)
-                        insert_table5_into_doc(doc, risk_rows)
-                    except Exception as e:
-                        logger.warning(f"Таблица 5 не вставлена: {e}")
-
-                    # ---------- 11. Постобработка ----------
-                    step += 1
-                    self.progress.emit(step, "Заполнение результатов тестов…")
-                    table_processor.process_test_results_tables(doc, self.rooms)
-                    _fill_test_112(doc, self.rooms)
-
-                    import word_repeat_headers
-                    word_repeat_headers.split_test_results_table(
-                        doc,
-                        split_phrase="Результаты испытания",
-                        header_rows=2,
-                        table_must_contain="Проверка расхода приточного воздуха",
-                    )
-
-                    step += 1
-                    self.progress.emit(step, "Унификация шрифта…")
-                    table_processor.enforce_tnr_face_only_everywhere(doc)
-
-                    try:
-                        for table in doc.tables:
-                            table.style = "Table Grid"
-                    except Exception as e:
-                        logger.warning(f"Не удалось применить стиль 'Table Grid': {e}")
-
-                    # ---------- 12. Сохранение основного документа ----------
-                    step += 1
-                    self.progress.emit(step, "Сохранение…")
-                    doc.save(self.out_path)
-
-                # обновление полей/колонтитулов + разрезание таблицы 5 через Word (если нужно)
-                try:
-                    word_table5_splitter.update_fields_with_word(self.out_path)
-                except Exception as e:
-                    logger.warning(f"Не удалось обновить поля/разрезать таблицу 5 через Word: {e}")
-
-                # ---------- 13. Рендер ОТЧ-<code> ----------
-                if do_report:
-                    rep = (getattr(self, "report_code", "") or "").upper()
-                    rep = rep if rep else "ОТЧ"
-
-                    step += 1
-                    self.progress.emit(step, f"Рендер {rep}…")
-
-                    context_r = template_renderer.build_context(self.ctx_fields_report, self.rooms)
-                    if scan_paths:
-                        context_r["Scan_paths"] = scan_paths
-
-                    tpl_r = DocxTemplate(self.tpl_report_path)
-
-                    context_r["App1Scans"] = make_inline_images(tpl_r, self.app1_images, label="Приложение 1")
-                    context_r["App4Scans"] = make_inline_images(tpl_r, self.app4_images, label="Приложение 4")
-                    context_r["App5Scans"] = make_inline_images(tpl_r, self.app5_images, label="Приложение 5")
-                    context_r["Scans"] = make_inline_images(tpl_r, scan_paths, label="Приложение 2")
-
-                    tpl_r.render(context_r)
-
-                    with temp_docx() as tmp_r_path:
-                        tpl_r.save(tmp_r_path)
-                        doc_r = Document(tmp_r_path)
-
-                        # 1) Таблица 1 (помещения)
-                        ok1 = fill_report_table1_rooms_by_hashes(doc_r, self.rooms)
-                        if not ok1:
-                            logger.warning(
-                                f"{rep}: Таблица 1 с маркерами #/##/... не найдена — помещения не заполнены.")
-
-                        # 2) Таблица 2 (из Excel по выбранным тестам)
-                        if self.xls_report_path:
-                            ok2, missing2 = fill_report_table2_from_excel(
-                                doc_r,
-                                self.selected_tests,  # порядок как выбран пользователем
-                                self.xls_report_path,
-                                default_eval="Соответствует",
-                            )
-                            if not ok2:
-                                logger.warning(f"{rep}: Таблица 2 не найдена (по заголовку/маркерам).")
-                            if missing2:
-                                logger.warning(f"{rep}: в Excel нет строк для тестов:\n" + "\n".join(missing2))
-                        else:
-                            logger.warning(f"{rep}: Excel отчёта не задан — Таблица 2 не заполнена.")
-
-                        # 3) "Таблица 2" приклеить к следующей таблице
-                        try:
-                            fix_table2_caption_glue(doc_r)
-                        except Exception as e:
-                            logger.warning(f"{rep}: не удалось применить fix_table2_caption_glue: {e}")
-
-                        # 4) Сохранение
-                        doc_r.save(self.out_report_path)
-
-                    # Таблица 2: деление по странице + "Продолжение таблицы 2" + обновление полей
-                    try:
-                        word_table2_otch_splitter.update_fields_and_split_table2(self.out_report_path)
-                    except Exception as e:
-                        logger.warning(f"{rep}: не удалось разрезать Таблицу 2 / обновить поля через Word: {e}")
-
-                    # финальный проход: обновить ВСЁ (PAGE/NUMPAGES + TOC + поля)
-                    try:
-                        import word_update_all
-                        word_update_all.update_all(self.out_report_path)
-                    except Exception as e:
-                        logger.warning(f"{rep}: не удалось обновить все поля/содержание через Word: {e}")
-
-                msg = f"Документ сохранён:\n{self.out_path}"
-                if do_report and self.out_report_path:
-                    rep = (getattr(self, "report_code", "") or "").upper()
-                    rep = f"ОТЧ-{rep}" if rep else "ОТЧ"
-                    msg += f"\n\n{rep} сохранён:\n{self.out_report_path}"
-
-                self.finished.emit(True, msg, missing)
-
+            result = render_engine.render_job(self.job, progress=self.progress.emit)
+            self.finished.emit(True, result.message, result.missing)
         except Exception as e:
             logger.exception("Ошибка в RenderWorker:")
             self.finished.emit(False, str(e), [])
 
 
+
 # =============================================================================
 # 10) Main Window
 # =============================================================================
@@ -1768,29 +514,18 @@ class MainWindow(QMainWindow):
 
         base = Path(__file__).resolve().parents[1]
         self.defaults = {
-            "OQ": {
-                "tpl": base / "Шаблон OQ.docx",
-                "tests": base / "Тесты OQ.docx",
-                "xls_tests": base / "tests OQ.xlsx",
-                "xls_eq": base / "ПЕРЕЧЕНЬ ПРИБОРОВ OQ.xlsx",
-                "scans_dir": base / "Сканы поверок",
-                "risk_doc": base / "risk_analysis_from_docx.xlsx",
-            },
-            "PQ": {
-                "tpl": base / "Шаблон PQ.docx",
-                "tests": base / "Тесты PQ.docx",
-                "xls_tests": base / "tests PQ.xlsx",
-                "xls_eq": base / "ПЕРЕЧЕНЬ ПРИБОРОВ OQ.xlsx",
-                "scans_dir": base / "Сканы поверок",
-                "risk_doc": base / "risk_analysis_from_docx.xlsx",
-            },
+            "OQ": render_engine.default_paths("OQ", base),
+            "PQ": render_engine.default_paths("PQ", base),
         }
 
         self.rooms: List[Dict[str, str]] = []
+        self.test11_result = None  # калькулятор Теста 11 (tools.test11_airflow_calc.Test11Result)
         self.equipment: List[Dict[str, str]] = []
         self.all_tests: List[str] = []
         self.selected_tests: List[str] = []
-        self._batch_modes: List[str] = []
+        # активные рендеры по режимам ("OQ"/"PQ") и их итоги — OQ и PQ идут параллельно
+        self.workers: Dict[str, RenderWorker] = {}
+        self._results: Dict[str, tuple[bool, str, list]] = {}
 
         # Приложения 1, 4, 5
         self.app1_images: list[str] = []
@@ -1942,10 +677,16 @@ class MainWindow(QMainWindow):
         g.addWidget(btn_save, row, 2)
         row += 1
 
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 20)
-        g.addWidget(self.progress_bar, row, 0, 1, 3)
-        row += 1
+        # по «дорожке» прогресса на каждый режим — в «OQ и PQ» видны обе
+        self.progress_lanes: Dict[str, tuple[QLabel, QProgressBar]] = {}
+        for lane_mode in ("OQ", "PQ"):
+            lbl = QLabel(lane_mode)
+            bar = QProgressBar()
+            bar.setRange(0, 20)
+            g.addWidget(lbl, row, 0)
+            g.addWidget(bar, row, 1, 1, 2)
+            self.progress_lanes[lane_mode] = (lbl, bar)
+            row += 1
 
         btn_generate = QPushButton("Сгенерировать")
         btn_generate.clicked.connect(self.start_render)
@@ -2057,8 +798,11 @@ class MainWindow(QMainWindow):
             self.rooms = dlg.get_rooms()
 
     def launch_test11_calculator(self, *_, auto_close: bool = True) -> int:
-        import subprocess
-
+        """
+        Калькулятор Теста 11 — в этом же процессе. Помещения передаются списками,
+        результат (DOCX тестов с таблицей и расходы) остаётся в памяти и подставляется
+        в рендер, пока «Документ-тесты» указывает на тот же файл.
+        """
         tpl_path_str = (self.tests_path.text().strip() or "")
         if not tpl_path_str:
             QMessageBox.critical(self, "Калькулятор Тест 11", "Не указан «Документ-тесты (.docx)».")
@@ -2093,84 +837,74 @@ class MainWindow(QMainWindow):
             need = n - len(lst)
             return lst if need <= 0 else lst + [filler(len(lst) + k + 1) for k in range(need)]
 
-        nums = _pad(nums, lambda k: str(k))
-        names = _pad(names, lambda _: "")
-        klasses = _pad(klasses, lambda _: "")
-        areas = _pad(areas, lambda _: "1")
-        filters = _pad(filters, lambda _: "2")
-        points = _pad(points, lambda _: "2")
-        airflows = _pad(airflows, lambda _: "")
-
-        def _join(xs: List[str]) -> str:
-            # безопасно для разделителя ;
-            return ";".join(x.replace(";", " ").strip() for x in xs)
-
-        nums_s = _join(nums)
-        names_s = _join(names)
-        klasses_s = _join(klasses)
-        areas_s = _join(areas)
-        filters_s = _join(filters)
-        points_s = _join(points)
-        airflows_s = _join(airflows)
-
-        proj_root = Path(__file__).resolve().parents[1]
-        candidates = [
-            proj_root / "tools" / "test11_airflow_calc.py",
-            Path.cwd() / "tools" / "test11_airflow_calc.py",
-            proj_root / "tests" / "test11_airflow_calc.py",
-            Path(__file__).resolve().parent / "test11_airflow_calc.py",
-        ]
-        script = next((p for p in candidates if p.exists()), None)
-        if script is None:
-            paths_list = "\n".join(str(p) for p in candidates)
-            QMessageBox.critical(
-                self, "Калькулятор Тест 11",
-                "Не найден скрипт test11_airflow_calc.py по путям:\n\n" + paths_list
-            )
-            return 1
-
-        tmp_dir = Path(tempfile.mkdtemp(prefix="test11_"))
-        auto_save_path = tmp_dir / "test11_auto_save.docx"
-
-        args: List[str] = [
-            sys.executable, str(script),
-            "--template", str(tpl_path),
-            "--rooms", str(n),
-            "--nums", nums_s,
-            "--names", names_s,
-            "--klasses", klasses_s,  # <-- ВАЖНО
-            "--areas", areas_s,
-            "--filters", filters_s,
-            "--points", points_s,
-            "--airflows", airflows_s,
-            "--auto-save", str(auto_save_path),
-        ]
-        if auto_close:
-            args.append("--auto-close")
-
         try:
-            proc = subprocess.run(args, check=False)
-            rc = int(proc.returncode or 0)
+            from tools.test11_airflow_calc import run_calculator
         except Exception as e:
-            QMessageBox.critical(self, "Калькулятор Тест 11", f"Ошибка запуска:\n{e}")
+            QMessageBox.critical(self, "Калькулятор Тест 11", f"Не удалось загрузить калькулятор:\n{e}")
             return 1
 
-        if auto_save_path.exists():
-            self.tests_path.setText(str(auto_save_path))
+        result = run_calculator(
+            self,
+            template=str(tpl_path),
+            rooms=n,
+            nums=_pad(nums, lambda k: str(k)),
+            names=_pad(names, lambda _: ""),
+            klasses=_pad(klasses, lambda _: ""),
+            areas=_pad(areas, lambda _: "1"),
+            filters=_pad(filters, lambda _: "2"),
+            points=_pad(points, lambda _: "2"),
+            airflows=_pad(airflows, lambda _: ""),
+            auto_close=auto_close,
+        )
+        if result is None:
+            return 1
 
-        setattr(self, "last_test11_autosave", str(auto_save_path))
-        return rc
+        self.test11_result = result
+        self.statusBar().showMessage(
+            f"Тест 11 рассчитан: таблица будет подставлена в «{Path(result.template).name}» при рендере"
+        )
+        return 0
+
+    def _test11_for(self, tests_path: str):
+        """Результат калькулятора, если он посчитан по этому же документу-тестам."""
+        res = getattr(self, "test11_result", None)
+        if res is None or not tests_path:
+            return None
+        try:
+            same = Path(tests_path).expanduser().resolve() == Path(res.template).resolve()
+        except OSError:
+            return None
+        return res if same else None
 
     def start_render(self) -> None:
         mode = self.mode_combo.currentText()
-        if mode == "OQ и PQ":
-            self._batch_modes = ["OQ", "PQ"]
-            self._start_single_render(self._batch_modes.pop(0))
-        else:
-            self._batch_modes = []
-            self._start_single_render(mode)
+        modes = ["OQ", "PQ"] if mode == "OQ и PQ" else [mode.upper()]
+
+        # сначала собираем (и проверяем) все задания, потом запускаем разом
+        jobs: Dict[str, RenderJob] = {}
+        for m in modes:
+            job = self._build_job(m)
+            if job is None:
+                return
+            jobs[m] = job
 
-    def _start_single_render(self, mode: str) -> None:
+        self.setEnabled(False)
+        self.workers.clear()
+        self._results.clear()
+        for lane_mode, (lbl, bar) in self.progress_lanes.items():
+            lbl.setVisible(lane_mode in jobs)
+            bar.setVisible(lane_mode in jobs)
+            bar.setValue(0)
+
+        for m, job in jobs.items():
+            worker = RenderWorker(job)
+            worker.progress.connect(lambda step, message, m=m: self.on_progress(m, step, message))
+            worker.finished.connect(lambda ok, message, missing, m=m: self.on_finished(m, ok, message, missing))
+            self.workers[m] = worker
+        for worker in self.workers.values():
+            worker.start()
+
+    def _build_job(self, mode: str) -> RenderJob | None:
         mode = mode.upper()
         use_ui_paths = (self.mode_combo.currentText().upper() == mode)
 
@@ -2182,6 +916,7 @@ class MainWindow(QMainWindow):
             scans_dir = self.scans_dir_input.text().strip()
             sel_tests_raw = self.selected_tests[:]
             equipment_list = self.equipment[:]
+            test11 = self._test11_for(tests_path)
             # risk берем из defaults (UI поля под него нет)
             risk_path = str(self.defaults[mode]["risk_doc"])
         else:
@@ -2203,6 +938,7 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, f"Ошибка загрузки оборудования ({mode})", str(e))
                 return
+            test11 = None
 
         app1_images = self.app1_images[:]
         app4_images = self.app4_images[:]
@@ -2216,27 +952,7 @@ class MainWindow(QMainWindow):
         out_path = out_base.with_name(out_base.stem + f"_{mode}.docx")
 
         # ---------- ОТЧ (для текущего mode) ----------
-        base = Path(__file__).resolve().parents[1]
-        tpl_report_path = None
-        out_report_path = None
-        ctx_fields_report = None
-        xls_report_path = None
-
-        if mode in ("OQ", "PQ"):
-            report_code = mode  # "OQ" или "PQ"
-
-            candidate_tpl = base / f"Шаблон ОТЧ-{report_code}.docx"
-            if candidate_tpl.exists():
-                tpl_report_path = str(candidate_tpl)
-                out_report_path = str(out_base.with_name(out_base.stem + f"_{mode}_ОТЧ-{report_code}.docx"))
-            else:
-                logger.warning(f"Шаблон отчёта ОТЧ-{report_code} не найден: {candidate_tpl}")
-
-            candidate_xls = base / f"ОТЧ-{report_code}.xlsx"
-            if candidate_xls.exists():
-                xls_report_path = str(candidate_xls)
-            else:
-                logger.warning(f"Excel отчёта ОТЧ-{report_code} не найден: {candidate_xls}")
+        tpl_report_path, out_report_path, xls_report_path = render_engine.report_paths(mode, out_base)
 
         missing_fields = []
         if not tpl_path:
@@ -2251,106 +967,41 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, f"Ошибка ({mode})", "Не указаны: " + ", ".join(missing_fields))
             return
 
-        sel_tests = [
-            re.sub(r"(?i)^тест\s*\d+(?:\.\d+)?\.?\s*", "", s).strip()
-            for s in sel_tests_raw if isinstance(s, str) and s.strip()
-        ]
-
-        def _norm_doc_id(raw: str) -> str:
-            s = (raw or "").strip().upper()
-            # если пользователь вставил уже с префиксом — срежем
-            prefixes = (
-                "ПРТ-OQ-", "ПРТ-PQ-", "ПРТ-IQ-",
-                "ОТЧ-OQ-", "ОТЧ-PQ-", "ОТЧ-IQ-",
-                "ПРТ-", "ОТЧ-",
-            )
-            for p in prefixes:
-                if s.startswith(p):
-                    s = s[len(p):]
-                    break
-            return s
-
-        doc_id = _norm_doc_id(self.prt_input.text())
-
-        # основной документ (OQ/PQ): {{prt}} = ПРТ-<ввод>
-        prt = RichText(
-            f"ПРТ-{doc_id}" if doc_id else "",
-            bold=False, italic=False, underline=False
-        )
-
-        # отчёт ОТЧ-(OQ/PQ): {{prt}} = ОТЧ-<mode>-<ввод>
-        prt_report = RichText(
-            f"ОТЧ-{mode}-{doc_id}" if doc_id else "",
-            bold=False, italic=False, underline=False
-        )
-
-        # отчёт: {{prt1}} = ПРТ-<mode>-<ввод>
-        prt1_report = RichText(
-            f"ПРТ-{mode}-{doc_id}" if doc_id else "",
-            bold=False, italic=False, underline=False
-        )
-
-        object_text = self.object_input.text().strip()
-        object_rd = ""
-        if object_text:
-            morph = MorphAnalyzer()
-            words = object_text.split()
-            parsed = [morph.parse(w)[0] for w in words]
-            adj_idx = next((i for i, p in enumerate(parsed[:-1]) if "ADJF" in p.tag), None)
-            noun_idx = adj_idx + 1 if adj_idx is not None and adj_idx + 1 < len(parsed) else None
-            if adj_idx is not None and noun_idx is not None and "NOUN" in parsed[noun_idx].tag:
-                adj = parsed[adj_idx]
-                noun = parsed[noun_idx]
-                gender = noun.tag.gender
-                number = noun.tag.number
-                adj_gent = adj.inflect({"gent", gender, number})
-                noun_gent = noun.inflect({"gent"})
-                if adj_gent and noun_gent:
-                    before = " ".join(words[:adj_idx])
-                    after = " ".join(words[noun_idx + 1:])
-                    object_rd = f"{before} {adj_gent.word} {noun_gent.word} {after}".strip()
-                else:
-                    object_rd = object_text
-            else:
-                first_noun = next((p for p in parsed if "NOUN" in p.tag), None)
-                if first_noun:
-                    infl = first_noun.inflect({"gent"})
-                    if infl:
-                        idx = parsed.index(first_noun)
-                        object_rd = " ".join(words[:idx] + [infl.word] + words[idx + 1:])
-                    else:
-                        object_rd = object_text
-                else:
-                    object_rd = object_text
-
-        ctx_fields: Dict[str, Any] = {
-            "объект": object_text,
-            "объект1": object_rd,
-            "prt": prt,
-            "year": self.year_input.text().strip(),
-            "customer": self.customer_input.text().strip(),
-            "address": self.address_input.text().strip(),
-            "Разработал": self.developed_input.text().strip(),
-            "Проверил": self.checked_input.text().strip(),
-            "Дата_Разработки": self.date_dev.date().toString("dd.MM.yyyy"),
-            "Дата_Проверки": self.date_check.date().toString("dd.MM.yyyy"),
-            "ДАТА_начала_испытания": self.date_test.date().toString("dd.MM.yyyy"),
-            "ДАТА_окончания": self.date_end.date().toString("dd.MM.yyyy"),
-            "Тесты_маркированным_списком": RichText("\n".join(f"• {t}" for t in sel_tests), bold=False),
+        sel_tests = render_engine.strip_test_numbers(sel_tests_raw)
+
+        fields = {
+            "object": self.object_input.text(),
+            "prt": self.prt_input.text(),
+            "year": self.year_input.text(),
+            "customer": self.customer_input.text(),
+            "address": self.address_input.text(),
+            "developed": self.developed_input.text(),
+            "checked": self.checked_input.text(),
+            "date_dev": self.date_dev.date().toString("dd.MM.yyyy"),
+            "date_check": self.date_check.date().toString("dd.MM.yyyy"),
+            "date_test": self.date_test.date().toString("dd.MM.yyyy"),
+            "date_end": self.date_end.date().toString("dd.MM.yyyy"),
         }
+        try:
+            ctx_fields, ctx_fields_report = render_engine.build_ctx_fields(fields, mode, sel_tests)
+        except Exception as e:
+            QMessageBox.critical(self, f"Ошибка ({mode})", str(e))
+            return
 
         # контекст для отчёта (только если реально есть шаблон и путь)
-        if mode in ("OQ", "PQ") and tpl_report_path and out_report_path:
-            ctx_fields_report = dict(ctx_fields)
-            ctx_fields_report["prt"] = prt_report
-            ctx_fields_report["prt1"] = prt1_report
-
-        self.setEnabled(False)
-        self.progress_bar.setValue(0)
-
-        self.worker = RenderWorker(
-            tpl_path, tests_path, xls_tests, xls_eq, str(out_path),
-            sel_tests, self.rooms, equipment_list, ctx_fields,
+        if not (tpl_report_path and out_report_path):
+            ctx_fields_report = None
+
+        return RenderJob(
+            tpl_path=tpl_path,
+            tests_doc_path=tests_path,
+            xls_tests_path=xls_tests,
+            xls_eq_path=xls_eq,
+            out_path=str(out_path),
+            selected_tests=sel_tests,
+            rooms=self.rooms,
+            equipment=equipment_list,
+            ctx_fields=ctx_fields,
             risk_path=risk_path,
             scans_dir=scans_dir,
             app1_images=app1_images,
@@ -2363,40 +1014,42 @@ class MainWindow(QMainWindow):
             ctx_fields_report=ctx_fields_report,
             xls_report_path=xls_report_path,
             report_code=mode,
+
+            # Тест 11 из калькулятора — из памяти, без временного DOCX
+            tests_doc_data=test11.docx if test11 else None,
+            test11_flows=test11.flows if test11 else None,
         )
 
-        self.worker.progress.connect(self.on_progress)
-        self.worker.finished.connect(self.on_finished)
-        self.worker.start()
-
-    def on_progress(self, step: int, message: str) -> None:
-        self.progress_bar.setValue(step)
-        self.statusBar().showMessage(message)
-
-    def on_finished(self, success: bool, message: str, missing: list[str]) -> None:
-        if self._batch_modes:
-            next_mode = self._batch_modes.pop(0)
-            if success:
-                if missing:
-                    QMessageBox.warning(self, "Внимание", "Не вставлены тесты:\n" + "\n".join(missing))
-                logger.info(message)
-            else:
-                QMessageBox.critical(self, "Ошибка", message)
-                self._batch_modes.clear()
-                self.setEnabled(True)
-                self.statusBar().clearMessage()
-                return
-            self._start_single_render(next_mode)
+    def on_progress(self, mode: str, step: int, message: str) -> None:
+        self.progress_lanes[mode][1].setValue(step)
+        self.statusBar().showMessage(f"{mode}: {message}")
+
+    def on_finished(self, mode: str, success: bool, message: str, missing: list[str]) -> None:
+        self._results[mode] = (success, message, missing)
+        if len(self._results) < len(self.workers):
+            logger.info(f"{mode}: {'готово' if success else 'ошибка'} — ждём остальные режимы")
             return
 
         self.setEnabled(True)
-        if success:
-            if missing:
-                QMessageBox.warning(self, "Внимание", "Не вставлены тесты:\n" + "\n".join(missing))
-            QMessageBox.information(self, "Успех", message)
-        else:
-            QMessageBox.critical(self, "Ошибка", message)
         self.statusBar().clearMessage()
+        several = len(self._results) > 1
+        all_missing: list[str] = []
+        ok_msgs: list[str] = []
+        err_msgs: list[str] = []
+        for m, (ok, msg, miss) in self._results.items():
+            prefix = f"[{m}] " if several else ""
+            if ok:
+                ok_msgs.append(prefix + msg)
+                all_missing += [prefix + t for t in miss]
+            else:
+                err_msgs.append(prefix + msg)
+
+        if all_missing:
+            QMessageBox.warning(self, "Внимание", "Не вставлены тесты:\n" + "\n".join(all_missing))
+        if err_msgs:
+            QMessageBox.critical(self, "Ошибка", "\n\n".join(err_msgs))
+        if ok_msgs:
+            QMessageBox.information(self, "Успех", "\n\n".join(ok_msgs))
 
 
 def main():
@@ -1,10 +1,9 @@
 from __future__ import annotations
 
 import re
-from typing import Optional
 
-import win32com.client as win32
-from win32com.client import constants as c
+import word_pool
+from word_facade import ComDocument, split_by_pages
 
 
 def _clean_cell_text(s: str) -> str:
@@ -35,43 +34,55 @@ def _looks_like_table2(word_table) -> bool:
         return False
 
 
-def _insert_continuation_block_before_table(word_app, doc, table, title: str) -> None:
+def split_table2_open_doc(
+    word_app,
+    doc,
+    c,
+    *,
+    continuation_title: str = "Продолжение таблицы 2",
+    header_rows_count: int = 1,
+    max_splits: int = 20,
+) -> bool:
     """
-    Вставляет ПЕРЕД table:
-      - абзац 'Продолжение таблицы 2' (TNR12 bold, справа)
-      - абзац начинается С НОВОЙ СТРАНИЦЫ (PageBreakBefore=True)
-    ВАЖНО: гарантированно вставляем ВНЕ таблицы (не в ячейку).
+    В ОТКРЫТОМ документе Word режет Таблицу 2 по фактическому переносу на
+    следующую страницу: word_facade.split_by_pages поверх ComDocument.
+    Возвращает True если хотя бы один разрез сделан.
     """
-    sel = word_app.Selection
+    # если уже есть "Продолжение таблицы 2" — не плодим дубли
+    if continuation_title in _clean_cell_text(doc.Content.Text):
+        return False
 
-    # Ставим курсор в начало новой таблицы
-    sel.SetRange(table.Range.Start, table.Range.Start)
+    doc.Repaginate()
 
-    # Гарантированно выходим из таблицы в "параграф-якорь" перед ней
-    # Иногда Word держит Range внутри первой ячейки — выходим MoveLeft'ом.
-    guard = 0
-    while sel.Information(c.wdWithInTable) and guard < 50:
-        sel.MoveLeft(Unit=c.wdCharacter, Count=1)
-        guard += 1
+    # найдём таблицу 2
+    t2 = None
+    for t in doc.Tables:
+        if _looks_like_table2(t):
+            t2 = t
+            break
 
-    # Теперь мы вне таблицы: вставляем абзац перед таблицей
-    sel.InsertParagraphAfter()          # создаём параграф перед таблицей
-    sel.MoveUp(Unit=c.wdParagraph, Count=1)
+    if t2 is None:
+        return False
 
-    # Настраиваем абзац как "начало новой страницы"
-    sel.ParagraphFormat.PageBreakBefore = True
-    sel.ParagraphFormat.Alignment = c.wdAlignParagraphRight
-    sel.ParagraphFormat.SpaceBefore = 0
-    sel.ParagraphFormat.SpaceAfter = 0
+    splits = split_by_pages(
+        ComDocument(word_app, doc, c),
+        t2,
+        header_rows=header_rows_count,
+        title=continuation_title,
+        max_splits=max_splits,
+    )
+    return splits > 0
 
-    # Текст + шрифт
-    sel.Font.Name = "Times New Roman"
-    sel.Font.Size = 12
-    sel.Font.Bold = True
-    sel.TypeText(title)
 
-    # Важно: НЕ InsertBreak() — иначе может появляться пустая страница
-    # И НЕ InsertParagraphAfter() — иначе появится лишняя пустая строка
+def _split_op(continuation_title: str, header_rows_count: int, max_splits: int = 20):
+    def split_table2(app, doc, c):
+        return split_table2_open_doc(
+            app, doc, c,
+            continuation_title=continuation_title,
+            header_rows_count=header_rows_count,
+            max_splits=max_splits,
+        )
+    return split_table2
 
 
 def split_table2_with_continuation_word(
@@ -85,98 +96,8 @@ def split_table2_with_continuation_word(
     Режет Таблицу 2 по фактическому переносу на следующую страницу (через Word пагинацию).
     Возвращает True если хотя бы один разрез сделан.
     """
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = False
-
-    did_any = False
-    try:
-        doc = word.Documents.Open(str(docx_path))
-
-        # если уже есть "Продолжение таблицы 2" — не плодим дубли
-        if continuation_title in _clean_cell_text(doc.Content.Text):
-            doc.Close(SaveChanges=False)
-            return False
-
-        doc.Repaginate()
-
-        # найдём таблицу 2
-        t2 = None
-        for t in doc.Tables:
-            if _looks_like_table2(t):
-                t2 = t
-                break
-
-        if t2 is None:
-            doc.Close(SaveChanges=False)
-            return False
-
-        # сделаем шапку повторяемой
-        try:
-            for i in range(1, header_rows_count + 1):
-                t2.Rows(i).HeadingFormat = True
-        except Exception:
-            pass
-
-        splits_done = 0
-        cur_table = t2
-
-        while splits_done < max_splits:
-            doc.Repaginate()
-
-            # страница, на которой заканчивается шапка
-            base_page = cur_table.Rows(header_rows_count).Range.Information(c.wdActiveEndPageNumber)
-
-            # найдём первую строку данных, которая ушла на следующую страницу
-            split_row_idx: Optional[int] = None
-            for ri in range(header_rows_count + 1, cur_table.Rows.Count + 1):
-                pg = cur_table.Rows(ri).Range.Information(c.wdActiveEndPageNumber)
-                if pg > base_page:
-                    split_row_idx = ri
-                    break
-
-            if split_row_idx is None:
-                break  # таблица целиком помещается на странице
-
-            # 1) Копируем текущую таблицу после неё же
-            count_before = doc.Tables.Count
-            ins = cur_table.Range
-            ins.Collapse(c.wdCollapseEnd)
-            ins.InsertParagraphAfter()
-            ins.Collapse(c.wdCollapseEnd)
-
-            cur_table.Range.Copy()
-            ins.PasteAndFormat(c.wdFormatOriginalFormatting)
-
-            new_table = doc.Tables(count_before + 1)
-
-            # 2) В НОВОЙ таблице удаляем строки ДО split_row_idx (кроме шапки)
-            for _ in range((split_row_idx - 1) - header_rows_count):
-                new_table.Rows(header_rows_count + 1).Delete()
-
-            # 3) В СТАРОЙ таблице удаляем строки split_row_idx..конец
-            while cur_table.Rows.Count >= split_row_idx:
-                cur_table.Rows(split_row_idx).Delete()
-
-            # 4) Вставляем "Продолжение таблицы 2" ПЕРЕД новой таблицей (вне таблицы!)
-            _insert_continuation_block_before_table(word, doc, new_table, continuation_title)
-
-            # 5) Повторяемая шапка для новой таблицы
-            try:
-                for i in range(1, header_rows_count + 1):
-                    new_table.Rows(i).HeadingFormat = True
-            except Exception:
-                pass
-
-            did_any = True
-            splits_done += 1
-            cur_table = new_table
-
-        doc.Save()
-        doc.Close()
-        return did_any
-
-    finally:
-        word.Quit()
+    res = word_pool.finalize(docx_path, [_split_op(continuation_title, header_rows_count, max_splits)])
+    return res.get("split_table2") is True
 
 
 def update_fields_and_split_table2(
@@ -188,35 +109,7 @@ def update_fields_and_split_table2(
     """
     1) Режет Таблицу 2 по фактическому переносу страницы (через Word).
     2) Обновляет поля документа + колонтитулы.
-    Возвращает True если были сделаны разрезы.
+    Один запуск Word на оба шага. Возвращает True если были сделаны разрезы.
     """
-    did_split = split_table2_with_continuation_word(
-        docx_path,
-        continuation_title=continuation_title,
-        header_rows_count=header_rows_count,
-    )
-
-    # Обновление полей/колонтитулов отдельным проходом (надежно)
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = False
-    try:
-        doc = word.Documents.Open(str(docx_path))
-        doc.Repaginate()
-
-        doc.Fields.Update()
-        for sec in doc.Sections:
-            try:
-                sec.Headers(1).Range.Fields.Update()
-            except Exception:
-                pass
-            try:
-                sec.Footers(1).Range.Fields.Update()
-            except Exception:
-                pass
-
-        doc.Save()
-        doc.Close()
-    finally:
-        word.Quit()
-
-    return did_split
+    res = word_pool.finalize(docx_path, [_split_op(continuation_title, header_rows_count), "fields"])
+    return res.get("split_table2") is True
@@ -0,0 +1,407 @@
+# word_facade.py
+"""
+Фасад автоматизации Word для сплиттеров таблиц + поддельный бэкенд.
+
+Сплиттеры искали строку разреза линейно: на каждую строку — межпроцессный
+COM-вызов Range.Information, а Таблица 2 — так на каждой из (до 20)
+итераций разреза. Страницы строк таблицы не убывают, поэтому первая строка,
+ушедшая за страницу, ищется галопом + делением пополам — O(log k) запросов
+на разрез (k — строк на странице):
+
+    probe = ComTableProbe(word_doc, tbl, c)               # FakeDocument.probe(...) в тестах
+    row = first_row_past_page(probe, page, lo=header_rows + 1)
+
+Цикл «репагинация -> поиск -> разрез» написан против протокола WordDocument
+(split_by_pages): ComDocument — Word через pywin32, FakeDocument — модель
+страниц в памяти, считает запросы (тесты и замеры на Linux без Word).
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, List, Optional, Protocol, Sequence
+
+from logger import logger
+
+
+# ===== 1) Протоколы =====
+class TableProbe(Protocol):
+    """Таблица, у строки которой можно спросить номер страницы."""
+
+    def row_count(self) -> int: ...
+
+    def row_page(self, row: int) -> Optional[int]:
+        """Страница, на которой КОНЧАЕТСЯ строка row (1-based); None — Word не ответил."""
+        ...
+
+
+class WordDocument(Protocol):
+    """Операции над открытым документом, которые нужны split_by_pages."""
+
+    def repaginate(self) -> None: ...
+
+    def probe(self, table) -> TableProbe: ...
+
+    def set_heading_rows(self, table, n: int) -> None: ...
+
+    def split_table(self, table, row: int, *, header_rows: int, title: str):
+        """
+        Строки row.. уходят в новую таблицу (с копией шапки) под абзацем title
+        с новой страницы. Возвращает новую таблицу.
+        """
+        ...
+
+
+SearchFn = Callable[..., Optional[int]]   # (probe, page, lo, *, hint) -> строка | None
+
+
+# ===== 2) Поиск строки разреза =====
+def first_row_past_page(
+    probe: TableProbe,
+    page: int,
+    lo: int,
+    hi: Optional[int] = None,
+    *,
+    hint: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Первая строка из lo..hi (1-based), которая кончается дальше страницы page;
+    None — все влезли. Строка, про которую Word не ответил, пропускается —
+    как в линейном переборе: решение принимается по ближайшей читаемой строке.
+
+    Сначала вилка «галопом» от lo + hint - 1 (hint — сколько строк влезло на
+    прошлую страницу; без него — от lo) шагами 1, 2, 4, …, затем деление
+    пополам внутри вилки: O(log k) запросов, k — строк на странице; при
+    точной подсказке — два запроса.
+    """
+    hi = probe.row_count() if hi is None else hi
+    if lo > hi:
+        return None
+
+    seen: Dict[int, Optional[bool]] = {}
+
+    def past(row: int) -> Optional[bool]:
+        """True/False — за страницей или нет; None — Word не ответил."""
+        if row not in seen:
+            pg = probe.row_page(row)
+            seen[row] = None if pg is None else pg > page
+        return seen[row]
+
+    # 1) вилка (good, bad]: до good включительно ответа нет, bad — читаемая
+    #    строка за страницей (hi + 1 — «все влезли»)
+    start = min(max(lo, lo + (hint or 1) - 1), hi)
+    good, bad = lo - 1, hi + 1
+    step = 1
+    state = past(start)
+    if state:
+        bad = pos = start
+        while pos - step >= lo:
+            pos -= step
+            state = past(pos)
+            if state is False:
+                good = pos
+                break
+            if state:
+                bad = pos
+            step *= 2
+    else:
+        if state is False:
+            good = start
+        pos = start
+        while pos < hi:
+            pos = min(pos + step, hi)
+            state = past(pos)
+            if state:
+                bad = pos
+                break
+            if state is False:
+                good = pos
+            step *= 2
+
+    # 2) деление пополам внутри (good, bad); нечитаемая середина —
+    #    ближайшая читаемая строка выше, иначе ниже
+    while bad - good > 1:
+        mid = (good + bad) // 2
+        state = past(mid)
+        if state is None:
+            mid = next((r for r in range(mid + 1, bad) if past(r) is not None), None) \
+                or next((r for r in range(mid - 1, good, -1) if past(r) is not None), None)
+            if mid is None:
+                break               # между good и bad читаемых строк нет
+            state = past(mid)
+        if state:
+            bad = mid
+        else:
+            good = mid
+    return bad if bad <= hi else None
+
+
+def first_row_past_page_linear(
+    probe: TableProbe,
+    page: int,
+    lo: int,
+    hi: Optional[int] = None,
+    *,
+    hint: Optional[int] = None,
+) -> Optional[int]:
+    """Прежний линейный перебор — для сравнения в тестах и замерах."""
+    hi = probe.row_count() if hi is None else hi
+    for row in range(lo, hi + 1):
+        pg = probe.row_page(row)
+        if pg is not None and pg > page:
+            return row
+    return None
+
+
+def split_by_pages(
+    doc: WordDocument,
+    table,
+    *,
+    header_rows: int,
+    title: str,
+    max_splits: int = 20,
+    search: SearchFn = first_row_past_page,
+) -> int:
+    """
+    Режет таблицу по фактическому переносу страниц: пока какая-то строка
+    уходит дальше страницы шапки — хвост переносится в новую таблицу
+    «title». Шапка повторяется. Возвращает число разрезов.
+    """
+    doc.set_heading_rows(table, header_rows)
+    splits = 0
+    cur = table
+    hint: Optional[int] = None
+    while splits < max_splits:
+        doc.repaginate()
+        probe = doc.probe(cur)
+        base_page = probe.row_page(header_rows)
+        if base_page is None:
+            break
+        row = search(probe, base_page, header_rows + 1, hint=hint)
+        if row is None:
+            break  # остаток таблицы помещается на странице
+        # следующие части начинаются с новой страницы под шапкой — влезет примерно столько же
+        hint = row - (header_rows + 1) if splits else None
+        cur = doc.split_table(cur, row, header_rows=header_rows, title=title)
+        splits += 1
+    return splits
+
+
+# ===== 3) Word через COM =====
+class ComTableProbe:
+    """
+    Страницы строк таблицы Word (COM). row_range(i) -> Range строки; по
+    умолчанию Rows(i).Range, для таблиц с vMerge — диапазон якорной ячейки.
+    page_at(pos) -> страница позиции документа (по умолчанию
+    wdActiveEndPageNumber). Ответы кэшируются до следующей репагинации
+    (новый probe).
+    """
+
+    def __init__(
+        self,
+        word_doc,
+        table,
+        c,
+        row_range: Optional[Callable[[int], object]] = None,
+        page_at: Optional[Callable[[int], Optional[int]]] = None,
+    ):
+        self._doc = word_doc
+        self._table = table
+        self._c = c
+        self._row_range = row_range or (lambda i: table.Rows(i).Range)
+        self._page_at = page_at or self._page_number
+        self._pages: Dict[int, Optional[int]] = {}
+
+    def _page_number(self, pos: int) -> Optional[int]:
+        return int(self._doc.Range(pos, pos).Information(self._c.wdActiveEndPageNumber))
+
+    def row_count(self) -> int:
+        return int(self._table.Rows.Count)
+
+    def row_page(self, row: int) -> Optional[int]:
+        if row not in self._pages:
+            try:
+                rng = self._row_range(row)
+                self._pages[row] = self._page_at(max(int(rng.End) - 1, int(rng.Start)))
+            except Exception:
+                self._pages[row] = None
+        return self._pages[row]
+
+
+class ComDocument:
+    """WordDocument поверх открытого документа Word (pywin32)."""
+
+    def __init__(self, word_app, word_doc, c):
+        self.app = word_app
+        self.doc = word_doc
+        self.c = c
+
+    def repaginate(self) -> None:
+        self.doc.Repaginate()
+
+    def probe(self, table) -> ComTableProbe:
+        return ComTableProbe(self.doc, table, self.c)
+
+    def set_heading_rows(self, table, n: int) -> None:
+        for i in range(1, n + 1):
+            try:
+                table.Rows(i).HeadingFormat = True
+            except Exception:
+                pass
+
+    def split_table(self, table, row: int, *, header_rows: int, title: str):
+        c = self.c
+        doc = self.doc
+
+        # 1) копия таблицы сразу после неё
+        count_before = doc.Tables.Count
+        ins = table.Range
+        ins.Collapse(c.wdCollapseEnd)
+        ins.InsertParagraphAfter()
+        ins.Collapse(c.wdCollapseEnd)
+        table.Range.Copy()
+        ins.PasteAndFormat(c.wdFormatOriginalFormatting)
+        new_table = doc.Tables(count_before + 1)
+
+        # 2) в новой — удалить строки до row (кроме шапки)
+        for _ in range((row - 1) - header_rows):
+            new_table.Rows(header_rows + 1).Delete()
+
+        # 3) в старой — удалить row..конец
+        while table.Rows.Count >= row:
+            table.Rows(row).Delete()
+
+        # 4) «Продолжение таблицы N» перед новой таблицей, 5) повтор шапки
+        self._insert_continuation_before(new_table, title)
+        self.set_heading_rows(new_table, header_rows)
+        return new_table
+
+    def _insert_continuation_before(self, table, title: str) -> None:
+        """
+        Абзац title ПЕРЕД table: с новой страницы (PageBreakBefore), TNR 12 bold,
+        справа. Гарантированно вне таблицы (не в ячейке).
+        """
+        c = self.c
+        sel = self.app.Selection
+        sel.SetRange(table.Range.Start, table.Range.Start)
+
+        # Word иногда держит Range внутри первой ячейки — выходим MoveLeft'ом
+        guard = 0
+        while sel.Information(c.wdWithInTable) and guard < 50:
+            sel.MoveLeft(Unit=c.wdCharacter, Count=1)
+            guard += 1
+
+        sel.InsertParagraphAfter()
+        sel.MoveUp(Unit=c.wdParagraph, Count=1)
+
+        sel.ParagraphFormat.PageBreakBefore = True
+        sel.ParagraphFormat.Alignment = c.wdAlignParagraphRight
+        sel.ParagraphFormat.SpaceBefore = 0
+        sel.ParagraphFormat.SpaceAfter = 0
+
+        sel.Font.Name = "Times New Roman"
+        sel.Font.Size = 12
+        sel.Font.Bold = True
+        # НЕ InsertBreak() — иначе может появляться пустая страница,
+        # и НЕ InsertParagraphAfter() — иначе появится лишняя пустая строка
+        sel.TypeText(title)
+
+
+# ===== 4) Поддельный бэкенд =====
+class FakeTable:
+    """Таблица модели: высоты строк; page_break_before — начинается с новой страницы."""
+
+    def __init__(self, heights: Sequence[int], *, page_break_before: bool = False):
+        self.heights: List[int] = list(heights)
+        self.page_break_before = page_break_before
+        self.heading_rows = 0
+        self.title: Optional[str] = None
+
+
+class FakeDocument:
+    """
+    Модель пагинации в памяти: блоки (абзацы фиксированной высоты и
+    таблицы) идут подряд, строка не рвётся, шапка (heading_rows) повторяется
+    на каждой странице. Считает запросы страниц и репагинации; probe_cost —
+    задержка на запрос (имитация COM для замеров).
+    """
+
+    def __init__(self, page_height: int = 1000, *, probe_cost: float = 0.0):
+        self.page_height = page_height
+        self.probe_cost = probe_cost
+        self.blocks: List[object] = []      # int (высота абзаца) или FakeTable
+        self.probes = 0
+        self.repaginations = 0
+        self._pages: Dict[int, List[int]] = {}
+
+    # ---------- построение ----------
+    def add_paragraph(self, height: int) -> None:
+        self.blocks.append(height)
+
+    def add_table(self, heights: Sequence[int]) -> FakeTable:
+        t = FakeTable(heights)
+        self.blocks.append(t)
+        return t
+
+    def tables(self) -> List[FakeTable]:
+        return [b for b in self.blocks if isinstance(b, FakeTable)]
+
+    # ---------- WordDocument ----------
+    def repaginate(self) -> None:
+        self.repaginations += 1
+        self._pages = {}
+        page, y, h_max = 1, 0, self.page_height
+        for b in self.blocks:
+            if not isinstance(b, FakeTable):
+                if y + b > h_max and y > 0:
+                    page, y = page + 1, 0
+                y += b
+                continue
+            if b.page_break_before and (y > 0 or page > 1):
+                page, y = page + 1, 0
+            if b.title is not None:
+                y += 20                     # абзац «Продолжение…»
+            hdr = sum(b.heights[:b.heading_rows])
+            pages: List[int] = []
+            for h in b.heights:
+                if y + h > h_max and y > 0:
+                    page, y = page + 1, (hdr if len(pages) >= b.heading_rows else 0)
+                y += h
+                pages.append(page)
+            self._pages[id(b)] = pages
+
+    def probe(self, table: FakeTable) -> "FakeProbe":
+        return FakeProbe(self, table)
+
+    def set_heading_rows(self, table: FakeTable, n: int) -> None:
+        table.heading_rows = n
+
+    def split_table(self, table: FakeTable, row: int, *, header_rows: int, title: str) -> FakeTable:
+        new = FakeTable(table.heights[:header_rows] + table.heights[row - 1:], page_break_before=True)
+        new.heading_rows = header_rows
+        new.title = title
+        del table.heights[row - 1:]
+        self.blocks.insert(self.blocks.index(table) + 1, new)
+        self._pages = {}                    # до репагинации страниц не знаем
+        return new
+
+    def _row_page(self, table: FakeTable, row: int) -> Optional[int]:
+        self.probes += 1
+        if self.probe_cost:
+            time.sleep(self.probe_cost)
+        pages = self._pages.get(id(table))
+        if pages is None:
+            logger.warning("FakeDocument: запрос страницы без репагинации.")
+            return None
+        return pages[row - 1]
+
+
+class FakeProbe:
+    def __init__(self, doc: FakeDocument, table: FakeTable):
+        self._doc = doc
+        self._table = table
+
+    def row_count(self) -> int:
+        return len(self._table.heights)
+
+    def row_page(self, row: int) -> Optional[int]:
+        return self._doc._row_page(self._table, row)
@@ -0,0 +1,431 @@
+# word_pool.py
+"""
+Один экземпляр MS Word на финализацию документов (и, по желанию, между заданиями).
+
+Раньше каждый Word-проход запускал и закрывал свой Word.Application:
+разрезание Таблицы 5 + поля протокола, разрезание Таблицы 2, отдельное
+обновление полей ОТЧ, финальный проход — 4–5 холодных стартов по 3–8 с на
+задание. Здесь Word живёт в одном служебном потоке (COM STA: все вызовы —
+из потока, где объект создан), документы открываются по очереди и над
+каждым выполняется очередь операций:
+
+    with word_pool.session():                        # один Word на задание
+        word_pool.finalize(out_path, PROTOCOL_OPS)   # split_table5, шапки 11.3, поля, TOC
+        word_pool.finalize(report_path, REPORT_OPS)
+
+Вне session() Word закрывается после каждого finalize(); keep_warm —
+оставить его запущенным между заданиями (закроется через idle_timeout или
+при выходе из процесса). Бэкенд подменяемый: ComBackend — pywin32,
+FakeBackend — запись операций в памяти для тестов.
+"""
+from __future__ import annotations
+
+import atexit
+import multiprocessing.util
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple, Union
+
+from logger import logger
+
+# операция над открытым документом: имя из OPS или fn(app, doc, constants)
+OpFn = Callable[[Any, Any, Any], Any]
+Op = Union[str, OpFn]
+
+
+# ===== 1) Операции =====
+def _split_table5(app, doc, c):
+    import word_table5_splitter
+    doc.Repaginate()
+    return word_table5_splitter.split_table5_with_continuation_open_doc(doc, header_rows=2)
+
+
+def _split_table2(app, doc, c):
+    from ui import word_table2_otch_splitter
+    return word_table2_otch_splitter.split_table2_open_doc(app, doc, c)
+
+
+def _test11_3_headers(app, doc, c):
+    import word_update_all
+    return word_update_all.enforce_test11_3_header_open_doc(doc)
+
+
+def _fields(app, doc, c):
+    import word_update_all
+    word_update_all.update_fields_open_doc(doc)
+
+
+def _toc(app, doc, c):
+    import word_update_all
+    word_update_all.update_toc_open_doc(doc)
+
+
+OPS: Dict[str, OpFn] = {
+    "split_table5": _split_table5,          # Таблица 5 -> «Продолжение таблицы 5»
+    "split_table2": _split_table2,          # ОТЧ, Таблица 2 -> «Продолжение таблицы 2»
+    "test11_3_headers": _test11_3_headers,  # шапка Теста 11.3 на каждой странице
+    "fields": _fields,                      # поля тела и колонтитулов
+    "toc": _toc,                            # содержание + финальный пересчёт NUMPAGES
+}
+
+PROTOCOL_OPS: Tuple[str, ...] = ("split_table5", "test11_3_headers", "fields", "toc")
+REPORT_OPS: Tuple[str, ...] = ("split_table2", "fields", "toc")
+
+
+def op_name(op: Op) -> str:
+    if isinstance(op, str):
+        return op
+    return getattr(getattr(op, "func", op), "__name__", repr(op))   # partial -> имя функции
+
+
+# ===== 2) Бэкенды =====
+class WordBackend(Protocol):
+    """Всё, что пул делает с Word. Все методы вызываются из служебного потока пула."""
+
+    def thread_init(self) -> None: ...
+
+    def thread_done(self) -> None: ...
+
+    def launch(self) -> Any: ...
+
+    def alive(self, app) -> bool: ...
+
+    def quit(self, app) -> None: ...
+
+    def open(self, app, path: str) -> Any: ...
+
+    def close(self, doc, *, save: bool) -> None: ...
+
+    def run(self, app, doc, op: Op) -> Any: ...
+
+
+class ComBackend:
+    """MS Word через pywin32 (только Windows)."""
+
+    def __init__(self):
+        self.constants = None
+        self._pythoncom = None
+
+    def thread_init(self) -> None:
+        import pythoncom
+        self._pythoncom = pythoncom
+        pythoncom.CoInitialize()
+
+    def thread_done(self) -> None:
+        if self._pythoncom is not None:
+            self._pythoncom.CoUninitialize()
+
+    def launch(self):
+        import win32com.client as win32
+        # DispatchEx — всегда новый экземпляр (не документы пользователя в его Word);
+        # EnsureDispatch поверх — типизированная обёртка, чтобы заполнились constants
+        app = win32.gencache.EnsureDispatch(win32.DispatchEx("Word.Application"))
+        app.Visible = False
+        app.DisplayAlerts = 0
+        self.constants = win32.constants
+        return app
+
+    def alive(self, app) -> bool:
+        try:
+            _ = app.Version
+            return True
+        except Exception:
+            return False
+
+    def quit(self, app) -> None:
+        app.Quit()
+
+    def open(self, app, path: str):
+        return app.Documents.Open(str(path), ReadOnly=False, AddToRecentFiles=False)
+
+    def close(self, doc, *, save: bool) -> None:
+        if save:
+            doc.Save()
+        doc.Close(SaveChanges=False)
+
+    def run(self, app, doc, op: Op):
+        fn = OPS[op] if isinstance(op, str) else op
+        return fn(app, doc, self.constants)
+
+
+class FakeBackend:
+    """Word в памяти: считает запуски, пишет журнал (путь, операция); для тестов."""
+
+    def __init__(self, *, fail_ops: Sequence[str] = ()):
+        self.fail_ops = set(fail_ops)
+        self.launches = 0
+        self.quits = 0
+        self.log: List[Tuple[str, str]] = []
+        self.saved: List[str] = []
+        self.threads: set = set()
+        self._apps: List[Dict[str, Any]] = []
+
+    def thread_init(self) -> None:
+        pass
+
+    def thread_done(self) -> None:
+        pass
+
+    def launch(self):
+        self.launches += 1
+        app = {"alive": True}
+        self._apps.append(app)
+        return app
+
+    def kill(self) -> None:
+        """Имитация упавшего Word: следующий finalize перезапустит его."""
+        for app in self._apps:
+            app["alive"] = False
+
+    def alive(self, app) -> bool:
+        return bool(app["alive"])
+
+    def quit(self, app) -> None:
+        self.quits += 1
+        app["alive"] = False
+
+    def open(self, app, path: str):
+        self.threads.add(threading.get_ident())
+        return {"path": str(path)}
+
+    def close(self, doc, *, save: bool) -> None:
+        if save:
+            self.saved.append(doc["path"])
+
+    def run(self, app, doc, op: Op):
+        name = op_name(op)
+        self.log.append((doc["path"], name))
+        if name in self.fail_ops:
+            raise RuntimeError(f"fake: {name}")
+        return None if isinstance(op, str) else op(app, doc, None)
+
+
+# ===== 3) Пул =====
+class _WordThread:
+    """
+    Служебный поток-демон с очередью. Не ThreadPoolExecutor: его потоки
+    завершаются ДО atexit, и закрыть Word при выходе было бы уже нечем.
+    """
+
+    def __init__(self):
+        self._q: "queue.Queue[Optional[Tuple[Future, Callable, tuple]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="word", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            fut, fn, args = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def submit(self, fn, *args) -> Future:
+        fut: Future = Future()
+        self._q.put((fut, fn, args))
+        return fut
+
+    def stop(self) -> None:
+        self._q.put(None)
+        self._thread.join()
+
+
+class WordPool:
+    """
+    Один Word в одном служебном потоке. session() — Word не закрывается,
+    пока открыта хоть одна сессия; keep_warm — не закрывается и после неё
+    (до idle_timeout секунд простоя или shutdown()).
+    """
+
+    def __init__(self, backend: Optional[WordBackend] = None, *, keep_warm: bool = False,
+                 idle_timeout: float = 300.0):
+        self._backend = backend
+        self.keep_warm = keep_warm
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._executor: Optional[_WordThread] = None
+        self._thread_ready = False
+        self._app = None
+        self._users = 0
+        self._idle: Optional[threading.Timer] = None
+        self._atexit = False
+        self._closed = False
+
+    @property
+    def backend(self) -> WordBackend:
+        if self._backend is None:
+            self._backend = ComBackend()
+        return self._backend
+
+    # ---------- служебный поток ----------
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WordPool закрыт")
+            if self._executor is None:
+                self._executor = _WordThread()
+                self._thread_ready = False
+                if not self._atexit:
+                    # atexit не срабатывает в дочерних процессах multiprocessing — там Finalize
+                    atexit.register(self.shutdown)
+                    multiprocessing.util.Finalize(None, self.shutdown, exitpriority=10)
+                    self._atexit = True
+            # в очередь — под замком: иначе shutdown() между ними оставит задачу после стопа
+            future = self._executor.submit(fn, *args)
+        return future.result()
+
+    def _ensure_app(self):
+        if not self._thread_ready:
+            self.backend.thread_init()
+            self._thread_ready = True
+        if self._app is not None and not self.backend.alive(self._app):
+            logger.warning("Word: экземпляр больше не отвечает — перезапускаем.")
+            self._app = None
+        if self._app is None:
+            self._app = self.backend.launch()
+        return self._app
+
+    def _quit_app(self) -> None:
+        if self._app is None:
+            return
+        try:
+            self.backend.quit(self._app)
+        except Exception as e:
+            logger.warning(f"Word: не удалось закрыть экземпляр: {e}")
+        self._app = None
+
+    def _finalize(self, path: str, ops: Sequence[Op]) -> Dict[str, Any]:
+        app = self._ensure_app()
+        results: Dict[str, Any] = {}
+        doc = self.backend.open(app, path)
+        try:
+            for op in ops:
+                try:
+                    results[op_name(op)] = self.backend.run(app, doc, op)
+                except Exception as e:
+                    # операции независимы: упавший сплиттер не должен отменять обновление полей
+                    logger.warning(f"Word: {op_name(op)} для {path}: {e}")
+                    results[op_name(op)] = e
+            self.backend.close(doc, save=True)
+            doc = None
+        finally:
+            if doc is not None:
+                try:
+                    self.backend.close(doc, save=False)
+                except Exception:
+                    pass
+        return results
+
+    def _release(self) -> None:
+        if self._users == 0 and not self.keep_warm:
+            self._quit_app()
+
+    def _quit_if_idle(self) -> None:
+        if self._users == 0:
+            self._quit_app()
+
+    # ---------- API ----------
+    def finalize(self, path: str, ops: Sequence[Op]) -> Dict[str, Any]:
+        """
+        Открыть документ, выполнить операции по порядку, сохранить и закрыть.
+        Возвращает {имя операции: результат или исключение}. Нет pywin32 —
+        warning в лог и {} (проход просто пропускается, как раньше в каждом
+        сплиттере). Исключение наружу — только если Word не запустился или
+        документ не открылся.
+        """
+        self._cancel_idle()
+        try:
+            return self._submit(self._finalize, str(path), tuple(ops))
+        except ImportError as e:
+            logger.warning(f"Word postprocess пропущен: pywin32 не установлен/недоступен: {e}")
+            return {}
+        finally:
+            self._release_after_use()
+
+    @contextmanager
+    def session(self) -> Iterator["WordPool"]:
+        """Word не закрывается между finalize() внутри сессии (сессии могут быть вложенными/параллельными)."""
+        with self._lock:
+            self._users += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._users -= 1
+            if self._app is not None:
+                self._release_after_use()
+
+    def _release_after_use(self) -> None:
+        # после shutdown() Word уже закрыт, а RuntimeError из finally скрыл бы исходную ошибку
+        try:
+            self._submit(self._release)
+        except RuntimeError:
+            if not self._closed:
+                raise
+            return
+        self._schedule_idle()
+
+    def _cancel_idle(self) -> None:
+        with self._lock:
+            if self._idle is not None:
+                self._idle.cancel()
+                self._idle = None
+
+    def _schedule_idle(self) -> None:
+        if not self.keep_warm or self._app is None or not self.idle_timeout:
+            return
+        with self._lock:
+            if self._idle is not None:
+                self._idle.cancel()
+            self._idle = threading.Timer(self.idle_timeout, self._idle_fire)
+            self._idle.daemon = True
+            self._idle.start()
+
+    def _idle_fire(self) -> None:
+        with self._lock:
+            if self._closed or self._executor is None:
+                return
+            future = self._executor.submit(self._quit_if_idle)
+        future.result()
+
+    def shutdown(self) -> None:
+        """
+        Закрыть Word и служебный поток (вызывается и при выходе из процесса).
+        После этого пул не запускает Word: finalize() — RuntimeError, таймер простоя — ничего.
+        """
+        self._cancel_idle()
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+
+        def _done():
+            self._quit_app()
+            if self._thread_ready:
+                self.backend.thread_done()
+                self._thread_ready = False
+
+        try:
+            executor.submit(_done).result()
+        finally:
+            executor.stop()
+
+
+# ===== 4) Пул процесса =====
+POOL = WordPool()
+
+
+def finalize(path: str, ops: Sequence[Op]) -> Dict[str, Any]:
+    return POOL.finalize(path, ops)
+
+
+def session():
+    return POOL.session()
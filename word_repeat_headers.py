@@ -3,13 +3,15 @@ from __future__ import annotations
 
 import re
 from copy import deepcopy
-from typing import Optional
+from typing import Iterable, Optional
 
 from docx.document import Document as DocxDocument
 from docx.table import Table
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 
+from table_view import TableView
+
 
 def _norm(s: str) -> str:
     s = "" if s is None else str(s)
@@ -23,8 +25,8 @@ def _norm(s: str) -> str:
     return s.replace("ё", "е")
 
 
-def _row_text(row) -> str:
-    return _norm(" ".join(c.text for c in row.cells))
+def _row_text(view: TableView, ri: int) -> str:
+    return _norm(" ".join(view.texts(ri)))
 
 
 def _mark_tr_as_header(tr_el) -> None:
@@ -43,10 +45,12 @@ def split_test_results_table(
     split_phrase: str = "Результаты испытания",
     header_rows: int = 2,
     table_must_contain: Optional[str] = None,
+    tables: Optional[Iterable[Table]] = None,
 ) -> int:
     """
     Разрезает таблицы так, чтобы строка ПОСЛЕ 'split_phrase' стала первой строкой новой таблицы.
     Затем помечает первые header_rows строк новой таблицы как повторяемый заголовок (tblHeader).
+    tables — кандидаты (например, из DocumentIndex); по умолчанию все doc.tables.
 
     Возвращает количество разрезанных таблиц.
     """
@@ -55,18 +59,19 @@ def split_test_results_table(
 
     changed = 0
 
-    for t in doc.tables:
-        if not t.rows:
+    for t in (doc.tables if tables is None else list(tables)):
+        view = TableView(t)
+        if not len(view):
             continue
 
         if must_key:
-            whole = _norm(" ".join(_row_text(r) for r in t.rows[: min(len(t.rows), 6)]))
+            whole = _norm(" ".join(_row_text(view, i) for i in range(min(len(view), 6))))
             if must_key not in whole:
                 continue
 
         marker_idx = None
-        for i, row in enumerate(t.rows):
-            if split_key in _row_text(row):
+        for i in range(len(view)):
+            if split_key in _row_text(view, i):
                 marker_idx = i
                 break
 
@@ -74,14 +79,12 @@ def split_test_results_table(
             continue
 
         start_new = marker_idx + 1
-        if start_new >= len(t.rows):
+        if start_new >= len(view):
             continue  # нечего переносить
 
         # XML таблицы и строки
         tbl_el = t._tbl
-        tr_elems = tbl_el.xpath("./w:tr")
-        if len(tr_elems) != len(t.rows):
-            continue
+        tr_elems = view.trs
 
         # Копия таблицы -> будущая "новая таблица"
         new_tbl_el = deepcopy(tbl_el)
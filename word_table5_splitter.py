@@ -23,6 +23,7 @@ import re
 from typing import Optional
 
 from logger import logger
+from word_facade import ComTableProbe, first_row_past_page
 
 
 # ------------------------------- helpers -------------------------------
@@ -329,34 +330,16 @@ def split_table5_with_continuation_open_doc(word_doc, *, header_rows: int = 2) -
         logger.info("Table5 split: слишком мало строк — делить не нужно.")
         return False
 
-    def _row_start_page(t, row_idx: int) -> Optional[int]:
-        cell = _row_anchor_cell(t, row_idx)
+    def _row_range(row_idx: int):
+        cell = _row_anchor_cell(tbl, row_idx)
         if not cell:
-            return None
-        return _page_at(int(cell.Range.Start))
-
-    def _row_end_page(t, row_idx: int) -> Optional[int]:
-        cell = _row_anchor_cell(t, row_idx)
-        if not cell:
-            return None
-        end_pos = int(cell.Range.End) - 1
-        if end_pos < int(cell.Range.Start):
-            end_pos = int(cell.Range.Start)
-        return _page_at(end_pos)
+            raise LookupError(row_idx)
+        return cell.Range
 
     # --- найти строку, которая уехала на следующую страницу (или ломается) ---
-    split_row_idx: Optional[int] = None
-    for r in range(header_rows + 1, rows_count + 1):
-        rp_start = _row_start_page(tbl, r)
-        if rp_start is None:
-            continue
-        if rp_start > start_page:
-            split_row_idx = r
-            break
-        rp_end = _row_end_page(tbl, r)
-        if rp_end is not None and rp_end > rp_start:
-            split_row_idx = r
-            break
+    # страницы строк не убывают -> деление пополам, O(log n) COM-запросов
+    probe = ComTableProbe(word_doc, tbl, c, row_range=_row_range, page_at=_page_at)
+    split_row_idx = first_row_past_page(probe, start_page, lo=header_rows + 1, hi=rows_count)
 
     if split_row_idx is None:
         logger.warning("Table5 split: не нашли строку для переноса/разрыва — пропускаем.")
@@ -552,58 +535,8 @@ def split_table5_with_continuation_open_doc(word_doc, *, header_rows: int = 2) -
 def update_fields_with_word(docx_path: str) -> None:
     """
     Открывает DOCX в Word, режет Таблицу 5, обновляет поля/колонтитулы, сохраняет.
-    ВАЖНО: вызывается из QThread => обязательно CoInitialize/CoUninitialize.
+    Word берётся из word_pool (один экземпляр, свой COM-поток); без pywin32 —
+    warning в лог и ничего не делаем.
     """
-    try:
-        import pythoncom
-        import win32com.client as win32
-    except Exception as e:
-        logger.warning(f"Word postprocess пропущен: pywin32 не установлен/недоступен: {e}")
-        return
-
-    pythoncom.CoInitialize()
-    word = None
-    doc = None
-    try:
-        word = win32.DispatchEx("Word.Application")
-        word.Visible = False
-        word.DisplayAlerts = 0
-
-        doc = word.Documents.Open(str(docx_path), ReadOnly=False, AddToRecentFiles=False)
-
-        try:
-            doc.Repaginate()
-            split_table5_with_continuation_open_doc(doc, header_rows=2)
-            doc.Repaginate()
-        except Exception as e:
-            logger.warning(f"Table5 split: ошибка во время разрезания: {e}")
-
-        # обновление полей
-        try:
-            doc.Fields.Update()
-        except Exception:
-            pass
-
-        try:
-            for sec in doc.Sections:
-                sec.Headers(1).Range.Fields.Update()
-                sec.Footers(1).Range.Fields.Update()
-        except Exception:
-            pass
-
-        doc.Save()
-        doc.Close(SaveChanges=False)
-        doc = None
-
-    finally:
-        try:
-            if doc is not None:
-                doc.Close(SaveChanges=False)
-        except Exception:
-            pass
-        try:
-            if word is not None:
-                word.Quit()
-        except Exception:
-            pass
-        pythoncom.CoUninitialize()
+    import word_pool
+    word_pool.finalize(docx_path, ("split_table5", "fields"))
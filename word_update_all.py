@@ -2,10 +2,9 @@
 from __future__ import annotations
 
 import re
-from typing import Optional
+from functools import partial
 
-import win32com.client as win32
-from win32com.client import constants as c
+import word_pool
 
 
 def _clean_text(s: str) -> str:
@@ -81,30 +80,78 @@ def _set_repeat_header(tbl, header_rows_count: int) -> None:
             pass
 
 
+def enforce_test11_3_header_open_doc(doc, header_rows_count: int = 2) -> int:
+    """
+    В ОТКРЫТОМ документе Word: все таблицы формата Тест 11.3 — с повтором шапки
+    на каждой странице. Возвращает количество найденных/исправленных таблиц.
+    """
+    changed = 0
+    for tbl in doc.Tables:
+        if _looks_like_test11_3_table(tbl):
+            _set_repeat_header(tbl, header_rows_count=header_rows_count)
+            changed += 1
+    return changed
+
+
+def update_fields_open_doc(doc) -> None:
+    """
+    В ОТКРЫТОМ документе Word: Repaginate, поля основного текста и колонтитулов.
+    """
+    doc.Repaginate()
+
+    # 1) Поля в основном тексте
+    try:
+        doc.Fields.Update()
+    except Exception:
+        pass
+
+    # 2) Колонтитулы
+    for sec in doc.Sections:
+        for hf_idx in (1, 2, 3):  # 1=Primary, 2=FirstPage, 3=EvenPages
+            try:
+                sec.Headers(hf_idx).Range.Fields.Update()
+            except Exception:
+                pass
+            try:
+                sec.Footers(hf_idx).Range.Fields.Update()
+            except Exception:
+                pass
+
+
+def update_toc_open_doc(doc) -> None:
+    """
+    В ОТКРЫТОМ документе Word: содержание (TOC), если есть, и ещё один
+    пересчёт полей — NUMPAGES/страницы после всех вставок/разрывов.
+    """
+    try:
+        # Если TOC несколько — обновим все
+        for i in range(1, doc.TablesOfContents.Count + 1):
+            try:
+                doc.TablesOfContents(i).Update()
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    doc.Repaginate()
+    try:
+        doc.Fields.Update()
+    except Exception:
+        pass
+
+
 def enforce_test11_3_header_each_page(docx_path: str, header_rows_count: int = 2) -> int:
     """
     Находит все таблицы формата Тест 11.3 и включает повтор шапки на каждой странице.
     Возвращает количество найденных/исправленных таблиц.
     """
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = False
+    op = partial(_enforce_op, header_rows_count=header_rows_count)
+    res = word_pool.finalize(docx_path, [op]).get(word_pool.op_name(op))
+    return res if isinstance(res, int) else 0
 
-    changed = 0
-    try:
-        doc = word.Documents.Open(str(docx_path))
-        doc.Repaginate()
 
-        for tbl in doc.Tables:
-            if _looks_like_test11_3_table(tbl):
-                _set_repeat_header(tbl, header_rows_count=header_rows_count)
-                changed += 1
-
-        if changed:
-            doc.Save()
-        doc.Close()
-        return changed
-    finally:
-        word.Quit()
+def _enforce_op(app, doc, c, *, header_rows_count: int = 2) -> int:
+    return enforce_test11_3_header_open_doc(doc, header_rows_count)
 
 
 def update_all_fields_toc_headers(docx_path: str) -> None:
@@ -115,60 +162,19 @@ def update_all_fields_toc_headers(docx_path: str) -> None:
     - обновление полей в колонтитулах
     - обновление содержания (TOC), если есть
     """
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = False
-    try:
-        doc = word.Documents.Open(str(docx_path))
-        doc.Repaginate()
+    word_pool.finalize(docx_path, ("fields", "toc"))
 
-        # 1) Обновить поля в основном тексте
-        try:
-            doc.Fields.Update()
-        except Exception:
-            pass
 
-        # 2) Колонтитулы
-        for sec in doc.Sections:
-            for hf_idx in (1, 2, 3):  # 1=Primary, 2=FirstPage, 3=EvenPages
-                try:
-                    sec.Headers(hf_idx).Range.Fields.Update()
-                except Exception:
-                    pass
-                try:
-                    sec.Footers(hf_idx).Range.Fields.Update()
-                except Exception:
-                    pass
-
-        # 3) Содержание (TOC)
-        try:
-            if doc.TablesOfContents.Count >= 1:
-                # Если TOC несколько — обновим все
-                for i in range(1, doc.TablesOfContents.Count + 1):
-                    try:
-                        doc.TablesOfContents(i).Update()
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
-        # 4) Ещё разок для пересчёта NUMPAGES после всех вставок/разрывов
-        doc.Repaginate()
-        try:
-            doc.Fields.Update()
-        except Exception:
-            pass
-
-        doc.Save()
-        doc.Close()
-    finally:
-        word.Quit()
+def update_all(docx_path: str) -> None:
+    """Финальный проход ОТЧ: поля, колонтитулы, содержание."""
+    update_all_fields_toc_headers(docx_path)
 
 
 def finalize_docx(docx_path: str, *, test11_3_header_rows: int = 2) -> None:
     """
-    Один вызов на финализацию документа:
+    Один вызов (и один запуск Word) на финализацию документа:
     - сделать повтор шапки в таблице Тест 11.3 (на каждой странице)
     - обновить TOC/поля/колонтитулы (NUMPAGES/страницы в содержании)
     """
-    enforce_test11_3_header_each_page(docx_path, header_rows_count=test11_3_header_rows)
-    update_all_fields_toc_headers(docx_path)
+    op = partial(_enforce_op, header_rows_count=test11_3_header_rows)
+    word_pool.finalize(docx_path, (op, "fields", "toc"))
@@ -0,0 +1,199 @@
+# workbook_cache.py
+"""
+Общий слой данных Excel: каждая книга читается один раз на сессию.
+
+Раньше одни и те же файлы открывались на каждом рендере и разными
+библиотеками: pandas (тесты, перечень приборов — io_manager), openpyxl в
+полном режиме (анализ рисков — Таблица 5, данные Таблицы 2 ОТЧ). В режиме
+«OQ и PQ» оба задания заново читали один и тот же «ПЕРЕЧЕНЬ ПРИБОРОВ OQ.xlsx»
+и risk_analysis_from_docx.xlsx.
+
+Теперь книга читается потоково (openpyxl read_only, data_only — как это
+делает и pandas), значения ячеек всех листов лежат в памяти по ключу
+(путь, mtime, размер), а снимок — в .cache/workbooks, так что следующий
+запуск программы Excel вообще не разбирает:
+
+    book = workbook_cache.get_book(path)
+    for row in book.rows():                    # активный лист, кортежи значений
+        ...
+    df = workbook_cache.frame(path, sheet)     # то же, что pd.read_excel(..., dtype=str)
+    idx = workbook_cache.derived(path, "risk_index", RiskIndex.from_book)
+
+derived() — производные структуры (индексы, словари) на ту же книгу:
+строятся один раз и сбрасываются вместе с ней при изменении файла.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from file_utils import cache_dir
+from logger import logger
+
+_FORMAT = 1
+
+Row = Tuple[Any, ...]
+
+
+@dataclass
+class BookData:
+    """Значения ячеек книги: лист -> строки (кортежи, хвостовые пустые ячейки/строки срезаны)."""
+    path: str
+    stamp: Tuple[int, int]                      # (mtime_ns, размер)
+    sheets: Dict[str, List[Row]]                # в порядке листов книги
+    active: str                                 # активный лист (wb.active)
+    derived: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.sheets)
+
+    def rows(self, sheet: Optional[str] = None) -> List[Row]:
+        """Строки листа (по умолчанию — активного), начиная с первой (шапки)."""
+        return self.sheets[self.active if sheet is None else sheet]
+
+
+# ===== 1) Чтение книги =====
+def _cell_value(cell) -> Any:
+    # ошибки формул (#DIV/0!, #REF! …) — пустая ячейка; pandas их тоже отдаёт как NaN
+    return None if cell.data_type == "e" else cell.value
+
+
+def _read_book(path: str, stamp: Tuple[int, int]) -> BookData:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheets: Dict[str, List[Row]] = {}
+        for ws in wb.worksheets:
+            ws.reset_dimensions()   # размеры в файле бывают неверными
+            rows: List[Row] = []
+            last = -1
+            for r in ws.rows:
+                values = [_cell_value(c) for c in r]
+                while values and values[-1] is None:
+                    values.pop()
+                if values:
+                    last = len(rows)
+                rows.append(tuple(values))
+            sheets[ws.title] = rows[:last + 1]
+        active = wb.active.title if wb.active is not None else next(iter(sheets), "")
+    finally:
+        wb.close()
+    return BookData(path=path, stamp=stamp, sheets=sheets, active=active)
+
+
+# ===== 2) Кэш на процесс + снимок на диске =====
+_books: Dict[str, BookData] = {}
+_lock = threading.Lock()
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _store_file(path: str):
+    h = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+    return cache_dir("workbooks") / f"{h}.pkl"
+
+
+def _load_snapshot(path: str, stamp: Tuple[int, int]) -> Optional[BookData]:
+    store = _store_file(path)
+    if not store.exists():
+        return None
+    try:
+        with open(store, "rb") as f:
+            fmt, saved_path, saved_stamp, sheets, active = pickle.load(f)
+    except Exception as e:
+        logger.debug(f"Снимок книги {store.name} не прочитан ({e}) — читаю Excel")
+        return None
+    if fmt != _FORMAT or saved_path != path or tuple(saved_stamp) != stamp:
+        return None
+    return BookData(path=path, stamp=stamp, sheets=sheets, active=active)
+
+
+def _save_snapshot(book: BookData) -> None:
+    store = _store_file(book.path)
+    try:
+        tmp = store.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((_FORMAT, book.path, book.stamp, book.sheets, book.active), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, store)
+    except OSError as e:
+        logger.debug(f"Снимок книги не сохранён: {e}")
+
+
+def get_book(xlsx_path) -> BookData:
+    """Книга из памяти / снимка / Excel (по ключу путь + mtime + размер)."""
+    path = os.path.abspath(str(xlsx_path))
+    stamp = _stamp(path)
+    with _lock:
+        book = _books.get(path)
+    if book is not None and book.stamp == stamp:
+        return book
+
+    book = _load_snapshot(path, stamp)
+    if book is None:
+        book = _read_book(path, stamp)
+        _save_snapshot(book)
+        logger.debug(f"Excel прочитан: {os.path.basename(path)} ({len(book.sheets)} лист.)")
+
+    with _lock:
+        cur = _books.get(path)
+        if cur is not None and cur.stamp == stamp:
+            return cur   # параллельный поток успел первым — берём его (с его derived)
+        _books[path] = book
+    return book
+
+
+def derived(xlsx_path, name: str, build: Callable[[BookData], Any]) -> Any:
+    """build(book), посчитанный один раз на версию книги."""
+    book = get_book(xlsx_path)
+    try:
+        return book.derived[name]
+    except KeyError:
+        return book.derived.setdefault(name, build(book))
+
+
+def clear() -> None:
+    """Сбросить кэш в памяти (снимки на диске остаются)."""
+    with _lock:
+        _books.clear()
+
+
+# ===== 3) pandas =====
+def _pd_cell(v: Any) -> Any:
+    # как pandas OpenpyxlReader._convert_cell: пусто -> "", целые float -> int
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def frame(xlsx_path, sheet: Optional[str] = None, *, dtype=str):
+    """
+    DataFrame листа (по умолчанию — первого, как pd.read_excel) из кэша:
+    тот же разбор, что pd.read_excel(path, sheet_name=sheet, dtype=dtype).
+    """
+    import pandas as pd
+    from pandas.errors import EmptyDataError
+    from pandas.io.parsers import TextParser
+
+    book = get_book(xlsx_path)
+    rows = book.rows(book.sheet_names[0] if sheet is None else sheet)
+    if not rows:
+        return pd.DataFrame()
+
+    width = max(len(r) for r in rows)
+    data = [[_pd_cell(v) for v in r] + [""] * (width - len(r)) for r in rows]
+    try:
+        return TextParser(data, header=0, dtype=dtype, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()